@@ -0,0 +1,183 @@
+"""
+Banc de charge de bout en bout de la surveillance PlexPatrol
+
+Lance le moteur de surveillance contre le serveur Plex simulé
+(benchmarks/plex_simulator.py), hors ligne, pendant une durée donnée, puis
+rapporte:
+    - le débit de sondage (sondages par seconde);
+    - le délai d'application des règles, du dépassement de la limite de
+      flux jusqu'à la requête d'arrêt reçue par le serveur;
+    - le temps CPU du thread de surveillance et la mémoire résidente maximale;
+    - la répartition par étape des cycles de sondage.
+
+Usage:
+    python benchmarks/load_harness.py --users 200 --duration 30 --interval 0.5
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import threading
+from types import SimpleNamespace
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from benchmarks.plex_simulator import PlexSimulator  # noqa: E402
+
+
+def _max_rss_mb():
+    """Mémoire résidente maximale du processus, en Mo (None si indisponible)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Ko sous Linux, octets sous macOS
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def _format_ms(seconds):
+    return f"{seconds * 1000:8.1f} ms"
+
+
+def run_load(args):
+    """Exécuter le moteur contre le simulateur et retourner les mesures"""
+    from utils.logger import setup_logging
+    from data.database import PlexPatrolDB
+    from core.engine import MonitoringEngine
+
+    # Les logs restent dans les fichiers: la sortie standard est réservée au rapport
+    setup_logging(console=False)
+
+    simulator = PlexSimulator(
+        users=args.users,
+        max_streams=args.max_streams,
+        limit=args.limit,
+        churn=args.churn,
+        latency=args.latency,
+        error_rate=args.error_rate,
+        seed=args.seed,
+    )
+    url = simulator.start()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db = PlexPatrolDB(os.path.join(tmp_dir, "load.db"))
+        for user_id, username in simulator.users.items():
+            db.add_or_update_user(str(user_id), username, max_streams=args.limit)
+
+        config = SimpleNamespace(
+            plex_servers=[
+                {"id": "default", "name": "Simulateur", "url": url, "token": "load"}
+            ],
+            check_interval=args.interval,
+            termination_message="load harness",
+            enforcement_grace_period=args.grace_period,
+            enforcement_grace_polls=args.grace_polls,
+        )
+        engine = MonitoringEngine(db_instance=db, config=config)
+        # Les notifications Telegram ne sont pas envoyées pendant la mesure
+        engine.send_telegram = lambda message: False
+
+        polls = []
+        engine.subscribe("sessions_updated", lambda user_streams: polls.append(1))
+
+        cpu = {}
+
+        def run_engine():
+            engine.run()
+            cpu["seconds"] = time.thread_time()
+
+        thread = threading.Thread(target=run_engine, name="load-engine")
+        started = time.perf_counter()
+        thread.start()
+        time.sleep(args.duration)
+        engine.stop()
+        thread.join()
+        elapsed = time.perf_counter() - started
+
+        simulator.stop()
+
+    return {
+        "elapsed": elapsed,
+        "polls": len(polls),
+        "cpu": cpu.get("seconds", 0.0),
+        "rss_mb": _max_rss_mb(),
+        "simulator": simulator.snapshot(),
+        "percentiles": engine.timings.percentiles(),
+    }
+
+
+def print_report(result):
+    from core.diagnostics import STAGES, STAGE_LABELS, percentile
+
+    simulator = result["simulator"]
+    requests = simulator["requests"]
+    delays = sorted(simulator["enforcement_delays"])
+
+    print(f"Durée mesurée            {result['elapsed']:8.1f} s")
+    print(
+        f"Sondages                 {result['polls']:8d}"
+        f"  ({result['polls'] / result['elapsed']:.2f}/s)"
+    )
+    print(
+        f"Requêtes simulateur      sessions={requests['sessions']}"
+        f" erreurs={requests['errors']} arrêts={requests['terminate']}"
+    )
+    print(f"Sessions restantes       {simulator['streams']:8d}")
+
+    print("\nDélai dépassement -> arrêt")
+    if delays:
+        for label, fraction in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99)):
+            print(f"  {label:<22} {_format_ms(percentile(delays, fraction))}")
+        print(f"  {'max':<22} {_format_ms(delays[-1])}")
+    else:
+        print("  aucun arrêt mesuré")
+
+    print("\nRessources")
+    print(
+        f"  {'CPU thread moteur':<22} {result['cpu']:8.2f} s"
+        f"  ({100 * result['cpu'] / result['elapsed']:.1f} %)"
+    )
+    if result["rss_mb"] is not None:
+        print(f"  {'RSS max':<22} {result['rss_mb']:8.1f} Mo")
+
+    print("\nDurée par étape (p50 / p95 / p99)")
+    for stage in STAGES + ("total",):
+        values = result["percentiles"][stage]
+        label = STAGE_LABELS.get(stage, "Total")
+        print(f"  {label:<22} " + " / ".join(_format_ms(v).strip() for v in values))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--max-streams", type=int, default=4)
+    parser.add_argument("--limit", type=int, default=2, help="Limite de flux par utilisateur")
+    parser.add_argument("--churn", type=float, default=0.05)
+    parser.add_argument("--latency", type=float, default=0.0, help="en secondes")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--interval", type=float, default=1.0, help="Intervalle de sondage (s)")
+    parser.add_argument("--duration", type=float, default=10.0, help="Durée de la mesure (s)")
+    parser.add_argument(
+        "--grace-period",
+        type=float,
+        default=0.0,
+        help="Délai de grâce avant l'arrêt (s, 0: arrêt immédiat)",
+    )
+    parser.add_argument(
+        "--grace-polls",
+        type=int,
+        default=1,
+        help="Sondages en dépassement avant l'arrêt (1: arrêt immédiat)",
+    )
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    print_report(run_load(args))
+
+
+if __name__ == "__main__":
+    main()
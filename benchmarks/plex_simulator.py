@@ -0,0 +1,302 @@
+"""
+Faux serveur Plex local, pour exercer PlexPatrol sans serveur réel
+
+Points de terminaison servis:
+    - /status/sessions: sessions actives générées pour un nombre configurable
+      d'utilisateurs, avec renouvellement aléatoire (changement d'état, fin et
+      début de lecture) à chaque requête;
+    - /status/sessions/terminate?sessionId=...: arrêt d'une session;
+    - /accounts: liste des comptes simulés.
+
+Une latence et un taux d'erreur (HTTP 500) peuvent être injectés. Le
+simulateur mesure aussi, pour chaque arrêt, le délai depuis le moment où
+l'utilisateur a dépassé sa limite de flux.
+
+Usage:
+    python benchmarks/plex_simulator.py --users 50 --max-streams 4 --port 32400
+"""
+
+import time
+import random
+import argparse
+import threading
+from urllib.parse import urlparse, parse_qs
+from xml.sax.saxutils import quoteattr
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PLATFORMS = [
+    ("Chrome", "Plex Web", "Windows"),
+    ("Android", "Plex for Android", "Pixel 7"),
+    ("iOS", "Plex for iOS", "iPhone"),
+    ("Roku", "Plex for Roku", "Roku Ultra"),
+    ("tvOS", "Plex for Apple TV", "Apple TV"),
+]
+
+TITLES = ["Film A", "Film B", "Série - S01 - Épisode 1", "Documentaire", "Concert"]
+
+# Résolution et débit typique (kb/s) des médias simulés
+QUALITIES = [("4k", 40000), ("1080", 12000), ("720", 4000), ("sd", 1500)]
+
+
+class SimulatedStream:
+    """Session active simulée"""
+
+    def __init__(self, session_id, user_id, rng):
+        self.session_id = session_id
+        self.user_id = user_id
+        self.player_id = f"player-{session_id}"
+        self.ip_address = f"10.{user_id % 250}.{rng.randint(0, 250)}.{rng.randint(1, 250)}"
+        self.platform, self.product, self.device = rng.choice(PLATFORMS)
+        self.title = rng.choice(TITLES)
+        self.transcode = rng.random() < 0.3
+        self.resolution, bitrate = rng.choice(QUALITIES)
+        self.bandwidth = int(bitrate * rng.uniform(0.8, 1.2))
+        self.state = "playing"
+        self.started_at = time.time()
+
+    def to_xml(self, username):
+        transcode = (
+            '<TranscodeSession videoDecision="transcode" audioDecision="copy"/>'
+            if self.transcode
+            else ""
+        )
+        return (
+            f'<Video title={quoteattr(self.title)} librarySectionTitle="Films">'
+            f'<Media videoResolution="{self.resolution}" selected="1"/>'
+            f'<Session id="{self.session_id}" bandwidth="{self.bandwidth}" location="wan"/>'
+            f"{transcode}"
+            f'<Player state="{self.state}" address="{self.ip_address}" '
+            f'machineIdentifier="{self.player_id}" platform={quoteattr(self.platform)} '
+            f"product={quoteattr(self.product)} device={quoteattr(self.device)}/>"
+            f'<User id="{self.user_id}" title={quoteattr(username)}/>'
+            f"</Video>"
+        )
+
+
+class PlexSimulator:
+    """
+    État du serveur simulé et serveur HTTP associé
+
+    Args:
+        users (int): Nombre de comptes simulés
+        max_streams (int): Nombre maximum de flux simultanés par utilisateur
+        limit (int): Limite appliquée par PlexPatrol, pour mesurer le délai
+            entre le dépassement et l'arrêt
+        churn (float): Probabilité, par flux et par requête, d'un changement
+        latency (float): Latence ajoutée à chaque requête, en secondes
+        error_rate (float): Proportion de requêtes /status/sessions en erreur 500
+        seed (int, optional): Graine du générateur aléatoire
+    """
+
+    def __init__(
+        self,
+        users=10,
+        max_streams=3,
+        limit=2,
+        churn=0.05,
+        latency=0.0,
+        error_rate=0.0,
+        seed=None,
+    ):
+        self.users = {user_id: f"user{user_id}" for user_id in range(1, users + 1)}
+        self.max_streams = max_streams
+        self.limit = limit
+        self.churn = churn
+        self.latency = latency
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+
+        self.streams = {}  # {session_id: SimulatedStream}
+        self.user_stream_counts = dict.fromkeys(self.users, 0)
+        self.over_limit_since = {}  # {user_id: horodatage du dépassement}
+        self.enforcement_delays = []  # Délais dépassement -> arrêt, en secondes
+        self.requests = {"sessions": 0, "terminate": 0, "accounts": 0, "errors": 0}
+
+        self._next_session = 1
+        self._lock = threading.Lock()
+        self._server = None
+
+        with self._lock:
+            for user_id in self.users:
+                for _ in range(self.random.randint(0, max_streams)):
+                    self._start_stream(user_id)
+
+    # =====================================================
+    # ÉTAT SIMULÉ
+    # =====================================================
+
+    def _start_stream(self, user_id):
+        session_id = str(self._next_session)
+        self._next_session += 1
+        self.streams[session_id] = SimulatedStream(session_id, user_id, self.random)
+        self.user_stream_counts[user_id] += 1
+        if self.user_stream_counts[user_id] > self.limit:
+            self.over_limit_since.setdefault(user_id, time.time())
+
+    def _end_stream(self, session_id):
+        stream = self.streams.pop(session_id)
+        self.user_stream_counts[stream.user_id] -= 1
+        if self.user_stream_counts[stream.user_id] <= self.limit:
+            self.over_limit_since.pop(stream.user_id, None)
+        return stream
+
+    def _apply_churn(self):
+        """Faire évoluer les sessions entre deux requêtes"""
+        for session_id, stream in list(self.streams.items()):
+            roll = self.random.random()
+            if roll < self.churn / 2:
+                self._end_stream(session_id)
+            elif roll < self.churn:
+                stream.state = "paused" if stream.state == "playing" else "playing"
+
+        for user_id in self.users:
+            if (
+                self.random.random() < self.churn
+                and self.user_stream_counts[user_id] < self.max_streams
+            ):
+                self._start_stream(user_id)
+
+    def sessions_xml(self):
+        with self._lock:
+            self._apply_churn()
+            videos = "".join(
+                stream.to_xml(self.users[stream.user_id])
+                for stream in self.streams.values()
+            )
+            size = len(self.streams)
+        return f'<MediaContainer size="{size}">{videos}</MediaContainer>'
+
+    def accounts_xml(self):
+        accounts = "".join(
+            f'<Account id="{user_id}" name={quoteattr(name)}/>'
+            for user_id, name in self.users.items()
+        )
+        return f'<MediaContainer size="{len(self.users)}">{accounts}</MediaContainer>'
+
+    def terminate(self, session_id):
+        """Arrêter une session; retourne False si elle n'existe pas"""
+        with self._lock:
+            stream = self.streams.get(session_id)
+            if stream is None:
+                return False
+            since = self.over_limit_since.get(stream.user_id)
+            if since is not None:
+                self.enforcement_delays.append(time.time() - since)
+            self._end_stream(session_id)
+            return True
+
+    def snapshot(self):
+        """Copie des compteurs, pour le rapport de charge"""
+        with self._lock:
+            return {
+                "streams": len(self.streams),
+                "requests": dict(self.requests),
+                "enforcement_delays": list(self.enforcement_delays),
+            }
+
+    # =====================================================
+    # SERVEUR HTTP
+    # =====================================================
+
+    def _handler_class(self):
+        simulator = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                if simulator.latency:
+                    time.sleep(simulator.latency)
+
+                if url.path == "/status/sessions":
+                    with simulator._lock:
+                        simulator.requests["sessions"] += 1
+                        failed = simulator.random.random() < simulator.error_rate
+                        if failed:
+                            simulator.requests["errors"] += 1
+                    if failed:
+                        self._reply(500, "Erreur simulée")
+                    else:
+                        self._reply(200, simulator.sessions_xml())
+                elif url.path == "/status/sessions/terminate":
+                    with simulator._lock:
+                        simulator.requests["terminate"] += 1
+                    session_id = parse_qs(url.query).get("sessionId", [""])[0]
+                    if simulator.terminate(session_id):
+                        self._reply(200, "")
+                    else:
+                        self._reply(404, "Session inconnue")
+                elif url.path == "/accounts":
+                    with simulator._lock:
+                        simulator.requests["accounts"] += 1
+                    self._reply(200, simulator.accounts_xml())
+                else:
+                    self._reply(404, "")
+
+            def _reply(self, status, body):
+                data = body.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/xml")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self, host="127.0.0.1", port=0):
+        """Démarrer le serveur dans un thread; retourne son URL"""
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        threading.Thread(
+            target=self._server.serve_forever, name="plex-simulator", daemon=True
+        ).start()
+        return self.url
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=32400)
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--max-streams", type=int, default=3)
+    parser.add_argument("--limit", type=int, default=2)
+    parser.add_argument("--churn", type=float, default=0.05)
+    parser.add_argument("--latency", type=float, default=0.0, help="en secondes")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    simulator = PlexSimulator(
+        users=args.users,
+        max_streams=args.max_streams,
+        limit=args.limit,
+        churn=args.churn,
+        latency=args.latency,
+        error_rate=args.error_rate,
+        seed=args.seed,
+    )
+    url = simulator.start(args.host, args.port)
+    print(f"Serveur Plex simulé sur {url} ({len(simulator.streams)} sessions)")
+
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        simulator.stop()
+
+
+if __name__ == "__main__":
+    main()
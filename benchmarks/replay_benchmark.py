@@ -0,0 +1,155 @@
+"""
+Rejeu des sondages enregistrés dans la chaîne de surveillance complète
+
+Rejoue les réponses de /status/sessions conservées par l'enregistreur
+(data/recordings) dans le moteur réel, sur une copie de la base: parsing,
+écriture en base, règles et délai de grâce. Aucun arrêt n'est envoyé à Plex.
+Rapporte:
+    - le débit (sondages et sessions par seconde);
+    - la répartition par étape des cycles de sondage;
+    - les décisions d'arrêt prises, par utilisateur.
+
+Les décisions ne dépendent que des enregistrements, de la base et de la
+configuration: --json les écrit dans un fichier, à comparer d'une version
+à l'autre.
+
+Usage:
+    python benchmarks/replay_benchmark.py --interval 30 --json decisions.json
+"""
+
+import os
+import sys
+import json
+import argparse
+import tempfile
+from datetime import datetime
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+
+def _timestamp(value):
+    """Date ISO (AAAA-MM-JJ[THH:MM]) en horodatage"""
+    return datetime.fromisoformat(value).timestamp()
+
+
+def _format_ms(seconds):
+    return f"{seconds * 1000:8.2f} ms"
+
+
+def run(args):
+    """Rejouer les enregistrements et retourner les mesures et les décisions"""
+    from utils import get_app_path
+    from utils.constants import Paths
+    from utils.logger import setup_logging
+    from config.config_manager import config
+    from data.database import PlexPatrolDB
+    from data.recorder import PollRecorder
+    from core.replay import (
+        ReplayEngine,
+        copy_database,
+        replay_config,
+        replay_polls,
+        run_replay,
+    )
+
+    # Les logs restent dans les fichiers: la sortie standard est réservée au rapport
+    setup_logging(console=False)
+
+    recordings = args.recordings or os.path.join(
+        get_app_path(), Paths.DATA, Paths.RECORDINGS
+    )
+    recorder = PollRecorder(recordings)
+    source_db = args.db or config.db_path
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # Le rejeu écrit en base: il travaille sur une copie
+        db_path = os.path.join(tmp_dir, "replay.db")
+        copy_database(source_db, db_path)
+        db = PlexPatrolDB(db_path)
+
+        start = _timestamp(args.start) if args.start else recorder.stats()["first"]
+        engine = ReplayEngine(
+            db,
+            replay_config(config.snapshot(), sorted(recorder.servers())),
+            start=start,
+        )
+        polls = replay_polls(
+            recorder,
+            start=start,
+            end=_timestamp(args.end) if args.end else None,
+            interval=args.interval,
+        )
+        # La copie contient aussi les décisions passées (réelles et simulées):
+        # seules celles écrites pendant le rejeu entrent dans le rapport
+        replay_started = datetime.now()
+        result = run_replay(engine, polls)
+
+        result["percentiles"] = engine.timings.percentiles()
+        result["terminations"] = engine.terminations
+        result["decisions"] = db.get_enforcement_report(replay_started, datetime.max)
+
+    recorder.close()
+    return result
+
+
+def print_report(result):
+    from core.diagnostics import STAGES, STAGE_LABELS
+
+    print(f"Sondages rejoués         {result['polls']:8d}")
+    print(f"Sessions                 {result['sessions']:8d}")
+    print(f"Durée                    {result['elapsed']:8.2f} s")
+    print(
+        f"Débit                    {result['polls_per_second']:8.1f} sondages/s"
+        f"  {result['sessions_per_second']:8.1f} sessions/s"
+    )
+
+    print("\nDurée par étape (p50 / p95 / p99)")
+    for stage in STAGES + ("total",):
+        values = result["percentiles"].get(stage)
+        if values is None:
+            continue
+        label = STAGE_LABELS.get(stage, "Total")
+        print(f"  {label:<20} " + " / ".join(_format_ms(value).strip() for value in values))
+
+    print(f"\nArrêts capturés          {len(result['terminations']):8d}")
+    for row in result["decisions"]:
+        print(
+            f"  {row['username'] or row['user_id']:<22}"
+            f" {row['decisions']:6d} décision(s) {row['sessions']:6d} session(s)"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--recordings", help="Dossier des enregistrements (data/recordings par défaut)"
+    )
+    parser.add_argument(
+        "--db", help="Base à copier pour le rejeu (base de l'application par défaut)"
+    )
+    parser.add_argument("--start", help="Début de la période (AAAA-MM-JJ[THH:MM])")
+    parser.add_argument("--end", help="Fin de la période (AAAA-MM-JJ[THH:MM])")
+    parser.add_argument(
+        "--interval",
+        type=float,
+        help="Rejouer un sondage toutes les N secondes (par défaut: un par enregistrement)",
+    )
+    parser.add_argument("--json", help="Écrire les arrêts capturés dans ce fichier")
+    args = parser.parse_args()
+
+    result = run(args)
+    print_report(result)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as handle:
+            json.dump(
+                [termination._asdict() for termination in result["terminations"]],
+                handle,
+                ensure_ascii=False,
+                indent=1,
+            )
+
+
+if __name__ == "__main__":
+    main()
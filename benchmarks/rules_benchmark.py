@@ -0,0 +1,158 @@
+"""
+Coût d'évaluation des règles de limitation des flux
+
+Génère un jeu de règles (par utilisateur, par bibliothèque, par plateforme,
+de transcodage, avec ou sans plage horaire) et un sondage de flux actifs,
+puis mesure:
+    - la compilation des règles (CompiledPolicy);
+    - l'évaluation d'un sondage par l'index compilé;
+    - à titre de comparaison, l'évaluation naïve qui teste chaque règle
+      contre chaque flux.
+
+Usage:
+    python benchmarks/rules_benchmark.py --streams 1000 --rules 500
+"""
+
+import os
+import sys
+import random
+import argparse
+import statistics
+import time
+from datetime import datetime
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from core.models import StreamInfo, PolicyRule  # noqa: E402
+from core.rules import CompiledPolicy, is_rule_active, stream_key  # noqa: E402
+
+LIBRARIES = ["Films", "Séries", "4K", "Documentaires", "Musique", "Animés"]
+PLATFORMS = ["Chrome", "Android", "iOS", "Roku", "tvOS", "Windows"]
+
+
+def generate_streams(count, users, rng):
+    """Flux actifs d'un sondage, regroupés par utilisateur"""
+    user_streams = {}
+    for index in range(count):
+        user_id = str(rng.randint(1, users))
+        user_streams.setdefault(user_id, []).append(
+            StreamInfo(
+                session_id=str(index),
+                ip_address=f"10.0.{rng.randint(0, 255)}.{rng.randint(1, 254)}",
+                player_id=f"player-{index}",
+                library_section=rng.choice(LIBRARIES),
+                media_title="Titre",
+                platform=rng.choice(PLATFORMS),
+                product="Plex",
+                device="Appareil",
+                username=f"user{user_id}",
+                state=rng.choice(("playing", "playing", "paused")),
+                transcode=rng.random() < 0.3,
+            )
+        )
+    return user_streams
+
+
+def generate_rules(count, users, rng):
+    """Règles variées: la plupart ciblent un utilisateur, une sur dix s'applique à tous"""
+    rules = []
+    for rule_id in range(1, count + 1):
+        window = rng.random() < 0.3
+        start = rng.randint(0, 23) * 60
+        rules.append(
+            PolicyRule(
+                id=rule_id,
+                name=f"Règle {rule_id}",
+                max_streams=rng.randint(1, 4),
+                user_id=str(rng.randint(1, users)) if rng.random() < 0.9 else None,
+                library=rng.choice(LIBRARIES) if rng.random() < 0.4 else None,
+                platform=rng.choice(PLATFORMS) if rng.random() < 0.3 else None,
+                transcode_only=rng.random() < 0.2,
+                start_minute=start if window else None,
+                end_minute=(start + rng.randint(1, 12) * 60) % 1440 if window else None,
+            )
+        )
+    return rules
+
+
+def naive_evaluate(rules, user_streams, now):
+    """Référence: chaque règle est testée contre chaque flux"""
+    minute = now.hour * 60 + now.minute
+    violations = 0
+    for rule in rules:
+        if not rule.enabled or not is_rule_active(rule, minute):
+            continue
+        for user_id, streams in user_streams.items():
+            if rule.user_id is not None and rule.user_id != user_id:
+                continue
+            keys = {
+                stream_key(stream)
+                for stream in streams
+                if (rule.library is None or rule.library == stream.library_section)
+                and (rule.platform is None or rule.platform == stream.platform)
+                and (not rule.transcode_only or stream.transcode)
+            }
+            if len(keys) > rule.max_streams:
+                violations += 1
+    return violations
+
+
+def _measure(func, repeat):
+    samples = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples), result
+
+
+def _format_ms(seconds):
+    return f"{seconds * 1000:8.3f} ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--streams", type=int, default=1000)
+    parser.add_argument("--rules", type=int, default=500)
+    parser.add_argument("--users", type=int, default=300)
+    parser.add_argument("--repeat", type=int, default=50, help="Nombre de mesures")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    user_streams = generate_streams(args.streams, args.users, rng)
+    rules = generate_rules(args.rules, args.users, rng)
+    now = datetime.now()
+
+    compile_time, policy = _measure(lambda: CompiledPolicy(rules), args.repeat)
+    indexed_time, violations = _measure(
+        lambda: policy.evaluate(user_streams, now), args.repeat
+    )
+    naive_time, naive_violations = _measure(
+        lambda: naive_evaluate(rules, user_streams, now), max(1, args.repeat // 5)
+    )
+
+    # Le coût de l'évaluation indexée suit le nombre de couples (flux, règle)
+    pairs = sum(
+        len(policy.candidates(user_id, stream))
+        for user_id, streams in user_streams.items()
+        for stream in streams
+    )
+
+    print(
+        f"{args.streams} flux, {len(user_streams)} utilisateurs, {args.rules} règles"
+        f" (médiane sur {args.repeat} mesures)"
+    )
+    print(f"  {'couples flux/règle':<22} {pairs:8d}")
+    print(f"  {'compilation':<22} {_format_ms(compile_time)}")
+    print(f"  {'évaluation indexée':<22} {_format_ms(indexed_time)}")
+    print(f"  {'évaluation naïve':<22} {_format_ms(naive_time)}")
+    print(f"  {'violations':<22} {len(violations):8d}")
+    if len(violations) != naive_violations:
+        print(f"  ÉCART avec l'évaluation naïve: {naive_violations} violations")
+
+
+if __name__ == "__main__":
+    main()
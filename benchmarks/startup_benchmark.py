@@ -0,0 +1,229 @@
+"""
+Mesure du temps de démarrage de PlexPatrol
+
+Deux indicateurs sont suivis, chacun dans un interpréteur neuf:
+    - le temps d'import des modules du chemin de démarrage, avec la liste
+      des modules lourds (QtChart, QtWebEngine, geoip2, dialogues) chargés
+      au passage et qui ne devraient pas l'être;
+    - le temps jusqu'au premier sondage: du lancement du processus jusqu'à
+      la première liste de sessions publiée par le moteur de surveillance,
+      contre un faux serveur Plex local.
+
+Usage:
+    python benchmarks/startup_benchmark.py [--runs 5]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+import subprocess
+import threading
+from types import SimpleNamespace
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules mesurés, dans l'ordre du chemin de démarrage
+IMPORT_TARGETS = [
+    "utils",
+    "config.config_manager",
+    "data",
+    "core.engine",
+    "core.daemon",
+    "ui.main_window",
+]
+
+# Modules qui ne doivent pas être chargés avant l'ouverture du dialogue concerné
+HEAVY_MODULES = [
+    "PyQt5.QtChart",
+    "PyQt5.QtWebEngineWidgets",
+    "geoip2",
+    "ui.dialogs.stats_dialog",
+    "ui.dialogs.config_dialog",
+    "ui.dialogs.user_dialog",
+]
+
+SESSIONS_XML = b"""<MediaContainer size="1">
+<Video title="Film" librarySectionTitle="Films">
+<Session id="bench-session"/>
+<Player state="playing" address="10.0.0.2" machineIdentifier="bench-player"
+        platform="Chrome" product="Plex Web" device="Windows"/>
+<User id="1" title="bench"/>
+</Video>
+</MediaContainer>"""
+
+IMPORT_SNIPPET = """
+import sys, json, time
+start = time.perf_counter()
+try:
+    import {module}
+    error = None
+except Exception as e:
+    error = "%s: %s" % (type(e).__name__, e)
+elapsed = time.perf_counter() - start
+heavy = [name for name in {heavy!r} if name in sys.modules]
+print(json.dumps({{"seconds": elapsed, "heavy": heavy, "error": error}}))
+"""
+
+
+class _PlexStubHandler(BaseHTTPRequestHandler):
+    """Faux serveur Plex: renvoie toujours la même session active"""
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/xml")
+        self.end_headers()
+        self.wfile.write(SESSIONS_XML)
+
+    def log_message(self, *args):
+        pass
+
+
+def _run_child(args):
+    """Lancer un interpréteur neuf et retourner sa dernière ligne JSON"""
+    result = subprocess.run(
+        [sys.executable, *args],
+        cwd=ROOT_DIR,
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+    lines = [line for line in result.stdout.splitlines() if line.startswith("{")]
+    if not lines:
+        raise RuntimeError(result.stderr.strip() or "aucune sortie")
+    return json.loads(lines[-1])
+
+
+def measure_imports(runs):
+    """Mesurer le temps d'import de chaque module du chemin de démarrage"""
+    results = {}
+    for module in IMPORT_TARGETS:
+        samples = []
+        heavy = []
+        error = None
+        for _ in range(runs):
+            snippet = IMPORT_SNIPPET.format(module=module, heavy=HEAVY_MODULES)
+            data = _run_child(["-c", snippet])
+            if data["error"]:
+                error = data["error"]
+                break
+            samples.append(data["seconds"])
+            heavy = data["heavy"]
+        results[module] = {"samples": samples, "heavy": heavy, "error": error}
+    return results
+
+
+def measure_first_poll(runs):
+    """Mesurer le temps entre le lancement du processus et le premier sondage"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _PlexStubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    samples = []
+    try:
+        for _ in range(runs):
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                spawned_at = time.time()
+                data = _run_child(
+                    [
+                        os.path.abspath(__file__),
+                        "--child-first-poll",
+                        url,
+                        os.path.join(tmp_dir, "bench.db"),
+                    ]
+                )
+                samples.append(
+                    {
+                        "imports": data["imports_done"] - spawned_at,
+                        "first_poll": data["first_poll"] - spawned_at,
+                    }
+                )
+    finally:
+        server.shutdown()
+        server.server_close()
+    return samples
+
+
+def child_first_poll(url, db_path):
+    """Processus fils: démarrer le moteur et signaler le premier sondage"""
+    sys.path.insert(0, ROOT_DIR)
+
+    from utils.logger import setup_logging
+    from data.database import PlexPatrolDB
+    from core.engine import MonitoringEngine
+
+    imports_done = time.time()
+
+    # Pas de copie des logs sur la sortie standard, réservée au résultat
+    setup_logging(console=False)
+
+    config = SimpleNamespace(
+        plex_server_url=url,
+        plex_token="benchmark",
+        plex_servers=[
+            {"id": "default", "name": "Benchmark", "url": url, "token": "benchmark"}
+        ],
+        check_interval=1,
+        termination_message="benchmark",
+    )
+    engine = MonitoringEngine(db_instance=PlexPatrolDB(db_path), config=config)
+
+    first_poll = {}
+
+    def on_sessions(user_streams):
+        first_poll.setdefault("time", time.time())
+        engine.stop()
+
+    engine.subscribe("sessions_updated", on_sessions)
+    engine.run()
+
+    print(
+        json.dumps(
+            {"imports_done": imports_done, "first_poll": first_poll.get("time", 0)}
+        )
+    )
+
+
+def _format_ms(seconds):
+    return f"{seconds * 1000:8.1f} ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="Nombre de mesures")
+    parser.add_argument("--child-first-poll", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child_first_poll:
+        child_first_poll(*args.child_first_poll)
+        return
+
+    print(f"Temps d'import (médiane sur {args.runs} interpréteurs neufs)")
+    for module, result in measure_imports(args.runs).items():
+        if result["error"]:
+            print(f"  {module:<24} indisponible ({result['error']})")
+            continue
+        line = f"  {module:<24} {_format_ms(statistics.median(result['samples']))}"
+        if result["heavy"]:
+            line += f"  modules lourds: {', '.join(result['heavy'])}"
+        print(line)
+
+    print(f"\nTemps jusqu'au premier sondage (médiane sur {args.runs} lancements)")
+    try:
+        samples = measure_first_poll(args.runs)
+    except Exception as e:
+        print(f"  indisponible ({str(e).splitlines()[-1]})")
+        return
+
+    imports = statistics.median(sample["imports"] for sample in samples)
+    first_poll = statistics.median(sample["first_poll"] for sample in samples)
+    print(f"  {'imports terminés':<24} {_format_ms(imports)}")
+    print(f"  {'premier sondage':<24} {_format_ms(first_poll)}")
+
+
+if __name__ == "__main__":
+    main()
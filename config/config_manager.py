@@ -2,10 +2,75 @@ import os
 import json
 import logging
 import sqlite3
+import threading
+from dataclasses import dataclass, fields, replace
+from types import MappingProxyType
 from utils import get_app_path
 from utils.constants import UIMessages, ConfigKeys, Defaults
 
 
+@dataclass(frozen=True)
+class ConfigSnapshot:
+    """
+    Vue figée et typée de la configuration
+
+    Les attributs portent les noms des propriétés de ConfigManager: un
+    snapshot peut remplacer le gestionnaire partout où la configuration est
+    seulement lue, sans accès à la base ni verrou.
+    """
+
+    version: int
+    plex_server_url: str
+    plex_token: str
+    plex_servers: tuple
+    check_interval: int
+    default_max_streams: int
+    termination_message: str
+    household_grouping: bool
+    household_ipv4_prefix: int
+    household_ipv6_prefix: int
+    household_networks: tuple
+    enforcement_grace_period: int
+    enforcement_grace_polls: int
+    shadow_mode: bool
+    max_transcodes: int
+    max_bandwidth: int
+    telegram_enabled: bool
+    telegram_bot_token: str
+    telegram_group_id: str
+    telegram_suppression_window: int
+    telegram_digest_interval: int
+    sharing_enabled: bool
+    sharing_window_hours: int
+    sharing_max_speed: int
+    sharing_max_locations: int
+    sharing_max_networks: int
+    recorder_enabled: bool
+    recorder_changes_only: bool
+    recorder_max_size_mb: int
+    metrics_enabled: bool
+    metrics_port: int
+
+    @classmethod
+    def from_manager(cls, manager, version=0):
+        """Construire un snapshot à partir des valeurs courantes du gestionnaire"""
+        values = {
+            field.name: getattr(manager, field.name)
+            for field in fields(cls)
+            if field.name != "version"
+        }
+        # Serveurs et listes en lecture seule, comme le reste du snapshot
+        values["plex_servers"] = tuple(
+            MappingProxyType(dict(server)) for server in values["plex_servers"]
+        )
+        values["household_networks"] = tuple(values["household_networks"])
+        return cls(version=version, **values)
+
+    def differs_from(self, other):
+        """Indiquer si la configuration a changé, indépendamment de la version"""
+        return other is None or replace(self, version=other.version) != other
+
+
 class ConfigManager:
     """Gestionnaire de configuration centralisé pour PlexPatrol utilisant SQLite"""
 
@@ -30,6 +95,14 @@ class ConfigManager:
         self._config_cache = {}
         self._load_config_to_cache()
 
+        # Snapshot publié et abonnés aux changements
+        self._lock = threading.RLock()
+        self._snapshot = None
+        self._subscribers = []
+        # Connexion dédiée à la détection des écritures d'autres processus
+        self._watch_conn = None
+        self._data_version = None
+
     def _ensure_db_exists(self):
         """S'assure que la table de configuration existe"""
         conn = sqlite3.connect(self.db_path)
@@ -91,6 +164,60 @@ class ConfigManager:
                 "category": "rules",
                 "description": "Message affiché lors de la terminaison d'un flux",
             },
+            ConfigKeys.HOUSEHOLD_GROUPING: {
+                "value": "False",
+                "type": "bool",
+                "category": "rules",
+                "description": "Compter les flux par foyer plutôt que par appareil et IP",
+            },
+            ConfigKeys.HOUSEHOLD_IPV4_PREFIX: {
+                "value": str(Defaults.HOUSEHOLD_IPV4_PREFIX),
+                "type": "int",
+                "category": "rules",
+                "description": "Préfixe IPv4 regroupant les adresses d'un foyer",
+            },
+            ConfigKeys.HOUSEHOLD_IPV6_PREFIX: {
+                "value": str(Defaults.HOUSEHOLD_IPV6_PREFIX),
+                "type": "int",
+                "category": "rules",
+                "description": "Préfixe IPv6 regroupant les adresses d'un foyer",
+            },
+            ConfigKeys.HOUSEHOLD_NETWORKS: {
+                "value": "[]",
+                "type": "list",
+                "category": "rules",
+                "description": "Réseaux CIDR formant chacun un foyer",
+            },
+            ConfigKeys.ENFORCEMENT_GRACE_PERIOD: {
+                "value": str(Defaults.ENFORCEMENT_GRACE_PERIOD),
+                "type": "int",
+                "category": "rules",
+                "description": "Dépassement toléré avant l'arrêt des flux (secondes)",
+            },
+            ConfigKeys.ENFORCEMENT_GRACE_POLLS: {
+                "value": str(Defaults.ENFORCEMENT_GRACE_POLLS),
+                "type": "int",
+                "category": "rules",
+                "description": "Sondages consécutifs en dépassement avant l'arrêt des flux",
+            },
+            ConfigKeys.SHADOW_MODE: {
+                "value": "False",
+                "type": "bool",
+                "category": "rules",
+                "description": "Journaliser les décisions d'arrêt sans arrêter les flux",
+            },
+            ConfigKeys.MAX_TRANSCODES: {
+                "value": "0",
+                "type": "int",
+                "category": "rules",
+                "description": "Transcodages simultanés maximum par serveur (0: illimité)",
+            },
+            ConfigKeys.MAX_BANDWIDTH: {
+                "value": "0",
+                "type": "int",
+                "category": "rules",
+                "description": "Débit total maximum par serveur en Mb/s (0: illimité)",
+            },
             "telegram.enabled": {
                 "value": "False",
                 "type": "bool",
@@ -109,6 +236,78 @@ class ConfigManager:
                 "category": "notifications",
                 "description": "ID du groupe Telegram",
             },
+            ConfigKeys.TELEGRAM_SUPPRESSION_WINDOW: {
+                "value": str(Defaults.NOTIFICATION_SUPPRESSION_WINDOW),
+                "type": "int",
+                "category": "notifications",
+                "description": "Délai avant de renvoyer une même alerte (secondes)",
+            },
+            ConfigKeys.TELEGRAM_DIGEST_INTERVAL: {
+                "value": str(Defaults.NOTIFICATION_DIGEST_INTERVAL),
+                "type": "int",
+                "category": "notifications",
+                "description": "Intervalle des résumés d'alertes regroupées (secondes)",
+            },
+            ConfigKeys.SHARING_ENABLED: {
+                "value": "False",
+                "type": "bool",
+                "category": "sharing",
+                "description": "Détecter le partage de compte (lieux et réseaux des sessions)",
+            },
+            ConfigKeys.SHARING_WINDOW_HOURS: {
+                "value": str(Defaults.SHARING_WINDOW_HOURS),
+                "type": "int",
+                "category": "sharing",
+                "description": "Fenêtre d'observation des sessions (heures)",
+            },
+            ConfigKeys.SHARING_MAX_SPEED: {
+                "value": str(Defaults.SHARING_MAX_SPEED),
+                "type": "int",
+                "category": "sharing",
+                "description": "Vitesse de déplacement maximale plausible (km/h)",
+            },
+            ConfigKeys.SHARING_MAX_LOCATIONS: {
+                "value": str(Defaults.SHARING_MAX_LOCATIONS),
+                "type": "int",
+                "category": "sharing",
+                "description": "Lieux distincts tolérés sur la fenêtre",
+            },
+            ConfigKeys.SHARING_MAX_NETWORKS: {
+                "value": str(Defaults.SHARING_MAX_NETWORKS),
+                "type": "int",
+                "category": "sharing",
+                "description": "Réseaux distincts tolérés sur la fenêtre",
+            },
+            ConfigKeys.RECORDER_ENABLED: {
+                "value": "False",
+                "type": "bool",
+                "category": "recorder",
+                "description": "Enregistrer les réponses brutes de /status/sessions",
+            },
+            ConfigKeys.RECORDER_CHANGES_ONLY: {
+                "value": "True",
+                "type": "bool",
+                "category": "recorder",
+                "description": "N'enregistrer que les réponses qui ont changé",
+            },
+            ConfigKeys.RECORDER_MAX_SIZE_MB: {
+                "value": str(Defaults.RECORDER_MAX_MB),
+                "type": "int",
+                "category": "recorder",
+                "description": "Taille maximale des enregistrements (Mo)",
+            },
+            ConfigKeys.METRICS_ENABLED: {
+                "value": "False",
+                "type": "bool",
+                "category": "metrics",
+                "description": "Exposer les métriques internes en HTTP local",
+            },
+            ConfigKeys.METRICS_PORT: {
+                "value": str(Defaults.METRICS_PORT),
+                "type": "int",
+                "category": "metrics",
+                "description": "Port du point de terminaison des métriques",
+            },
         }
 
         # Insérer la configuration par défaut
@@ -144,6 +343,22 @@ class ConfigManager:
 
         conn.close()
 
+    @staticmethod
+    def _serialize_value(value):
+        """Convertit une valeur en (texte, type) pour la base"""
+        if isinstance(value, bool):
+            return str(value).lower(), "bool"
+        elif isinstance(value, int):
+            return str(value), "int"
+        elif isinstance(value, float):
+            return str(value), "float"
+        elif isinstance(value, list):
+            return json.dumps(value), "list"
+        elif isinstance(value, dict):
+            return json.dumps(value), "dict"
+        else:
+            return (str(value) if value is not None else ""), "str"
+
     def _convert_value(self, value_str, value_type):
         """Convertit une valeur de texte selon son type"""
         if value_type == "bool":
@@ -196,25 +411,7 @@ class ConfigManager:
 
     def set(self, key, value, commit=True):
         """Définit une valeur de configuration"""
-        # Déterminer le type
-        if isinstance(value, bool):
-            value_type = "bool"
-            value_str = str(value).lower()
-        elif isinstance(value, int):
-            value_type = "int"
-            value_str = str(value)
-        elif isinstance(value, float):
-            value_type = "float"
-            value_str = str(value)
-        elif isinstance(value, list):
-            value_type = "list"
-            value_str = json.dumps(value)
-        elif isinstance(value, dict):
-            value_type = "dict"
-            value_str = json.dumps(value)
-        else:
-            value_type = "str"
-            value_str = str(value) if value is not None else ""
+        value_str, value_type = self._serialize_value(value)
 
         # Mettre à jour la BD
         conn = sqlite3.connect(self.db_path)
@@ -234,34 +431,22 @@ class ConfigManager:
 
         # Mettre à jour le cache
         self._config_cache[key] = value
+        self._publish()
         return True
 
     def set_many(self, config_dict):
-        """Met à jour plusieurs paramètres de configuration à la fois"""
+        """
+        Met à jour plusieurs paramètres dans une seule transaction
+
+        Les abonnés ne sont notifiés qu'une fois, après la validation de
+        l'ensemble des valeurs.
+        """
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
 
         try:
             for key, value in config_dict.items():
-                # Déterminer le type
-                if isinstance(value, bool):
-                    value_type = "bool"
-                    value_str = str(value).lower()
-                elif isinstance(value, int):
-                    value_type = "int"
-                    value_str = str(value)
-                elif isinstance(value, float):
-                    value_type = "float"
-                    value_str = str(value)
-                elif isinstance(value, list):
-                    value_type = "list"
-                    value_str = json.dumps(value)
-                elif isinstance(value, dict):
-                    value_type = "dict"
-                    value_str = json.dumps(value)
-                else:
-                    value_type = "str"
-                    value_str = str(value) if value is not None else ""
+                value_str, value_type = self._serialize_value(value)
 
                 cursor.execute(
                     """
@@ -271,11 +456,7 @@ class ConfigManager:
                     (key, value_str, value_type),
                 )
 
-                # Mettre à jour le cache
-                self._config_cache[key] = value
-
             conn.commit()
-            return True
         except Exception as e:
             logging.error(f"Erreur lors de la mise à jour multiple: {str(e)}")
             conn.rollback()
@@ -283,6 +464,85 @@ class ConfigManager:
         finally:
             conn.close()
 
+        # Le cache n'est modifié qu'une fois la transaction validée
+        self._config_cache.update(config_dict)
+        self._publish()
+        return True
+
+    # =====================================================
+    # SNAPSHOTS ET NOTIFICATIONS DE CHANGEMENT
+    # =====================================================
+
+    def snapshot(self):
+        """Retourner le snapshot courant de la configuration"""
+        with self._lock:
+            if self._snapshot is None:
+                self._snapshot = ConfigSnapshot.from_manager(self, version=1)
+            return self._snapshot
+
+    def subscribe(self, callback):
+        """Appeler callback(snapshot) à chaque changement de configuration"""
+        with self._lock:
+            if callback not in self._subscribers:
+                self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        with self._lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+    def _publish(self):
+        """
+        Reconstruire le snapshot et notifier les abonnés s'il a changé
+
+        Returns:
+            bool: True si la configuration a changé
+        """
+        with self._lock:
+            previous = self._snapshot
+            current = ConfigSnapshot.from_manager(
+                self, version=(previous.version + 1) if previous else 1
+            )
+            if not current.differs_from(previous):
+                return False
+            self._snapshot = current
+            subscribers = list(self._subscribers)
+
+        for callback in subscribers:
+            try:
+                callback(current)
+            except Exception as e:
+                logging.error(
+                    f"Erreur dans un abonné aux changements de configuration: {str(e)}"
+                )
+        return True
+
+    def reload_if_changed(self):
+        """
+        Recharger la configuration si la base a été modifiée par une autre connexion
+
+        PRAGMA data_version ne change que lorsqu'une autre connexion (un autre
+        processus, ou une autre instance) a écrit dans la base: l'appel est
+        donc peu coûteux lorsque rien n'a changé.
+
+        Returns:
+            bool: True si la configuration a changé
+        """
+        with self._lock:
+            if self._watch_conn is None:
+                self._watch_conn = sqlite3.connect(
+                    self.db_path, check_same_thread=False
+                )
+            data_version = self._watch_conn.execute("PRAGMA data_version").fetchone()[0]
+            if data_version == self._data_version:
+                return False
+            self._data_version = data_version
+
+            self._config_cache = {}
+            self._load_config_to_cache()
+
+        return self._publish()
+
     def get_category(self, category):
         """Récupère toutes les configurations d'une catégorie donnée"""
         conn = sqlite3.connect(self.db_path)
@@ -352,6 +612,7 @@ class ConfigManager:
         if key in self._config_cache:
             del self._config_cache[key]
 
+        self._publish()
         return True
 
     def reset_to_defaults(self):
@@ -370,21 +631,11 @@ class ConfigManager:
         self._initialize_default_config_if_empty()
         self._load_config_to_cache()
 
+        self._publish()
         return True
 
-    def first_time_setup(self):
-        """Configuration initiale si aucune donnée n'est présente"""
-        from PyQt5.QtWidgets import (
-            QDialog,
-            QVBoxLayout,
-            QFormLayout,
-            QLineEdit,
-            QDialogButtonBox,
-            QLabel,
-            QMessageBox,
-        )
-
-        # Vérifier si des configurations essentielles sont manquantes
+    def is_configured(self):
+        """Vérifier que l'URL et le token du serveur Plex sont renseignés"""
         plex_url = self.get("plex_server.url")
         plex_token = self.get("plex_server.token")
 
@@ -392,17 +643,31 @@ class ConfigManager:
             f"Vérification de la configuration - URL: {plex_url}, Token présent: {'Oui' if plex_token else 'Non'}"
         )
 
-        if (
+        return bool(
             plex_url
             and plex_token
             and plex_url != "http://localhost:32400"
             and plex_token != ""
-        ):
+        )
+
+    def first_time_setup(self):
+        """Configuration initiale si aucune donnée n'est présente"""
+        if self.is_configured():
             logging.info("Configuration déjà présente, skip du dialogue")
             return True
 
         logging.info("Configuration manquante, affichage du dialogue")
 
+        from PyQt5.QtWidgets import (
+            QDialog,
+            QVBoxLayout,
+            QFormLayout,
+            QLineEdit,
+            QDialogButtonBox,
+            QLabel,
+            QMessageBox,
+        )
+
         dialog = QDialog()
         dialog.setWindowTitle(UIMessages.FIRST_TIME_SETUP_TITLE)
         layout = QVBoxLayout(dialog)
@@ -445,6 +710,30 @@ class ConfigManager:
         """Token d'authentification Plex"""
         return self.get("plex_server.token", "")
 
+    @property
+    def plex_servers(self):
+        """Serveurs Plex surveillés: le serveur principal puis les serveurs additionnels"""
+        servers = [
+            {
+                "id": Defaults.SERVER_ID,
+                "name": Defaults.SERVER_NAME,
+                "url": self.plex_server_url,
+                "token": self.plex_token,
+            }
+        ]
+        for server in self.get(ConfigKeys.PLEX_ADDITIONAL_SERVERS, []) or []:
+            if not isinstance(server, dict) or not server.get("url"):
+                continue
+            servers.append(
+                {
+                    "id": str(server.get("id") or server["url"]),
+                    "name": server.get("name") or server["url"],
+                    "url": server["url"],
+                    "token": server.get("token", ""),
+                }
+            )
+        return servers
+
     @property
     def check_interval(self):
         """Intervalle de vérification des flux"""
@@ -478,6 +767,120 @@ class ConfigManager:
         """ID du groupe Telegram"""
         return self.get("telegram.group_id", "")
 
+    @property
+    def telegram_suppression_window(self):
+        """Durée pendant laquelle une même notification n'est pas renvoyée (secondes)"""
+        return self.get(
+            ConfigKeys.TELEGRAM_SUPPRESSION_WINDOW,
+            Defaults.NOTIFICATION_SUPPRESSION_WINDOW,
+        )
+
+    @property
+    def telegram_digest_interval(self):
+        """Intervalle entre deux résumés des notifications regroupées (secondes)"""
+        return self.get(
+            ConfigKeys.TELEGRAM_DIGEST_INTERVAL, Defaults.NOTIFICATION_DIGEST_INTERVAL
+        )
+
+    @property
+    def household_grouping(self):
+        """Flux comptés par foyer (préfixe réseau) plutôt que par appareil + IP"""
+        return self.get(ConfigKeys.HOUSEHOLD_GROUPING, False)
+
+    @property
+    def household_ipv4_prefix(self):
+        return self.get(ConfigKeys.HOUSEHOLD_IPV4_PREFIX, Defaults.HOUSEHOLD_IPV4_PREFIX)
+
+    @property
+    def household_ipv6_prefix(self):
+        return self.get(ConfigKeys.HOUSEHOLD_IPV6_PREFIX, Defaults.HOUSEHOLD_IPV6_PREFIX)
+
+    @property
+    def household_networks(self):
+        """Réseaux CIDR formant chacun un foyer"""
+        return self.get(ConfigKeys.HOUSEHOLD_NETWORKS, [])
+
+    @property
+    def enforcement_grace_period(self):
+        """Durée de dépassement tolérée avant l'arrêt des flux (secondes)"""
+        return self.get(
+            ConfigKeys.ENFORCEMENT_GRACE_PERIOD, Defaults.ENFORCEMENT_GRACE_PERIOD
+        )
+
+    @property
+    def enforcement_grace_polls(self):
+        """Sondages consécutifs en dépassement tolérés avant l'arrêt des flux"""
+        return self.get(
+            ConfigKeys.ENFORCEMENT_GRACE_POLLS, Defaults.ENFORCEMENT_GRACE_POLLS
+        )
+
+    @property
+    def shadow_mode(self):
+        """Mode simulation: décisions d'arrêt journalisées, aucun flux arrêté"""
+        return self.get(ConfigKeys.SHADOW_MODE, False)
+
+    @property
+    def max_transcodes(self):
+        """Transcodages simultanés maximum par serveur (0: illimité)"""
+        return self.get(ConfigKeys.MAX_TRANSCODES, 0)
+
+    @property
+    def max_bandwidth(self):
+        """Débit total maximum par serveur en Mb/s (0: illimité)"""
+        return self.get(ConfigKeys.MAX_BANDWIDTH, 0)
+
+    @property
+    def sharing_enabled(self):
+        """Détection du partage de compte activée"""
+        return self.get(ConfigKeys.SHARING_ENABLED, False)
+
+    @property
+    def sharing_window_hours(self):
+        """Fenêtre d'observation des sessions (heures)"""
+        return self.get(ConfigKeys.SHARING_WINDOW_HOURS, Defaults.SHARING_WINDOW_HOURS)
+
+    @property
+    def sharing_max_speed(self):
+        """Vitesse de déplacement maximale plausible (km/h)"""
+        return self.get(ConfigKeys.SHARING_MAX_SPEED, Defaults.SHARING_MAX_SPEED)
+
+    @property
+    def sharing_max_locations(self):
+        """Lieux distincts tolérés sur la fenêtre"""
+        return self.get(
+            ConfigKeys.SHARING_MAX_LOCATIONS, Defaults.SHARING_MAX_LOCATIONS
+        )
+
+    @property
+    def sharing_max_networks(self):
+        """Réseaux distincts tolérés sur la fenêtre"""
+        return self.get(ConfigKeys.SHARING_MAX_NETWORKS, Defaults.SHARING_MAX_NETWORKS)
+
+    @property
+    def recorder_enabled(self):
+        """Enregistrement des réponses brutes de /status/sessions activé"""
+        return self.get(ConfigKeys.RECORDER_ENABLED, False)
+
+    @property
+    def recorder_changes_only(self):
+        """N'enregistrer une réponse que si elle diffère de la précédente"""
+        return self.get(ConfigKeys.RECORDER_CHANGES_ONLY, True)
+
+    @property
+    def recorder_max_size_mb(self):
+        """Taille maximale des enregistrements (Mo)"""
+        return self.get(ConfigKeys.RECORDER_MAX_SIZE_MB, Defaults.RECORDER_MAX_MB)
+
+    @property
+    def metrics_enabled(self):
+        """Point de terminaison local des métriques activé"""
+        return self.get(ConfigKeys.METRICS_ENABLED, False)
+
+    @property
+    def metrics_port(self):
+        """Port du point de terminaison local des métriques"""
+        return self.get(ConfigKeys.METRICS_PORT, Defaults.METRICS_PORT)
+
 
 # Instance globale
 config = ConfigManager()
@@ -1,4 +1,14 @@
-from core.monitoring import StreamMonitor
+from core.engine import MonitoringEngine
 from core.plex_api import PlexAPI, get_plex_users
 
-__all__ = ["StreamMonitor", "PlexAPI", "get_plex_users"]
+__all__ = ["MonitoringEngine", "StreamMonitor", "PlexAPI", "get_plex_users"]
+
+
+def __getattr__(name):
+    # StreamMonitor dépend de PyQt5: ne l'importer qu'à la demande pour que
+    # le mode sans interface n'ait pas à charger Qt
+    if name == "StreamMonitor":
+        from core.monitoring import StreamMonitor
+
+        return StreamMonitor
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,127 @@
+import signal
+import logging
+from datetime import datetime, timedelta
+from utils.constants import LogMessages, Defaults
+
+
+# Correspondance entre les niveaux du journal d'interface et ceux du module logging
+LOG_LEVELS = {
+    "INFO": logging.INFO,
+    "SUCCESS": logging.INFO,
+    "WARNING": logging.WARNING,
+    "ERROR": logging.ERROR,
+}
+
+
+def run_headless():
+    """
+    Exécuter la surveillance sans interface graphique (serveur sans affichage)
+
+    La boucle tourne dans le thread principal jusqu'à réception de SIGINT
+    ou SIGTERM. Aucun module Qt n'est chargé.
+
+    Returns:
+        int: Code de sortie du processus
+    """
+    from utils.logger import setup_logging
+    from config.config_manager import config
+    from core.engine import MonitoringEngine
+
+    setup_logging()
+    logger = logging.getLogger("plexpatrol")
+
+    if not config.is_configured():
+        logger.error(LogMessages.HEADLESS_NOT_CONFIGURED)
+        return 1
+
+    engine = MonitoringEngine()
+
+    # Les messages destinés à l'interface sont écrits dans le journal
+    engine.subscribe(
+        "log",
+        lambda message, level: logger.log(LOG_LEVELS.get(level, logging.INFO), message),
+    )
+
+    def handle_signal(signum, frame):
+        logger.info(LogMessages.HEADLESS_SIGNAL.format(signal=signum))
+        engine.stop()
+
+    signal.signal(signal.SIGINT, handle_signal)
+    signal.signal(signal.SIGTERM, handle_signal)
+
+    logger.info(LogMessages.HEADLESS_START)
+    engine.run()
+
+    return 0
+
+
+def summarize_decisions(rows):
+    """
+    Rapprocher, par utilisateur, les décisions de simulation et les décisions réelles
+
+    Args:
+        rows (list): Lignes de PlexPatrolDB.get_enforcement_report()
+
+    Returns:
+        tuple: (totaux par mode, {username: {mode: ligne}})
+    """
+    totals = {}
+    per_user = {}
+    for row in rows:
+        mode = row["mode"]
+        total = totals.setdefault(
+            mode, {"decisions": 0, "sessions": 0, "executed": 0, "users": 0}
+        )
+        total["decisions"] += row["decisions"]
+        total["sessions"] += row["sessions"]
+        total["executed"] += row["executed"] or 0
+        total["users"] += 1
+        per_user.setdefault(row["username"] or row["user_id"], {})[mode] = row
+    return totals, per_user
+
+
+def run_shadow_report(days=Defaults.ENFORCEMENT_REPORT_DAYS):
+    """
+    Afficher les décisions d'arrêt des derniers jours, simulation et mode réel côte à côte
+
+    Returns:
+        int: Code de sortie du processus
+    """
+    from data.database import PlexPatrolDB
+
+    db = PlexPatrolDB()
+    end_date = datetime.now()
+    start_date = end_date - timedelta(days=days)
+    totals, per_user = summarize_decisions(
+        db.get_enforcement_report(start_date, end_date)
+    )
+
+    live, shadow = PlexPatrolDB.DECISION_MODE_LIVE, PlexPatrolDB.DECISION_MODE_SHADOW
+    print(
+        f"Décisions d'arrêt du {start_date:%Y-%m-%d %H:%M} au {end_date:%Y-%m-%d %H:%M}"
+    )
+    if not per_user:
+        print("Aucune décision sur la période")
+        return 0
+
+    print(f"{'':<24} {'Simulation':>12} {'Réel':>12}")
+    for label, field in (
+        ("Décisions", "decisions"),
+        ("Sessions", "sessions"),
+        ("Utilisateurs", "users"),
+        ("Arrêts effectués", "executed"),
+    ):
+        print(
+            f"{label:<24} {totals.get(shadow, {}).get(field, 0):>12}"
+            f" {totals.get(live, {}).get(field, 0):>12}"
+        )
+
+    print(f"\n{'Utilisateur':<24} {'Simulation':>12} {'Réel':>12} {'Écart':>8}")
+    for username in sorted(per_user):
+        modes = per_user[username]
+        simulated = modes.get(shadow, {}).get("sessions", 0)
+        enforced = modes.get(live, {}).get("sessions", 0)
+        print(
+            f"{username:<24} {simulated:>12} {enforced:>12} {simulated - enforced:>+8}"
+        )
+    return 0
@@ -0,0 +1,117 @@
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+from utils.constants import Defaults
+
+
+# Étapes d'un cycle de sondage, dans l'ordre d'exécution
+STAGES = ("fetch", "record", "parse", "ingest", "policy", "termination", "emit")
+
+STAGE_LABELS = {
+    "fetch": "Requête HTTP",
+    "record": "Enregistrement",
+    "parse": "Parsing XML",
+    "ingest": "Écriture base",
+    "policy": "Règles",
+    "termination": "Arrêts",
+    "emit": "Publication",
+}
+
+
+def percentile(sorted_values, fraction):
+    """Percentile par rang le plus proche d'une liste déjà triée"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+class PollCycle:
+    """
+    Chronométrage d'un cycle de sondage, étape par étape
+
+    Les étapes peuvent s'imbriquer: le temps d'une étape interne (les arrêts
+    pendant l'évaluation des règles) est retiré de l'étape qui la contient,
+    si bien que la somme des étapes ne compte jamais deux fois la même durée.
+    """
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.stages = dict.fromkeys(STAGES, 0.0)
+        self.total = 0.0
+        self._start = time.perf_counter()
+        # Pile des étapes en cours: [nom, durée des étapes imbriquées]
+        self._stack = []
+
+    @contextmanager
+    def stage(self, name):
+        """Chronométrer une étape du cycle"""
+        frame = [name, 0.0]
+        self._stack.append(frame)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self._stack.pop()
+            self.stages[name] += elapsed - frame[1]
+            if self._stack:
+                self._stack[-1][1] += elapsed
+
+    def finish(self):
+        """Clore le cycle et figer sa durée totale"""
+        self.total = time.perf_counter() - self._start
+        return self
+
+
+class PollTimings:
+    """Tampon circulaire des derniers cycles de sondage, partagé entre threads"""
+
+    def __init__(self, max_cycles=Defaults.DIAGNOSTICS_MAX_CYCLES):
+        self._cycles = deque(maxlen=max_cycles)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._cycles)
+
+    def record(self, cycle):
+        """Ajouter un cycle terminé (le plus ancien est oublié si le tampon est plein)"""
+        with self._lock:
+            self._cycles.append(cycle)
+
+    def clear(self):
+        with self._lock:
+            self._cycles.clear()
+
+    def recent(self, count=None):
+        """Retourner les derniers cycles, du plus récent au plus ancien"""
+        with self._lock:
+            cycles = list(self._cycles)
+        cycles.reverse()
+        return cycles[:count] if count else cycles
+
+    def slowest(self, count=10):
+        """Retourner les cycles les plus lents du tampon"""
+        with self._lock:
+            cycles = list(self._cycles)
+        return sorted(cycles, key=lambda cycle: cycle.total, reverse=True)[:count]
+
+    def percentiles(self, fractions=(0.5, 0.95, 0.99)):
+        """
+        Calculer les percentiles de durée par étape et pour le cycle complet
+
+        Returns:
+            dict: {étape ou "total": [valeurs dans l'ordre de fractions]}
+        """
+        with self._lock:
+            cycles = list(self._cycles)
+
+        series = {stage: sorted(cycle.stages[stage] for cycle in cycles) for stage in STAGES}
+        series["total"] = sorted(cycle.total for cycle in cycles)
+
+        return {
+            name: [percentile(values, fraction) for fraction in fractions]
+            for name, values in series.items()
+        }
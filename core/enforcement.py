@@ -0,0 +1,240 @@
+"""
+Délai de grâce avant l'arrêt des flux
+
+Un utilisateur qui passe de la télévision au téléphone a brièvement deux
+flux: les arrêter au premier sondage en dépassement pénalise un usage
+légitime. Chaque utilisateur suit donc un petit automate:
+
+    CONFORME --dépassement--> GRÂCE --délai ou N sondages--> APPLICATION
+        ^                       |                                |
+        +---- M sondages conformes consécutifs (hystérésis) -----+
+
+Un retour sous la limite n'efface l'état qu'après plusieurs sondages
+conformes: un flux qui clignote d'un sondage à l'autre ne relance pas le
+délai de grâce.
+
+Les sessions arrêtées sont mémorisées un moment: Plex continue souvent de
+les signaler au sondage suivant, et elles ne doivent ni être comptées ni
+faire l'objet d'une nouvelle demande d'arrêt. Un arrêt simulé (mode
+simulation) n'interrompt rien: la session reste ignorée tant que Plex la
+signale, pour n'être décidée qu'une fois, comme en mode réel.
+"""
+
+import threading
+import time
+
+from utils.constants import Defaults
+
+
+# États de l'automate d'un utilisateur
+STATE_COMPLIANT = "compliant"
+STATE_GRACE = "grace"
+STATE_ENFORCING = "enforcing"
+
+
+class _UserState:
+    """Suivi d'un utilisateur en dépassement"""
+
+    __slots__ = ("first_over", "polls_over", "polls_under", "state")
+
+    def __init__(self, now):
+        self.first_over = now
+        self.polls_over = 0
+        self.polls_under = 0
+        self.state = STATE_GRACE
+
+
+class EnforcementTracker:
+    """
+    Automate de mise en application des limites, par utilisateur (en mémoire)
+
+    Args:
+        grace_period (float): Secondes de dépassement tolérées avant d'agir
+        grace_polls (int): Sondages consécutifs en dépassement avant d'agir
+            (le premier des deux seuils atteint déclenche l'arrêt)
+        clear_polls (int): Sondages conformes consécutifs avant d'oublier un
+            dépassement
+        terminated_ttl (float): Durée pendant laquelle une session arrêtée
+            est ignorée si Plex la signale encore (secondes)
+        clock (callable): Horloge monotone (remplaçable pour le rejeu)
+    """
+
+    def __init__(
+        self,
+        grace_period=Defaults.ENFORCEMENT_GRACE_PERIOD,
+        grace_polls=Defaults.ENFORCEMENT_GRACE_POLLS,
+        clear_polls=Defaults.ENFORCEMENT_CLEAR_POLLS,
+        terminated_ttl=Defaults.ENFORCEMENT_TERMINATED_TTL,
+        clock=time.monotonic,
+    ):
+        self.grace_period = grace_period
+        self.grace_polls = grace_polls
+        self.clear_polls = max(1, clear_polls)
+        self.terminated_ttl = terminated_ttl
+        self.clock = clock
+
+        self._users = {}
+        # {session_id: instant à partir duquel la session peut être oubliée}
+        self._terminated = {}
+        # Sessions dont l'arrêt n'a été que simulé: leur échéance est
+        # repoussée tant qu'elles sont signalées
+        self._simulated = set()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config, **kwargs):
+        """Construire l'automate à partir de la configuration"""
+        return cls(
+            grace_period=getattr(
+                config, "enforcement_grace_period", Defaults.ENFORCEMENT_GRACE_PERIOD
+            ),
+            grace_polls=getattr(
+                config, "enforcement_grace_polls", Defaults.ENFORCEMENT_GRACE_POLLS
+            ),
+            **kwargs,
+        )
+
+    def configure(self, grace_period, grace_polls):
+        """Changer les seuils sans perdre les dépassements en cours"""
+        self.grace_period = grace_period
+        self.grace_polls = grace_polls
+
+    # =====================================================
+    # AUTOMATE PAR UTILISATEUR
+    # =====================================================
+
+    def update(self, over_limit, now=None):
+        """
+        Faire avancer l'automate d'un sondage
+
+        Args:
+            over_limit (iterable): Utilisateurs en dépassement à ce sondage;
+                tous les autres utilisateurs suivis sont considérés conformes
+            now (float, optional): Instant du sondage, selon l'horloge
+
+        Returns:
+            set: Utilisateurs dont les flux doivent être arrêtés maintenant
+        """
+        now = self.clock() if now is None else now
+        over_limit = set(over_limit)
+        to_enforce = set()
+
+        with self._lock:
+            for user_id in over_limit:
+                entry = self._users.get(user_id)
+                if entry is None:
+                    entry = self._users[user_id] = _UserState(now)
+                entry.polls_over += 1
+                entry.polls_under = 0
+
+                if (
+                    entry.state == STATE_ENFORCING
+                    or entry.polls_over >= self.grace_polls
+                    or now - entry.first_over >= self.grace_period
+                ):
+                    entry.state = STATE_ENFORCING
+                    to_enforce.add(user_id)
+
+            # Hystérésis: un dépassement n'est oublié qu'après plusieurs
+            # sondages conformes consécutifs
+            for user_id in [user_id for user_id in self._users if user_id not in over_limit]:
+                entry = self._users[user_id]
+                entry.polls_under += 1
+                if entry.polls_under >= self.clear_polls:
+                    del self._users[user_id]
+
+        return to_enforce
+
+    def state(self, user_id):
+        """État courant de l'automate d'un utilisateur"""
+        entry = self._users.get(user_id)
+        return entry.state if entry is not None else STATE_COMPLIANT
+
+    def pending(self, now=None):
+        """
+        Utilisateurs en période de grâce
+
+        Returns:
+            dict: {user_id: secondes écoulées depuis le premier dépassement}
+        """
+        now = self.clock() if now is None else now
+        with self._lock:
+            return {
+                user_id: now - entry.first_over
+                for user_id, entry in self._users.items()
+                if entry.state == STATE_GRACE
+            }
+
+    def reset(self, user_id=None):
+        """Oublier l'état d'un utilisateur (de tous par défaut)"""
+        with self._lock:
+            if user_id is None:
+                self._users.clear()
+            else:
+                self._users.pop(user_id, None)
+
+    # =====================================================
+    # SESSIONS RÉCEMMENT ARRÊTÉES
+    # =====================================================
+
+    def mark_terminated(self, session_id, now=None, simulated=False):
+        """
+        Mémoriser une session dont l'arrêt a été accepté par Plex
+
+        Args:
+            simulated (bool): Arrêt seulement simulé: la session reste
+                ignorée tant qu'elle est signalée, puis encore terminated_ttl
+        """
+        now = self.clock() if now is None else now
+        with self._lock:
+            self._terminated[session_id] = now + self.terminated_ttl
+            if simulated:
+                self._simulated.add(session_id)
+            else:
+                self._simulated.discard(session_id)
+
+    def is_terminated(self, session_id, now=None):
+        """Indiquer si la session a été arrêtée récemment"""
+        expires = self._terminated.get(session_id)
+        if expires is None:
+            return False
+        return (self.clock() if now is None else now) < expires
+
+    def without_terminated(self, user_streams, now=None):
+        """
+        Retirer d'un sondage les sessions récemment arrêtées
+
+        Les sessions expirées sont oubliées au passage; celles dont l'arrêt
+        a été simulé et qui figurent dans le sondage voient leur échéance
+        repoussée.
+
+        Returns:
+            dict: {user_id: [StreamInfo, ...]}, sans les utilisateurs dont
+            tous les flux viennent d'être arrêtés
+        """
+        now = self.clock() if now is None else now
+        with self._lock:
+            if not self._terminated:
+                return user_streams
+            if self._simulated:
+                for streams in user_streams.values():
+                    for stream in streams:
+                        if stream.session_id in self._simulated:
+                            self._terminated[stream.session_id] = (
+                                now + self.terminated_ttl
+                            )
+            for session_id in [
+                session_id
+                for session_id, expires in self._terminated.items()
+                if expires <= now
+            ]:
+                del self._terminated[session_id]
+                self._simulated.discard(session_id)
+            terminated = set(self._terminated)
+
+        filtered = {}
+        for user_id, streams in user_streams.items():
+            remaining = [stream for stream in streams if stream.session_id not in terminated]
+            if remaining:
+                filtered[user_id] = remaining
+        return filtered
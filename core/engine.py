@@ -0,0 +1,1868 @@
+import os
+import sqlite3
+import time
+import json
+import logging
+import threading
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from functools import wraps
+from datetime import datetime
+import requests
+from utils import get_app_path
+from data import PlexPatrolDB
+from data.recorder import PollRecorder
+from core.models import StreamInfo, PlexServer
+from core.diagnostics import PollCycle, PollTimings
+from core.enforcement import EnforcementTracker
+from core.household import HouseholdResolver
+from core.sharing import ALERT_LABELS, SharingDetector
+from core.usage import (
+    CAPACITY_TRANSCODES,
+    UsageTracker,
+    format_bandwidth,
+    media_quality,
+    select_capacity_streams,
+)
+from core.rules import (
+    CompiledPolicy,
+    select_excess_streams,
+    stream_key,
+)
+from utils.constants import LogMessages, UIMessages, Defaults, Paths
+from utils.notification import (
+    NotificationDigester,
+    queue_telegram_notification,
+    start_notification_dispatcher,
+    stop_notification_dispatcher,
+)
+from utils.metrics import (
+    POLL_DURATION,
+    POLL_FAILURES,
+    PARSE_DURATION,
+    LAST_POLL,
+    CONSECUTIVE_ERRORS,
+    ACTIVE_STREAMS,
+    USER_BANDWIDTH,
+    SERVER_BANDWIDTH,
+    SERVER_TRANSCODES,
+    TERMINATIONS,
+    TERMINATION_DURATION,
+    start_metrics_server,
+    stop_metrics_server,
+)
+
+
+def _instrumented_termination(func):
+    """Chronométrer un arrêt de flux et compter son résultat dans les métriques"""
+
+    @wraps(func)
+    def wrapper(self, *args, **kwargs):
+        with self._stage("termination"), TERMINATION_DURATION.time():
+            stopped = func(self, *args, **kwargs)
+        TERMINATIONS.inc(result="success" if stopped else "failure")
+        return stopped
+
+    return wrapper
+
+
+class MonitoringEngine:
+    """
+    Cœur de la surveillance des flux Plex, indépendant de Qt
+
+    Les événements sont publiés à des callbacks enregistrés via subscribe():
+        - "log": (message, level)
+        - "sessions_updated": (user_streams,)
+        - "connection_status": (is_connected,)
+        - "usage_updated": (UsageSnapshot,)
+
+    Les callbacks sont appelés depuis le thread qui exécute run().
+    """
+
+    EVENTS = ("log", "sessions_updated", "connection_status", "usage_updated")
+
+    def __init__(self, db_instance=None, config=None):
+        if config is None:
+            from config.config_manager import config
+
+        # Le moteur lit un snapshot figé de la configuration, remplacé d'un bloc
+        # à chaque changement: un cycle ne voit jamais une configuration à moitié
+        # mise à jour. Une configuration simple (bancs de mesure) est lue telle quelle.
+        self._config_source = config if hasattr(config, "snapshot") else None
+        self.config = config.snapshot() if self._config_source else config
+        self.is_running = False
+        self.is_paused = False
+        # Instant où chaque session active a été vue pour la première fois
+        self.known_sessions = {}
+        self.last_poll_time = 0
+        self.consecutive_errors = 0
+        self.db = db_instance if db_instance is not None else PlexPatrolDB()
+
+        # Serveur d'origine de chaque session active, pour router les arrêts
+        self.session_servers = {}
+        # Un thread de sondage par serveur lorsque plusieurs serveurs sont surveillés
+        self._executor = None
+        self._executor_size = 0
+        # Une session HTTP par serveur, pour réutiliser les connexions d'un sondage à l'autre
+        self._http_sessions = {}
+        self._http_lock = threading.Lock()
+
+        # Règles de limitation compilées, recompilées lorsque la table change
+        self.policy = CompiledPolicy()
+        self._policy_signature = None
+
+        # Délai de grâce par utilisateur et sessions récemment arrêtées
+        self.enforcement = EnforcementTracker.from_config(self.config)
+
+        # Débit et transcodages glissants, par utilisateur et par serveur
+        self.usage = UsageTracker()
+        # Dépassements de capacité sans flux arrêtable (tous en liste
+        # blanche), déjà signalés: (server_id, type)
+        self._capacity_reported = set()
+
+        # Durées par étape des derniers cycles de sondage (onglet Diagnostics)
+        self.timings = PollTimings()
+        # Cycle en cours, propre au thread de surveillance: un rafraîchissement
+        # manuel depuis l'interface n'est pas comptabilisé
+        self._local = threading.local()
+
+        # Abonnés aux événements du moteur
+        self._subscribers = {event: [] for event in self.EVENTS}
+        # Permet d'interrompre immédiatement l'attente entre deux vérifications
+        # (arrêt, ou changement de l'intervalle de vérification)
+        self._stop_event = threading.Event()
+
+        # Snapshot de configuration publié par un autre thread, appliqué par
+        # le thread de surveillance entre deux sondages
+        self._pending_config = None
+        self._config_lock = threading.Lock()
+
+        # Port du serveur de métriques démarré par ce moteur (None: arrêté)
+        self._metrics_port = None
+
+        # Notifications envoyées en arrière-plan: la surveillance n'attend jamais Telegram
+        self.send_telegram = queue_telegram_notification
+
+        # Une alerte répétée à chaque sondage n'est envoyée qu'une fois par
+        # fenêtre de suppression, les répétitions étant résumées périodiquement
+        self.notifier = NotificationDigester(
+            sink=lambda message: self.send_telegram(message),
+            suppression_window=getattr(
+                self.config,
+                "telegram_suppression_window",
+                Defaults.NOTIFICATION_SUPPRESSION_WINDOW,
+            ),
+            digest_interval=getattr(
+                self.config,
+                "telegram_digest_interval",
+                Defaults.NOTIFICATION_DIGEST_INTERVAL,
+            ),
+        )
+
+        # Configurer le logger
+        self.setup_logger()
+
+        # Regroupement des flux par foyer, si activé
+        self.households = self.build_households()
+
+        # Enregistrement des réponses brutes de Plex, si activé
+        self.recorder = self.build_recorder()
+
+        # Détection du partage de compte, si activée
+        self._geoip = None
+        self.sharing = self.build_sharing_detector()
+
+    def setup_logger(self):
+        """Configurer le logger pour ce module"""
+        from utils.logger import setup_logging
+
+        # Le pipeline est configuré une seule fois par processus: le fichier
+        # stream_monitor.log n'est plus ajouté à chaque nouveau moniteur
+        setup_logging()
+
+        self.logger = logging.getLogger("stream_monitor")
+        self.logger.setLevel(logging.INFO)
+
+    # =====================================================
+    # ÉVÉNEMENTS
+    # =====================================================
+
+    def subscribe(self, event, callback):
+        """
+        Enregistrer un callback pour un événement du moteur
+
+        Args:
+            event (str): Nom de l'événement (voir EVENTS)
+            callback (callable): Fonction appelée avec les arguments de l'événement
+        """
+        if event not in self._subscribers:
+            raise ValueError(f"Événement inconnu: {event}")
+        self._subscribers[event].append(callback)
+
+    def unsubscribe(self, event, callback):
+        """Retirer un callback précédemment enregistré"""
+        if callback in self._subscribers.get(event, []):
+            self._subscribers[event].remove(callback)
+
+    def _emit(self, event, *args):
+        """Publier un événement à tous ses abonnés"""
+        for callback in list(self._subscribers[event]):
+            try:
+                callback(*args)
+            except Exception as e:
+                # Un abonné défaillant ne doit pas interrompre la surveillance
+                self.logger.error(
+                    f"Erreur dans un abonné à l'événement {event}: {str(e)}"
+                )
+
+    def emit_log(self, message, level="INFO"):
+        """Publier un message de journal destiné à l'utilisateur"""
+        self._emit("log", message, level)
+
+    # =====================================================
+    # BOUCLE DE SURVEILLANCE
+    # =====================================================
+
+    def run(self):
+        """Exécuter la surveillance des flux Plex jusqu'à l'appel de stop()"""
+        self.is_running = True
+        self._stop_event.clear()
+        self.emit_log(LogMessages.MONITOR_START, "INFO")
+
+        # Suivre les changements de configuration pendant la surveillance
+        if self._config_source is not None:
+            self._config_source.subscribe(self._on_config_changed)
+            self.apply_config(self._config_source.snapshot())
+        applied_version = getattr(self.config, "version", 0)
+        if self.shadow_mode:
+            self.emit_log(LogMessages.SHADOW_MODE_ENABLED, "WARNING")
+
+        # Reprendre les notifications non livrées lors d'une exécution précédente
+        start_notification_dispatcher(self.db)
+
+        # Point de terminaison local des métriques, si activé
+        self._apply_metrics_settings()
+
+        cleanup_counter = 0  # Pour nettoyer périodiquement les sessions
+
+        while self.is_running:
+            try:
+                # Prendre en compte une configuration modifiée par un autre processus
+                if self._config_source is not None:
+                    self._config_source.reload_if_changed()
+                self._apply_pending_config()
+                if getattr(self.config, "version", 0) != applied_version:
+                    applied_version = getattr(self.config, "version", 0)
+                    self._prune_http_sessions()
+
+                if not self.is_paused:
+                    self.check_sessions()
+
+                    # Nettoyage périodique toutes les 10 vérifications
+                    cleanup_counter += 1
+                    if cleanup_counter >= 10:
+                        self.cleanup_expired_sessions()
+                        # Liste blanche éventuellement modifiée par un autre processus
+                        self.db.reload_exempt_users()
+                        cleanup_counter = 0
+
+                self._wait(self.config.check_interval)
+            except Exception as e:
+                self.logger.error(f"Erreur dans la boucle de surveillance: {str(e)}")
+                self.emit_log(
+                    f"Erreur dans la boucle de surveillance: {str(e)}", "ERROR"
+                )
+                # Augmenter le temps de pause après des erreurs consécutives
+                self.consecutive_errors += 1
+                self._wait(min(60, self.consecutive_errors * 5))
+
+        if self._config_source is not None:
+            self._config_source.unsubscribe(self._on_config_changed)
+
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+        self._close_http_sessions()
+        if self.recorder is not None:
+            self.recorder.close()
+        if self._geoip is not None:
+            self._geoip.close()
+
+        # is_running est faux: le serveur de métriques est arrêté
+        self._apply_metrics_settings()
+
+        # Ne pas perdre les occurrences regroupées depuis le dernier résumé
+        self.notifier.flush(force=True)
+        stop_notification_dispatcher()
+
+        self.emit_log(LogMessages.MONITOR_STOP, "INFO")
+
+    def stop(self):
+        """Demander l'arrêt de la boucle de surveillance"""
+        self.is_running = False
+
+        # Réveiller la boucle si elle est en attente entre deux vérifications
+        self._stop_event.set()
+
+    def _wait(self, timeout):
+        """Attendre avant la prochaine vérification, sauf réveil anticipé"""
+        self._stop_event.wait(timeout)
+        # Un réveil dû à un changement de configuration ne vaut pas arrêt
+        if self.is_running:
+            self._stop_event.clear()
+
+    def _on_config_changed(self, snapshot):
+        """
+        Prendre note d'un nouveau snapshot de configuration
+
+        Appelé depuis le thread qui a modifié la configuration (l'interface):
+        le snapshot est seulement mis en attente. Il est appliqué par le
+        thread de surveillance avant le sondage suivant, jamais pendant
+        qu'un sondage utilise les foyers, le détecteur ou l'enregistreur.
+        """
+        with self._config_lock:
+            self._pending_config = snapshot
+
+        # Appliquer immédiatement un nouvel intervalle de vérification
+        if getattr(self.config, "check_interval", None) != snapshot.check_interval:
+            self._stop_event.set()
+
+    def _apply_pending_config(self):
+        """Appliquer le dernier snapshot mis en attente, s'il y en a un"""
+        with self._config_lock:
+            snapshot, self._pending_config = self._pending_config, None
+        if snapshot is not None:
+            self.apply_config(snapshot)
+
+    def apply_config(self, snapshot):
+        """
+        Appliquer un snapshot de configuration (thread de surveillance)
+
+        Les composants dont les paramètres n'ont pas changé sont conservés.
+        """
+        previous = self.config
+        self.config = snapshot
+
+        self.notifier.suppression_window = snapshot.telegram_suppression_window
+        self.notifier.digest_interval = snapshot.telegram_digest_interval
+        self.enforcement.configure(
+            snapshot.enforcement_grace_period, snapshot.enforcement_grace_polls
+        )
+
+        # Les foyers ne sont reconstruits que si leurs paramètres ont changé
+        if self._household_settings(previous) != self._household_settings(snapshot):
+            self.households = self.build_households()
+
+        if self._recorder_settings(previous) != self._recorder_settings(snapshot):
+            recorder = self.recorder
+            self.recorder = self.build_recorder()
+            if recorder is not None:
+                recorder.close()
+
+        if self._sharing_settings(previous) != self._sharing_settings(snapshot):
+            self.sharing = self.build_sharing_detector()
+
+        if self.is_running:
+            self._apply_metrics_settings()
+
+    def _apply_metrics_settings(self):
+        """
+        Démarrer, arrêter ou déplacer le serveur de métriques
+
+        Le serveur ne tourne que pendant la surveillance, sur le port configuré.
+        """
+        wanted = None
+        if self.is_running and getattr(self.config, "metrics_enabled", False):
+            wanted = getattr(self.config, "metrics_port", Defaults.METRICS_PORT)
+        if wanted == self._metrics_port:
+            return
+
+        if self._metrics_port is not None:
+            stop_metrics_server()
+            self._metrics_port = None
+        if wanted is not None and start_metrics_server(wanted):
+            self._metrics_port = wanted
+
+    @staticmethod
+    def _household_settings(config):
+        return tuple(
+            getattr(config, name, None)
+            for name in (
+                "household_grouping",
+                "household_ipv4_prefix",
+                "household_ipv6_prefix",
+                "household_networks",
+            )
+        )
+
+    def build_households(self):
+        """
+        Construire le résolveur de foyers, avec les réseaux appris de l'historique
+
+        Returns:
+            HouseholdResolver: None si le comptage par foyer est désactivé
+        """
+        if not getattr(self.config, "household_grouping", False):
+            return None
+
+        try:
+            resolver = HouseholdResolver.from_config(self.config)
+        except ValueError as e:
+            # Un réseau mal saisi ne doit pas empêcher la surveillance
+            self.logger.error(LogMessages.HOUSEHOLD_NETWORK_ERROR.format(error=str(e)))
+            resolver = HouseholdResolver(
+                ipv4_prefix=getattr(
+                    self.config,
+                    "household_ipv4_prefix",
+                    Defaults.HOUSEHOLD_IPV4_PREFIX,
+                ),
+                ipv6_prefix=getattr(
+                    self.config,
+                    "household_ipv6_prefix",
+                    Defaults.HOUSEHOLD_IPV6_PREFIX,
+                ),
+            )
+
+        # Historique relatif à l'heure du moteur (celle des sondages rejoués)
+        for user_id, ip_address, count in self.db.get_user_ip_counts(
+            now=self.current_time()
+        ):
+            resolver.observe(user_id, ip_address, count)
+        resolver.learn()
+
+        self.logger.info(
+            LogMessages.HOUSEHOLDS_ENABLED.format(networks=len(resolver.networks))
+        )
+        return resolver
+
+    @staticmethod
+    def _recorder_settings(config):
+        return tuple(
+            getattr(config, name, None)
+            for name in (
+                "recorder_enabled",
+                "recorder_changes_only",
+                "recorder_max_size_mb",
+            )
+        )
+
+    def build_recorder(self):
+        """
+        Ouvrir le magasin des réponses brutes de /status/sessions
+
+        Returns:
+            PollRecorder: None si l'enregistrement est désactivé ou impossible
+        """
+        if not getattr(self.config, "recorder_enabled", False):
+            return None
+
+        directory = os.path.join(get_app_path(), Paths.DATA, Paths.RECORDINGS)
+        max_size_mb = getattr(
+            self.config, "recorder_max_size_mb", Defaults.RECORDER_MAX_MB
+        )
+        try:
+            recorder = PollRecorder(
+                directory,
+                max_bytes=max_size_mb * 1024 * 1024,
+                changes_only=getattr(self.config, "recorder_changes_only", True),
+            )
+        except OSError as e:
+            self.logger.error(LogMessages.RECORDER_ERROR.format(error=str(e)))
+            return None
+
+        self.logger.info(
+            LogMessages.RECORDER_ENABLED.format(path=directory, size=max_size_mb)
+        )
+        return recorder
+
+    @staticmethod
+    def _sharing_settings(config):
+        return tuple(
+            getattr(config, name, None)
+            for name in (
+                "sharing_enabled",
+                "sharing_window_hours",
+                "sharing_max_speed",
+                "sharing_max_locations",
+                "sharing_max_networks",
+                "household_ipv4_prefix",
+                "household_ipv6_prefix",
+            )
+        )
+
+    def build_sharing_detector(self):
+        """
+        Construire le détecteur de partage de compte
+
+        La base GeoIP n'est ouverte qu'une fois; sans elle, seuls les réseaux
+        des sessions sont surveillés.
+
+        Returns:
+            SharingDetector: None si la détection est désactivée
+        """
+        if not getattr(self.config, "sharing_enabled", False):
+            return None
+
+        if self._geoip is None:
+            from data.geoip import GeoIPLocator
+
+            self._geoip = GeoIPLocator()
+        locate = self._geoip.locate_ip if self._geoip.reader is not None else None
+
+        self.logger.info(
+            LogMessages.SHARING_ENABLED.format(
+                hours=getattr(
+                    self.config, "sharing_window_hours", Defaults.SHARING_WINDOW_HOURS
+                )
+            )
+        )
+        return SharingDetector.from_config(self.config, locate=locate)
+
+    def detect_sharing(self, user_streams, previous_sessions, timestamp):
+        """
+        Passer les nouvelles sessions d'un sondage au détecteur de partage
+
+        Les alertes sont journalisées, enregistrées en base et notifiées.
+
+        Args:
+            user_streams (dict): {user_id: [StreamInfo, ...]}
+            previous_sessions (dict): Sessions connues avant ce sondage
+            timestamp (float): Instant du sondage
+        """
+        detector = self.sharing
+        if detector is None:
+            return
+
+        alerts = []
+        for user_id, streams in user_streams.items():
+            for stream in streams:
+                if stream.session_id not in previous_sessions:
+                    alerts.extend(
+                        detector.observe(
+                            user_id, stream.username, stream.ip_address, timestamp
+                        )
+                    )
+        if not alerts:
+            return
+
+        self.db.record_sharing_alerts(alerts)
+        for alert in alerts:
+            kind = ALERT_LABELS.get(alert.kind, alert.kind)
+            message = LogMessages.SHARING_ALERT.format(
+                username=alert.username, kind=kind, details=alert.details
+            )
+            self.logger.warning(message)
+            self.emit_log(message, "WARNING")
+            self.notifier.notify(
+                "sharing_alert",
+                UIMessages.SHARING_ALERT.format(
+                    username=alert.username,
+                    kind=kind,
+                    details=alert.details,
+                    ip=alert.ip_address,
+                ),
+                alert.user_id,
+                label=alert.username,
+            )
+
+    def _stage(self, name):
+        """Chronométrer une étape du cycle de sondage en cours, s'il y en a un"""
+        cycle = getattr(self._local, "cycle", None)
+        if cycle is None:
+            return nullcontext()
+        return cycle.stage(name)
+
+    def check_sessions(self):
+        """Vérifier les sessions actives et agir si nécessaire"""
+        cycle = self._local.cycle = PollCycle()
+        try:
+            # Récupérer et fusionner les sessions actives de tous les serveurs
+            user_streams = self.poll_sessions()
+            if user_streams is not None:
+                self._emit("connection_status", True)
+                self.consecutive_errors = 0
+
+                # Mettre à jour l'interface
+                with self._stage("emit"):
+                    self._emit("sessions_updated", user_streams)
+                    usage = self.usage.update(user_streams)
+                    self._emit("usage_updated", usage)
+
+                # Vérifier les conditions d'arrêt
+                with self._stage("policy"):
+                    self.check_stream_conditions(user_streams)
+
+                # Mettre à jour l'heure du dernier sondage réussi
+                self.last_poll_time = time.time()
+                LAST_POLL.set(self.last_poll_time)
+                ACTIVE_STREAMS.replace(
+                    {
+                        streams[0].username: len(streams)
+                        for streams in user_streams.values()
+                        if streams
+                    }
+                )
+                USER_BANDWIDTH.replace(
+                    {entry.label: entry.bandwidth for entry in usage.users.values()}
+                )
+                SERVER_BANDWIDTH.replace(
+                    {
+                        server_id: entry.bandwidth
+                        for server_id, entry in usage.servers.items()
+                    }
+                )
+                SERVER_TRANSCODES.replace(
+                    {
+                        server_id: entry.transcodes
+                        for server_id, entry in usage.servers.items()
+                    }
+                )
+            else:
+                self.consecutive_errors += 1
+                error_message = "Impossible de récupérer les sessions actives"
+                if self.consecutive_errors >= 3:
+                    self._emit("connection_status", False)
+                    self.emit_log(
+                        f"{error_message} (tentative {self.consecutive_errors})",
+                        "ERROR",
+                    )
+
+                    # Tentative de reconnexion
+                    if self.consecutive_errors % 5 == 0:  # Toutes les 5 erreurs
+                        if (
+                            self.reconnect_to_plex()
+                        ):  # Utilisation de la nouvelle méthode
+                            self.consecutive_errors = 0
+                        else:
+                            # Si la reconnexion échoue, augmenter le délai avant la prochaine tentative
+                            time.sleep(min(60, self.consecutive_errors))
+                else:
+                    self.emit_log(error_message, "WARNING")
+
+        except Exception as e:
+            self.logger.error(f"Erreur lors de la vérification des sessions: {str(e)}")
+            self.emit_log(LogMessages.SESSION_ERROR.format(error=str(e)), "ERROR")
+            self.consecutive_errors += 1
+
+            if self.consecutive_errors >= 3:
+                self._emit("connection_status", False)
+        finally:
+            CONSECUTIVE_ERRORS.set(self.consecutive_errors)
+            self.notifier.flush()
+            self._local.cycle = None
+            self.timings.record(cycle.finish())
+
+    # =====================================================
+    # SERVEURS PLEX
+    # =====================================================
+
+    def get_servers(self):
+        """Retourner la liste des serveurs Plex surveillés (serveur principal en tête)"""
+        return [
+            PlexServer(
+                id=server.get("id") or Defaults.SERVER_ID,
+                name=server.get("name") or server.get("url", ""),
+                url=server.get("url", "").rstrip("/"),
+                token=server.get("token", ""),
+            )
+            for server in self.config.plex_servers
+        ]
+
+    def _http(self, server):
+        """Session HTTP du serveur (connexions persistantes)"""
+        with self._http_lock:
+            session = self._http_sessions.get(server.url)
+            if session is None:
+                session = self._http_sessions[server.url] = requests.Session()
+            return session
+
+    def _prune_http_sessions(self):
+        """Fermer les sessions HTTP des serveurs qui ne sont plus configurés"""
+        urls = {server.url for server in self.get_servers()}
+        with self._http_lock:
+            stale = [url for url in self._http_sessions if url not in urls]
+            sessions = [self._http_sessions.pop(url) for url in stale]
+        for session in sessions:
+            session.close()
+
+    def _close_http_sessions(self):
+        with self._http_lock:
+            sessions = list(self._http_sessions.values())
+            self._http_sessions.clear()
+        for session in sessions:
+            session.close()
+
+    def server_for_session(self, session_id):
+        """Retourner le serveur qui héberge une session (serveur principal par défaut)"""
+        server = self.session_servers.get(session_id)
+        if server is not None:
+            return server
+        return self.get_servers()[0]
+
+    def fetch_all_sessions(self, servers):
+        """
+        Interroger tous les serveurs en parallèle
+
+        Returns:
+            list: Couples (serveur, données XML ou None), dans l'ordre des serveurs
+        """
+        if len(servers) == 1:
+            return [(servers[0], self.get_active_sessions(servers[0]))]
+
+        if self._executor is None or self._executor_size != len(servers):
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+            self._executor = ThreadPoolExecutor(
+                max_workers=len(servers), thread_name_prefix="plex-poller"
+            )
+            self._executor_size = len(servers)
+
+        return list(zip(servers, self._executor.map(self.get_active_sessions, servers)))
+
+    def poll_sessions(self):
+        """
+        Récupérer les sessions de tous les serveurs et les regrouper par utilisateur
+
+        Les limites de flux s'appliquent ainsi à l'ensemble des serveurs: un
+        utilisateur connecté à deux serveurs cumule ses flux.
+
+        Returns:
+            dict: {user_id: [StreamInfo, ...]}, ou None si aucun serveur n'a répondu
+        """
+        with self._stage("fetch"):
+            results = self.fetch_all_sessions(self.get_servers())
+
+        failed_ids = {server.id for server, xml_data in results if not xml_data}
+        if len(failed_ids) == len(results):
+            return None
+
+        # Conserver les réponses telles que Plex les a envoyées, avant parsing
+        recorder = self.recorder
+        if recorder is not None:
+            with self._stage("record"):
+                for server, xml_data in results:
+                    if xml_data:
+                        recorder.record(server.id, xml_data)
+
+        # Conserver le routage des sessions des serveurs injoignables à ce sondage
+        session_servers = {
+            session_id: server
+            for session_id, server in self.session_servers.items()
+            if server.id in failed_ids
+        }
+
+        user_streams = {}
+        for server, xml_data in results:
+            if not xml_data:
+                continue
+            for user_id, streams in self.parse_sessions(xml_data, server.id).items():
+                user_streams.setdefault(user_id, []).extend(streams)
+                for stream in streams:
+                    session_servers[stream.session_id] = server
+
+        self.session_servers = session_servers
+
+        # Première apparition des sessions, conservée pour celles des serveurs
+        # injoignables à ce sondage
+        now = self.current_time().timestamp()
+        known_sessions = self.known_sessions
+        self.known_sessions = {
+            session_id: known_sessions.get(session_id, now)
+            for session_id in session_servers
+        }
+
+        # Lieux et réseaux des nouvelles sessions (partage de compte)
+        with self._stage("ingest"):
+            self.detect_sharing(user_streams, known_sessions, now)
+        return user_streams
+
+    def session_started(self, stream):
+        """Instant où la session a été vue pour la première fois (horodatage)"""
+        return self.known_sessions.get(stream.session_id, 0)
+
+    def cleanup_expired_sessions(self):
+        """Nettoie les sessions expirées de la base de données"""
+        try:
+            # Considérer une session comme expirée après 30 minutes d'inactivité
+            expiration_minutes = 30
+            cleaned_count = self.db.cleanup_expired_sessions(expiration_minutes)
+
+            if cleaned_count > 0:
+                self.logger.info(
+                    f"{cleaned_count} sessions expirées nettoyées de la base de données"
+                )
+                self.emit_log(
+                    f"{cleaned_count} anciennes sessions nettoyées", "INFO"
+                )
+
+            return cleaned_count
+
+        except Exception as e:
+            self.logger.error(
+                f"Erreur lors du nettoyage des sessions expirées: {str(e)}"
+            )
+            return 0
+
+    def test_connection(self, server=None):
+        """Test si la connexion au serveur Plex est active et fonctionnelle"""
+        server = server or self.get_servers()[0]
+        url = f"{server.url}/status/sessions"
+        headers = {"X-Plex-Token": server.token}
+
+        try:
+            start_time = time.time()
+            response = self._http(server).get(url, headers=headers, timeout=5)
+            response_time = time.time() - start_time
+
+            if response.status_code == 200:
+                self.logger.debug(
+                    f"Connexion au serveur Plex réussie (temps: {response_time:.2f}s)"
+                )
+                return True
+            elif response.status_code == 401:
+                self.logger.error(
+                    "Erreur d'authentification au serveur Plex (token invalide)"
+                )
+                self.emit_log(
+                    "Erreur d'authentification au serveur Plex. Vérifiez votre token.",
+                    "ERROR",
+                )
+                return False
+            else:
+                self.logger.error(
+                    f"Échec de la connexion au serveur Plex: code HTTP {response.status_code}"
+                )
+                return False
+        except requests.exceptions.Timeout:
+            self.logger.error(
+                "Délai d'attente dépassé lors de la connexion au serveur Plex"
+            )
+            return False
+        except requests.exceptions.ConnectionError:
+            self.logger.error("Erreur de connexion au serveur Plex")
+            return False
+        except Exception as e:
+            self.logger.error(
+                f"Erreur lors du test de connexion au serveur Plex: {str(e)}"
+            )
+            return False
+
+    def reconnect_to_plex(self):
+        """Tente de rétablir la connexion au serveur Plex de manière robuste"""
+        self.emit_log("Tentative de reconnexion au serveur Plex...", "INFO")
+
+        # La reconnexion réussit dès qu'un des serveurs répond
+        for server in self.get_servers():
+            try:
+                url = f"{server.url}/status/sessions"
+                headers = {"X-Plex-Token": server.token}
+
+                response = self._http(server).get(url, headers=headers, timeout=10)
+
+                if response.status_code == 200:
+                    self.consecutive_errors = 0
+                    self._emit("connection_status", True)
+                    self.emit_log(
+                        f"Reconnexion réussie au serveur Plex {server.name}", "SUCCESS"
+                    )
+                    return True
+                else:
+                    self.emit_log(
+                        f"Échec de la reconnexion à {server.name}: code HTTP {response.status_code}",
+                        "ERROR",
+                    )
+            except requests.exceptions.RequestException as e:
+                self.logger.error(
+                    f"Erreur lors de la tentative de reconnexion à {server.name}: {str(e)}"
+                )
+                self.emit_log(
+                    f"Échec de la reconnexion à {server.name}: {str(e)}", "ERROR"
+                )
+
+        return False
+
+    def get_active_sessions(self, server=None):
+        """Récupérer les sessions actives depuis un serveur Plex (principal par défaut)"""
+        server = server or self.get_servers()[0]
+        url = f"{server.url}/status/sessions"
+        headers = {"X-Plex-Token": server.token}
+
+        try:
+            with POLL_DURATION.time(server=server.id):
+                response = self._http(server).get(url, headers=headers, timeout=10)
+            if response.status_code == 200 and response.text:
+                return response.text
+            else:
+                POLL_FAILURES.inc(server=server.id)
+                self.logger.error(
+                    f"Erreur de requête ({server.name}): {response.status_code}"
+                )
+                self.emit_log(
+                    f"Erreur de requête ({server.name}): {response.status_code}",
+                    "ERROR",
+                )
+                return None
+        except requests.exceptions.RequestException as e:
+            POLL_FAILURES.inc(server=server.id)
+            self.logger.error(f"Erreur de connexion ({server.name}): {str(e)}")
+            self.emit_log(
+                f"Erreur de connexion au serveur Plex {server.name}: {str(e)}", "ERROR"
+            )
+            return None
+
+    @PARSE_DURATION.time()
+    def parse_sessions(self, xml_data, server_id=Defaults.SERVER_ID):
+        """Parser les données XML des sessions d'un serveur Plex et les enregistrer"""
+        with self._stage("parse"):
+            user_streams = self.read_sessions(xml_data, server_id)
+        with self._stage("ingest"):
+            self.ingest_sessions(user_streams)
+        return user_streams
+
+    def read_sessions(self, xml_data, server_id=Defaults.SERVER_ID):
+        """
+        Extraire les flux des données XML des sessions, sans accès à la base
+
+        Returns:
+            dict: {user_id: [StreamInfo, ...]}
+        """
+        user_streams = {}
+
+        try:
+            root = ET.fromstring(xml_data)
+
+            # Parcourir toutes les sessions vidéo
+            for video in root.findall(".//Video"):
+                try:
+                    # Récupérer les informations de base
+                    session_elem = video.find(".//Session")
+                    if session_elem is None:
+                        # Ignorer les streams sans session ID
+                        continue
+
+                    session_id = session_elem.get("id", "")
+                    grandparent_title = video.get("grandparentTitle", "")
+                    parent_title = video.get("parentTitle", "")
+                    title = video.get("title", "")
+
+                    # Construire le titre complet
+                    if grandparent_title and parent_title:
+                        # Format série: "Série - S01E01 - Titre de l'épisode"
+                        media_title = f"{grandparent_title} - {parent_title} - {title}"
+                    elif grandparent_title:
+                        # Format série sans numéro d'épisode
+                        media_title = f"{grandparent_title} - {title}"
+                    else:
+                        # Format film
+                        media_title = title
+
+                    # Récupérer la section/bibliothèque
+                    library_section = video.get("librarySectionTitle", "Inconnu")
+
+                    # Récupérer les informations sur le player
+                    player_elem = video.find(".//Player")
+                    if player_elem is None:
+                        # Ignorer les streams sans information de lecteur
+                        continue
+
+                    # Récupérer l'état (lecture, pause)
+                    state = player_elem.get("state", "unknown")
+                    ip_address = player_elem.get("address", "Inconnu")
+                    player_id = player_elem.get("machineIdentifier", "Inconnu")
+                    platform = player_elem.get("platform", "Inconnu")
+                    product = player_elem.get("product", "Inconnu")
+                    device = player_elem.get("device", "Inconnu")
+
+                    # Transcodage vidéo ou audio (absent en lecture directe)
+                    transcode_elem = video.find("TranscodeSession")
+                    transcode = transcode_elem is not None and "transcode" in (
+                        transcode_elem.get("videoDecision"),
+                        transcode_elem.get("audioDecision"),
+                    )
+
+                    # Débit de la session (kb/s) et qualité du média lu
+                    try:
+                        bandwidth = int(session_elem.get("bandwidth") or 0)
+                    except ValueError:
+                        bandwidth = 0
+                    quality = media_quality(video)
+
+                    # Récupérer les informations sur l'utilisateur
+                    user_elem = video.find(".//User")
+                    if user_elem is None:
+                        # Utiliser des valeurs par défaut si l'utilisateur n'est pas trouvé
+                        username = "Inconnu"
+                        user_id = "0"
+                    else:
+                        username = user_elem.get("title", "Inconnu")
+                        user_id = user_elem.get("id", "0")
+
+                    # Stocker les informations dans le dictionnaire
+                    stream_info = StreamInfo(
+                        session_id,
+                        ip_address,
+                        player_id,
+                        library_section,
+                        media_title,
+                        platform,
+                        product,
+                        device,
+                        username,
+                        state,
+                        server_id,
+                        transcode,
+                        bandwidth,
+                        quality,
+                    )
+
+                    if user_id not in user_streams:
+                        user_streams[user_id] = []
+
+                    user_streams[user_id].append(stream_info)
+                except Exception as inner_e:
+                    # Capturer les erreurs spécifiques à un stream pour ne pas interrompre le traitement
+                    self.logger.error(
+                        f"Erreur lors du traitement d'un stream: {str(inner_e)}"
+                    )
+                    # Continuer avec le stream suivant
+
+            return user_streams
+
+        except ET.ParseError as e:
+            self.logger.error(f"Erreur lors du parsing XML: {str(e)}")
+            self.emit_log(
+                f"Erreur lors du parsing des données de session: {str(e)}", "ERROR"
+            )
+            return {}
+
+    def ingest_sessions(self, user_streams):
+        """Enregistrer les utilisateurs et les sessions d'un sondage dans la base"""
+        for user_id, streams in user_streams.items():
+            for stream in streams:
+                try:
+                    self.db.add_or_update_user(user_id, stream.username)
+                    self.db.record_session(
+                        user_id,
+                        stream.session_id,
+                        stream.platform,
+                        stream.device,
+                        stream.ip_address,
+                        stream.media_title,
+                        stream.library_section,
+                        server_id=stream.server_id,
+                        bandwidth=stream.bandwidth,
+                        transcode=stream.transcode,
+                        quality=stream.quality or None,
+                    )
+                except Exception as e:
+                    # Une écriture en échec ne doit pas bloquer les autres flux
+                    self.logger.error(
+                        f"Erreur lors de l'enregistrement d'un stream: {str(e)}"
+                    )
+
+    def check_stream_conditions(self, user_streams):
+        """
+        Vérifier les conditions des flux et arrêter ceux qui dépassent les limites
+        """
+        # Une session déjà arrêtée que Plex signale encore n'est ni comptée, ni
+        # arrêtée une seconde fois
+        user_streams = self.enforcement.without_terminated(user_streams)
+
+        # Capacité des serveurs: les flux des utilisateurs en liste blanche
+        # comptent dans la charge, mais ne sont jamais choisis
+        exempt = self.db.exempt_users
+        capacity_stops = self.check_capacity(user_streams, exempt)
+
+        # Les utilisateurs en liste blanche sont ensuite écartés de tout autre
+        # comptage ou accès à la base, y compris la vérification des comptes
+        # désactivés
+        if exempt:
+            user_streams = {
+                user_id: streams
+                for user_id, streams in user_streams.items()
+                if user_id not in exempt
+            }
+
+        # Clé des flux uniques: foyer si le regroupement est activé, sinon
+        # appareil + IP
+        households = self.households
+        if households is not None:
+            households.observe_streams(user_streams)
+            key_for = households.key_for
+        else:
+            key_for = None
+
+        # Les règles sont évaluées en un seul passage sur tous les flux du sondage
+        self.refresh_policy()
+        violations = {}
+        for violation in self.policy.evaluate(
+            user_streams, self.current_time(), key_for=key_for
+        ):
+            violations.setdefault(violation.user_id, []).append(violation)
+
+        # Flux à arrêter par utilisateur en dépassement, une fois le délai de
+        # grâce écoulé: {user_id: (username, flux à arrêter, flux, raisons, actions)}
+        over_limit = {}
+
+        for user_id, streams in user_streams.items():
+            # Obtenir le nom d'utilisateur du premier stream pour les logs
+            username = streams[0][8] if streams else "Inconnu"
+
+            # Vérifier si le compte est désactivé
+            if self.db.is_user_disabled(user_id):
+                self.logger.warning(
+                    f"Tentative de lecture sur compte désactivé : {username}"
+                )
+
+                # Récupérer les informations du premier stream pour la notification
+                stream = streams[0]
+                title = stream[4]  # media_title
+                platform = stream[5]  # platform
+                ip = stream[1]  # ip_address
+
+                # Envoyer une notification Telegram
+                notification = UIMessages.DISABLED_USER_ATTEMPT.format(
+                    username=username, title=title, platform=platform, ip=ip
+                )
+                self.notifier.notify(
+                    "disabled_attempt", notification, user_id, label=username
+                )
+
+                # Ajouter ce log pour l'interface
+                self.emit_log(
+                    f"Tentative de lecture détectée sur compte désactivé : {username}",
+                    "WARNING",
+                )
+
+                if self.shadow_mode:
+                    self.simulate_stops(
+                        streams, user_id, username, LogMessages.DISABLED_ACCOUNT_REASON
+                    )
+                    continue
+
+                # Arrêter tous les streams avec le message spécifique
+                decisions = []
+                for stream in streams:
+                    session_id = stream[0]
+                    stopped = self.stop_stream_with_message(
+                        user_id,
+                        username,
+                        session_id,
+                        UIMessages.ACCOUNT_DISABLED_MESSAGE,
+                    )
+                    decisions.append(
+                        self._decision(
+                            self.db.DECISION_MODE_LIVE,
+                            user_id,
+                            username,
+                            stream,
+                            LogMessages.DISABLED_ACCOUNT_REASON,
+                            stopped,
+                        )
+                    )
+                self.db.record_enforcement_decisions(decisions)
+
+                continue  # Passer à l'utilisateur suivant
+
+            streams_to_stop = []
+            reasons = []
+            # Journalisées seulement si l'arrêt a lieu (hors délai de grâce)
+            actions = []
+
+            # Limite personnalisée de l'utilisateur
+            max_streams = self.db.get_user_max_streams(user_id)
+            # Nombre total de flux uniques (par foyer, ou par appareil + IP)
+            key = key_for(user_id) if key_for is not None else stream_key
+            stream_count = len({key(stream) for stream in streams})
+
+            if max_streams is not None and stream_count > max_streams:
+                self.logger.warning(
+                    f"Utilisateur {username} dépasse la limite: {stream_count} flux actifs (max: {max_streams})"
+                )
+                self.emit_log(
+                    f"Utilisateur {username} dépasse la limite: {stream_count} flux actifs (max: {max_streams})",
+                    "WARNING",
+                )
+
+                # Seulement les flux en trop, les moins coûteux à interrompre d'abord
+                selected = select_excess_streams(
+                    streams, max_streams, key, self.session_started
+                )
+                actions.append(
+                    LogMessages.STREAMS_SELECTED.format(
+                        count=len(selected), total=len(streams), username=username
+                    )
+                )
+                streams_to_stop.extend(selected)
+                reasons.append(
+                    f"Dépassement de limite ({len(streams)} streams actifs, maximum autorisé: {max_streams})"
+                )
+
+            # Règles de limitation enfreintes par cet utilisateur
+            for violation in violations.get(user_id, ()):
+                rule = violation.rule
+                count = len({key(stream) for stream in violation.streams})
+                message = LogMessages.RULE_VIOLATION.format(
+                    username=username, rule=rule.name, count=count, max=rule.max_streams
+                )
+                self.logger.warning(message)
+                self.emit_log(message, "WARNING")
+
+                streams_to_stop.extend(
+                    select_excess_streams(
+                        violation.streams, rule.max_streams, key, self.session_started
+                    )
+                )
+                reasons.append(
+                    f"Règle « {rule.name} » ({count} streams, maximum autorisé: {rule.max_streams})"
+                )
+
+            # Flux choisis pour ramener un serveur sous sa capacité
+            for stream, reason in capacity_stops.get(user_id, ()):
+                streams_to_stop.append(stream)
+                if reason not in reasons:
+                    reasons.append(reason)
+
+            if streams_to_stop:
+                # Un flux visé par plusieurs règles n'est arrêté qu'une fois
+                unique_to_stop = list(
+                    {stream.session_id: stream for stream in streams_to_stop}.values()
+                )
+                over_limit[user_id] = (
+                    username,
+                    unique_to_stop,
+                    streams,
+                    reasons,
+                    actions,
+                )
+
+        # Un dépassement bref (changement d'appareil) est toléré: les flux ne
+        # sont arrêtés qu'après le délai de grâce ou plusieurs sondages
+        to_enforce = self.enforcement.update(over_limit)
+        pending = self.enforcement.pending()
+        for user_id, entry in over_limit.items():
+            username, unique_to_stop, streams, reasons, actions = entry
+            if user_id in to_enforce:
+                for action in actions:
+                    self.logger.info(action)
+                self.stop_sessions(
+                    unique_to_stop, user_id, username, streams, "; ".join(reasons)
+                )
+            else:
+                message = LogMessages.ENFORCEMENT_GRACE.format(
+                    username=username,
+                    elapsed=pending.get(user_id, 0),
+                    period=self.enforcement.grace_period,
+                )
+                self.logger.info(message)
+                self.emit_log(message, "INFO")
+
+    def check_capacity(self, user_streams, exempt=frozenset()):
+        """
+        Vérifier les transcodages simultanés et le débit total de chaque serveur
+
+        Args:
+            user_streams (dict): {user_id: [StreamInfo, ...]}, exemptés compris
+            exempt (set): Utilisateurs dont les flux ne sont jamais arrêtés
+
+        Returns:
+            dict: {user_id: [(StreamInfo, raison), ...]} flux à arrêter
+        """
+        max_transcodes = getattr(self.config, "max_transcodes", 0)
+        max_bandwidth = getattr(self.config, "max_bandwidth", 0)
+        violations = select_capacity_streams(
+            user_streams,
+            max_transcodes,
+            max_bandwidth * 1000,
+            exempt,
+            started=self.session_started,
+        )
+        # Un dépassement sans flux arrêtable n'est signalé qu'à son apparition,
+        # et non à chaque sondage tant qu'il dure
+        reported = self._capacity_reported
+        self._capacity_reported = {
+            (violation.server_id, violation.kind)
+            for violation in violations
+            if not violation.streams
+        }
+        if not violations:
+            return {}
+
+        names = {server.id: server.name for server in self.get_servers()}
+        capacity_stops = {}
+        for violation in violations:
+            if not violation.streams and (violation.server_id, violation.kind) in reported:
+                continue
+            server = names.get(violation.server_id, violation.server_id)
+            if violation.kind == CAPACITY_TRANSCODES:
+                message = LogMessages.CAPACITY_TRANSCODES.format(
+                    server=server, count=violation.value, max=violation.limit
+                )
+                reason = (
+                    f"Capacité du serveur {server} ({violation.value} transcodages, "
+                    f"maximum autorisé: {violation.limit})"
+                )
+            else:
+                message = LogMessages.CAPACITY_BANDWIDTH.format(
+                    server=server,
+                    total=violation.value / 1000,
+                    max=violation.limit // 1000,
+                )
+                reason = (
+                    f"Capacité du serveur {server} (débit de "
+                    f"{format_bandwidth(violation.value)}, maximum autorisé: "
+                    f"{format_bandwidth(violation.limit)})"
+                )
+            self.logger.warning(message)
+            self.emit_log(message, "WARNING")
+
+            for user_id, stream in violation.streams:
+                capacity_stops.setdefault(user_id, []).append((stream, reason))
+
+        return capacity_stops
+
+    def current_time(self):
+        """Heure des plages horaires des règles (l'heure du sondage rejoué en rejeu)"""
+        return datetime.now()
+
+    def refresh_policy(self):
+        """Recompiler les règles de limitation si la table a changé depuis la dernière compilation"""
+        signature = self.db.get_policy_rules_signature()
+        if signature is None or signature == self._policy_signature:
+            return False
+
+        self.policy = CompiledPolicy(self.db.get_policy_rules())
+        self._policy_signature = signature
+        self.logger.info(LogMessages.RULES_COMPILED.format(count=len(self.policy)))
+        return True
+
+    def stop_sessions(
+        self, sessions_to_stop, user_id, username, all_streams, reason=None
+    ):
+        """
+        Arrêter les sessions spécifiées et mettre à jour les statistiques
+
+        Args:
+            sessions_to_stop: Liste des sessions à arrêter
+            user_id: ID de l'utilisateur
+            username: Nom d'utilisateur
+            all_streams: Toutes les sessions de l'utilisateur pour les statistiques
+            reason: Raison de l'arrêt (dépassement de la limite de l'utilisateur par défaut)
+        """
+        if reason is None:
+            reason = f"Dépassement de limite ({len(all_streams)} streams actifs, maximum autorisé: {self.db.get_user_max_streams(user_id)})"
+
+        # En mode simulation, la décision est journalisée mais aucun flux n'est arrêté
+        if self.shadow_mode:
+            self.simulate_stops(sessions_to_stop, user_id, username, reason)
+            return
+
+        # Variables pour construire un message Telegram pour tous les streams arrêtés
+        successful_stops = 0
+        telegram_message_parts = [f"🛑 <b>Streams arrêtés !</b>"]
+        telegram_message_parts.append(f"👤 <b>Utilisateur</b>: {username}")
+        telegram_message_parts.append(
+            f"🔢 <b>Nombre de streams</b>: {len(sessions_to_stop)}"
+        )
+
+        decisions = []
+        for stream in sessions_to_stop:
+            session_id = stream[0]
+            platform = stream[5]
+            device = stream[7]
+            state = stream[9]
+            media_title = stream[4]  # Titre du média en cours de lecture
+
+            self.logger.info(
+                f"Tentative d'arrêt du flux {session_id} ({platform}/{device}, état: {state}) pour {username}"
+            )
+
+            success = self.stop_stream(user_id, username, session_id, state)
+            decisions.append(
+                self._decision(
+                    self.db.DECISION_MODE_LIVE, user_id, username, stream, reason, success
+                )
+            )
+
+            if success:
+                successful_stops += 1
+                self.logger.info(f"Stream {session_id} arrêté pour {username}")
+
+                # Utiliser un message différent selon l'état du flux
+                if state == "playing":
+                    log_message = LogMessages.STREAM_STOPPED_PLAYING.format(
+                        username=username, platform=platform, device=device
+                    )
+                elif state == "paused":
+                    log_message = LogMessages.STREAM_STOPPED_PAUSED.format(
+                        username=username, platform=platform, device=device
+                    )
+                else:
+                    log_message = LogMessages.STREAM_STOPPED_OTHER.format(
+                        username=username, platform=platform, device=device, state=state
+                    )
+
+                self.emit_log(log_message, "SUCCESS")
+
+                # Ajouter les détails de ce stream au message Telegram
+                stream_details = f"\n\n📺 <b>Stream #{successful_stops}</b>"
+                stream_details += f"\n<b>Contenu</b>: {media_title}"
+                stream_details += f"\n<b>Plateforme</b>: {platform}"
+                stream_details += f"\n<b>Appareil</b>: {device}"
+                stream_details += f"\n<b>État</b>: {state}"
+                telegram_message_parts.append(stream_details)
+
+                # Mettre à jour les statistiques directement en base de données
+                self.db.record_stream_termination(user_id, username, platform)
+            else:
+                self.logger.warning(
+                    f"Échec de l'arrêt du flux {session_id} pour {username}"
+                )
+                self.emit_log(
+                    LogMessages.STREAM_STOP_FAILED.format(
+                        username=username, platform=platform
+                    ),
+                    "ERROR",
+                )
+
+        # Journal des décisions, pour comparaison avec le mode simulation
+        self.db.record_enforcement_decisions(decisions)
+
+        # Si des streams ont été arrêtés avec succès, envoyer une notification Telegram
+        if successful_stops > 0:
+            reason_msg = f"\n\n📝 <b>Raison</b>: {reason}"
+            telegram_message_parts.append(reason_msg)
+
+            # Joindre toutes les parties du message
+            full_telegram_message = "\n".join(telegram_message_parts)
+
+            # Envoyer la notification Telegram (ou la regrouper si l'utilisateur
+            # a déjà été signalé récemment)
+            try:
+                if self.notifier.notify(
+                    "streams_stopped", full_telegram_message, user_id, label=username
+                ):
+                    self.logger.info(
+                        f"Notification Telegram envoyée pour l'arrêt de {successful_stops} streams de {username}"
+                    )
+            except Exception as e:
+                self.logger.error(
+                    f"Erreur lors de l'envoi de la notification Telegram: {str(e)}"
+                )
+
+    @property
+    def shadow_mode(self):
+        """Mode simulation: les décisions d'arrêt sont journalisées sans être appliquées"""
+        return getattr(self.config, "shadow_mode", False)
+
+    @staticmethod
+    def _decision(mode, user_id, username, stream, reason, executed):
+        """Ligne du journal des décisions d'arrêt pour un flux"""
+        return (
+            mode,
+            user_id,
+            username,
+            stream.session_id,
+            stream.platform,
+            stream.state,
+            reason,
+            executed,
+        )
+
+    def simulate_stops(self, sessions_to_stop, user_id, username, reason):
+        """
+        Journaliser des arrêts décidés en mode simulation, sans les appliquer
+
+        Les sessions sont mémorisées comme arrêtées tant que Plex les signale:
+        les sondages suivants ne les comptent plus et ne redécident pas leur
+        arrêt, comme en mode réel où Plex ne les signalerait plus.
+        """
+        decisions = []
+        for stream in sessions_to_stop:
+            self.enforcement.mark_terminated(stream.session_id, simulated=True)
+            decisions.append(
+                self._decision(
+                    self.db.DECISION_MODE_SHADOW, user_id, username, stream, reason, False
+                )
+            )
+        self.db.record_enforcement_decisions(decisions)
+
+        message = LogMessages.SHADOW_DECISION.format(
+            count=len(sessions_to_stop), username=username, reason=reason
+        )
+        self.logger.warning(message)
+        self.emit_log(message, "WARNING")
+
+    @_instrumented_termination
+    def stop_stream(self, user_id, username, session_id, state="playing"):
+        """
+        Arrêter un stream spécifique avec un message adapté à l'état du flux
+
+        Args:
+            user_id: ID de l'utilisateur
+            username: Nom de l'utilisateur
+            session_id: ID de la session à arrêter
+            state: État du flux (playing, paused, etc.)
+        """
+        server = self.server_for_session(session_id)
+        url = f"{server.url}/status/sessions/terminate"
+
+        # Sélectionner le message en fonction de l'état du flux
+        if state == "paused":
+            reason = UIMessages.TERMINATION_MESSAGE_PAUSED
+        elif state == "playing":
+            reason = UIMessages.TERMINATION_MESSAGE_PLAYING
+        else:
+            reason = self.config.termination_message  # Message par défaut
+
+        params = {"sessionId": session_id, "reason": reason}
+        headers = {"X-Plex-Token": server.token}
+
+        max_retries = 3
+        retry_count = 0
+
+        while retry_count < max_retries:
+            try:
+                response = self._http(server).get(
+                    url, params=params, headers=headers, timeout=10
+                )
+                if response.status_code == 200:
+                    self.db.mark_session_terminated(session_id)
+                    self.enforcement.mark_terminated(session_id)
+                    self.logger.info(
+                        f"Stream {session_id} de l'utilisateur {username} arrêté avec succès"
+                    )
+                    return True
+                else:
+                    self.logger.warning(
+                        f"Échec de l'arrêt du stream {session_id}: HTTP {response.status_code}"
+                    )
+                    retry_count += 1
+                    time.sleep(1)  # Attente avant nouvelle tentative
+            except requests.exceptions.Timeout:
+                self.logger.warning(
+                    f"Délai d'attente dépassé lors de l'arrêt du stream {session_id}"
+                )
+                retry_count += 1
+                time.sleep(2)  # Attente plus longue en cas de timeout
+            except requests.exceptions.ConnectionError:
+                self.logger.error(
+                    f"Erreur de connexion lors de l'arrêt du stream {session_id}"
+                )
+                retry_count += 1
+                time.sleep(2)
+            except Exception as e:
+                self.logger.error(
+                    f"Erreur inattendue lors de l'arrêt du stream {session_id}: {str(e)}"
+                )
+                return False
+
+        # Si on arrive ici, c'est que toutes les tentatives ont échoué
+        self.logger.error(
+            f"Impossible d'arrêter le stream {session_id} après {max_retries} tentatives"
+        )
+        return False
+
+    @_instrumented_termination
+    def stop_stream_with_message(self, user_id, username, session_id, custom_message):
+        """
+        Arrêter un stream spécifique avec un message personnalisé
+
+        Args:
+            user_id: ID de l'utilisateur
+            username: Nom de l'utilisateur
+            session_id: ID de la session à arrêter
+            custom_message: Message personnalisé à afficher
+        """
+        server = self.server_for_session(session_id)
+        url = f"{server.url}/status/sessions/terminate"
+
+        params = {"sessionId": session_id, "reason": custom_message}
+        headers = {"X-Plex-Token": server.token}
+
+        max_retries = 3
+        retry_count = 0
+
+        while retry_count < max_retries:
+            try:
+                response = self._http(server).get(
+                    url, params=params, headers=headers, timeout=10
+                )
+                if response.status_code == 200:
+                    self.db.mark_session_terminated(session_id)
+                    self.enforcement.mark_terminated(session_id)
+
+                    # Récupérer les informations sur le flux depuis la base de données
+                    session_info = self.db.get_session_info(session_id)
+
+                    platform = "Inconnu"
+                    if session_info:
+                        platform = session_info.get("platform", "Inconnu")
+
+                    # Enregistrer la terminaison pour les statistiques
+                    self.db.record_stream_termination(user_id, username, platform)
+
+                    # Ajouter ces lignes pour les logs d'interface
+                    self.logger.info(
+                        f"Stream {session_id} arrêté pour {username} avec message: '{custom_message}'"
+                    )
+                    self.emit_log(
+                        f"Stream arrêté pour {username} avec message personnalisé",
+                        "SUCCESS",
+                    )
+
+                    return True
+
+                self.logger.warning(
+                    f"Échec de l'arrêt du stream {session_id}: HTTP {response.status_code}"
+                )
+                retry_count += 1
+                time.sleep(1)  # Attente avant nouvelle tentative
+
+            except requests.exceptions.Timeout:
+                self.logger.warning(
+                    f"Délai d'attente dépassé lors de l'arrêt du stream {session_id}"
+                )
+                retry_count += 1
+                time.sleep(2)  # Attente plus longue en cas de timeout
+
+            except requests.exceptions.ConnectionError:
+                self.logger.error(
+                    f"Erreur de connexion lors de l'arrêt du stream {session_id}"
+                )
+                retry_count += 1
+                time.sleep(2)
+
+            except Exception as e:
+                self.logger.error(
+                    f"Erreur inattendue lors de l'arrêt du stream {session_id}: {str(e)}"
+                )
+                return False
+
+        # Si on arrive ici, c'est que toutes les tentatives ont échoué
+        self.logger.error(
+            f"Impossible d'arrêter le stream {session_id} après {max_retries} tentatives"
+        )
+        self.emit_log(
+            f"Échec de l'arrêt du flux pour {username} après plusieurs tentatives",
+            "ERROR",
+        )
+        return False
+
+    def update_user_stats(self, user_id, streams):
+        """
+        Met à jour les statistiques d'utilisation pour un utilisateur
+
+        Args:
+            user_id: ID de l'utilisateur dans la base de données
+            streams: Liste des streams actifs pour cet utilisateur
+        """
+        try:
+            if not streams:  # Rien à faire si pas de streams
+                return True
+
+            # Vérifier si user_id est valide
+            if not user_id:
+                self.logger.warning(
+                    "Tentative de mise à jour des statistiques avec un ID utilisateur invalide"
+                )
+                return False
+
+            # Utiliser un contexte `with` pour gérer la connexion et s'assurer qu'elle est fermée
+            with sqlite3.connect(self.db.db_path) as conn:
+                cursor = conn.cursor()
+
+                # Vérifier que l'utilisateur existe
+                cursor.execute("SELECT 1 FROM plex_users WHERE id = ?", (user_id,))
+                if not cursor.fetchone():
+                    self.logger.warning(
+                        f"Utilisateur ID {user_id} introuvable dans la base de données"
+                    )
+                    # Créer l'utilisateur avec des informations minimales
+                    try:
+                        username = (
+                            streams[0][8]
+                            if streams and len(streams[0]) > 8
+                            else "Inconnu"
+                        )
+                        cursor.execute(
+                            "INSERT INTO plex_users (id, username) VALUES (?, ?)",
+                            (user_id, username),
+                        )
+                        self.logger.info(
+                            f"Utilisateur {username} (ID: {user_id}) créé automatiquement"
+                        )
+                    except Exception as user_create_error:
+                        self.logger.error(
+                            f"Impossible de créer l'utilisateur: {str(user_create_error)}"
+                        )
+                        return False
+
+                # Mettre à jour last_seen pour l'utilisateur
+                cursor.execute(
+                    """
+                    UPDATE plex_users 
+                    SET last_seen = datetime('now')
+                    WHERE id = ?
+                    """,
+                    (user_id,),
+                )
+
+                # Mettre à jour le nombre total de sessions
+                cursor.execute(
+                    """
+                    UPDATE plex_users 
+                    SET total_sessions = COALESCE(total_sessions, 0) + ?
+                    WHERE id = ?
+                    """,
+                    (len(streams), user_id),
+                )
+
+                # Enregistrer les statistiques par plateforme
+                for stream in streams:
+                    try:
+                        # Vérifier que le stream contient suffisamment d'éléments
+                        if len(stream) <= 5:
+                            self.logger.warning(
+                                f"Stream avec structure invalide ignoré: {stream}"
+                            )
+                            continue
+
+                        platform = stream[
+                            5
+                        ]  # Plateforme (index 5 dans le tuple de stream)
+
+                        # S'assurer que la plateforme n'est pas None ou vide
+                        if not platform:
+                            platform = "Inconnu"
+
+                        # Vérifier si cette plateforme existe déjà pour cet utilisateur
+                        cursor.execute(
+                            """
+                            SELECT count
+                            FROM platform_stats
+                            WHERE user_id = ? AND platform = ?
+                            """,
+                            (user_id, platform),
+                        )
+                        result = cursor.fetchone()
+
+                        if result:
+                            # Mettre à jour le compteur existant
+                            cursor.execute(
+                                """
+                                UPDATE platform_stats
+                                SET count = count + 1
+                                WHERE user_id = ? AND platform = ?
+                                """,
+                                (user_id, platform),
+                            )
+                        else:
+                            # Vérifier si la table platform_stats existe
+                            cursor.execute(
+                                "SELECT name FROM sqlite_master WHERE type='table' AND name='platform_stats'"
+                            )
+                            if not cursor.fetchone():
+                                # Créer la table si elle n'existe pas
+                                cursor.execute(
+                                    """
+                                    CREATE TABLE platform_stats (
+                                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                                        user_id TEXT NOT NULL,
+                                        platform TEXT NOT NULL,
+                                        count INTEGER DEFAULT 0,
+                                        UNIQUE(user_id, platform)
+                                    )
+                                """
+                                )
+                                self.logger.info(
+                                    "Table platform_stats créée automatiquement"
+                                )
+
+                            # Créer un nouveau compteur pour cette plateforme
+                            cursor.execute(
+                                """
+                                INSERT INTO platform_stats (user_id, platform, count)
+                                VALUES (?, ?, 1)
+                                """,
+                                (user_id, platform),
+                            )
+                    except Exception as stream_error:
+                        # Capturer les erreurs par stream pour ne pas bloquer les autres
+                        self.logger.error(
+                            f"Erreur lors du traitement des stats du stream: {str(stream_error)}"
+                        )
+                        continue
+
+                # Le commit est automatiquement fait par le with statement
+                return True
+
+        except sqlite3.Error as sql_error:
+            self.logger.error(
+                f"Erreur SQL lors de la mise à jour des statistiques: {str(sql_error)}"
+            )
+            return False
+        except Exception as e:
+            self.logger.error(
+                f"Erreur lors de la mise à jour des statistiques: {str(e)}"
+            )
+            return False
+
+    def update_kill_stats(self, username, platform):
+        """Mettre à jour les statistiques d'arrêt de flux"""
+        stats_path = os.path.join(get_app_path(), "stats.json")
+        stats = {}
+
+        # Charger les statistiques existantes
+        if os.path.exists(stats_path):
+            try:
+                with open(stats_path, "r", encoding="utf-8") as f:
+                    stats = json.load(f)
+            except Exception as e:
+                self.logger.error(
+                    f"Erreur lors du chargement des statistiques: {str(e)}"
+                )
+
+        # Créer ou mettre à jour les statistiques pour cet utilisateur
+        if username not in stats:
+            stats[username] = {
+                "total_sessions": 0,
+                "kill_count": 0,
+                "platforms": {},
+                "last_seen": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            }
+
+        # Mettre à jour les statistiques d'arrêt
+        stats[username]["kill_count"] += 1
+        stats[username]["last_kill"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+        # Mettre à jour les statistiques par plateforme
+        if "platforms" not in stats[username]:
+            stats[username]["platforms"] = {}
+
+        if platform not in stats[username]["platforms"]:
+            stats[username]["platforms"][platform] = 0
+
+        stats[username]["platforms"][platform] += 1
+
+        # Enregistrer les statistiques
+        try:
+            with open(stats_path, "w", encoding="utf-8") as f:
+                json.dump(stats, f, indent=2)
+        except Exception as e:
+            self.logger.error(
+                f"Erreur lors de l'enregistrement des statistiques: {str(e)}"
+            )
+
+    def toggle_pause(self):
+        """Mettre en pause ou reprendre la surveillance"""
+        self.is_paused = not self.is_paused
+
+        if self.is_paused:
+            self.emit_log("Surveillance mise en pause", "WARNING")
+        else:
+            self.emit_log("Surveillance reprise", "INFO")
+
+        return self.is_paused
@@ -0,0 +1,251 @@
+"""
+Regroupement des flux par foyer
+
+Compter les flux par couple (appareil, IP) pénalise deux appareils d'un même
+foyer et un appareil dont l'adresse IPv6 change. Le foyer d'un flux est
+déterminé, dans l'ordre:
+    1. par les réseaux configurés (CIDR), au préfixe le plus long, grâce à un
+       arbre de préfixes: chacun forme un foyer;
+    2. par les réseaux domestiques appris pour l'utilisateur: le préfixe qui
+       concentre la majorité stricte de ses sessions, au plus un en IPv4 et
+       un en IPv6, forme le foyer « maison »;
+    3. à défaut, par le préfixe de l'adresse (/24 en IPv4, /64 en IPv6 par
+       défaut).
+"""
+
+import ipaddress
+import threading
+
+from utils.constants import Defaults
+
+
+class PrefixTrie:
+    """
+    Arbre binaire de préfixes IP, avec correspondance au préfixe le plus long
+
+    Chaque nœud est une liste [fils 0, fils 1, valeur]: une recherche suit au
+    plus 32 (IPv4) ou 128 (IPv6) nœuds, quel que soit le nombre de préfixes.
+    """
+
+    def __init__(self):
+        self._roots = {4: [None, None, None], 6: [None, None, None]}
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def insert(self, network, value):
+        """Associer une valeur à un réseau ("192.168.1.0/24", "2001:db8::/48"...)"""
+        network = ipaddress.ip_network(network, strict=False)
+        bits = int(network.network_address)
+        width = network.max_prefixlen
+
+        node = self._roots[network.version]
+        for position in range(network.prefixlen):
+            bit = (bits >> (width - 1 - position)) & 1
+            child = node[bit]
+            if child is None:
+                child = node[bit] = [None, None, None]
+            node = child
+
+        if node[2] is None:
+            self._size += 1
+        node[2] = value
+
+    def lookup(self, address):
+        """Valeur du plus long préfixe contenant l'adresse, ou None"""
+        if not isinstance(address, (ipaddress.IPv4Address, ipaddress.IPv6Address)):
+            address = ipaddress.ip_address(address)
+        bits = int(address)
+        width = address.max_prefixlen
+
+        node = self._roots[address.version]
+        best = node[2]
+        for position in range(width):
+            node = node[(bits >> (width - 1 - position)) & 1]
+            if node is None:
+                break
+            if node[2] is not None:
+                best = node[2]
+        return best
+
+
+def parse_address(value):
+    """Adresse IP d'un flux (IPv4 mappée en IPv6 ramenée en IPv4), ou None"""
+    try:
+        address = ipaddress.ip_address(value.split("%")[0])
+    except (ValueError, AttributeError):
+        return None
+    if address.version == 6 and address.ipv4_mapped is not None:
+        return address.ipv4_mapped
+    return address
+
+
+class HouseholdResolver:
+    """
+    Clé de foyer des flux, utilisée à la place de la clé appareil + IP
+
+    Args:
+        networks (iterable): Réseaux CIDR formant chacun un foyer
+        ipv4_prefix (int): Longueur du préfixe de regroupement IPv4
+        ipv6_prefix (int): Longueur du préfixe de regroupement IPv6
+        learn_min_observations (int): Sessions d'un utilisateur (par famille
+            d'adresses) avant d'apprendre son réseau domestique
+        learn_min_share (float): Part des sessions (par famille d'adresses)
+            que le préfixe le plus fréquent doit dépasser pour être considéré
+            comme domestique
+    """
+
+    def __init__(
+        self,
+        networks=(),
+        ipv4_prefix=Defaults.HOUSEHOLD_IPV4_PREFIX,
+        ipv6_prefix=Defaults.HOUSEHOLD_IPV6_PREFIX,
+        learn_min_observations=Defaults.HOUSEHOLD_LEARN_MIN_OBSERVATIONS,
+        learn_min_share=Defaults.HOUSEHOLD_LEARN_MIN_SHARE,
+    ):
+        self.prefixes = {4: ipv4_prefix, 6: ipv6_prefix}
+        self.learn_min_observations = learn_min_observations
+        self.learn_min_share = learn_min_share
+
+        self.networks = PrefixTrie()
+        for network in networks:
+            network = ipaddress.ip_network(network.strip(), strict=False)
+            self.networks.insert(network, f"net:{network}")
+
+        # Groupe (réseau configuré ou préfixe) de chaque adresse déjà vue
+        self._groups = {}
+        # Sessions observées: {user_id: {groupe: nombre}} et totaux par famille
+        self._observations = {}
+        self._totals = {}
+        # Sessions du dernier sondage: une session n'est comptée qu'une fois,
+        # quel que soit le nombre de sondages où elle apparaît
+        self._sessions = set()
+        # Groupes domestiques appris: {user_id: frozenset(groupes)}
+        self._homes = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config):
+        """Construire le résolveur à partir de la configuration"""
+        return cls(
+            networks=getattr(config, "household_networks", ()),
+            ipv4_prefix=getattr(
+                config, "household_ipv4_prefix", Defaults.HOUSEHOLD_IPV4_PREFIX
+            ),
+            ipv6_prefix=getattr(
+                config, "household_ipv6_prefix", Defaults.HOUSEHOLD_IPV6_PREFIX
+            ),
+        )
+
+    def group(self, ip_address):
+        """
+        Groupe réseau d'une adresse: réseau configuré, sinon préfixe
+
+        Returns:
+            tuple: (famille d'adresses, libellé du groupe), ou None si
+            l'adresse n'est pas une IP
+        """
+        group = self._groups.get(ip_address)
+        if group is not None or ip_address in self._groups:
+            return group
+
+        address = parse_address(ip_address)
+        if address is None:
+            group = None
+        else:
+            label = self.networks.lookup(address)
+            if label is None:
+                network = ipaddress.ip_network(
+                    (address, self.prefixes[address.version]), strict=False
+                )
+                label = str(network)
+            group = (address.version, label)
+
+        # Le nombre d'adresses vues reste borné par la taille du cache
+        if len(self._groups) >= Defaults.HOUSEHOLD_CACHE_SIZE:
+            self._groups.clear()
+        self._groups[ip_address] = group
+        return group
+
+    def key(self, user_id, stream):
+        """Clé de foyer d'un flux de l'utilisateur"""
+        group = self.group(stream.ip_address)
+        if group is None:
+            # Adresse inexploitable: revenir à la clé appareil + IP
+            return f"{stream.player_id}_{stream.ip_address}"
+        if group in self._homes.get(user_id, ()):
+            return f"home:{user_id}"
+        return group[1]
+
+    def key_for(self, user_id):
+        """Fonction clé des flux d'un utilisateur"""
+        return lambda stream: self.key(user_id, stream)
+
+    # =====================================================
+    # APPRENTISSAGE DES RÉSEAUX DOMESTIQUES
+    # =====================================================
+
+    def observe(self, user_id, ip_address, count=1):
+        """Compter une (ou plusieurs) sessions d'un utilisateur sur une adresse"""
+        group = self.group(ip_address)
+        if group is None:
+            return
+
+        with self._lock:
+            groups = self._observations.setdefault(user_id, {})
+            groups[group] = groups.get(group, 0) + count
+            totals = self._totals.setdefault(user_id, {4: 0, 6: 0})
+            totals[group[0]] += count
+
+    def observe_streams(self, user_streams):
+        """
+        Compter les nouvelles sessions d'un sondage, puis mettre à jour les
+        foyers appris
+
+        Une session n'est comptée qu'à sa première apparition, comme dans
+        l'historique chargé au démarrage (une ligne par session): un long
+        flux distant ne pèse pas plus lourd que le foyer réel.
+        """
+        sessions = set()
+        observed = set()
+        for user_id, streams in user_streams.items():
+            for stream in streams:
+                sessions.add(stream.session_id)
+                if stream.session_id not in self._sessions:
+                    self.observe(user_id, stream.ip_address)
+                    observed.add(user_id)
+        self._sessions = sessions
+        if observed:
+            self.learn(observed)
+
+    def learn(self, user_ids=None):
+        """Recalculer les réseaux domestiques (de tous les utilisateurs par défaut)"""
+        with self._lock:
+            for user_id in list(self._observations if user_ids is None else user_ids):
+                groups = self._observations.get(user_id)
+                if not groups:
+                    continue
+                totals = self._totals[user_id]
+                # Au plus un groupe par famille: le plus fréquent, s'il dépasse
+                # strictement la part minimale. Deux réseaux à égalité (deux
+                # foyers qui partagent le compte) ne sont jamais confondus.
+                homes = set()
+                for family, total in totals.items():
+                    if total < self.learn_min_observations:
+                        continue
+                    top = max(
+                        (group for group in groups if group[0] == family),
+                        key=groups.get,
+                        default=None,
+                    )
+                    if top is not None and groups[top] > total * self.learn_min_share:
+                        homes.add(top)
+                if homes:
+                    self._homes[user_id] = frozenset(homes)
+                else:
+                    self._homes.pop(user_id, None)
+
+    def homes(self, user_id):
+        """Groupes réseau appris comme domestiques pour un utilisateur"""
+        return sorted(label for _, label in self._homes.get(user_id, ()))
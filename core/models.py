@@ -0,0 +1,52 @@
+from collections import namedtuple
+from utils.constants import Defaults
+
+
+# Flux actif tel que renvoyé par le parsing des sessions Plex. Les dix premiers
+# champs gardent l'ordre historique du tuple: l'accès par index (stream[0],
+# stream[8]...) reste valide. Le débit est exprimé en kb/s (0 si inconnu).
+StreamInfo = namedtuple(
+    "StreamInfo",
+    [
+        "session_id",
+        "ip_address",
+        "player_id",
+        "library_section",
+        "media_title",
+        "platform",
+        "product",
+        "device",
+        "username",
+        "state",
+        "server_id",
+        "transcode",
+        "bandwidth",
+        "quality",
+    ],
+    defaults=[Defaults.SERVER_ID, False, 0, ""],
+)
+
+
+# Serveur Plex surveillé
+PlexServer = namedtuple("PlexServer", ["id", "name", "url", "token"])
+
+
+# Règle de limitation des flux. Les critères à None s'appliquent à toutes les
+# valeurs; la plage horaire est exprimée en minutes depuis minuit et peut
+# passer minuit (start_minute > end_minute).
+PolicyRule = namedtuple(
+    "PolicyRule",
+    [
+        "id",
+        "name",
+        "max_streams",
+        "user_id",
+        "library",
+        "platform",
+        "transcode_only",
+        "start_minute",
+        "end_minute",
+        "enabled",
+    ],
+    defaults=[None, None, None, False, None, None, True],
+)
@@ -0,0 +1,216 @@
+"""
+Rejeu des sondages enregistrés dans la chaîne de surveillance complète
+
+Les réponses de /status/sessions conservées par PollRecorder sont rejouées,
+aussi vite que possible, dans le moteur réel: parsing, écriture en base et
+vérification des limites. Les demandes d'arrêt sont capturées au lieu d'être
+envoyées à Plex. Le délai de grâce et les plages horaires des règles suivent
+l'heure des sondages enregistrés: deux rejeux des mêmes enregistrements sur
+la même base prennent les mêmes décisions.
+"""
+
+import sqlite3
+import time
+from collections import namedtuple
+from dataclasses import fields, is_dataclass, replace
+from datetime import datetime
+from types import SimpleNamespace
+
+from core.engine import MonitoringEngine, _instrumented_termination
+
+
+# Demande d'arrêt capturée pendant le rejeu
+CapturedTermination = namedtuple(
+    "CapturedTermination", ["timestamp", "user_id", "username", "session_id", "message"]
+)
+
+
+def copy_database(source_path, target_path):
+    """Copier une base SQLite (sauvegarde cohérente, même en cours d'utilisation)"""
+    source = sqlite3.connect(source_path)
+    target = sqlite3.connect(target_path)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+
+
+def replay_config(config, server_ids):
+    """
+    Configuration du rejeu: celle fournie, avec les serveurs enregistrés
+
+    L'enregistrement et les métriques sont désactivés, le mode simulation
+    aussi: les arrêts passent par le chemin réel, jusqu'à la requête exclue.
+    """
+    servers = tuple(
+        {"id": server_id, "name": server_id, "url": f"replay://{server_id}", "token": ""}
+        for server_id in server_ids
+    )
+    overrides = {
+        "version": 0,
+        "plex_servers": servers,
+        "recorder_enabled": False,
+        "metrics_enabled": False,
+        "shadow_mode": False,
+    }
+    if is_dataclass(config):
+        names = {field.name for field in fields(config)}
+        return replace(
+            config, **{key: value for key, value in overrides.items() if key in names}
+        )
+    values = dict(vars(config))
+    values.update(overrides)
+    return SimpleNamespace(**values)
+
+
+class ReplayEngine(MonitoringEngine):
+    """
+    Moteur de surveillance alimenté par des réponses enregistrées
+
+    Les réponses en vigueur sont fournies par feed() avant chaque sondage;
+    les arrêts réussissent toujours et sont capturés dans self.terminations,
+    en passant par la même instrumentation que les arrêts réels.
+
+    Args:
+        start (float, optional): Début des enregistrements rejoués: les
+            réseaux domestiques sont appris de l'historique précédant cet
+            instant, et non l'heure du rejeu
+    """
+
+    def __init__(self, db_instance, config, start=None):
+        # Horloge positionnée avant la construction: les foyers en dépendent
+        self._now = time.time() if start is None else start
+        self._responses = {}
+        super().__init__(db_instance=db_instance, config=config)
+        self.terminations = []
+
+        # Notifications jamais envoyées; horloges du délai de grâce et des
+        # agrégats de débit rejouées
+        self.send_telegram = lambda message: False
+        self.enforcement.clock = lambda: self._now
+        self.usage.clock = lambda: self._now
+
+    def feed(self, timestamp, responses):
+        """
+        Positionner l'heure et les réponses du prochain sondage
+
+        Args:
+            timestamp (float): Heure du sondage enregistré
+            responses (dict): {server_id: réponse de /status/sessions}
+        """
+        self._now = timestamp
+        self._responses = responses
+
+    def current_time(self):
+        return datetime.fromtimestamp(self._now)
+
+    def get_active_sessions(self, server=None):
+        server = server or self.get_servers()[0]
+        return self._responses.get(server.id)
+
+    def fetch_all_sessions(self, servers):
+        # Aucune requête réseau: pas de pool de threads
+        return [(server, self.get_active_sessions(server)) for server in servers]
+
+    @_instrumented_termination
+    def stop_stream(self, user_id, username, session_id, state="playing"):
+        return self._capture(user_id, username, session_id, state)
+
+    @_instrumented_termination
+    def stop_stream_with_message(self, user_id, username, session_id, custom_message):
+        return self._capture(user_id, username, session_id, custom_message)
+
+    def _capture(self, user_id, username, session_id, message):
+        self.terminations.append(
+            CapturedTermination(self._now, user_id, username, session_id, message)
+        )
+        self.db.mark_session_terminated(session_id)
+        self.enforcement.mark_terminated(session_id)
+        return True
+
+
+def replay_polls(recorder, start=None, end=None, interval=None):
+    """
+    Sondages à rejouer: réponses en vigueur de chaque serveur à chaque instant
+
+    Args:
+        recorder (PollRecorder): Enregistrements
+        start, end (float, optional): Période (horodatages)
+        interval (float, optional): Sondage toutes les `interval` secondes,
+            comme le moniteur; par défaut, un sondage par réponse enregistrée
+            (en mode « changements seulement », les sondages identiques
+            consécutifs ne sont pas rejoués)
+
+    Yields:
+        tuple: (horodatage, {server_id: réponse})
+    """
+    current = {}
+    records = recorder.iter_records(start, end)
+
+    if not interval:
+        for timestamp, server_id, payload in records:
+            current[server_id] = payload
+            yield timestamp, dict(current)
+        return
+
+    pending = next(records, None)
+    if pending is None:
+        return
+    timestamp = pending[0] if start is None else start
+    while True:
+        while pending is not None and pending[0] <= timestamp:
+            current[pending[1]] = pending[2]
+            pending = next(records, None)
+        if current:
+            yield timestamp, dict(current)
+
+        timestamp += interval
+        if end is not None:
+            if timestamp >= end:
+                break
+        elif pending is None:
+            # Sans fin de période, le rejeu s'arrête après le dernier enregistrement
+            break
+
+
+def run_replay(engine, polls, progress=None):
+    """
+    Rejouer des sondages dans un ReplayEngine
+
+    Args:
+        engine (ReplayEngine): Moteur de rejeu
+        polls (iterable): (horodatage, {server_id: réponse}), cf. replay_polls()
+        progress (callable, optional): progress(nombre de sondages rejoués)
+
+    Returns:
+        dict: Sondages, sessions, durée et débit du rejeu
+    """
+    poll_count = 0
+    session_count = 0
+
+    def count_sessions(user_streams):
+        nonlocal session_count
+        session_count += sum(len(streams) for streams in user_streams.values())
+
+    engine.subscribe("sessions_updated", count_sessions)
+
+    started = time.perf_counter()
+    for timestamp, responses in polls:
+        engine.feed(timestamp, responses)
+        engine.check_sessions()
+        poll_count += 1
+        if progress is not None:
+            progress(poll_count)
+    elapsed = time.perf_counter() - started
+
+    engine.unsubscribe("sessions_updated", count_sessions)
+    engine.notifier.flush(force=True)
+
+    return {
+        "polls": poll_count,
+        "sessions": session_count,
+        "elapsed": elapsed,
+        "polls_per_second": poll_count / elapsed if elapsed else 0.0,
+        "sessions_per_second": session_count / elapsed if elapsed else 0.0,
+    }
@@ -0,0 +1,263 @@
+"""
+Moteur de règles de limitation des flux
+
+Les règles (table policy_rules) sont compilées une seule fois, à chaque
+modification, en index {(bibliothèque, plateforme, transcodage): [règles]},
+l'un pour les règles communes, les autres par utilisateur. L'évaluation d'un
+sondage parcourt ensuite chaque flux une seule fois: les règles candidates
+d'un flux sont obtenues par quelques recherches dans ces index, quel que
+soit le nombre de règles.
+
+Une règle limite, pour chaque utilisateur concerné, le nombre de flux
+correspondant à ses critères (par exemple: deux flux au plus dans la
+bibliothèque "4K", ou aucun transcodage entre 18h et 23h).
+"""
+
+from collections import namedtuple
+from datetime import datetime
+from itertools import product
+
+from core.models import PolicyRule
+
+
+# Règle enfreinte par un utilisateur lors d'un sondage
+Violation = namedtuple("Violation", ["rule", "user_id", "streams"])
+
+
+def stream_key(stream):
+    """Clé d'un flux unique: un même appareil sur une même IP ne compte qu'une fois"""
+    return f"{stream.player_id}_{stream.ip_address}"
+
+
+def termination_cost(stream, started_at=0):
+    """
+    Clé de tri des flux à arrêter, du plus avantageux au moins avantageux
+
+    Un flux en pause est le moins gênant à interrompre; viennent ensuite
+    les flux qui coûtent le plus au serveur (transcodage avant lecture
+    directe, débit le plus élevé), puis les plus récents, dont l'arrêt
+    interrompt le moins de visionnage.
+
+    Args:
+        started_at (float): Instant où la session a été vue pour la première fois
+    """
+    return (
+        stream.state != "paused",
+        not stream.transcode,
+        -stream.bandwidth,
+        -started_at,
+    )
+
+
+def select_excess_streams(streams, max_streams, key=stream_key, started=None):
+    """
+    Choisir juste assez de flux pour revenir sous une limite
+
+    Seuls les flux uniques en trop sont arrêtés, les moins coûteux à
+    interrompre d'abord (cf. termination_cost). Les sessions d'un même flux
+    unique (même clé) sont arrêtées ensemble; un flux unique est classé
+    d'après la plus avantageuse de ses sessions.
+
+    Args:
+        key (callable): Clé des flux uniques (appareil + IP, ou foyer)
+        started (callable, optional): started(stream) retourne l'instant où
+            la session a été vue pour la première fois
+
+    Returns:
+        list: Flux à arrêter (vide si la limite est respectée)
+    """
+    groups = {}
+    for stream in streams:
+        groups.setdefault(key(stream), []).append(stream)
+
+    excess = len(groups) - max_streams
+    if excess <= 0:
+        return []
+
+    def group_cost(group):
+        return min(
+            termination_cost(stream, started(stream) if started else 0)
+            for stream in group
+        )
+
+    return [
+        stream
+        for group in sorted(groups.values(), key=group_cost)[:excess]
+        for stream in group
+    ]
+
+
+def rule_from_row(row):
+    """Construire une PolicyRule à partir d'une ligne de policy_rules"""
+    return PolicyRule(
+        id=row.get("id"),
+        name=row.get("name") or "",
+        max_streams=int(row.get("max_streams") or 0),
+        user_id=row.get("user_id") or None,
+        library=row.get("library") or None,
+        platform=row.get("platform") or None,
+        transcode_only=bool(row.get("transcode_only")),
+        start_minute=row.get("start_minute"),
+        end_minute=row.get("end_minute"),
+        enabled=bool(row.get("enabled", True)),
+    )
+
+
+def is_rule_active(rule, minute):
+    """Indiquer si la plage horaire de la règle contient la minute donnée"""
+    if rule.start_minute is None or rule.end_minute is None:
+        return True
+    if rule.start_minute <= rule.end_minute:
+        return rule.start_minute <= minute < rule.end_minute
+    # Plage qui passe minuit (par exemple 22h -> 6h)
+    return minute >= rule.start_minute or minute < rule.end_minute
+
+
+def rule_matches(rule, stream):
+    """Indiquer si un flux correspond aux critères de la règle (hors utilisateur et horaire)"""
+    return (
+        (rule.library is None or rule.library == stream.library_section)
+        and (rule.platform is None or rule.platform == stream.platform)
+        and (not rule.transcode_only or stream.transcode)
+    )
+
+
+class CompiledPolicy:
+    """
+    Ensemble de règles compilé pour une évaluation en un seul passage
+
+    Les règles communes à tous les utilisateurs sont indexées par critères de
+    flux; celles d'un utilisateur sont rangées à part, sous son identifiant.
+
+    Args:
+        rules (iterable): PolicyRule ou lignes de la table policy_rules
+    """
+
+    def __init__(self, rules=()):
+        self.rules = tuple(
+            rule if isinstance(rule, PolicyRule) else rule_from_row(rule)
+            for rule in rules
+        )
+        # {(bibliothèque, plateforme, transcodage): [(position, règle)]}
+        self._global_index = {}
+        # {user_id: {(bibliothèque, plateforme, transcodage): [(position, règle)]}}
+        self._user_index = {}
+        # Valeurs effectivement utilisées par les règles: un flux dont la
+        # bibliothèque n'apparaît dans aucune règle ne consulte que les
+        # entrées « toutes bibliothèques »
+        self._libraries = set()
+        self._platforms = set()
+
+        for position, rule in enumerate(self.rules):
+            if not rule.enabled:
+                continue
+            index = (
+                self._global_index
+                if rule.user_id is None
+                else self._user_index.setdefault(rule.user_id, {})
+            )
+            key = (rule.library, rule.platform, True if rule.transcode_only else None)
+            index.setdefault(key, []).append((position, rule))
+            self._libraries.add(rule.library)
+            self._platforms.add(rule.platform)
+
+    def __len__(self):
+        return len(self.rules)
+
+    def __bool__(self):
+        return bool(self._global_index or self._user_index)
+
+    def _keys(self, stream):
+        """Clés d'index qui peuvent correspondre au flux"""
+        library = stream.library_section
+        platform = stream.platform
+        return product(
+            (library, None) if library in self._libraries else (None,),
+            (platform, None) if platform in self._platforms else (None,),
+            (True, None) if stream.transcode else (None,),
+        )
+
+    @staticmethod
+    def _lookup(index, keys):
+        return [entry for key in keys for entry in index.get(key, ())]
+
+    def candidates(self, user_id, stream):
+        """Règles dont les critères correspondent au flux (plage horaire non vérifiée)"""
+        keys = list(self._keys(stream))
+        entries = self._lookup(self._global_index, keys)
+        if user_id in self._user_index:
+            entries += self._lookup(self._user_index[user_id], keys)
+        return [rule for _, rule in entries]
+
+    def evaluate(self, user_streams, now=None, key_for=None):
+        """
+        Évaluer les flux d'un sondage
+
+        Le coût est proportionnel au nombre de couples (flux, règle
+        correspondante), indépendamment du nombre total de règles.
+
+        Args:
+            user_streams (dict): {user_id: [StreamInfo, ...]}
+            now (datetime, optional): Heure d'évaluation des plages horaires
+            key_for (callable, optional): key_for(user_id) retourne la fonction
+                clé des flux uniques de l'utilisateur (appareil + IP par défaut)
+
+        Returns:
+            list: Violations, une par règle enfreinte et par utilisateur
+        """
+        if not self:
+            return []
+
+        now = now or datetime.now()
+        minute = now.hour * 60 + now.minute
+
+        # Règles communes actives par critères de flux: les flux d'un sondage
+        # partagent peu de combinaisons, la recherche n'est faite qu'une fois
+        global_rules = {}
+        violations = []
+        for user_id, streams in user_streams.items():
+            user_index = self._user_index.get(user_id)
+            key_of = key_for(user_id) if key_for is not None else stream_key
+            # {position de la règle: {clés des flux uniques}}
+            buckets = {}
+            for stream in streams:
+                signature = (
+                    stream.library_section,
+                    stream.platform,
+                    bool(stream.transcode),
+                )
+                entries = global_rules.get(signature)
+                if entries is None:
+                    entries = global_rules[signature] = [
+                        entry
+                        for entry in self._lookup(self._global_index, self._keys(stream))
+                        if is_rule_active(entry[1], minute)
+                    ]
+                if user_index is not None:
+                    entries = entries + [
+                        entry
+                        for entry in self._lookup(user_index, self._keys(stream))
+                        if is_rule_active(entry[1], minute)
+                    ]
+
+                key = key_of(stream)
+                for position, _ in entries:
+                    keys = buckets.get(position)
+                    if keys is None:
+                        buckets[position] = {key}
+                    else:
+                        keys.add(key)
+
+            # Les flux concernés ne sont rassemblés que pour les règles enfreintes
+            for position, keys in buckets.items():
+                rule = self.rules[position]
+                if len(keys) > rule.max_streams:
+                    violations.append(
+                        Violation(
+                            rule,
+                            user_id,
+                            [stream for stream in streams if rule_matches(rule, stream)],
+                        )
+                    )
+
+        return violations
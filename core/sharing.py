@@ -0,0 +1,296 @@
+"""
+Détection du partage de compte
+
+Chaque nouvelle session est un événement: son adresse est localisée (GeoIP)
+et rattachée à un réseau (préfixe /24 en IPv4, /64 en IPv6). Le détecteur
+garde, par utilisateur, une fenêtre glissante de ces événements et signale:
+    - un déplacement impossible: deux sessions trop éloignées pour le temps
+      qui les sépare (deux flux simultanés à 500 km l'un de l'autre);
+    - un nombre anormal de lieux ou de réseaux distincts sur la fenêtre.
+
+L'état est incrémental: une file des événements et, pour les lieux comme
+pour les réseaux, un compteur par valeur. Un événement coûte O(1) amorti:
+l'ajouter, retirer ceux sortis de la fenêtre, lire la taille des compteurs.
+
+Les adresses privées (réseau local) sont ignorées.
+"""
+
+import ipaddress
+import math
+import threading
+from collections import deque, namedtuple
+
+from core.household import parse_address
+from utils.constants import Defaults
+
+
+# Alerte de partage de compte. location est le lieu de la session qui l'a
+# déclenchée; details décrit l'anomalie.
+SharingAlert = namedtuple(
+    "SharingAlert",
+    ["timestamp", "user_id", "username", "kind", "ip_address", "location", "details"],
+)
+
+ALERT_IMPOSSIBLE_TRAVEL = "impossible_travel"
+ALERT_LOCATIONS = "locations"
+ALERT_NETWORKS = "networks"
+
+# Libellés des types d'alerte (interface et notifications)
+ALERT_LABELS = {
+    ALERT_IMPOSSIBLE_TRAVEL: "Déplacement impossible",
+    ALERT_LOCATIONS: "Lieux multiples",
+    ALERT_NETWORKS: "Réseaux multiples",
+}
+
+EARTH_RADIUS_KM = 6371.0
+
+
+def distance_km(latitude1, longitude1, latitude2, longitude2):
+    """Distance orthodromique entre deux points (formule de haversine)"""
+    phi1 = math.radians(latitude1)
+    phi2 = math.radians(latitude2)
+    delta_phi = phi2 - phi1
+    delta_lambda = math.radians(longitude2 - longitude1)
+    a = (
+        math.sin(delta_phi / 2) ** 2
+        + math.cos(phi1) * math.cos(phi2) * math.sin(delta_lambda / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def location_from_geoip(result):
+    """
+    Lieu exploitable à partir d'un résultat de GeoIPLocator.locate_ip()
+
+    Returns:
+        tuple: (libellé, latitude, longitude), ou None si l'adresse n'a pas
+        été localisée
+    """
+    if not result or (not result.get("latitude") and not result.get("longitude")):
+        return None
+    city = result.get("city")
+    country = result.get("country") or result.get("country_code") or "Inconnu"
+    label = f"{city}, {country}" if city else country
+    return label, result["latitude"], result["longitude"]
+
+
+class _UserWindow:
+    """Fenêtre glissante des sessions d'un utilisateur"""
+
+    __slots__ = ("events", "locations", "networks", "last")
+
+    def __init__(self):
+        # (horodatage, lieu ou None, réseau)
+        self.events = deque()
+        # {valeur: nombre d'événements dans la fenêtre}
+        self.locations = {}
+        self.networks = {}
+        # Dernière session localisée: (horodatage, libellé, latitude, longitude, IP)
+        self.last = None
+
+    @staticmethod
+    def _add(counts, value):
+        counts[value] = counts.get(value, 0) + 1
+
+    @staticmethod
+    def _remove(counts, value):
+        count = counts[value] - 1
+        if count:
+            counts[value] = count
+        else:
+            del counts[value]
+
+    def add(self, timestamp, location, network):
+        self.events.append((timestamp, location, network))
+        if location is not None:
+            self._add(self.locations, location)
+        self._add(self.networks, network)
+
+    def prune(self, cutoff):
+        while self.events and self.events[0][0] < cutoff:
+            _, location, network = self.events.popleft()
+            if location is not None:
+                self._remove(self.locations, location)
+            self._remove(self.networks, network)
+        if self.last is not None and self.last[0] < cutoff:
+            self.last = None
+
+
+class SharingDetector:
+    """
+    Détecteur de partage de compte en flux continu (en mémoire)
+
+    Args:
+        locate (callable): locate(ip) retourne un résultat de
+            GeoIPLocator.locate_ip(), ou None (sans GeoIP, seuls les réseaux
+            sont surveillés)
+        window (float): Durée de la fenêtre glissante (secondes)
+        max_speed (float): Vitesse de déplacement maximale plausible (km/h)
+        min_distance (float): Distance en deçà de laquelle deux lieux ne sont
+            pas comparés (précision de la géolocalisation, km)
+        max_locations (int): Lieux distincts tolérés sur la fenêtre
+        max_networks (int): Réseaux distincts tolérés sur la fenêtre
+        ipv4_prefix, ipv6_prefix (int): Préfixes définissant un réseau
+    """
+
+    def __init__(
+        self,
+        locate=None,
+        window=Defaults.SHARING_WINDOW_HOURS * 3600,
+        max_speed=Defaults.SHARING_MAX_SPEED,
+        min_distance=Defaults.SHARING_MIN_DISTANCE,
+        max_locations=Defaults.SHARING_MAX_LOCATIONS,
+        max_networks=Defaults.SHARING_MAX_NETWORKS,
+        ipv4_prefix=Defaults.HOUSEHOLD_IPV4_PREFIX,
+        ipv6_prefix=Defaults.HOUSEHOLD_IPV6_PREFIX,
+    ):
+        self.locate = locate
+        self.window = window
+        self.max_speed = max_speed
+        self.min_distance = min_distance
+        self.max_locations = max_locations
+        self.max_networks = max_networks
+        self.prefixes = {4: ipv4_prefix, 6: ipv6_prefix}
+
+        self._users = {}
+        # {ip: (réseau, lieu)}: une adresse n'est localisée qu'une fois
+        self._addresses = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config, locate=None):
+        """Construire le détecteur à partir de la configuration"""
+        return cls(
+            locate=locate,
+            window=getattr(
+                config, "sharing_window_hours", Defaults.SHARING_WINDOW_HOURS
+            )
+            * 3600,
+            max_speed=getattr(config, "sharing_max_speed", Defaults.SHARING_MAX_SPEED),
+            max_locations=getattr(
+                config, "sharing_max_locations", Defaults.SHARING_MAX_LOCATIONS
+            ),
+            max_networks=getattr(
+                config, "sharing_max_networks", Defaults.SHARING_MAX_NETWORKS
+            ),
+            ipv4_prefix=getattr(
+                config, "household_ipv4_prefix", Defaults.HOUSEHOLD_IPV4_PREFIX
+            ),
+            ipv6_prefix=getattr(
+                config, "household_ipv6_prefix", Defaults.HOUSEHOLD_IPV6_PREFIX
+            ),
+        )
+
+    def _resolve(self, ip_address):
+        """
+        Réseau et lieu d'une adresse, mis en cache
+
+        Returns:
+            tuple: (réseau, lieu ou None), ou None pour une adresse privée
+            ou invalide
+        """
+        if ip_address in self._addresses:
+            return self._addresses[ip_address]
+
+        address = parse_address(ip_address)
+        if address is None or not address.is_global:
+            resolved = None
+        else:
+            network = str(
+                ipaddress.ip_network(
+                    (address, self.prefixes[address.version]), strict=False
+                )
+            )
+            location = None
+            if self.locate is not None:
+                location = location_from_geoip(self.locate(str(address)))
+            resolved = (network, location)
+
+        # Le nombre d'adresses retenues reste borné
+        if len(self._addresses) >= Defaults.SHARING_CACHE_SIZE:
+            self._addresses.clear()
+        self._addresses[ip_address] = resolved
+        return resolved
+
+    def observe(self, user_id, username, ip_address, timestamp):
+        """
+        Prendre en compte une nouvelle session
+
+        Args:
+            user_id (str): Utilisateur
+            username (str): Nom affiché dans les alertes
+            ip_address (str): Adresse de la session
+            timestamp (float): Instant de la session (horodatage)
+
+        Returns:
+            list: SharingAlert déclenchées par cette session
+        """
+        resolved = self._resolve(ip_address)
+        if resolved is None:
+            return []
+        network, location = resolved
+        label = location[0] if location is not None else None
+
+        alerts = []
+
+        def alert(kind, details):
+            alerts.append(
+                SharingAlert(
+                    timestamp, user_id, username, kind, ip_address, label, details
+                )
+            )
+
+        with self._lock:
+            state = self._users.get(user_id)
+            if state is None:
+                state = self._users[user_id] = _UserWindow()
+            state.prune(timestamp - self.window)
+
+            # Déplacement impossible depuis la dernière session localisée
+            if location is not None:
+                last = state.last
+                if last is not None and last[4] != ip_address:
+                    distance = distance_km(last[2], last[3], location[1], location[2])
+                    if distance >= self.min_distance:
+                        # Deux sessions simultanées: au moins une minute d'écart
+                        elapsed = timestamp - last[0]
+                        speed = distance / (max(elapsed, 60) / 3600)
+                        if speed > self.max_speed:
+                            timing = (
+                                f"en {elapsed / 60:.0f} min ({speed:.0f} km/h)"
+                                if elapsed >= 60
+                                else "simultanément"
+                            )
+                            alert(
+                                ALERT_IMPOSSIBLE_TRAVEL,
+                                f"{last[1]} → {label}: {distance:.0f} km {timing}",
+                            )
+                state.last = (timestamp, label, location[1], location[2], ip_address)
+
+            new_location = label is not None and label not in state.locations
+            new_network = network not in state.networks
+            state.add(timestamp, label, network)
+
+            # Alerte à l'arrivée d'un lieu ou d'un réseau au-delà du seuil
+            if new_location and len(state.locations) > self.max_locations:
+                alert(
+                    ALERT_LOCATIONS,
+                    f"{len(state.locations)} lieux distincts: "
+                    + " ; ".join(sorted(state.locations)),
+                )
+            if new_network and len(state.networks) > self.max_networks:
+                alert(
+                    ALERT_NETWORKS,
+                    f"{len(state.networks)} réseaux distincts: "
+                    + " ; ".join(sorted(state.networks)),
+                )
+
+        return alerts
+
+    def reset(self, user_id=None):
+        """Oublier les sessions d'un utilisateur (de tous par défaut)"""
+        with self._lock:
+            if user_id is None:
+                self._users.clear()
+            else:
+                self._users.pop(user_id, None)
@@ -0,0 +1,330 @@
+"""
+Débit et transcodages des flux
+
+Plex indique pour chaque session son débit (attribut bandwidth de Session,
+en kb/s) et, via TranscodeSession, si le média est transcodé. UsageTracker
+en tient des agrégats glissants par utilisateur, par serveur et au total:
+valeur du dernier sondage, moyenne et pic sur la fenêtre. Chaque série
+garde une somme courante et une file monotone des maxima: un sondage coûte
+un temps proportionnel au nombre de séries, pas à la longueur de la fenêtre.
+
+La capacité de chaque serveur (transcodages simultanés, débit total) est
+vérifiée par select_capacity_streams().
+"""
+
+import threading
+import time
+from collections import deque, namedtuple
+
+from core.rules import termination_cost
+from utils.constants import Defaults
+
+
+# Agrégats d'un utilisateur, d'un serveur ou de l'ensemble des serveurs.
+# Débits en kb/s; moyennes et pics sur la fenêtre glissante.
+Usage = namedtuple(
+    "Usage",
+    [
+        "label",
+        "streams",
+        "transcodes",
+        "bandwidth",
+        "average_bandwidth",
+        "peak_bandwidth",
+        "peak_transcodes",
+    ],
+)
+
+# Agrégats d'un sondage: total, {server_id: Usage}, {user_id: Usage}
+UsageSnapshot = namedtuple("UsageSnapshot", ["total", "servers", "users"])
+
+# Capacité d'un serveur dépassée: flux choisis pour revenir sous la limite,
+# en (user_id, StreamInfo)
+CapacityViolation = namedtuple(
+    "CapacityViolation", ["server_id", "kind", "value", "limit", "streams"]
+)
+
+CAPACITY_TRANSCODES = "transcodes"
+CAPACITY_BANDWIDTH = "bandwidth"
+
+
+def media_quality(video):
+    """
+    Résolution du média lu par une session (« 1080p », « 4K », « SD »)
+
+    Le média sélectionné est retenu s'il est indiqué, le premier sinon.
+
+    Returns:
+        str: Résolution, vide si Plex ne la fournit pas
+    """
+    medias = video.findall("Media")
+    if not medias:
+        return ""
+    media = next(
+        (media for media in medias if media.get("selected") == "1"), medias[0]
+    )
+    resolution = media.get("videoResolution") or ""
+    if resolution.isdigit():
+        return f"{resolution}p"
+    return resolution.upper()
+
+
+def format_bandwidth(kbps):
+    """Débit lisible: kb/s sous 1 Mb/s, Mb/s au-delà"""
+    if kbps < 1000:
+        return f"{kbps} kb/s"
+    return f"{kbps / 1000:.1f} Mb/s"
+
+
+def select_capacity_streams(
+    user_streams, max_transcodes=0, max_bandwidth=0, exempt=frozenset(), started=None
+):
+    """
+    Choisir les flux à arrêter pour ramener chaque serveur sous sa capacité
+
+    Les flux des utilisateurs exemptés comptent dans la charge mais ne sont
+    jamais choisis. Les flux les moins coûteux à interrompre passent en
+    premier (cf. termination_cost). Les transcodages en trop sont choisis
+    avant l'excès de débit, qui tient compte des flux déjà choisis.
+
+    Args:
+        user_streams (dict): {user_id: [StreamInfo, ...]}
+        max_transcodes (int): Transcodages simultanés par serveur (0: illimité)
+        max_bandwidth (int): Débit total par serveur en kb/s (0: illimité)
+        exempt (set): Utilisateurs dont les flux ne sont jamais arrêtés
+        started (callable, optional): started(stream) retourne l'instant où
+            la session a été vue pour la première fois
+
+    Returns:
+        list: CapacityViolation, une par capacité dépassée et par serveur
+    """
+    if not max_transcodes and not max_bandwidth:
+        return []
+
+    servers = {}
+    for user_id, streams in user_streams.items():
+        for stream in streams:
+            servers.setdefault(stream.server_id, []).append((user_id, stream))
+
+    violations = []
+    for server_id, entries in servers.items():
+        candidates = sorted(
+            (entry for entry in entries if entry[0] not in exempt),
+            key=lambda entry: termination_cost(
+                entry[1], started(entry[1]) if started else 0
+            ),
+        )
+        selected = set()
+
+        if max_transcodes:
+            transcodes = sum(1 for _, stream in entries if stream.transcode)
+            if transcodes > max_transcodes:
+                chosen = [
+                    entry for entry in candidates if entry[1].transcode
+                ][: transcodes - max_transcodes]
+                selected.update(stream.session_id for _, stream in chosen)
+                violations.append(
+                    CapacityViolation(
+                        server_id,
+                        CAPACITY_TRANSCODES,
+                        transcodes,
+                        max_transcodes,
+                        chosen,
+                    )
+                )
+
+        if max_bandwidth:
+            total = sum(stream.bandwidth for _, stream in entries)
+            if total > max_bandwidth:
+                remaining = total - sum(
+                    stream.bandwidth
+                    for _, stream in entries
+                    if stream.session_id in selected
+                )
+                # Les transcodages déjà choisis suffisent à revenir sous le débit
+                if remaining <= max_bandwidth:
+                    continue
+                chosen = []
+                for entry in candidates:
+                    if remaining <= max_bandwidth:
+                        break
+                    stream = entry[1]
+                    if stream.session_id in selected or not stream.bandwidth:
+                        continue
+                    chosen.append(entry)
+                    remaining -= stream.bandwidth
+                violations.append(
+                    CapacityViolation(
+                        server_id, CAPACITY_BANDWIDTH, total, max_bandwidth, chosen
+                    )
+                )
+
+    return violations
+
+
+class _Series:
+    """Série glissante: somme courante et file monotone des maxima"""
+
+    __slots__ = ("samples", "total", "peaks")
+
+    def __init__(self):
+        self.samples = deque()
+        self.total = 0
+        # (horodatage, valeur), valeurs strictement décroissantes
+        self.peaks = deque()
+
+    def add(self, timestamp, value):
+        self.samples.append((timestamp, value))
+        self.total += value
+        while self.peaks and self.peaks[-1][1] <= value:
+            self.peaks.pop()
+        self.peaks.append((timestamp, value))
+
+    def prune(self, cutoff):
+        while self.samples and self.samples[0][0] < cutoff:
+            self.total -= self.samples.popleft()[1]
+        while self.peaks and self.peaks[0][0] < cutoff:
+            self.peaks.popleft()
+
+    def average(self):
+        return self.total / len(self.samples) if self.samples else 0
+
+    def peak(self):
+        return self.peaks[0][1] if self.peaks else 0
+
+
+class _Aggregate:
+    """Séries de débit et de transcodages d'un utilisateur ou d'un serveur"""
+
+    __slots__ = ("label", "bandwidth", "transcodes", "current")
+
+    def __init__(self, label):
+        self.label = label
+        self.bandwidth = _Series()
+        self.transcodes = _Series()
+        # (flux, transcodages, débit) au dernier sondage
+        self.current = (0, 0, 0)
+
+    def add(self, timestamp, streams, transcodes, bandwidth):
+        self.current = (streams, transcodes, bandwidth)
+        self.bandwidth.add(timestamp, bandwidth)
+        self.transcodes.add(timestamp, transcodes)
+
+    def prune(self, cutoff):
+        self.bandwidth.prune(cutoff)
+        self.transcodes.prune(cutoff)
+
+    def idle(self):
+        """Aucune activité sur toute la fenêtre"""
+        return not self.bandwidth.peak() and not self.transcodes.peak()
+
+    def usage(self):
+        streams, transcodes, bandwidth = self.current
+        return Usage(
+            self.label,
+            streams,
+            transcodes,
+            bandwidth,
+            int(self.bandwidth.average()),
+            self.bandwidth.peak(),
+            self.transcodes.peak(),
+        )
+
+
+class UsageTracker:
+    """
+    Agrégats glissants du débit et des transcodages (en mémoire)
+
+    Args:
+        window (float): Durée de la fenêtre des moyennes et pics (secondes)
+        clock (callable): Horloge monotone (remplaçable pour le rejeu)
+    """
+
+    def __init__(self, window=Defaults.USAGE_WINDOW, clock=time.monotonic):
+        self.window = window
+        self.clock = clock
+
+        self._total = _Aggregate("")
+        self._servers = {}
+        self._users = {}
+        self._snapshot = UsageSnapshot(self._total.usage(), {}, {})
+        self._lock = threading.Lock()
+
+    def update(self, user_streams, now=None):
+        """
+        Ajouter un sondage aux agrégats
+
+        Les utilisateurs et serveurs sans flux à ce sondage comptent pour
+        zéro; ils sont oubliés après une fenêtre entière sans activité.
+
+        Args:
+            user_streams (dict): {user_id: [StreamInfo, ...]}
+            now (float, optional): Instant du sondage, selon l'horloge
+
+        Returns:
+            UsageSnapshot: Agrégats après ce sondage
+        """
+        now = self.clock() if now is None else now
+
+        # {clé: [flux, transcodages, débit]}
+        users = {}
+        servers = {}
+        labels = {}
+        for user_id, streams in user_streams.items():
+            for stream in streams:
+                for counts, key in ((users, user_id), (servers, stream.server_id)):
+                    entry = counts.get(key)
+                    if entry is None:
+                        entry = counts[key] = [0, 0, 0]
+                    entry[0] += 1
+                    entry[1] += 1 if stream.transcode else 0
+                    entry[2] += stream.bandwidth
+            if streams:
+                labels[user_id] = streams[0].username
+
+        with self._lock:
+            cutoff = now - self.window
+            total = [0, 0, 0]
+            for counts in servers.values():
+                for position in range(3):
+                    total[position] += counts[position]
+            self._total.add(now, *total)
+            self._total.prune(cutoff)
+
+            for aggregates, counts, label_of in (
+                (self._users, users, labels.get),
+                (self._servers, servers, str),
+            ):
+                for key in counts:
+                    if key not in aggregates:
+                        aggregates[key] = _Aggregate(label_of(key))
+                for key in list(aggregates):
+                    aggregate = aggregates[key]
+                    values = counts.get(key)
+                    if values is None:
+                        aggregate.add(now, 0, 0, 0)
+                    else:
+                        aggregate.label = label_of(key) or aggregate.label
+                        aggregate.add(now, *values)
+                    aggregate.prune(cutoff)
+                    if values is None and aggregate.idle():
+                        del aggregates[key]
+
+            self._snapshot = UsageSnapshot(
+                self._total.usage(),
+                {key: aggregate.usage() for key, aggregate in self._servers.items()},
+                {key: aggregate.usage() for key, aggregate in self._users.items()},
+            )
+            return self._snapshot
+
+    def snapshot(self):
+        """Agrégats du dernier sondage"""
+        return self._snapshot
+
+    def reset(self):
+        """Oublier tous les agrégats"""
+        with self._lock:
+            self._total = _Aggregate("")
+            self._servers = {}
+            self._users = {}
+            self._snapshot = UsageSnapshot(self._total.usage(), {}, {})
@@ -1,5 +1,9 @@
 from data.database import PlexPatrolDB
+from data.export import SessionExporter
+from data.recorder import PollRecorder
 
 __all__ = [
     "PlexPatrolDB",
+    "SessionExporter",
+    "PollRecorder",
 ]
@@ -3,19 +3,30 @@ import os
 import logging
 from datetime import datetime, timedelta
 import time
+import threading
 from utils import get_app_path
-from utils.constants import LogMessages, Paths
+from utils.constants import LogMessages, Paths, Defaults
+from utils.metrics import DB_WRITE_DURATION
 
 
 class PlexPatrolDB:
-    def __init__(self):
-        # Créer le dossier data s'il n'existe pas déjà
-        data_dir = os.path.join(get_app_path(), Paths.DATA)
-        if not os.path.exists(data_dir):
-            os.makedirs(data_dir)
+    def __init__(self, db_path=None):
+        if db_path is None:
+            # Créer le dossier data s'il n'existe pas déjà
+            data_dir = os.path.join(get_app_path(), Paths.DATA)
+            if not os.path.exists(data_dir):
+                os.makedirs(data_dir)
 
-        # Utiliser le chemin dans le dossier data
-        self.db_path = os.path.join(data_dir, Paths.DATABASE)
+            # Utiliser le chemin dans le dossier data
+            db_path = os.path.join(data_dir, Paths.DATABASE)
+
+        self.db_path = db_path
+
+        # Utilisateurs en liste blanche, exemptés des limites: tenu en mémoire
+        # et mis à jour avec chaque modification d'utilisateur, pour que la
+        # surveillance les écarte sans accès à la base
+        self._exempt_users = None
+        self._exempt_lock = threading.Lock()
 
         # Initialiser la base de données
         self.initialize_db()
@@ -34,6 +45,13 @@ class PlexPatrolDB:
             self.create_table_sessions(conn)
             self.create_table_config(conn)
             self.create_table_platform_stats(conn)
+            self.create_table_pending_notifications(conn)
+            self.create_table_policy_rules(conn)
+            self.create_table_enforcement_decisions(conn)
+            self.create_table_sharing_alerts(conn)
+
+            # Mettre à niveau les bases créées par une version antérieure
+            self.upgrade_table_sessions(conn)
 
             conn.commit()
             conn.close()
@@ -88,6 +106,29 @@ class PlexPatrolDB:
             """
         )
 
+    def upgrade_table_sessions(self, conn):
+        """Ajoute à la table des sessions les colonnes des versions récentes"""
+        self.ensure_column(
+            conn, "sessions", "server_id", f"TEXT DEFAULT '{Defaults.SERVER_ID}'"
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_sessions_server_start "
+            "ON sessions (server_id, start_time)"
+        )
+        # Débit (kb/s, maximum observé), transcodage et qualité du média
+        self.ensure_column(conn, "sessions", "bandwidth", "INTEGER DEFAULT 0")
+        self.ensure_column(conn, "sessions", "transcode", "INTEGER DEFAULT 0")
+        self.ensure_column(conn, "sessions", "quality", "TEXT")
+
+    def ensure_column(self, conn, table, column, definition):
+        """Ajoute une colonne à une table si elle n'existe pas encore"""
+        cursor = conn.cursor()
+        cursor.execute(f"PRAGMA table_info({table})")
+        existing = {row[1] for row in cursor.fetchall()}
+        if column not in existing:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+            logging.info(f"Colonne {column} ajoutée à la table {table}")
+
     def create_table_config(self, conn):
         """Crée la table de configuration"""
         cursor = conn.cursor()
@@ -119,10 +160,91 @@ class PlexPatrolDB:
             """
         )
 
+    def create_table_pending_notifications(self, conn):
+        """Crée la table des notifications en attente d'envoi"""
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS pending_notifications (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                message TEXT NOT NULL,
+                created_at TEXT
+            )
+            """
+        )
+
+    def create_table_policy_rules(self, conn):
+        """Crée la table des règles de limitation des flux"""
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS policy_rules (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL,
+                max_streams INTEGER NOT NULL,
+                user_id TEXT,
+                library TEXT,
+                platform TEXT,
+                transcode_only INTEGER DEFAULT 0,
+                start_minute INTEGER,
+                end_minute INTEGER,
+                enabled INTEGER DEFAULT 1,
+                updated_at REAL
+            )
+            """
+        )
+
+    def create_table_enforcement_decisions(self, conn):
+        """Crée le journal des décisions d'arrêt (mode réel ou simulation)"""
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS enforcement_decisions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                decided_at TEXT NOT NULL,
+                mode TEXT NOT NULL,
+                user_id TEXT,
+                username TEXT,
+                session_id TEXT,
+                platform TEXT,
+                state TEXT,
+                reason TEXT,
+                executed INTEGER DEFAULT 0
+            )
+            """
+        )
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_enforcement_decisions_time "
+            "ON enforcement_decisions (decided_at, mode)"
+        )
+
+    def create_table_sharing_alerts(self, conn):
+        """Crée la table des alertes de partage de compte"""
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS sharing_alerts (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                detected_at TEXT NOT NULL,
+                user_id TEXT,
+                username TEXT,
+                kind TEXT NOT NULL,
+                ip_address TEXT,
+                location TEXT,
+                details TEXT
+            )
+            """
+        )
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_sharing_alerts_time "
+            "ON sharing_alerts (detected_at)"
+        )
+
     # =====================================================
     # MÉTHODES DE GESTION DES UTILISATEURS
     # =====================================================
 
+    @DB_WRITE_DURATION.time(operation="add_or_update_user")
     def add_or_update_user(
         self,
         user_id,
@@ -209,6 +331,7 @@ class PlexPatrolDB:
 
             conn.commit()
             conn.close()
+            self._set_exempt(user_id, is_whitelisted)
             return True
         except Exception as e:
             logging.error(
@@ -297,6 +420,9 @@ class PlexPatrolDB:
             # Commit et fermeture
             conn.commit()
             conn.close()
+
+            # La suppression se fait par nom: relire les exemptions
+            self.reload_exempt_users()
             return True
         except Exception as e:
             logging.error(f"Erreur lors de la suppression de l'utilisateur: {str(e)}")
@@ -357,6 +483,7 @@ class PlexPatrolDB:
     # MÉTHODES DE GESTION DES SESSIONS
     # =====================================================
 
+    @DB_WRITE_DURATION.time(operation="record_session")
     def record_session(
         self,
         user_id,
@@ -366,8 +493,16 @@ class PlexPatrolDB:
         ip_address,
         media_title,
         library_section,
+        server_id=Defaults.SERVER_ID,
+        bandwidth=0,
+        transcode=False,
+        quality=None,
     ):
-        """Enregistrer une nouvelle session"""
+        """Enregistrer une nouvelle session
+
+        Le débit conservé est le plus élevé observé pendant la session; une
+        session transcodée à un sondage le reste.
+        """
         try:
             conn = sqlite3.connect(self.db_path)
             cursor = conn.cursor()
@@ -396,8 +531,9 @@ class PlexPatrolDB:
                 cursor.execute(
                     """
                     INSERT INTO sessions 
-                    (user_id, session_id, start_time, platform, device, ip_address, media_title, library_section)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                    (user_id, session_id, start_time, platform, device, ip_address, media_title, library_section, server_id,
+                     bandwidth, transcode, quality)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                     """,
                     (
                         user_id,
@@ -408,6 +544,10 @@ class PlexPatrolDB:
                         ip_address,
                         media_title,
                         library_section,
+                        server_id,
+                        bandwidth,
+                        int(bool(transcode)),
+                        quality,
                     ),
                 )
 
@@ -425,7 +565,10 @@ class PlexPatrolDB:
                 cursor.execute(
                     """
                     UPDATE sessions 
-                    SET platform = ?, device = ?, ip_address = ?, media_title = ?, library_section = ?
+                    SET platform = ?, device = ?, ip_address = ?, media_title = ?, library_section = ?,
+                        bandwidth = MAX(COALESCE(bandwidth, 0), ?),
+                        transcode = MAX(COALESCE(transcode, 0), ?),
+                        quality = COALESCE(?, quality)
                     WHERE session_id = ?
                     """,
                     (
@@ -434,6 +577,9 @@ class PlexPatrolDB:
                         ip_address,
                         media_title,
                         library_section,
+                        bandwidth,
+                        int(bool(transcode)),
+                        quality,
                         session_id,
                     ),
                 )
@@ -453,6 +599,7 @@ class PlexPatrolDB:
             logging.error(f"Erreur lors de l'enregistrement de la session: {str(e)}")
             return False
 
+    @DB_WRITE_DURATION.time(operation="mark_session_terminated")
     def mark_session_terminated(self, session_id):
         """Marque une session comme terminée"""
         try:
@@ -496,6 +643,7 @@ class PlexPatrolDB:
             )
             return False
 
+    @DB_WRITE_DURATION.time(operation="cleanup_expired_sessions")
     def cleanup_expired_sessions(self, expiration_minutes=30):
         """
         Nettoie les sessions expirées de la base de données
@@ -537,7 +685,7 @@ class PlexPatrolDB:
             logging.error(f"Erreur lors du nettoyage des sessions expirées: {str(e)}")
             return 0
 
-    def get_sessions_by_time_range(self, start_date, end_date):
+    def get_sessions_by_time_range(self, start_date, end_date, server_id=None):
         """Obtenir l'historique des sessions sur une période personnalisée"""
         try:
             conn = sqlite3.connect(self.db_path)
@@ -556,13 +704,19 @@ class PlexPatrolDB:
                 media_title
             FROM sessions
             WHERE start_time >= ? AND start_time <= ?
-            ORDER BY start_time
             """
 
             # Ajouter l'heure de fin de journée pour la date de fin
             end_date_with_time = end_date + " 23:59:59"
+            params = [start_date, end_date_with_time]
+
+            if server_id:
+                query += " AND server_id = ?"
+                params.append(server_id)
+
+            query += " ORDER BY start_time"
 
-            cursor.execute(query, (start_date, end_date_with_time))
+            cursor.execute(query, params)
             results = [dict(row) for row in cursor.fetchall()]
 
             conn.close()
@@ -574,6 +728,190 @@ class PlexPatrolDB:
             )
             return []
 
+    def _build_session_filters(
+        self,
+        start_date=None,
+        end_date=None,
+        user_id=None,
+        library_section=None,
+        server_id=None,
+    ):
+        """Construire la clause WHERE commune aux requêtes d'historique
+
+        Args:
+            start_date (str, optional): Date de début au format YYYY-MM-DD
+            end_date (str, optional): Date de fin au format YYYY-MM-DD (incluse)
+            user_id (str, optional): Limiter à un utilisateur
+            library_section (str, optional): Limiter à une bibliothèque
+            server_id (str, optional): Limiter à un serveur Plex
+
+        Returns:
+            tuple: (clause WHERE, paramètres)
+        """
+        conditions = []
+        params = []
+
+        if start_date:
+            conditions.append("s.start_time >= ?")
+            params.append(start_date)
+        if end_date:
+            # start_time est au format isoformat() (séparateur "T"): la borne
+            # doit l'utiliser aussi pour inclure toute la journée de fin
+            conditions.append("s.start_time <= ?")
+            params.append(end_date + "T23:59:59.999999")
+        if user_id:
+            conditions.append("s.user_id = ?")
+            params.append(user_id)
+        if library_section:
+            conditions.append("s.library_section = ?")
+            params.append(library_section)
+        if server_id:
+            conditions.append("s.server_id = ?")
+            params.append(server_id)
+
+        where = " WHERE " + " AND ".join(conditions) if conditions else ""
+        return where, params
+
+    def count_sessions(
+        self,
+        start_date=None,
+        end_date=None,
+        user_id=None,
+        library_section=None,
+        server_id=None,
+    ):
+        """Compter les sessions correspondant aux filtres d'historique"""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+
+            where, params = self._build_session_filters(
+                start_date, end_date, user_id, library_section, server_id
+            )
+            cursor.execute(f"SELECT COUNT(*) FROM sessions s{where}", params)
+            count = cursor.fetchone()[0]
+
+            conn.close()
+            return count
+        except Exception as e:
+            logging.error(f"Erreur lors du comptage des sessions: {str(e)}")
+            return 0
+
+    def iter_sessions(
+        self,
+        start_date=None,
+        end_date=None,
+        user_id=None,
+        library_section=None,
+        server_id=None,
+        chunk_size=Defaults.EXPORT_CHUNK_SIZE,
+    ):
+        """Parcourir l'historique des sessions par lots, sans tout charger en mémoire
+
+        Les lignes sont lues depuis le curseur par paquets de ``chunk_size``;
+        la connexion reste ouverte tant que le générateur n'est pas épuisé
+        ou fermé.
+
+        Yields:
+            dict: Une session, avec le nom de l'utilisateur
+        """
+        where, params = self._build_session_filters(
+            start_date, end_date, user_id, library_section, server_id
+        )
+        query = f"""
+        SELECT
+            s.server_id,
+            s.session_id,
+            s.user_id,
+            u.username,
+            s.start_time,
+            s.end_time,
+            s.platform,
+            s.device,
+            s.ip_address,
+            s.library_section,
+            s.media_title,
+            s.was_terminated
+        FROM sessions s
+        LEFT JOIN plex_users u ON s.user_id = u.id
+        {where}
+        ORDER BY s.start_time
+        """
+
+        conn = sqlite3.connect(self.db_path)
+        try:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield dict(row)
+        finally:
+            conn.close()
+
+    def get_user_ip_counts(self, days=Defaults.HOUSEHOLD_HISTORY_DAYS, now=None):
+        """
+        Nombre de sessions par utilisateur et par adresse IP sur une période
+
+        Args:
+            days (int): Durée de la période, en jours
+            now (datetime, optional): Fin de la période (exclue), maintenant
+                par défaut
+
+        Returns:
+            list: Tuples (user_id, ip_address, nombre de sessions)
+        """
+        now = now or datetime.now()
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT user_id, ip_address, COUNT(*)
+                FROM sessions
+                WHERE start_time >= ? AND start_time < ?
+                    AND ip_address IS NOT NULL
+                GROUP BY user_id, ip_address
+                """,
+                ((now - timedelta(days=days)).isoformat(), now.isoformat()),
+            )
+            rows = cursor.fetchall()
+            conn.close()
+            return rows
+        except Exception as e:
+            logging.error(
+                f"Erreur lors de la lecture des adresses IP des utilisateurs: {str(e)}"
+            )
+            return []
+
+    def get_library_sections(self):
+        """Obtenir la liste des bibliothèques présentes dans l'historique"""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+
+            cursor.execute(
+                """
+                SELECT DISTINCT library_section
+                FROM sessions
+                WHERE library_section IS NOT NULL AND library_section != ''
+                ORDER BY library_section
+                """
+            )
+            results = [row[0] for row in cursor.fetchall()]
+
+            conn.close()
+            return results
+        except Exception as e:
+            logging.error(
+                f"Erreur lors de la récupération des bibliothèques: {str(e)}"
+            )
+            return []
+
     def get_session_info(self, session_id):
         """Récupère les informations d'une session"""
         try:
@@ -642,7 +980,7 @@ class PlexPatrolDB:
             )
             return 0
 
-    def get_content_stats(self):
+    def get_content_stats(self, server_id=None):
         """Obtenir les statistiques sur les types de contenu consommés"""
         try:
             conn = sqlite3.connect(self.db_path)
@@ -655,11 +993,16 @@ class PlexPatrolDB:
                 COUNT(*) as count,
                 SUM(CASE WHEN was_terminated = 1 THEN 1 ELSE 0 END) as terminated_count
             FROM sessions
-            GROUP BY library_section
-            ORDER BY count DESC
             """
+            params = []
 
-            cursor.execute(query)
+            if server_id:
+                query += " WHERE server_id = ?"
+                params.append(server_id)
+
+            query += " GROUP BY library_section ORDER BY count DESC"
+
+            cursor.execute(query, params)
             results = [dict(row) for row in cursor.fetchall()]
 
             conn.close()
@@ -671,7 +1014,7 @@ class PlexPatrolDB:
             )
             return []
 
-    def get_sessions_by_time(self, days=7):
+    def get_sessions_by_time(self, days=7, server_id=None):
         """Obtenir l'historique des sessions sur une période donnée"""
         try:
             conn = sqlite3.connect(self.db_path)
@@ -690,10 +1033,16 @@ class PlexPatrolDB:
                 media_title
             FROM sessions
             WHERE start_time >= datetime('now', '-' || ? || ' days')
-            ORDER BY start_time
             """
+            params = [days]
 
-            cursor.execute(query, (days,))
+            if server_id:
+                query += " AND server_id = ?"
+                params.append(server_id)
+
+            query += " ORDER BY start_time"
+
+            cursor.execute(query, params)
             results = [dict(row) for row in cursor.fetchall()]
 
             conn.close()
@@ -705,13 +1054,16 @@ class PlexPatrolDB:
             )
             return []
 
-    def get_ip_stats(self, days=None, start_date=None, end_date=None):
+    def get_ip_stats(
+        self, days=None, start_date=None, end_date=None, server_id=None
+    ):
         """Obtenir les statistiques des adresses IP
 
         Args:
             days (int, optional): Nombre de jours à prendre en compte. Par défaut None.
             start_date (str, optional): Date de début au format YYYY-MM-DD. Par défaut None.
             end_date (str, optional): Date de fin au format YYYY-MM-DD. Par défaut None.
+            server_id (str, optional): Limiter à un serveur Plex. Par défaut None.
         """
         try:
             conn = sqlite3.connect(self.db_path)
@@ -726,17 +1078,25 @@ class PlexPatrolDB:
             FROM sessions
             """
 
-            # Ajouter la condition de période si spécifiée
+            # Ajouter les conditions de période et de serveur si spécifiées
+            conditions = []
             params = []
             if days is not None:
-                query += " WHERE start_time >= datetime('now', '-' || ? || ' days')"
+                conditions.append("start_time >= datetime('now', '-' || ? || ' days')")
                 params.append(days)
             elif start_date and end_date:
-                query += " WHERE start_time BETWEEN ? AND ?"
+                conditions.append("start_time BETWEEN ? AND ?")
                 # Ajouter l'heure de fin de journée pour la date de fin
                 end_date_with_time = end_date + " 23:59:59"
                 params.extend([start_date, end_date_with_time])
 
+            if server_id:
+                conditions.append("server_id = ?")
+                params.append(server_id)
+
+            if conditions:
+                query += " WHERE " + " AND ".join(conditions)
+
             # Grouper et trier
             query += " GROUP BY ip_address ORDER BY count DESC"
 
@@ -755,13 +1115,16 @@ class PlexPatrolDB:
             )
             return []
 
-    def get_device_stats(self, days=None, start_date=None, end_date=None):
+    def get_device_stats(
+        self, days=None, start_date=None, end_date=None, server_id=None
+    ):
         """Obtenir les statistiques des appareils utilisés
 
         Args:
             days (int, optional): Nombre de jours à prendre en compte. Par défaut None.
             start_date (str, optional): Date de début au format YYYY-MM-DD. Par défaut None.
             end_date (str, optional): Date de fin au format YYYY-MM-DD. Par défaut None.
+            server_id (str, optional): Limiter à un serveur Plex. Par défaut None.
         """
         try:
             conn = sqlite3.connect(self.db_path)
@@ -776,17 +1139,25 @@ class PlexPatrolDB:
             FROM sessions
             """
 
-            # Ajouter la condition de période si spécifiée
+            # Ajouter les conditions de période et de serveur si spécifiées
+            conditions = []
             params = []
             if days is not None:
-                query += " WHERE start_time >= datetime('now', '-' || ? || ' days')"
+                conditions.append("start_time >= datetime('now', '-' || ? || ' days')")
                 params.append(days)
             elif start_date and end_date:
-                query += " WHERE start_time BETWEEN ? AND ?"
+                conditions.append("start_time BETWEEN ? AND ?")
                 # Ajouter l'heure de fin de journée pour la date de fin
                 end_date_with_time = end_date + " 23:59:59"
                 params.extend([start_date, end_date_with_time])
 
+            if server_id:
+                conditions.append("server_id = ?")
+                params.append(server_id)
+
+            if conditions:
+                query += " WHERE " + " AND ".join(conditions)
+
             # Grouper et trier
             query += " GROUP BY device ORDER BY session_count DESC"
 
@@ -806,10 +1177,89 @@ class PlexPatrolDB:
             )
             return []
 
+    def get_bandwidth_stats(
+        self, days=None, start_date=None, end_date=None, server_id=None
+    ):
+        """Obtenir les statistiques de débit et de transcodage par utilisateur
+
+        Args:
+            days (int, optional): Nombre de jours à prendre en compte. Par défaut None.
+            start_date (str, optional): Date de début au format YYYY-MM-DD. Par défaut None.
+            end_date (str, optional): Date de fin au format YYYY-MM-DD. Par défaut None.
+            server_id (str, optional): Limiter à un serveur Plex. Par défaut None.
+
+        Returns:
+            list: Dictionnaires (username, sessions, transcodes, débit moyen et
+            maximal en kb/s), par débit moyen décroissant
+        """
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+
+            # Base de la requête: seules les sessions dont le débit est connu
+            # entrent dans les moyennes
+            query = """
+            SELECT 
+                COALESCE(u.username, s.user_id) as username,
+                COUNT(*) as session_count,
+                SUM(CASE WHEN s.transcode = 1 THEN 1 ELSE 0 END) as transcode_count,
+                AVG(NULLIF(s.bandwidth, 0)) as avg_bandwidth,
+                MAX(s.bandwidth) as max_bandwidth
+            FROM sessions s
+            LEFT JOIN plex_users u ON u.id = s.user_id
+            """
+
+            # Ajouter les conditions de période et de serveur si spécifiées
+            conditions = []
+            params = []
+            if days is not None:
+                conditions.append(
+                    "s.start_time >= datetime('now', '-' || ? || ' days')"
+                )
+                params.append(days)
+            elif start_date and end_date:
+                conditions.append("s.start_time BETWEEN ? AND ?")
+                # Ajouter l'heure de fin de journée pour la date de fin
+                end_date_with_time = end_date + " 23:59:59"
+                params.extend([start_date, end_date_with_time])
+
+            if server_id:
+                conditions.append("s.server_id = ?")
+                params.append(server_id)
+
+            if conditions:
+                query += " WHERE " + " AND ".join(conditions)
+
+            # Grouper et trier
+            query += " GROUP BY s.user_id ORDER BY avg_bandwidth DESC"
+
+            cursor.execute(query, params)
+
+            results = []
+            for row in cursor.fetchall():
+                results.append(
+                    {
+                        "username": row[0],
+                        "count": row[1],
+                        "transcode_count": row[2] or 0,
+                        "avg_bandwidth": int(row[3] or 0),
+                        "max_bandwidth": row[4] or 0,
+                    }
+                )
+
+            conn.close()
+            return results
+        except Exception as e:
+            logging.error(
+                f"Erreur lors de la récupération des statistiques de débit: {str(e)}"
+            )
+            return []
+
     # =====================================================
     # MÉTHODES DE GESTION DES STATISTIQUES
     # =====================================================
 
+    @DB_WRITE_DURATION.time(operation="record_stream_termination")
     def record_stream_termination(self, user_id, username, platform):
         """Enregistre la terminaison d'un flux et met à jour les statistiques"""
         try:
@@ -855,7 +1305,9 @@ class PlexPatrolDB:
             )
             return False
 
-    def get_user_stats(self, user_id=None, days=None, start_date=None, end_date=None):
+    def get_user_stats(
+        self, user_id=None, days=None, start_date=None, end_date=None, server_id=None
+    ):
         """Obtenir les statistiques d'utilisation
 
         Args:
@@ -863,6 +1315,7 @@ class PlexPatrolDB:
             days (int, optional): Nombre de jours à prendre en compte. Par défaut None.
             start_date (str, optional): Date de début au format YYYY-MM-DD. Par défaut None.
             end_date (str, optional): Date de fin au format YYYY-MM-DD. Par défaut None.
+            server_id (str, optional): Limiter à un serveur Plex. Par défaut None.
 
         Returns:
             dict: Dictionnaire des statistiques utilisateurs, avec le nom d'utilisateur comme clé
@@ -900,6 +1353,11 @@ class PlexPatrolDB:
                 end_date_with_time = end_date + " 23:59:59"
                 params.extend([start_date, end_date_with_time])
 
+            # Condition de serveur
+            if server_id:
+                conditions.append("s.server_id = ?")
+                params.append(server_id)
+
             # Condition d'utilisateur spécifique
             if user_id:
                 conditions.append("u.id = ?")
@@ -946,6 +1404,10 @@ class PlexPatrolDB:
                     platform_query += " AND start_time BETWEEN ? AND ?"
                     platform_params.extend([start_date, end_date_with_time])
 
+                if server_id:
+                    platform_query += " AND server_id = ?"
+                    platform_params.append(server_id)
+
                 platform_query += " GROUP BY platform ORDER BY count DESC"
 
                 cursor.execute(platform_query, platform_params)
@@ -1007,6 +1469,7 @@ class PlexPatrolDB:
 
             conn.commit()
             conn.close()
+            self._set_exempt(user_id, whitelist_value)
             return True
         except Exception as e:
             logging.error(
@@ -1014,6 +1477,46 @@ class PlexPatrolDB:
             )
             return False
 
+    @property
+    def exempt_users(self):
+        """Identifiants des utilisateurs exemptés des limites (ensemble figé)"""
+        exempt = self._exempt_users
+        if exempt is None:
+            exempt = self.reload_exempt_users()
+        return exempt
+
+    def reload_exempt_users(self):
+        """
+        Relire la liste blanche depuis la base
+
+        Nécessaire seulement pour prendre en compte les modifications faites
+        par un autre processus: celles de cette instance tiennent l'ensemble à jour.
+        """
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            cursor.execute("SELECT id FROM plex_users WHERE is_whitelisted = 1")
+            exempt = frozenset(str(row[0]) for row in cursor.fetchall())
+            conn.close()
+        except Exception as e:
+            logging.error(f"Erreur lors de la lecture de la liste blanche: {str(e)}")
+            exempt = self._exempt_users or frozenset()
+
+        with self._exempt_lock:
+            self._exempt_users = exempt
+        return exempt
+
+    def _set_exempt(self, user_id, is_whitelisted):
+        """Reporter un changement de liste blanche dans l'ensemble en mémoire"""
+        with self._exempt_lock:
+            # Tant que l'ensemble n'a pas été lu, il le sera depuis la base
+            if self._exempt_users is None:
+                return
+            if is_whitelisted:
+                self._exempt_users = self._exempt_users | {str(user_id)}
+            else:
+                self._exempt_users = self._exempt_users - {str(user_id)}
+
     def is_user_disabled(self, user_id):
         """Vérifie si un utilisateur est désactivé"""
         try:
@@ -1053,6 +1556,348 @@ class PlexPatrolDB:
             )
             return False
 
+    # =====================================================
+    # MÉTHODES DES NOTIFICATIONS EN ATTENTE
+    # =====================================================
+
+    @DB_WRITE_DURATION.time(operation="add_pending_notification")
+    def add_pending_notification(self, message):
+        """
+        Conserver une notification jusqu'à sa livraison
+
+        Returns:
+            int: Identifiant de la notification, ou None en cas d'erreur
+        """
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            cursor.execute(
+                "INSERT INTO pending_notifications (message, created_at) VALUES (?, ?)",
+                (message, datetime.now().isoformat()),
+            )
+            notification_id = cursor.lastrowid
+            conn.commit()
+            conn.close()
+            return notification_id
+        except Exception as e:
+            logging.error(
+                f"Erreur lors de l'enregistrement d'une notification en attente: {str(e)}"
+            )
+            return None
+
+    @DB_WRITE_DURATION.time(operation="delete_pending_notification")
+    def delete_pending_notification(self, notification_id):
+        """Retirer une notification livrée (ou abandonnée)"""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            cursor.execute(
+                "DELETE FROM pending_notifications WHERE id = ?", (notification_id,)
+            )
+            conn.commit()
+            conn.close()
+            return True
+        except Exception as e:
+            logging.error(
+                f"Erreur lors de la suppression d'une notification en attente: {str(e)}"
+            )
+            return False
+
+    def get_pending_notifications(self):
+        """
+        Récupérer les notifications non livrées, de la plus ancienne à la plus récente
+
+        Returns:
+            list: Tuples (id, message)
+        """
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            cursor.execute("SELECT id, message FROM pending_notifications ORDER BY id")
+            rows = cursor.fetchall()
+            conn.close()
+            return rows
+        except Exception as e:
+            logging.error(
+                f"Erreur lors de la lecture des notifications en attente: {str(e)}"
+            )
+            return []
+
+    # =====================================================
+    # MÉTHODES DES RÈGLES DE LIMITATION
+    # =====================================================
+
+    POLICY_RULE_COLUMNS = (
+        "name",
+        "max_streams",
+        "user_id",
+        "library",
+        "platform",
+        "transcode_only",
+        "start_minute",
+        "end_minute",
+        "enabled",
+    )
+
+    def get_policy_rules(self):
+        """
+        Récupérer toutes les règles de limitation
+
+        Returns:
+            list: Dictionnaires des colonnes de policy_rules, par identifiant
+        """
+        try:
+            conn = sqlite3.connect(self.db_path)
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            cursor.execute("SELECT * FROM policy_rules ORDER BY id")
+            rules = [dict(row) for row in cursor.fetchall()]
+            conn.close()
+            return rules
+        except Exception as e:
+            logging.error(f"Erreur lors de la lecture des règles: {str(e)}")
+            return []
+
+    def get_policy_rules_signature(self):
+        """
+        Signature de la table des règles, qui change à chaque modification
+
+        Permet au moniteur de ne recompiler les règles que lorsqu'elles ont
+        changé, y compris depuis un autre processus.
+        """
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT COUNT(*), MAX(id), MAX(updated_at) FROM policy_rules"
+            )
+            signature = cursor.fetchone()
+            conn.close()
+            return signature
+        except Exception as e:
+            logging.error(f"Erreur lors de la lecture des règles: {str(e)}")
+            return None
+
+    @DB_WRITE_DURATION.time(operation="save_policy_rule")
+    def save_policy_rule(self, rule, rule_id=None):
+        """
+        Créer ou mettre à jour une règle de limitation
+
+        Args:
+            rule (dict): Valeurs des colonnes de POLICY_RULE_COLUMNS
+            rule_id (int, optional): Règle à mettre à jour (création si None)
+
+        Returns:
+            int: Identifiant de la règle, ou None en cas d'erreur
+        """
+        values = [rule.get(column) for column in self.POLICY_RULE_COLUMNS]
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            if rule_id is None:
+                cursor.execute(
+                    f"""
+                    INSERT INTO policy_rules ({", ".join(self.POLICY_RULE_COLUMNS)}, updated_at)
+                    VALUES ({", ".join("?" * len(values))}, ?)
+                    """,
+                    values + [time.time()],
+                )
+                rule_id = cursor.lastrowid
+            else:
+                assignments = ", ".join(
+                    f"{column} = ?" for column in self.POLICY_RULE_COLUMNS
+                )
+                cursor.execute(
+                    f"UPDATE policy_rules SET {assignments}, updated_at = ? WHERE id = ?",
+                    values + [time.time(), rule_id],
+                )
+            conn.commit()
+            conn.close()
+            return rule_id
+        except Exception as e:
+            logging.error(f"Erreur lors de l'enregistrement d'une règle: {str(e)}")
+            return None
+
+    @DB_WRITE_DURATION.time(operation="delete_policy_rule")
+    def delete_policy_rule(self, rule_id):
+        """Supprimer une règle de limitation"""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM policy_rules WHERE id = ?", (rule_id,))
+            conn.commit()
+            conn.close()
+            return True
+        except Exception as e:
+            logging.error(f"Erreur lors de la suppression d'une règle: {str(e)}")
+            return False
+
+    # =====================================================
+    # MÉTHODES DU JOURNAL DES DÉCISIONS D'ARRÊT
+    # =====================================================
+
+    DECISION_MODE_LIVE = "live"
+    DECISION_MODE_SHADOW = "shadow"
+
+    @DB_WRITE_DURATION.time(operation="record_enforcement_decisions")
+    def record_enforcement_decisions(self, decisions):
+        """
+        Enregistrer les décisions d'arrêt d'un passage de vérification
+
+        Args:
+            decisions (list): Tuples (mode, user_id, username, session_id,
+                platform, state, reason, executed)
+
+        Returns:
+            bool: True si les décisions ont été enregistrées
+        """
+        if not decisions:
+            return True
+        decided_at = datetime.now().isoformat()
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            cursor.executemany(
+                """
+                INSERT INTO enforcement_decisions (
+                    decided_at, mode, user_id, username, session_id,
+                    platform, state, reason, executed
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                [(decided_at,) + tuple(decision) for decision in decisions],
+            )
+            conn.commit()
+            conn.close()
+            return True
+        except Exception as e:
+            logging.error(
+                f"Erreur lors de l'enregistrement des décisions d'arrêt: {str(e)}"
+            )
+            return False
+
+    def get_enforcement_report(self, start_date, end_date):
+        """
+        Agréger les décisions d'arrêt d'une période, par mode et par utilisateur
+
+        L'agrégation est faite par SQLite sur l'index (decided_at, mode): le
+        rapport reste rapide quelle que soit la taille du journal.
+
+        Args:
+            start_date (datetime): Début de la période
+            end_date (datetime): Fin de la période (exclue)
+
+        Returns:
+            list: Dictionnaires (mode, user_id, username, decisions, sessions,
+            executed), triés par utilisateur
+        """
+        try:
+            conn = sqlite3.connect(self.db_path)
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT
+                    mode,
+                    user_id,
+                    MAX(username) AS username,
+                    COUNT(*) AS decisions,
+                    COUNT(DISTINCT session_id) AS sessions,
+                    SUM(executed) AS executed
+                FROM enforcement_decisions
+                WHERE decided_at >= ? AND decided_at < ?
+                GROUP BY mode, user_id
+                ORDER BY username, mode
+                """,
+                (start_date.isoformat(), end_date.isoformat()),
+            )
+            rows = [dict(row) for row in cursor.fetchall()]
+            conn.close()
+            return rows
+        except Exception as e:
+            logging.error(
+                f"Erreur lors de la lecture des décisions d'arrêt: {str(e)}"
+            )
+            return []
+
+    def record_sharing_alerts(self, alerts):
+        """
+        Enregistrer des alertes de partage de compte
+
+        Args:
+            alerts (list): SharingAlert (horodatage, user_id, username, type,
+                IP, lieu, détails)
+
+        Returns:
+            bool: True si les alertes ont été enregistrées
+        """
+        if not alerts:
+            return True
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            cursor.executemany(
+                """
+                INSERT INTO sharing_alerts (
+                    detected_at, user_id, username, kind, ip_address, location, details
+                ) VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                [
+                    (datetime.fromtimestamp(alert[0]).isoformat(),) + tuple(alert[1:])
+                    for alert in alerts
+                ],
+            )
+            conn.commit()
+            conn.close()
+            return True
+        except Exception as e:
+            logging.error(
+                f"Erreur lors de l'enregistrement des alertes de partage: {str(e)}"
+            )
+            return False
+
+    def get_sharing_alerts(self, days=None, start_date=None, end_date=None):
+        """Obtenir les alertes de partage de compte, les plus récentes d'abord
+
+        Args:
+            days (int, optional): Nombre de jours à prendre en compte. Par défaut None.
+            start_date (str, optional): Date de début au format YYYY-MM-DD. Par défaut None.
+            end_date (str, optional): Date de fin au format YYYY-MM-DD. Par défaut None.
+
+        Returns:
+            list: Dictionnaires (detected_at, user_id, username, kind,
+            ip_address, location, details)
+        """
+        try:
+            conn = sqlite3.connect(self.db_path)
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+
+            query = """
+            SELECT detected_at, user_id, username, kind, ip_address, location, details
+            FROM sharing_alerts
+            """
+
+            # Les dates sont enregistrées en heure locale (isoformat)
+            params = []
+            if days is not None:
+                query += " WHERE detected_at >= ?"
+                params.append((datetime.now() - timedelta(days=days)).isoformat())
+            elif start_date and end_date:
+                query += " WHERE detected_at BETWEEN ? AND ?"
+                params.extend([start_date, end_date + "T23:59:59.999999"])
+
+            query += " ORDER BY detected_at DESC"
+
+            cursor.execute(query, params)
+            rows = [dict(row) for row in cursor.fetchall()]
+            conn.close()
+            return rows
+        except Exception as e:
+            logging.error(
+                f"Erreur lors de la lecture des alertes de partage: {str(e)}"
+            )
+            return []
+
     def close(self):
         """Ferme proprement toutes les connexions à la base de données"""
         try:
@@ -0,0 +1,129 @@
+import csv
+import gzip
+import json
+import logging
+import os
+
+
+class SessionExporter:
+    """Export de l'historique des sessions en flux continu (CSV ou JSON Lines)"""
+
+    # Colonnes exportées, dans l'ordre
+    FIELDS = [
+        "server_id",
+        "session_id",
+        "user_id",
+        "username",
+        "start_time",
+        "end_time",
+        "platform",
+        "device",
+        "ip_address",
+        "library_section",
+        "media_title",
+        "was_terminated",
+    ]
+
+    FORMAT_CSV = "csv"
+    FORMAT_JSONL = "jsonl"
+    FORMATS = (FORMAT_CSV, FORMAT_JSONL)
+
+    # Fréquence des notifications de progression (en lignes)
+    PROGRESS_STEP = 500
+
+    def __init__(self, db):
+        self.db = db
+
+    @classmethod
+    def file_extension(cls, fmt, compress=False):
+        """Retourner l'extension de fichier associée à un format"""
+        extension = f".{fmt}"
+        if compress:
+            extension += ".gz"
+        return extension
+
+    def export(
+        self,
+        filepath,
+        fmt=FORMAT_CSV,
+        compress=False,
+        progress_callback=None,
+        should_cancel=None,
+        **filters,
+    ):
+        """
+        Écrire les sessions filtrées dans un fichier, ligne par ligne
+
+        La mémoire utilisée reste constante quelle que soit la taille de
+        l'historique: les lignes sont lues par lots depuis la base et écrites
+        immédiatement.
+
+        Le fichier de destination n'est créé (ou remplacé) qu'à la fin d'un
+        export complet.
+
+        Args:
+            filepath (str): Chemin du fichier de destination
+            fmt (str): "csv" ou "jsonl"
+            compress (bool): Si True, compresser la sortie en gzip
+            progress_callback (callable, optional): Appelé avec (lignes écrites, total)
+            should_cancel (callable, optional): Retourne True pour interrompre l'export
+            **filters: start_date, end_date, user_id, library_section, server_id
+
+        Returns:
+            int: Nombre de sessions écrites, ou None si l'export a été annulé
+        """
+        if fmt not in self.FORMATS:
+            raise ValueError(f"Format d'export inconnu: {fmt}")
+
+        total = self.db.count_sessions(**filters)
+        written = 0
+
+        # Écriture dans un fichier temporaire, renommé une fois l'export
+        # terminé: une annulation ou une erreur ne laisse pas de fichier tronqué
+        temp_path = filepath + ".part"
+        opener = gzip.open if compress else open
+        try:
+            # newline="" est requis par le module csv pour gérer lui-même les fins de ligne
+            with opener(temp_path, "wt", encoding="utf-8", newline="") as f:
+                write_row = self._row_writer(f, fmt)
+
+                rows = self.db.iter_sessions(**filters)
+                try:
+                    for row in rows:
+                        write_row(row)
+                        written += 1
+
+                        if written % self.PROGRESS_STEP == 0:
+                            if should_cancel and should_cancel():
+                                logging.info(
+                                    f"Export de l'historique annulé après {written} sessions"
+                                )
+                                return None
+                            if progress_callback:
+                                progress_callback(written, total)
+                finally:
+                    rows.close()
+            os.replace(temp_path, filepath)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+        if progress_callback:
+            progress_callback(written, max(total, written))
+
+        logging.info(f"{written} sessions exportées dans {filepath}")
+        return written
+
+    def _row_writer(self, f, fmt):
+        """Préparer la fonction d'écriture d'une ligne pour le format demandé"""
+        if fmt == self.FORMAT_CSV:
+            writer = csv.DictWriter(f, fieldnames=self.FIELDS, extrasaction="ignore")
+            writer.writeheader()
+            return writer.writerow
+
+        def write_json_line(row):
+            record = {field: row.get(field) for field in self.FIELDS}
+            f.write(json.dumps(record, ensure_ascii=False))
+            f.write("\n")
+
+        return write_json_line
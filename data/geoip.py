@@ -1,8 +1,6 @@
 import os
 import logging
 from utils import get_app_path
-import geoip2.database
-from geoip2.errors import AddressNotFoundError
 
 
 class GeoIPLocator:
@@ -20,6 +18,9 @@ class GeoIPLocator:
 
         try:
             if os.path.exists(self.db_path):
+                # geoip2 n'est chargé que si la base de localisation est présente
+                import geoip2.database
+
                 self.reader = geoip2.database.Reader(self.db_path)
                 logging.info("Base de données GeoIP chargée avec succès")
             else:
@@ -48,6 +49,8 @@ class GeoIPLocator:
                 "longitude": 0,
             }
 
+        from geoip2.errors import AddressNotFoundError
+
         try:
             response = self.reader.city(ip_address)
             return {
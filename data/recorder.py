@@ -0,0 +1,388 @@
+"""
+Enregistrement des réponses brutes de /status/sessions
+
+Les réponses de Plex sont conservées telles quelles pour rejouer un sondage
+(contestation d'un arrêt, bogue du parsing). Le stockage est:
+    - en segments append-only: un nouveau segment est ouvert au-delà d'une
+      taille donnée, les plus anciens sont supprimés au-delà de la taille
+      totale autorisée;
+    - compressé: la première réponse d'un serveur dans un segment est une
+      image complète compressée (zlib); les suivantes sont compressées avec
+      cette image comme dictionnaire, les réponses successives d'un serveur
+      étant presque identiques;
+    - indexé par horodatage: l'index (en mémoire, reconstruit à l'ouverture
+      en lisant les seuls en-têtes) retrouve un sondage par recherche
+      dichotomique, puis au plus deux décompressions.
+
+Format d'un enregistrement:
+    en-tête <dBHII: horodatage, type (image ou delta), longueur de
+    l'identifiant du serveur, longueur des données compressées, CRC32 des
+    données décompressées; puis l'identifiant du serveur et les données.
+"""
+
+import os
+import bisect
+import struct
+import hashlib
+import logging
+import threading
+import time
+import zlib
+
+from utils.constants import Defaults
+
+
+HEADER = struct.Struct("<dBHII")
+
+KIND_KEYFRAME = 0
+KIND_DELTA = 1
+
+SEGMENT_PREFIX = "segment-"
+SEGMENT_SUFFIX = ".bin"
+
+
+class _Segment:
+    """Fichier de segment et images de référence des serveurs qu'il contient"""
+
+    __slots__ = ("number", "path", "size", "keyframes")
+
+    def __init__(self, number, path, size=0):
+        self.number = number
+        self.path = path
+        self.size = size
+        # {server_id: position de l'image de référence}
+        self.keyframes = {}
+
+
+class PollRecorder:
+    """
+    Magasin des réponses brutes de /status/sessions, plafonné en taille
+
+    Args:
+        directory (str): Dossier des segments
+        max_bytes (int): Taille totale maximale des segments
+        segment_bytes (int): Taille d'un segment avant d'en ouvrir un nouveau
+        changes_only (bool): N'enregistrer une réponse que si elle diffère de
+            la précédente du même serveur
+    """
+
+    def __init__(
+        self,
+        directory,
+        max_bytes=Defaults.RECORDER_MAX_MB * 1024 * 1024,
+        segment_bytes=Defaults.RECORDER_SEGMENT_BYTES,
+        changes_only=True,
+    ):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.segment_bytes = min(segment_bytes, max_bytes)
+        self.changes_only = changes_only
+
+        self._segments = []
+        # {server_id: ([horodatages], [(segment, position)])}
+        self._index = {}
+        # Empreinte de la dernière réponse enregistrée par serveur
+        self._digests = {}
+        self._last_timestamp = 0.0
+        self._file = None
+        self._lock = threading.Lock()
+
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    # =====================================================
+    # OUVERTURE ET INDEX
+    # =====================================================
+
+    def _segment_path(self, number):
+        return os.path.join(
+            self.directory, f"{SEGMENT_PREFIX}{number:08d}{SEGMENT_SUFFIX}"
+        )
+
+    def _load(self):
+        """Reconstruire l'index à partir des en-têtes des segments existants"""
+        numbers = sorted(
+            int(name[len(SEGMENT_PREFIX) : -len(SEGMENT_SUFFIX)])
+            for name in os.listdir(self.directory)
+            if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX)
+        )
+        for number in numbers:
+            segment = _Segment(number, self._segment_path(number))
+            self._segments.append(segment)
+            self._scan(segment)
+
+    def _scan(self, segment):
+        """Indexer les enregistrements d'un segment sans décompresser les données"""
+        with open(segment.path, "rb") as handle:
+            position = 0
+            while True:
+                header = handle.read(HEADER.size)
+                if len(header) < HEADER.size:
+                    break
+                timestamp, kind, id_length, length, _ = HEADER.unpack(header)
+                server_id = handle.read(id_length).decode("utf-8")
+                handle.seek(length, os.SEEK_CUR)
+                end = position + HEADER.size + id_length + length
+                if handle.tell() != end or end > os.path.getsize(segment.path):
+                    break
+                self._add_to_index(segment, position, timestamp, kind, server_id)
+                position = end
+
+        # Un enregistrement tronqué (arrêt pendant une écriture) est écarté
+        if position < os.path.getsize(segment.path):
+            logging.warning(
+                f"Enregistrement tronqué ignoré dans {os.path.basename(segment.path)}"
+            )
+            with open(segment.path, "r+b") as handle:
+                handle.truncate(position)
+        segment.size = position
+
+    def _add_to_index(self, segment, position, timestamp, kind, server_id):
+        if kind == KIND_KEYFRAME:
+            segment.keyframes[server_id] = position
+        timestamps, locations = self._index.setdefault(server_id, ([], []))
+        timestamps.append(timestamp)
+        locations.append((segment, position))
+        self._last_timestamp = max(self._last_timestamp, timestamp)
+
+    # =====================================================
+    # ÉCRITURE
+    # =====================================================
+
+    def record(self, server_id, payload, timestamp=None):
+        """
+        Enregistrer une réponse de /status/sessions
+
+        Args:
+            server_id (str): Serveur interrogé
+            payload (str | bytes): Réponse brute
+            timestamp (float, optional): Instant du sondage (maintenant par défaut)
+
+        Returns:
+            bool: True si la réponse a été écrite, False si elle est identique
+            à la précédente (mode « changements seulement ») ou en cas d'erreur
+        """
+        if isinstance(payload, str):
+            payload = payload.encode("utf-8")
+        digest = hashlib.blake2b(payload, digest_size=16).digest()
+
+        with self._lock:
+            if self.changes_only and self._digests.get(server_id) == digest:
+                return False
+
+            # Les horodatages restent croissants, même si l'horloge recule
+            timestamp = max(
+                time.time() if timestamp is None else timestamp, self._last_timestamp
+            )
+            try:
+                self._append(server_id, payload, timestamp)
+            except OSError as e:
+                logging.error(f"Erreur lors de l'enregistrement d'un sondage: {str(e)}")
+                return False
+            self._digests[server_id] = digest
+            return True
+
+    def _append(self, server_id, payload, timestamp):
+        segment = self._writable_segment()
+
+        keyframe_position = segment.keyframes.get(server_id)
+        if keyframe_position is None:
+            kind = KIND_KEYFRAME
+            data = zlib.compress(payload, Defaults.RECORDER_COMPRESSION_LEVEL)
+        else:
+            kind = KIND_DELTA
+            compressor = zlib.compressobj(
+                Defaults.RECORDER_COMPRESSION_LEVEL,
+                zdict=self._read(segment, keyframe_position)[2],
+            )
+            data = compressor.compress(payload) + compressor.flush()
+
+        encoded_id = server_id.encode("utf-8")
+        record = (
+            HEADER.pack(
+                timestamp, kind, len(encoded_id), len(data), zlib.crc32(payload)
+            )
+            + encoded_id
+            + data
+        )
+
+        position = segment.size
+        self._file.write(record)
+        self._file.flush()
+        segment.size += len(record)
+        self._add_to_index(segment, position, timestamp, kind, server_id)
+
+    def _writable_segment(self):
+        """Segment courant, ou nouveau segment si le courant est plein"""
+        segment = self._segments[-1] if self._segments else None
+        if segment is None or segment.size >= self.segment_bytes:
+            number = segment.number + 1 if segment is not None else 1
+            segment = _Segment(number, self._segment_path(number))
+            self._segments.append(segment)
+            if self._file is not None:
+                self._file.close()
+            self._file = None
+            self._enforce_cap()
+
+        if self._file is None:
+            self._file = open(segment.path, "ab")
+        return segment
+
+    def _enforce_cap(self):
+        """Supprimer les segments les plus anciens au-delà de la taille maximale"""
+        total = sum(segment.size for segment in self._segments)
+        while len(self._segments) > 1 and total + self.segment_bytes > self.max_bytes:
+            oldest = self._segments.pop(0)
+            total -= oldest.size
+            try:
+                os.remove(oldest.path)
+            except OSError as e:
+                logging.error(f"Impossible de supprimer {oldest.path}: {str(e)}")
+
+            # Les entrées d'index du segment sont en tête de chaque liste
+            for server_id, (timestamps, locations) in list(self._index.items()):
+                count = 0
+                while count < len(locations) and locations[count][0] is oldest:
+                    count += 1
+                del timestamps[:count]
+                del locations[:count]
+                if not timestamps:
+                    del self._index[server_id]
+
+    # =====================================================
+    # LECTURE
+    # =====================================================
+
+    def _read(self, segment, position):
+        """
+        Lire et décompresser un enregistrement
+
+        Returns:
+            tuple: (horodatage, identifiant du serveur, réponse brute en octets)
+        """
+        with open(segment.path, "rb") as handle:
+            handle.seek(position)
+            timestamp, kind, id_length, length, checksum = HEADER.unpack(
+                handle.read(HEADER.size)
+            )
+            server_id = handle.read(id_length).decode("utf-8")
+            data = handle.read(length)
+
+        if kind == KIND_KEYFRAME:
+            payload = zlib.decompress(data)
+        else:
+            decompressor = zlib.decompressobj(
+                zdict=self._read(segment, segment.keyframes[server_id])[2]
+            )
+            payload = decompressor.decompress(data) + decompressor.flush()
+
+        if zlib.crc32(payload) != checksum:
+            raise ValueError(
+                f"Enregistrement corrompu ({os.path.basename(segment.path)}, "
+                f"position {position})"
+            )
+        return timestamp, server_id, payload
+
+    def get(self, server_id, timestamp):
+        """
+        Réponse d'un serveur en vigueur à un instant donné
+
+        En mode « changements seulement », la réponse en vigueur est la
+        dernière enregistrée avant l'instant demandé.
+
+        Returns:
+            tuple: (horodatage de l'enregistrement, réponse en texte), ou None
+        """
+        with self._lock:
+            entry = self._index.get(server_id)
+            if entry is None:
+                return None
+            timestamps, locations = entry
+            index = bisect.bisect_right(timestamps, timestamp) - 1
+            if index < 0:
+                return None
+            if self._file is not None:
+                self._file.flush()
+            recorded_at, _, payload = self._read(*locations[index])
+        return recorded_at, payload.decode("utf-8")
+
+    def at(self, timestamp):
+        """
+        Réponses de tous les serveurs en vigueur à un instant donné
+
+        Returns:
+            dict: {server_id: (horodatage, réponse)}
+        """
+        responses = {}
+        for server_id in self.servers():
+            response = self.get(server_id, timestamp)
+            if response is not None:
+                responses[server_id] = response
+        return responses
+
+    def iter_records(self, start=None, end=None, server_id=None):
+        """
+        Parcourir les enregistrements d'une période, dans l'ordre chronologique
+
+        Args:
+            start (float, optional): Début de la période (inclus)
+            end (float, optional): Fin de la période (exclue)
+            server_id (str, optional): Limiter à un serveur
+
+        Yields:
+            tuple: (horodatage, server_id, réponse en texte)
+        """
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+            entries = []
+            for current_id, (timestamps, locations) in self._index.items():
+                if server_id is not None and current_id != server_id:
+                    continue
+                first = 0 if start is None else bisect.bisect_left(timestamps, start)
+                last = (
+                    len(timestamps)
+                    if end is None
+                    else bisect.bisect_left(timestamps, end)
+                )
+                entries.extend(
+                    (timestamps[index], locations[index])
+                    for index in range(first, last)
+                )
+
+        entries.sort(key=lambda entry: (entry[0], entry[1][0].number, entry[1][1]))
+        for _, (segment, position) in entries:
+            try:
+                timestamp, current_id, payload = self._read(segment, position)
+            except FileNotFoundError:
+                # Segment supprimé par le plafond de taille pendant le parcours
+                continue
+            yield timestamp, current_id, payload.decode("utf-8")
+
+    def servers(self):
+        """Identifiants des serveurs enregistrés"""
+        with self._lock:
+            return list(self._index)
+
+    def stats(self):
+        """Nombre de segments, d'enregistrements, taille totale et période couverte"""
+        with self._lock:
+            timestamps = [
+                timestamp
+                for entry_timestamps, _ in self._index.values()
+                for timestamp in (entry_timestamps[:1] + entry_timestamps[-1:])
+            ]
+            return {
+                "segments": len(self._segments),
+                "records": sum(len(entry[0]) for entry in self._index.values()),
+                "bytes": sum(segment.size for segment in self._segments),
+                "first": min(timestamps) if timestamps else None,
+                "last": max(timestamps) if timestamps else None,
+            }
+
+    def close(self):
+        """Fermer le segment en cours d'écriture"""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
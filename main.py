@@ -1,15 +1,40 @@
 import sys
-from PyQt5.QtWidgets import QApplication
-from PyQt5.QtCore import Qt
-from ui.main_window import PlexPatrolApp
+import argparse
 from utils.logger import setup_logging
+from utils.constants import Defaults
 
 # Initialiser le logging
 setup_logging()
 
 
-def main():
-    """Point d'entrée principal"""
+def parse_args(argv=None):
+    """Analyser les arguments de la ligne de commande"""
+    parser = argparse.ArgumentParser(
+        prog="plexpatrol", description="Surveillance des flux Plex"
+    )
+    parser.add_argument(
+        "--headless",
+        action="store_true",
+        help="Lancer la surveillance sans interface graphique",
+    )
+    parser.add_argument(
+        "--shadow-report",
+        type=int,
+        nargs="?",
+        const=Defaults.ENFORCEMENT_REPORT_DAYS,
+        metavar="JOURS",
+        help="Comparer les décisions d'arrêt simulées et réelles des derniers jours",
+    )
+    return parser.parse_args(argv)
+
+
+def run_gui():
+    """Lancer l'interface graphique"""
+    # Qt n'est chargé que pour l'interface graphique
+    from PyQt5.QtWidgets import QApplication
+    from PyQt5.QtCore import Qt
+    from ui.main_window import PlexPatrolApp
+
     QApplication.setAttribute(Qt.AA_ShareOpenGLContexts)
     app = QApplication(sys.argv)
     app.setStyle("Fusion")
@@ -22,7 +47,24 @@ def main():
     window = PlexPatrolApp()
     window.show()
 
-    sys.exit(app.exec_())
+    return app.exec_()
+
+
+def main():
+    """Point d'entrée principal"""
+    args = parse_args()
+
+    if args.shadow_report is not None:
+        from core.daemon import run_shadow_report
+
+        sys.exit(run_shadow_report(args.shadow_report))
+
+    if args.headless:
+        from core.daemon import run_headless
+
+        sys.exit(run_headless())
+
+    sys.exit(run_gui())
 
 
 if __name__ == "__main__":
@@ -1,6 +1,21 @@
-from ui.dialogs.config_dialog import ConfigDialog
-from ui.dialogs.stats_dialog import StatisticsDialog
-from ui.dialogs.user_dialog import UserManagementDialog
-from ui.dialogs.message_dialog import MessageDialog
+import importlib
 
-__all__ = ["ConfigDialog", "StatisticsDialog", "UserManagementDialog", "MessageDialog"]
+# Les dialogues sont importés à la demande: stats_dialog charge notamment
+# QtChart, inutile pour afficher la fenêtre principale
+_DIALOG_MODULES = {
+    "ConfigDialog": "ui.dialogs.config_dialog",
+    "StatisticsDialog": "ui.dialogs.stats_dialog",
+    "UserManagementDialog": "ui.dialogs.user_dialog",
+    "MessageDialog": "ui.dialogs.message_dialog",
+    "ExportDialog": "ui.dialogs.export_dialog",
+    "RuleDialog": "ui.dialogs.rule_dialog",
+}
+
+__all__ = list(_DIALOG_MODULES)
+
+
+def __getattr__(name):
+    module_name = _DIALOG_MODULES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(module_name), name)
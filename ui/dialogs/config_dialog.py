@@ -1,3 +1,4 @@
+import ipaddress
 from datetime import datetime
 from PyQt5.QtWidgets import (
     QDialog,
@@ -17,8 +18,12 @@ from PyQt5.QtWidgets import (
     QWidget,
     QMessageBox,
     QCheckBox,
+    QTableWidget,
+    QTableWidgetItem,
+    QHeaderView,
 )
 from PyQt5.QtCore import Qt
+from uuid import uuid4
 from utils.constants import UIMessages, ConfigKeys, Defaults
 
 
@@ -73,13 +78,122 @@ class ConfigDialog(QDialog):
         )
         server_layout.addRow(self.termination_message_label, self.termination_message)
 
+        # Délai de grâce: un dépassement bref (changement d'appareil) est toléré
+        self.grace_period = QSpinBox()
+        self.grace_period.setRange(0, 3600)
+        self.grace_period.setSuffix(" secondes")
+        server_layout.addRow("Tolérer un dépassement pendant:", self.grace_period)
+
+        self.grace_polls = QSpinBox()
+        self.grace_polls.setRange(1, 100)
+        self.grace_polls.setSuffix(" vérifications")
+        server_layout.addRow("Ou pendant:", self.grace_polls)
+
+        # Mode simulation: évaluer de nouvelles limites sans arrêter de flux
+        self.shadow_mode = QCheckBox(
+            "Journaliser les décisions d'arrêt sans arrêter les flux"
+        )
+        server_layout.addRow("Simulation:", self.shadow_mode)
+
+        # Capacité de chaque serveur (0: illimité)
+        self.max_transcodes = QSpinBox()
+        self.max_transcodes.setRange(0, 100)
+        self.max_transcodes.setSpecialValueText("Illimité")
+        server_layout.addRow("Transcodages simultanés max:", self.max_transcodes)
+
+        self.max_bandwidth = QSpinBox()
+        self.max_bandwidth.setRange(0, 100000)
+        self.max_bandwidth.setSuffix(" Mb/s")
+        self.max_bandwidth.setSpecialValueText("Illimité")
+        server_layout.addRow("Débit total max:", self.max_bandwidth)
+
         # Bouton pour tester la connexion
         test_btn = QPushButton("Tester la connexion")
         test_btn.clicked.connect(self.test_connection)
         server_layout.addRow("", test_btn)
 
+        # Serveurs Plex additionnels, surveillés en parallèle du serveur principal
+        servers_group = QGroupBox("Serveurs additionnels")
+        servers_layout = QVBoxLayout(servers_group)
+
+        self.servers_table = QTableWidget(0, 3)
+        self.servers_table.setHorizontalHeaderLabels(["Nom", "URL", "Token"])
+        self.servers_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.servers_table.verticalHeader().setVisible(False)
+        servers_layout.addWidget(self.servers_table)
+
+        servers_buttons = QHBoxLayout()
+        add_server_btn = QPushButton("Ajouter")
+        add_server_btn.clicked.connect(lambda: self.add_server_row())
+        servers_buttons.addWidget(add_server_btn)
+        remove_server_btn = QPushButton("Supprimer")
+        remove_server_btn.clicked.connect(self.remove_server_row)
+        servers_buttons.addWidget(remove_server_btn)
+        servers_buttons.addStretch()
+        servers_layout.addLayout(servers_buttons)
+
+        server_layout.addRow(servers_group)
+
         tabs.addTab(server_tab, "Serveur")
 
+        # Onglet Foyers: comptage des flux par réseau plutôt que par appareil + IP
+        household_tab = QWidget()
+        household_layout = QFormLayout(household_tab)
+
+        self.household_grouping = QCheckBox("Compter les flux par foyer")
+        household_layout.addRow("Foyers:", self.household_grouping)
+
+        self.household_ipv4_prefix = QSpinBox()
+        self.household_ipv4_prefix.setRange(8, 32)
+        self.household_ipv4_prefix.setPrefix("/")
+        household_layout.addRow("Préfixe IPv4:", self.household_ipv4_prefix)
+
+        self.household_ipv6_prefix = QSpinBox()
+        self.household_ipv6_prefix.setRange(16, 128)
+        self.household_ipv6_prefix.setPrefix("/")
+        household_layout.addRow("Préfixe IPv6:", self.household_ipv6_prefix)
+
+        self.household_networks = QLineEdit()
+        self.household_networks.setPlaceholderText("192.168.0.0/16, 2001:db8:42::/48")
+        household_layout.addRow("Réseaux formant un foyer:", self.household_networks)
+
+        household_help = QLabel(UIMessages.CONFIG_HOUSEHOLD_HELP)
+        household_help.setWordWrap(True)
+        household_layout.addRow("", household_help)
+
+        tabs.addTab(household_tab, "Foyers")
+
+        # Onglet Partage: lieux et réseaux des sessions de chaque utilisateur
+        sharing_tab = QWidget()
+        sharing_layout = QFormLayout(sharing_tab)
+
+        self.sharing_enabled = QCheckBox("Détecter le partage de compte")
+        sharing_layout.addRow("Partage:", self.sharing_enabled)
+
+        self.sharing_window = QSpinBox()
+        self.sharing_window.setRange(1, 24 * 30)
+        self.sharing_window.setSuffix(" heures")
+        sharing_layout.addRow("Fenêtre d'observation:", self.sharing_window)
+
+        self.sharing_max_speed = QSpinBox()
+        self.sharing_max_speed.setRange(50, 5000)
+        self.sharing_max_speed.setSuffix(" km/h")
+        sharing_layout.addRow("Vitesse maximale plausible:", self.sharing_max_speed)
+
+        self.sharing_max_locations = QSpinBox()
+        self.sharing_max_locations.setRange(1, 100)
+        sharing_layout.addRow("Lieux distincts tolérés:", self.sharing_max_locations)
+
+        self.sharing_max_networks = QSpinBox()
+        self.sharing_max_networks.setRange(1, 100)
+        sharing_layout.addRow("Réseaux distincts tolérés:", self.sharing_max_networks)
+
+        sharing_help = QLabel(UIMessages.CONFIG_SHARING_HELP)
+        sharing_help.setWordWrap(True)
+        sharing_layout.addRow("", sharing_help)
+
+        tabs.addTab(sharing_tab, "Partage")
+
         # Onglet Notifications
         notif_tab = QWidget()
         notif_layout = QFormLayout(notif_tab)
@@ -95,6 +209,17 @@ class ConfigDialog(QDialog):
         self.telegram_group = QLineEdit()
         notif_layout.addRow(UIMessages.CONFIG_TELEGRAM_GROUP_LABEL, self.telegram_group)
 
+        # Regroupement des alertes répétées
+        self.suppression_window = QSpinBox()
+        self.suppression_window.setRange(0, 86400)
+        self.suppression_window.setSuffix(" secondes")
+        notif_layout.addRow("Ne pas répéter une alerte pendant:", self.suppression_window)
+
+        self.digest_interval = QSpinBox()
+        self.digest_interval.setRange(30, 86400)
+        self.digest_interval.setSuffix(" secondes")
+        notif_layout.addRow("Résumé des alertes regroupées toutes les:", self.digest_interval)
+
         # Bouton pour tester les notifications
         test_notif_btn = QPushButton(UIMessages.BTN_TEST_NOTIFICATION)
         test_notif_btn.clicked.connect(self.test_notification)
@@ -102,6 +227,38 @@ class ConfigDialog(QDialog):
 
         tabs.addTab(notif_tab, "Notifications")
 
+        # Onglet Supervision
+        metrics_tab = QWidget()
+        metrics_layout = QFormLayout(metrics_tab)
+
+        self.metrics_enabled = QCheckBox("Exposer les métriques au format Prometheus")
+        metrics_layout.addRow("Métriques:", self.metrics_enabled)
+
+        self.metrics_port = QSpinBox()
+        self.metrics_port.setRange(1024, 65535)
+        metrics_layout.addRow("Port local:", self.metrics_port)
+
+        metrics_layout.addRow(
+            "",
+            QLabel("Pris en compte au prochain démarrage de la surveillance"),
+        )
+
+        # Enregistrement des réponses brutes de Plex, pour rejouer un sondage
+        self.recorder_enabled = QCheckBox("Enregistrer les réponses de Plex")
+        metrics_layout.addRow("Sondages:", self.recorder_enabled)
+
+        self.recorder_changes_only = QCheckBox(
+            "Uniquement les réponses qui ont changé"
+        )
+        metrics_layout.addRow("", self.recorder_changes_only)
+
+        self.recorder_max_size = QSpinBox()
+        self.recorder_max_size.setRange(10, 100000)
+        self.recorder_max_size.setSuffix(" Mo")
+        metrics_layout.addRow("Taille maximale:", self.recorder_max_size)
+
+        tabs.addTab(metrics_tab, "Supervision")
+
         layout.addWidget(tabs)
 
         # Boutons OK/Annuler
@@ -117,24 +274,63 @@ class ConfigDialog(QDialog):
 
     def accept(self):
         """Enregistrer les modifications et fermer le dialogue"""
-        # À la place, mettre à jour directement la configuration dans la base
-        self.config_manager.set(ConfigKeys.PLEX_SERVER_URL, self.server_url.text())
-        self.config_manager.set(ConfigKeys.PLEX_TOKEN, self.plex_token.text())
-        self.config_manager.set(ConfigKeys.CHECK_INTERVAL, self.check_interval.value())
-
-        self.config_manager.set(
-            ConfigKeys.TERMINATION_MESSAGE, self.termination_message.text()
-        )
-
-        self.config_manager.set(
-            ConfigKeys.TELEGRAM_ENABLED, self.telegram_enabled.isChecked()
-        )
-        self.config_manager.set(
-            ConfigKeys.TELEGRAM_BOT_TOKEN, self.telegram_token.text()
-        )
-        self.config_manager.set(
-            ConfigKeys.TELEGRAM_GROUP_ID, self.telegram_group.text()
+        # Vérifier les réseaux saisis avant d'enregistrer quoi que ce soit
+        household_networks = [
+            network.strip()
+            for network in self.household_networks.text().split(",")
+            if network.strip()
+        ]
+        for network in household_networks:
+            try:
+                ipaddress.ip_network(network, strict=False)
+            except ValueError:
+                QMessageBox.warning(
+                    self,
+                    UIMessages.TITLE_ERROR,
+                    UIMessages.CONFIG_HOUSEHOLD_INVALID.format(network=network),
+                )
+                return
+
+        # Enregistrer toutes les valeurs dans une seule transaction: le moniteur
+        # reçoit un unique snapshot cohérent au lieu d'une suite de changements
+        saved = self.config_manager.set_many(
+            {
+                ConfigKeys.PLEX_SERVER_URL: self.server_url.text(),
+                ConfigKeys.PLEX_TOKEN: self.plex_token.text(),
+                ConfigKeys.CHECK_INTERVAL: self.check_interval.value(),
+                ConfigKeys.PLEX_ADDITIONAL_SERVERS: self.additional_servers(),
+                ConfigKeys.TERMINATION_MESSAGE: self.termination_message.text(),
+                ConfigKeys.ENFORCEMENT_GRACE_PERIOD: self.grace_period.value(),
+                ConfigKeys.ENFORCEMENT_GRACE_POLLS: self.grace_polls.value(),
+                ConfigKeys.SHADOW_MODE: self.shadow_mode.isChecked(),
+                ConfigKeys.MAX_TRANSCODES: self.max_transcodes.value(),
+                ConfigKeys.MAX_BANDWIDTH: self.max_bandwidth.value(),
+                ConfigKeys.HOUSEHOLD_GROUPING: self.household_grouping.isChecked(),
+                ConfigKeys.HOUSEHOLD_IPV4_PREFIX: self.household_ipv4_prefix.value(),
+                ConfigKeys.HOUSEHOLD_IPV6_PREFIX: self.household_ipv6_prefix.value(),
+                ConfigKeys.HOUSEHOLD_NETWORKS: household_networks,
+                ConfigKeys.TELEGRAM_ENABLED: self.telegram_enabled.isChecked(),
+                ConfigKeys.TELEGRAM_BOT_TOKEN: self.telegram_token.text(),
+                ConfigKeys.TELEGRAM_GROUP_ID: self.telegram_group.text(),
+                ConfigKeys.TELEGRAM_SUPPRESSION_WINDOW: self.suppression_window.value(),
+                ConfigKeys.TELEGRAM_DIGEST_INTERVAL: self.digest_interval.value(),
+                ConfigKeys.SHARING_ENABLED: self.sharing_enabled.isChecked(),
+                ConfigKeys.SHARING_WINDOW_HOURS: self.sharing_window.value(),
+                ConfigKeys.SHARING_MAX_SPEED: self.sharing_max_speed.value(),
+                ConfigKeys.SHARING_MAX_LOCATIONS: self.sharing_max_locations.value(),
+                ConfigKeys.SHARING_MAX_NETWORKS: self.sharing_max_networks.value(),
+                ConfigKeys.RECORDER_ENABLED: self.recorder_enabled.isChecked(),
+                ConfigKeys.RECORDER_CHANGES_ONLY: self.recorder_changes_only.isChecked(),
+                ConfigKeys.RECORDER_MAX_SIZE_MB: self.recorder_max_size.value(),
+                ConfigKeys.METRICS_ENABLED: self.metrics_enabled.isChecked(),
+                ConfigKeys.METRICS_PORT: self.metrics_port.value(),
+            }
         )
+        if not saved:
+            QMessageBox.critical(
+                self, UIMessages.TITLE_ERROR, UIMessages.CONFIG_SAVE_ERROR
+            )
+            return
 
         # Accepter le dialogue
         super().accept()
@@ -167,6 +363,47 @@ class ConfigDialog(QDialog):
                 UIMessages.CONFIG_CONNECTION_ERROR.format(error=str(e)),
             )
 
+    def add_server_row(self, server=None):
+        """Ajouter une ligne au tableau des serveurs additionnels"""
+        server = server or {"id": uuid4().hex[:8]}
+        row = self.servers_table.rowCount()
+        self.servers_table.insertRow(row)
+        for column, key in enumerate(("name", "url", "token")):
+            item = QTableWidgetItem(server.get(key, ""))
+            if column == 0:
+                # Identifiant stable du serveur, référencé par l'historique des sessions
+                item.setData(Qt.UserRole, server["id"])
+            self.servers_table.setItem(row, column, item)
+
+    def remove_server_row(self):
+        """Supprimer le serveur additionnel sélectionné"""
+        row = self.servers_table.currentRow()
+        if row >= 0:
+            self.servers_table.removeRow(row)
+
+    def additional_servers(self):
+        """Retourner les serveurs additionnels saisis (lignes sans URL ignorées)"""
+        servers = []
+        for row in range(self.servers_table.rowCount()):
+            values = [
+                (self.servers_table.item(row, column) or QTableWidgetItem()).text().strip()
+                for column in range(3)
+            ]
+            name, url, token = values
+            if not url:
+                continue
+            name_item = self.servers_table.item(row, 0)
+            server_id = name_item.data(Qt.UserRole) if name_item else None
+            servers.append(
+                {
+                    "id": server_id or uuid4().hex[:8],
+                    "name": name or url,
+                    "url": url,
+                    "token": token,
+                }
+            )
+        return servers
+
     def test_notification(self):
         """Tester l'envoi d'une notification Telegram"""
         from utils import send_telegram_notification
@@ -202,6 +439,28 @@ class ConfigDialog(QDialog):
         self.check_interval.setValue(
             self.config_manager.get(ConfigKeys.CHECK_INTERVAL, Defaults.CHECK_INTERVAL)
         )
+        for server in self.config_manager.plex_servers[1:]:
+            self.add_server_row(server)
+        self.grace_period.setValue(self.config_manager.enforcement_grace_period)
+        self.grace_polls.setValue(self.config_manager.enforcement_grace_polls)
+        self.shadow_mode.setChecked(self.config_manager.shadow_mode)
+        self.max_transcodes.setValue(self.config_manager.max_transcodes)
+        self.max_bandwidth.setValue(self.config_manager.max_bandwidth)
+
+        # Foyers
+        self.household_grouping.setChecked(self.config_manager.household_grouping)
+        self.household_ipv4_prefix.setValue(self.config_manager.household_ipv4_prefix)
+        self.household_ipv6_prefix.setValue(self.config_manager.household_ipv6_prefix)
+        self.household_networks.setText(
+            ", ".join(self.config_manager.household_networks)
+        )
+
+        # Partage de compte
+        self.sharing_enabled.setChecked(self.config_manager.sharing_enabled)
+        self.sharing_window.setValue(self.config_manager.sharing_window_hours)
+        self.sharing_max_speed.setValue(self.config_manager.sharing_max_speed)
+        self.sharing_max_locations.setValue(self.config_manager.sharing_max_locations)
+        self.sharing_max_networks.setValue(self.config_manager.sharing_max_networks)
 
         # Telegram
         self.telegram_enabled.setChecked(
@@ -213,3 +472,17 @@ class ConfigDialog(QDialog):
         self.telegram_group.setText(
             self.config_manager.get(ConfigKeys.TELEGRAM_GROUP_ID, "")
         )
+
+        self.suppression_window.setValue(
+            self.config_manager.telegram_suppression_window
+        )
+        self.digest_interval.setValue(self.config_manager.telegram_digest_interval)
+
+        # Métriques
+        self.metrics_enabled.setChecked(self.config_manager.metrics_enabled)
+        self.metrics_port.setValue(self.config_manager.metrics_port)
+
+        # Enregistrement des sondages
+        self.recorder_enabled.setChecked(self.config_manager.recorder_enabled)
+        self.recorder_changes_only.setChecked(self.config_manager.recorder_changes_only)
+        self.recorder_max_size.setValue(self.config_manager.recorder_max_size_mb)
@@ -0,0 +1,193 @@
+import os
+import time
+from PyQt5.QtWidgets import (
+    QDialog,
+    QVBoxLayout,
+    QHBoxLayout,
+    QFormLayout,
+    QLabel,
+    QPushButton,
+    QComboBox,
+    QCheckBox,
+    QDateEdit,
+    QProgressBar,
+    QFileDialog,
+    QMessageBox,
+)
+from PyQt5.QtCore import QDate
+from data.export import SessionExporter
+from ui.workers import ExportWorker
+from utils import get_app_path
+from utils.constants import UIMessages, LogMessages, Paths
+
+
+class ExportDialog(QDialog):
+    """Dialogue d'export de l'historique des sessions"""
+
+    ALL_USERS = "Tous les utilisateurs"
+    ALL_LIBRARIES = "Toutes les bibliothèques"
+    FORMAT_LABELS = {
+        SessionExporter.FORMAT_CSV: "CSV",
+        SessionExporter.FORMAT_JSONL: "JSON Lines",
+    }
+
+    def __init__(self, db, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self.worker = None
+
+        self.setWindowTitle(UIMessages.BTN_EXPORT_HISTORY)
+        self.resize(450, 300)
+
+        self.setup_ui()
+
+    def setup_ui(self):
+        """Configurer l'interface du dialogue"""
+        layout = QVBoxLayout(self)
+        form = QFormLayout()
+
+        # Période
+        self.date_start = QDateEdit(QDate.currentDate().addDays(-30))
+        self.date_start.setCalendarPopup(True)
+        form.addRow("Du:", self.date_start)
+
+        self.date_end = QDateEdit(QDate.currentDate())
+        self.date_end.setCalendarPopup(True)
+        form.addRow("Au:", self.date_end)
+
+        # Utilisateur
+        self.user_combo = QComboBox()
+        self.user_combo.addItem(self.ALL_USERS, None)
+        for user in self.db.get_all_users(include_disabled=True):
+            self.user_combo.addItem(user.get("username", ""), user.get("id"))
+        form.addRow("Utilisateur:", self.user_combo)
+
+        # Bibliothèque
+        self.library_combo = QComboBox()
+        self.library_combo.addItem(self.ALL_LIBRARIES, None)
+        for library in self.db.get_library_sections():
+            self.library_combo.addItem(library, library)
+        form.addRow("Bibliothèque:", self.library_combo)
+
+        # Format de sortie
+        self.format_combo = QComboBox()
+        for fmt in SessionExporter.FORMATS:
+            self.format_combo.addItem(self.FORMAT_LABELS[fmt], fmt)
+        form.addRow("Format:", self.format_combo)
+
+        self.compress_check = QCheckBox("Compresser (gzip)")
+        form.addRow("", self.compress_check)
+
+        layout.addLayout(form)
+
+        # Progression
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setValue(0)
+        layout.addWidget(self.progress_bar)
+
+        self.status_label = QLabel("")
+        layout.addWidget(self.status_label)
+
+        # Boutons
+        button_layout = QHBoxLayout()
+
+        self.export_btn = QPushButton("Exporter")
+        self.export_btn.setDefault(True)
+        self.export_btn.clicked.connect(self.start_export)
+        button_layout.addWidget(self.export_btn)
+
+        self.cancel_btn = QPushButton(UIMessages.BTN_CANCEL)
+        self.cancel_btn.clicked.connect(self.cancel_export)
+        button_layout.addWidget(self.cancel_btn)
+
+        layout.addLayout(button_layout)
+
+    def get_filters(self):
+        """Retourner les filtres sélectionnés"""
+        return {
+            "start_date": self.date_start.date().toString("yyyy-MM-dd"),
+            "end_date": self.date_end.date().toString("yyyy-MM-dd"),
+            "user_id": self.user_combo.currentData(),
+            "library_section": self.library_combo.currentData(),
+        }
+
+    def start_export(self):
+        """Choisir le fichier de destination et lancer l'export en arrière-plan"""
+        fmt = self.format_combo.currentData()
+        compress = self.compress_check.isChecked()
+
+        exports_dir = os.path.join(get_app_path(), Paths.EXPORTS)
+        if not os.path.exists(exports_dir):
+            os.makedirs(exports_dir)
+
+        now = time.strftime("%Y%m%d_%H%M%S", time.localtime())
+        default_path = os.path.join(
+            exports_dir,
+            f"PlexPatrol_sessions_{now}"
+            + SessionExporter.file_extension(fmt, compress),
+        )
+
+        filepath, _ = QFileDialog.getSaveFileName(
+            self, UIMessages.BTN_EXPORT_HISTORY, default_path
+        )
+        if not filepath:
+            return
+
+        self.export_btn.setEnabled(False)
+        self.progress_bar.setRange(0, 0)  # Indéterminé jusqu'au premier lot
+        self.status_label.setText("Export en cours...")
+
+        self.worker = ExportWorker(
+            self.db, filepath, fmt, compress, self.get_filters(), self
+        )
+        self.worker.progress.connect(self.on_progress)
+        self.worker.export_finished.connect(self.on_export_finished)
+        self.worker.export_failed.connect(self.on_export_failed)
+        self.worker.export_cancelled.connect(self.on_export_cancelled)
+        self.worker.start()
+
+    def on_progress(self, written, total):
+        """Mettre à jour la barre de progression"""
+        self.progress_bar.setRange(0, max(total, 1))
+        self.progress_bar.setValue(written)
+        self.status_label.setText(f"{written} / {total} sessions")
+
+    def on_export_finished(self, filepath, count):
+        """Gérer la fin de l'export"""
+        self.worker = None
+        self.export_btn.setEnabled(True)
+        message = UIMessages.HISTORY_EXPORTED.format(count=count, filepath=filepath)
+        self.status_label.setText(message)
+        QMessageBox.information(self, UIMessages.TITLE_SUCCESS, message)
+
+    def on_export_failed(self, error):
+        """Gérer un échec de l'export"""
+        self.worker = None
+        self.export_btn.setEnabled(True)
+        self.progress_bar.setRange(0, 1)
+        self.progress_bar.setValue(0)
+        message = LogMessages.HISTORY_EXPORT_ERROR.format(error=error)
+        self.status_label.setText(message)
+        QMessageBox.warning(self, "Erreur", message)
+
+    def on_export_cancelled(self):
+        """Gérer l'annulation de l'export"""
+        self.worker = None
+        self.export_btn.setEnabled(True)
+        self.progress_bar.setRange(0, 1)
+        self.progress_bar.setValue(0)
+        self.status_label.setText(UIMessages.HISTORY_EXPORT_CANCELLED)
+
+    def cancel_export(self):
+        """Annuler l'export en cours, ou fermer le dialogue"""
+        if self.worker is not None and self.worker.isRunning():
+            self.worker.cancel()
+            return
+        self.reject()
+
+    def reject(self):
+        """Attendre l'arrêt du thread d'export avant de fermer"""
+        if self.worker is not None and self.worker.isRunning():
+            self.worker.cancel()
+            self.worker.wait()
+        super().reject()
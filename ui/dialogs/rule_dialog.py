@@ -0,0 +1,171 @@
+from PyQt5.QtWidgets import (
+    QDialog,
+    QVBoxLayout,
+    QHBoxLayout,
+    QFormLayout,
+    QLineEdit,
+    QComboBox,
+    QCheckBox,
+    QSpinBox,
+    QTimeEdit,
+    QDialogButtonBox,
+    QMessageBox,
+)
+from PyQt5.QtCore import QTime
+from utils.constants import UIMessages
+
+
+def _minute_to_time(minute):
+    return QTime((minute // 60) % 24, minute % 60)
+
+
+def _time_to_minute(value):
+    return value.hour() * 60 + value.minute()
+
+
+class RuleDialog(QDialog):
+    """Création ou modification d'une règle de limitation des flux"""
+
+    ALL_USERS = "Tous les utilisateurs"
+    ALL_LIBRARIES = "Toutes les bibliothèques"
+    ALL_PLATFORMS = "Toutes les plateformes"
+
+    def __init__(self, db, rule=None, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self.rule = rule or {}
+
+        self.setWindowTitle(
+            UIMessages.RULE_DIALOG_EDIT if rule else UIMessages.RULE_DIALOG_NEW
+        )
+        self.resize(420, 320)
+
+        self.setup_ui()
+
+    def setup_ui(self):
+        """Configurer l'interface du dialogue"""
+        layout = QVBoxLayout(self)
+        form = QFormLayout()
+
+        self.name_edit = QLineEdit(self.rule.get("name", ""))
+        form.addRow("Nom:", self.name_edit)
+
+        # Utilisateur concerné
+        self.user_combo = QComboBox()
+        self.user_combo.addItem(self.ALL_USERS, None)
+        for user in self.db.get_all_users(include_disabled=True):
+            self.user_combo.addItem(user.get("username", ""), user.get("id"))
+        self._select(self.user_combo, self.rule.get("user_id"))
+        form.addRow("Utilisateur:", self.user_combo)
+
+        # Bibliothèque et plateforme: valeurs connues, ou saisie libre
+        self.library_combo = QComboBox()
+        self.library_combo.setEditable(True)
+        self.library_combo.addItem(self.ALL_LIBRARIES, None)
+        for library in self.db.get_library_sections():
+            self.library_combo.addItem(library, library)
+        self._select(self.library_combo, self.rule.get("library"))
+        form.addRow("Bibliothèque:", self.library_combo)
+
+        self.platform_combo = QComboBox()
+        self.platform_combo.setEditable(True)
+        self.platform_combo.addItem(self.ALL_PLATFORMS, None)
+        self._select(self.platform_combo, self.rule.get("platform"))
+        form.addRow("Plateforme:", self.platform_combo)
+
+        self.transcode_check = QCheckBox("Uniquement les flux transcodés")
+        self.transcode_check.setChecked(bool(self.rule.get("transcode_only")))
+        form.addRow("", self.transcode_check)
+
+        # Plage horaire (peut passer minuit)
+        start_minute = self.rule.get("start_minute")
+        end_minute = self.rule.get("end_minute")
+        self.window_check = QCheckBox("Limiter à une plage horaire")
+        self.window_check.setChecked(start_minute is not None)
+        form.addRow("", self.window_check)
+
+        window_layout = QHBoxLayout()
+        # Minuit (0) est une borne valide: seule l'absence de plage est remplacée
+        self.start_time = QTimeEdit(
+            _minute_to_time(start_minute if start_minute is not None else 18 * 60)
+        )
+        self.end_time = QTimeEdit(
+            _minute_to_time(end_minute if end_minute is not None else 23 * 60)
+        )
+        for widget in (self.start_time, self.end_time):
+            widget.setDisplayFormat("HH:mm")
+            widget.setEnabled(self.window_check.isChecked())
+            self.window_check.toggled.connect(widget.setEnabled)
+            window_layout.addWidget(widget)
+        form.addRow("De / à:", window_layout)
+
+        self.max_streams = QSpinBox()
+        self.max_streams.setRange(0, 100)
+        self.max_streams.setValue(int(self.rule.get("max_streams", 1)))
+        form.addRow("Flux maximum:", self.max_streams)
+
+        self.enabled_check = QCheckBox("Règle active")
+        self.enabled_check.setChecked(bool(self.rule.get("enabled", True)))
+        form.addRow("", self.enabled_check)
+
+        layout.addLayout(form)
+
+        buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+        layout.addWidget(buttons)
+
+    def _select(self, combo, value):
+        """Sélectionner une valeur, en l'ajoutant si elle n'est pas proposée"""
+        if value is None:
+            return
+        index = combo.findData(value)
+        if index < 0:
+            combo.addItem(str(value), value)
+            index = combo.count() - 1
+        combo.setCurrentIndex(index)
+
+    def _combo_value(self, combo, all_label):
+        """Valeur choisie ou saisie (None pour « toutes »)"""
+        text = combo.currentText().strip()
+        if not text or text == all_label:
+            return None
+        index = combo.findText(text)
+        if index >= 0 and combo.itemData(index) is not None:
+            return combo.itemData(index)
+        return text
+
+    def values(self):
+        """Valeurs des colonnes de la règle"""
+        windowed = self.window_check.isChecked()
+        return {
+            "name": self.name_edit.text().strip(),
+            "max_streams": self.max_streams.value(),
+            "user_id": self.user_combo.currentData(),
+            "library": self._combo_value(self.library_combo, self.ALL_LIBRARIES),
+            "platform": self._combo_value(self.platform_combo, self.ALL_PLATFORMS),
+            "transcode_only": 1 if self.transcode_check.isChecked() else 0,
+            "start_minute": _time_to_minute(self.start_time.time()) if windowed else None,
+            "end_minute": _time_to_minute(self.end_time.time()) if windowed else None,
+            "enabled": 1 if self.enabled_check.isChecked() else 0,
+        }
+
+    def accept(self):
+        """Enregistrer la règle et fermer le dialogue"""
+        values = self.values()
+        if not values["name"]:
+            QMessageBox.warning(self, UIMessages.TITLE_ERROR, UIMessages.RULE_NAME_REQUIRED)
+            return
+        # Une plage de durée nulle ne contient aucune minute
+        if (
+            values["start_minute"] is not None
+            and values["start_minute"] == values["end_minute"]
+        ):
+            QMessageBox.warning(self, UIMessages.TITLE_ERROR, UIMessages.RULE_EMPTY_WINDOW)
+            return
+
+        if self.db.save_policy_rule(values, self.rule.get("id")) is None:
+            QMessageBox.critical(self, UIMessages.TITLE_ERROR, UIMessages.RULE_SAVE_ERROR)
+            return
+
+        super().accept()
@@ -12,6 +12,7 @@ from PyQt5.QtWidgets import (
     QRadioButton,
     QDateEdit,
     QLabel,
+    QComboBox,
 )
 from PyQt5.QtChart import (
     QChart,
@@ -26,6 +27,8 @@ from PyQt5.QtChart import (
 from PyQt5.QtGui import QPainter
 from PyQt5.QtCore import Qt, QDate
 
+from core.sharing import ALERT_LABELS
+from core.usage import format_bandwidth
 from data.database import PlexPatrolDB
 from utils.constants import UIMessages
 
@@ -89,6 +92,14 @@ class StatisticsDialog(QDialog):
         device_tab = self.create_device_tab(self.initial_period)
         tabs.addTab(device_tab, "Appareils")
 
+        # Nouvel onglet: Débit et transcodages
+        bandwidth_tab = self.create_bandwidth_tab(self.initial_period)
+        tabs.addTab(bandwidth_tab, "Bande passante")
+
+        # Nouvel onglet: Alertes de partage de compte
+        sharing_tab = self.create_sharing_tab(self.initial_period)
+        tabs.addTab(sharing_tab, "Partage de compte")
+
         layout.addWidget(tabs)
 
         # Bouton de fermeture
@@ -132,6 +143,17 @@ class StatisticsDialog(QDialog):
         self.date_end.setCalendarPopup(True)
         layout.addWidget(self.date_end)
 
+        # Filtre par serveur, affiché seulement si plusieurs serveurs sont surveillés
+        from config.config_manager import config
+
+        self.server_combo = QComboBox()
+        self.server_combo.addItem("Tous les serveurs", None)
+        for server in config.plex_servers:
+            self.server_combo.addItem(server["name"], server["id"])
+        if self.server_combo.count() > 2:
+            layout.addWidget(QLabel("Serveur"))
+            layout.addWidget(self.server_combo)
+
         # Bouton d'application
         apply_btn = QPushButton("Appliquer")
         apply_btn.clicked.connect(self.refresh_stats)
@@ -169,15 +191,18 @@ class StatisticsDialog(QDialog):
     def get_selected_period(self):
         """Obtenir la période sélectionnée en jours ou comme tuple de dates"""
         if self.radio_7_days.isChecked():
-            return {"days": 7}
+            period = {"days": 7}
         elif self.radio_30_days.isChecked():
-            return {"days": 30}
+            period = {"days": 30}
         elif self.radio_90_days.isChecked():
-            return {"days": 90}
+            period = {"days": 90}
         else:  # Période personnalisée
             start_date = self.date_start.date().toString("yyyy-MM-dd")
             end_date = self.date_end.date().toString("yyyy-MM-dd")
-            return {"start_date": start_date, "end_date": end_date}
+            period = {"start_date": start_date, "end_date": end_date}
+
+        period["server_id"] = self.server_combo.currentData()
+        return period
 
     def refresh_stats(self):
         """Rafraîchir les statistiques avec la période sélectionnée"""
@@ -213,6 +238,12 @@ class StatisticsDialog(QDialog):
             device_tab = self.create_device_tab(period)
             tabs.addTab(device_tab, "Appareils")
 
+            bandwidth_tab = self.create_bandwidth_tab(period)
+            tabs.addTab(bandwidth_tab, "Bande passante")
+
+            sharing_tab = self.create_sharing_tab(period)
+            tabs.addTab(sharing_tab, "Partage de compte")
+
             # Restaurer l'onglet actif
             tabs.setCurrentIndex(current_index)
 
@@ -235,10 +266,14 @@ class StatisticsDialog(QDialog):
         # Si période spécifiée, récupérer les stats en fonction de cette période
         if period is not None:
             if "days" in period:
-                self.stats = self.db.get_user_stats(days=period["days"])
+                self.stats = self.db.get_user_stats(
+                    days=period["days"], server_id=period.get("server_id")
+                )
             else:
                 self.stats = self.db.get_user_stats(
-                    start_date=period["start_date"], end_date=period["end_date"]
+                    start_date=period["start_date"],
+                    end_date=period["end_date"],
+                    server_id=period.get("server_id"),
                 )
 
         # Tableau détaillé
@@ -459,10 +494,14 @@ class StatisticsDialog(QDialog):
 
         # Récupérer les données de sessions avec horodatage selon la période
         if "days" in period:
-            sessions_by_time = self.db.get_sessions_by_time(days=period["days"])
+            sessions_by_time = self.db.get_sessions_by_time(
+                days=period["days"], server_id=period.get("server_id")
+            )
         else:
             sessions_by_time = self.db.get_sessions_by_time_range(
-                start_date=period["start_date"], end_date=period["end_date"]
+                start_date=period["start_date"],
+                end_date=period["end_date"],
+                server_id=period.get("server_id"),
             )
 
         # Vérifier si nous avons des données
@@ -652,10 +691,14 @@ class StatisticsDialog(QDialog):
         if period is None:
             device_stats = self.db.get_device_stats()
         elif "days" in period:
-            device_stats = self.db.get_device_stats(days=period["days"])
+            device_stats = self.db.get_device_stats(
+                days=period["days"], server_id=period.get("server_id")
+            )
         else:
             device_stats = self.db.get_device_stats(
-                start_date=period["start_date"], end_date=period["end_date"]
+                start_date=period["start_date"],
+                end_date=period["end_date"],
+                server_id=period.get("server_id"),
             )
 
         # Créer un graphique en camembert pour les appareils
@@ -774,6 +817,184 @@ class StatisticsDialog(QDialog):
 
         return tab
 
+    def create_bandwidth_tab(self, period=None):
+        """Créer l'onglet du débit et des transcodages par utilisateur"""
+        tab = QWidget()
+        layout = QVBoxLayout(tab)
+
+        # Récupérer les statistiques de débit en fonction de la période
+        if period is None:
+            bandwidth_stats = self.db.get_bandwidth_stats()
+        elif "days" in period:
+            bandwidth_stats = self.db.get_bandwidth_stats(
+                days=period["days"], server_id=period.get("server_id")
+            )
+        else:
+            bandwidth_stats = self.db.get_bandwidth_stats(
+                start_date=period["start_date"],
+                end_date=period["end_date"],
+                server_id=period.get("server_id"),
+            )
+
+        # Graphique du débit moyen et maximal des 10 plus gros consommateurs (Mb/s)
+        top_users = bandwidth_stats[:10]
+        average_set = QBarSet("Débit moyen (Mb/s)")
+        peak_set = QBarSet("Débit maximal (Mb/s)")
+        categories = []
+        for user in top_users:
+            categories.append(user["username"] or "Inconnu")
+            average_set.append(user["avg_bandwidth"] / 1000)
+            peak_set.append(user["max_bandwidth"] / 1000)
+
+        series = QBarSeries()
+        series.append(average_set)
+        series.append(peak_set)
+
+        chart = QChart()
+        chart.addSeries(series)
+        chart.setTitle("Débit par utilisateur")
+        chart.setAnimationOptions(QChart.SeriesAnimations)
+
+        axis_x = QBarCategoryAxis()
+        axis_x.append(categories)
+        chart.addAxis(axis_x, Qt.AlignBottom)
+        series.attachAxis(axis_x)
+
+        axis_y = QValueAxis()
+        axis_y.setLabelFormat("%.1f")
+        axis_y.setMin(0)
+        chart.addAxis(axis_y, Qt.AlignLeft)
+        series.attachAxis(axis_y)
+
+        chart_view = QChartView(chart)
+        chart_view.setRenderHint(QPainter.Antialiasing)
+        layout.addWidget(chart_view)
+
+        # Tableau détaillé
+        table = QTableWidget()
+        table.setColumnCount(6)
+        table.setHorizontalHeaderLabels(
+            [
+                "Utilisateur",
+                "Sessions",
+                "Transcodages",
+                "Taux de transcodage",
+                "Débit moyen",
+                "Débit maximal",
+            ]
+        )
+        table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+
+        for i, user in enumerate(bandwidth_stats):
+            table.insertRow(i)
+            count = user["count"]
+            transcodes = user["transcode_count"]
+
+            table.setItem(i, 0, QTableWidgetItem(user["username"] or "Inconnu"))
+
+            # Stocker les nombres comme valeurs numériques pour le tri
+            count_item = QTableWidgetItem()
+            count_item.setData(Qt.DisplayRole, count)
+            table.setItem(i, 1, count_item)
+
+            transcode_item = QTableWidgetItem()
+            transcode_item.setData(Qt.DisplayRole, transcodes)
+            table.setItem(i, 2, transcode_item)
+
+            rate_value = (transcodes / count) * 100 if count > 0 else 0
+            table.setItem(
+                i, 3, PercentageTableItem(f"{rate_value:.1f}%", rate_value)
+            )
+
+            # Débits affichés en texte, triés sur leur valeur en kb/s
+            table.setItem(
+                i,
+                4,
+                PercentageTableItem(
+                    format_bandwidth(user["avg_bandwidth"]), user["avg_bandwidth"]
+                ),
+            )
+            table.setItem(
+                i,
+                5,
+                PercentageTableItem(
+                    format_bandwidth(user["max_bandwidth"]), user["max_bandwidth"]
+                ),
+            )
+
+        # Activer le tri pour ce tableau, par débit moyen décroissant
+        self.enable_sorting_for_table(table)
+        table.sortItems(4, Qt.DescendingOrder)
+
+        layout.addWidget(table)
+
+        return tab
+
+    def create_sharing_tab(self, period=None):
+        """Créer l'onglet des alertes de partage de compte"""
+        tab = QWidget()
+        layout = QVBoxLayout(tab)
+
+        # Récupérer les alertes en fonction de la période (le filtre par
+        # serveur ne s'applique pas: un compte est commun à tous les serveurs)
+        if period is None:
+            alerts = self.db.get_sharing_alerts()
+        elif "days" in period:
+            alerts = self.db.get_sharing_alerts(days=period["days"])
+        else:
+            alerts = self.db.get_sharing_alerts(
+                start_date=period["start_date"], end_date=period["end_date"]
+            )
+
+        # Résumé par utilisateur
+        users = {}
+        for alert in alerts:
+            name = alert["username"] or alert["user_id"]
+            users[name] = users.get(name, 0) + 1
+        summary = QLabel(
+            f"{len(alerts)} alerte(s) pour {len(users)} utilisateur(s)"
+            + (
+                ": " + ", ".join(f"{name} ({count})" for name, count in users.items())
+                if users
+                else ""
+            )
+        )
+        summary.setWordWrap(True)
+        layout.addWidget(summary)
+
+        # Tableau des alertes, les plus récentes d'abord
+        table = QTableWidget()
+        table.setColumnCount(6)
+        table.setHorizontalHeaderLabels(
+            ["Date", "Utilisateur", "Alerte", "IP", "Lieu", "Détails"]
+        )
+        table.horizontalHeader().setSectionResizeMode(QHeaderView.Interactive)
+        table.horizontalHeader().setStretchLastSection(True)
+
+        for i, alert in enumerate(alerts):
+            table.insertRow(i)
+            table.setItem(
+                i, 0, QTableWidgetItem(alert["detected_at"][:19].replace("T", " "))
+            )
+            table.setItem(
+                i, 1, QTableWidgetItem(alert["username"] or alert["user_id"] or "")
+            )
+            table.setItem(
+                i, 2, QTableWidgetItem(ALERT_LABELS.get(alert["kind"], alert["kind"]))
+            )
+            table.setItem(i, 3, QTableWidgetItem(alert["ip_address"] or ""))
+            table.setItem(i, 4, QTableWidgetItem(alert["location"] or "Inconnu"))
+            table.setItem(i, 5, QTableWidgetItem(alert["details"] or ""))
+
+        # Activer le tri pour ce tableau, par date décroissante
+        self.enable_sorting_for_table(table)
+        table.sortItems(0, Qt.DescendingOrder)
+        table.resizeColumnsToContents()
+
+        layout.addWidget(table)
+
+        return tab
+
     def create_geolocation_tab(self, period=None):
         """Créer l'onglet de géolocalisation IP"""
         from PyQt5.QtWebEngineWidgets import QWebEngineView
@@ -790,15 +1011,16 @@ class StatisticsDialog(QDialog):
         if period is None:
             ip_stats = self.db.get_ip_stats()
         elif "days" in period:
-            ip_stats = self.db.get_ip_stats(days=period["days"])
+            ip_stats = self.db.get_ip_stats(
+                days=period["days"], server_id=period.get("server_id")
+            )
         else:
             ip_stats = self.db.get_ip_stats(
-                start_date=period["start_date"], end_date=period["end_date"]
+                start_date=period["start_date"],
+                end_date=period["end_date"],
+                server_id=period.get("server_id"),
             )
 
-        # Récupérer les statistiques des IPs
-        ip_stats = self.db.get_ip_stats()
-
         # Initialiser le localisateur d'IP
         locator = GeoIPLocator()
 
@@ -3,8 +3,8 @@ import logging
 import os
 from PyQt5.QtWidgets import (
     QDialog,
-    QTableWidget,
-    QTableWidgetItem,
+    QTableView,
+    QAbstractItemView,
     QVBoxLayout,
     QPushButton,
     QHBoxLayout,
@@ -19,10 +19,11 @@ from PyQt5.QtWidgets import (
     QComboBox,
 )
 from PyQt5.QtCore import Qt
-from PyQt5.QtGui import QBrush, QColor
 from data.database import PlexPatrolDB
+from ui.models.users_model import UsersTableModel, UsersFilterProxyModel
+from ui.widgets.button_delegate import ButtonDelegate
 from ui.widgets.phone_field import PhoneNumberEdit
-from utils.constants import UIMessages, TableColumns, LogMessages
+from utils.constants import UIMessages, LogMessages
 
 
 class UserManagementDialog(QDialog):
@@ -63,22 +64,45 @@ class UserManagementDialog(QDialog):
         filter_layout.addWidget(self.show_disabled_check)
         filter_layout.addStretch(1)
 
+        # Recherche appliquée par le proxy, sans recharger les données
+        self.search_edit = QLineEdit()
+        self.search_edit.setPlaceholderText("Rechercher un utilisateur...")
+        self.search_edit.setClearButtonEnabled(True)
+        filter_layout.addWidget(self.search_edit)
+
         group_layout.addLayout(filter_layout)
 
-        self.users_table = QTableWidget()
-        self.users_table.setColumnCount(9)
-        self.users_table.setHorizontalHeaderLabels(TableColumns.USERS)
+        # Modèle des utilisateurs et proxy de tri/filtrage
+        self.users_model = UsersTableModel(self)
+        self.users_model.edit_requested.connect(self.on_cell_edited)
+        self.users_proxy = UsersFilterProxyModel(self)
+        self.users_proxy.setSourceModel(self.users_model)
+        self.search_edit.textChanged.connect(self.users_proxy.set_search_text)
+
+        self.users_table = QTableView()
+        self.users_table.setModel(self.users_proxy)
         self.users_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
-        self.users_table.setSelectionBehavior(QTableWidget.SelectRows)
-        self.users_table.setSelectionMode(QTableWidget.ExtendedSelection)
-        self.users_table.itemSelectionChanged.connect(self.on_user_selected)
+        self.users_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.users_table.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.users_table.verticalHeader().setVisible(False)
+        self.users_table.selectionModel().selectionChanged.connect(
+            self.on_user_selected
+        )
 
-        # Activer le tri du tableau
+        # Bouton de suppression dessiné par un délégué
+        self.delete_delegate = ButtonDelegate(UIMessages.BTN_DELETE, self.users_table)
+        self.delete_delegate.clicked.connect(self.delete_user)
+        self.users_table.setItemDelegateForColumn(
+            UsersTableModel.ACTIONS_COLUMN, self.delete_delegate
+        )
+
+        # Activer le tri du tableau (par nom d'utilisateur)
         self.users_table.setSortingEnabled(True)
+        self.users_table.sortByColumn(0, Qt.AscendingOrder)
 
         # Activer l'édition directe sur double-clic dans le tableau
         self.users_table.setEditTriggers(
-            QTableWidget.DoubleClicked | QTableWidget.EditKeyPressed
+            QAbstractItemView.DoubleClicked | QAbstractItemView.EditKeyPressed
         )
 
         group_layout.addWidget(self.users_table)
@@ -129,7 +153,7 @@ class UserManagementDialog(QDialog):
         buttons_layout = QHBoxLayout()
 
         refresh_btn = QPushButton(UIMessages.BTN_REFRESH)
-        refresh_btn.clicked.connect(self.load_users)
+        refresh_btn.clicked.connect(lambda: self.load_users())
         buttons_layout.addWidget(refresh_btn)
 
         bulk_edit_btn = QPushButton("Édition en masse")
@@ -153,260 +177,137 @@ class UserManagementDialog(QDialog):
         layout.addLayout(buttons_layout)
 
         # Charger les utilisateurs
-        self.load_users(include_disabled=False)
+        self.load_users()
 
-    def load_users(self, include_disabled=False):
+    def load_users(self):
         """Charger les utilisateurs depuis la base de données"""
-        # Déconnecter l'ancien signal si existant pour éviter les connexions multiples
         try:
-            self.users_table.itemChanged.disconnect(self.on_cell_edited)
-        except Exception as e:
-            # Log l'erreur mais continue l'exécution
-            logging.debug(f"Impossible de déconnecter le signal: {str(e)}")
-
-        # Désactiver la détection des changements pendant le chargement
-        self._editing = False
-
-        try:
-            # Utiliser la nouvelle méthode qui récupère tous les utilisateurs
-            users = self.db.get_all_users(include_disabled=include_disabled)
-
-            # Désactiver temporairement le tri
-            self.users_table.setSortingEnabled(False)
-
-            self.users_table.setRowCount(0)
-
-            for row, user in enumerate(users):
-                # Accéder aux clés du dictionnaire plutôt qu'aux indices
-                username = user.get("username", "Inconnu")
-                user_id = user.get("id", "")
-                phone = user.get("phone", "")
-                max_streams = user.get("max_streams", 1)
-                is_whitelisted = "Oui" if user.get("is_whitelisted", 0) else "Non"
-                is_disabled = "Oui" if user.get("is_disabled", 0) else "Non"
-                total_sessions = user.get("total_sessions", 0)
-                kill_count = user.get("terminated_sessions", 0)
-                last_activity = user.get("last_seen", "Jamais")
-
-                self.users_table.insertRow(row)
-
-                # Créer l'élément et stocker l'ID utilisateur
-                username_item = QTableWidgetItem(username)
-                username_item.setData(Qt.UserRole, user_id)
-                self.users_table.setItem(row, 0, username_item)
-
-                self.users_table.setItem(row, 1, QTableWidgetItem(phone))
-
-                max_streams_item = QTableWidgetItem()
-                max_streams_item.setData(Qt.DisplayRole, max_streams)
-                self.users_table.setItem(row, 2, max_streams_item)
-
-                self.users_table.setItem(row, 3, QTableWidgetItem(is_whitelisted))
-
-                self.users_table.setItem(row, 4, QTableWidgetItem(is_disabled))
-
-                total_sessions_item = QTableWidgetItem()
-                total_sessions_item.setData(Qt.DisplayRole, total_sessions)
-                self.users_table.setItem(row, 5, total_sessions_item)
-
-                kill_count_item = QTableWidgetItem()
-                kill_count_item.setData(Qt.DisplayRole, kill_count)
-                self.users_table.setItem(row, 6, kill_count_item)
-
-                self.users_table.setItem(row, 7, QTableWidgetItem(last_activity))
-
-                # Ajouter le bouton de suppression
-                delete_button = QPushButton("Supprimer")
-                delete_button.setProperty("username", username)
-                delete_button.clicked.connect(self.delete_user)
-
-                self.users_table.setCellWidget(row, 8, delete_button)
-
-                # Vérifier si l'utilisateur est désactivé
-                if user.get("is_disabled", 0):
-                    for col in range(
-                        self.users_table.columnCount() - 1
-                    ):  # Sauf le bouton supprimer
-                        item = self.users_table.item(row, col)
-                        item.setForeground(QBrush(QColor(128, 128, 128)))  # Texte grisé
-
-            # Réactiver le tri après avoir chargé toutes les données
-            self.users_table.setSortingEnabled(True)
-
-            # Réactiver la détection des changements
-            self._editing = True
-
-            # Trier automatiquement par nom d'utilisateur (colonne 0) en ordre croissant
-            self.users_table.sortItems(0, Qt.AscendingOrder)
-
-            # Connecter le signal itemChanged une fois les données chargées
-            self.users_table.itemChanged.connect(self.on_cell_edited)
-
+            # Tous les utilisateurs sont chargés, le proxy masque les désactivés
+            users = self.db.get_all_users(include_disabled=True)
+            self.users_model.load_users(users)
+            self.save_btn.setEnabled(False)
         except Exception as e:
             QMessageBox.critical(
                 self, "Erreur", f"Impossible de charger les utilisateurs: {str(e)}"
             )
             logging.error(f"Erreur lors du chargement des utilisateurs: {str(e)}")
-            self._editing = True  # Réactiver pour éviter de bloquer l'interface
 
-    def on_user_selected(self):
+    def selected_user_ids(self):
+        """Retourner les IDs des utilisateurs sélectionnés (ordre d'affichage)"""
+        user_ids = []
+        for proxy_index in self.users_table.selectionModel().selectedRows(0):
+            source_index = self.users_proxy.mapToSource(proxy_index)
+            user = self.users_model.user_at(source_index.row())
+            if user and user.get("id"):
+                user_ids.append(user["id"])
+        return user_ids
+
+    def on_user_selected(self, *args):
         """Réagir lorsqu'un utilisateur est sélectionné"""
-        selected_rows = self.users_table.selectedItems()
-        if selected_rows:
-            row = selected_rows[0].row()
-            user_id = self.users_table.item(row, 0).data(Qt.UserRole)
-
-            # Récupérer les détails complets de l'utilisateur
-            user_details = self.db.get_user_details(user_id) if user_id else None
-
-            if user_details:
-                self.username_edit.setText(user_details.get("username", ""))
-                self.max_streams_spin.setValue(user_details.get("max_streams", 2))
-                self.whitelist_check.setChecked(
-                    bool(user_details.get("is_whitelisted", 0))
-                )
-                self.disabled_check.setChecked(bool(user_details.get("is_disabled", 0)))
-                self.email_edit.setText(user_details.get("email", "") or "")
-                self.phone_edit.setText(user_details.get("phone", "") or "")
-                self.notes_edit.setText(user_details.get("notes", "") or "")
+        user_ids = self.selected_user_ids()
+        if not user_ids:
+            self.save_btn.setEnabled(False)
+            return
 
-                # Activer le bouton de sauvegarde
-                self.save_btn.setEnabled(True)
+        # Récupérer les détails complets de l'utilisateur
+        user_details = self.db.get_user_details(user_ids[0])
 
-    def on_cell_edited(self, item):
-        """Traite l'édition directe d'une cellule du tableau"""
-        # Éviter le traitement pendant le chargement initial des données
-        if not hasattr(self, "_editing") or not self._editing:
-            return
+        if user_details:
+            self.username_edit.setText(user_details.get("username", ""))
+            self.max_streams_spin.setValue(user_details.get("max_streams", 2))
+            self.whitelist_check.setChecked(bool(user_details.get("is_whitelisted", 0)))
+            self.disabled_check.setChecked(bool(user_details.get("is_disabled", 0)))
+            self.email_edit.setText(user_details.get("email", "") or "")
+            self.phone_edit.setText(user_details.get("phone", "") or "")
+            self.notes_edit.setText(user_details.get("notes", "") or "")
 
-        row = item.row()
-        col = item.column()
-        new_value = item.text()
+            # Activer le bouton de sauvegarde
+            self.save_btn.setEnabled(True)
 
-        # Ignorer les colonnes non éditables
-        if col in [5, 6, 7, 8]:
+    def on_cell_edited(self, user_id, col, new_value):
+        """Traite l'édition directe d'une cellule du tableau"""
+        user = self.users_model.get_user(user_id)
+        if user is None:
             return
 
-        user_id = self.users_table.item(row, 0).data(Qt.UserRole)
-        username = self.users_table.item(row, 0).text()
+        username = user.get("username", "")
+        new_value = str(new_value).strip()
 
         try:
             if col == 0:  # Nom d'utilisateur
-                # Mettre à jour seulement le nom d'utilisateur
-                self.db.add_or_update_user(user_id, new_value)
+                # Conserver les autres champs pour ne pas les écraser
+                if self.db.add_or_update_user(
+                    user_id,
+                    new_value,
+                    email=user.get("email"),
+                    phone=user.get("phone"),
+                    notes=user.get("notes"),
+                ):
+                    self.users_model.update_user(user_id, username=new_value)
 
             elif col == 1:  # Téléphone
-                # Mettre à jour le numéro de téléphone
-                self.db.add_or_update_user(user_id, username, phone=new_value)
+                if self.db.add_or_update_user(
+                    user_id,
+                    username,
+                    email=user.get("email"),
+                    phone=new_value,
+                    notes=user.get("notes"),
+                ):
+                    self.users_model.update_user(user_id, phone=new_value)
 
             elif col == 2:  # Max streams
                 try:
-                    max_streams = int(new_value)
-                    if max_streams < 1:
-                        max_streams = 1
-                    elif max_streams > 10:
-                        max_streams = 10
-
-                    self.db.add_or_update_user(
-                        user_id, username, max_streams=max_streams
-                    )
-                    # Mettre à jour l'affichage avec la valeur validée
-                    item.setData(Qt.DisplayRole, max_streams)
+                    max_streams = min(10, max(1, int(new_value)))
                 except ValueError:
-                    # Si la conversion en entier échoue, restaurer l'ancienne valeur
                     QMessageBox.warning(
                         self,
                         "Erreur",
                         "Le nombre maximum de flux doit être un nombre entier.",
                     )
-                    self.load_users(
-                        include_disabled=self.show_disabled_check.isChecked()
-                    )
                     return
 
+                if self.db.add_or_update_user(
+                    user_id,
+                    username,
+                    email=user.get("email"),
+                    phone=user.get("phone"),
+                    notes=user.get("notes"),
+                    max_streams=max_streams,
+                ):
+                    self.users_model.update_user(user_id, max_streams=max_streams)
+
             elif col == 3:  # Whitelist
                 is_whitelisted = (
                     1 if new_value.lower() in ["oui", "yes", "1", "true"] else 0
                 )
-                self.db.set_user_whitelist_status(user_id, is_whitelisted)
-                # Assurer une représentation cohérente
-                item.setText("Oui" if is_whitelisted else "Non")
+                if self.db.set_user_whitelist_status(user_id, is_whitelisted):
+                    self.users_model.update_user(user_id, is_whitelisted=is_whitelisted)
 
             elif col == 4:  # Disabled
                 is_disabled = (
                     1 if new_value.lower() in ["oui", "yes", "1", "true"] else 0
                 )
-                self.db.set_user_disabled_status(user_id, is_disabled)
-
-                # Assurer une représentation cohérente avant le rechargement
-                item.setText("Oui" if is_disabled else "Non")
-
-                # Mémoriser la position de défilement
-                scrollbar_pos = self.users_table.verticalScrollBar().value()
-
-                # Recharger la liste avec le paramètre d'affichage actuel
-                include_disabled = self.show_disabled_check.isChecked()
-                self.load_users(include_disabled=include_disabled)
-
-                # Restaurer la position de défilement
-                self.users_table.verticalScrollBar().setValue(scrollbar_pos)
-                return  # Sortir car la liste a été rechargée
+                # Le proxy masque la ligne si nécessaire, sans rechargement
+                if self.db.set_user_disabled_status(user_id, is_disabled):
+                    self.users_model.update_user(user_id, is_disabled=is_disabled)
 
         except Exception as e:
             QMessageBox.warning(
                 self, "Erreur de mise à jour", f"Impossible de mettre à jour: {str(e)}"
             )
-            # Recharger pour restaurer les valeurs d'origine
-            self.load_users(include_disabled=self.show_disabled_check.isChecked())
 
     def on_show_disabled_toggled(self, checked):
         """Affiche ou masque les utilisateurs désactivés sans reconstruire tout le tableau"""
-        # Désactiver temporairement le signal itemChanged pour éviter les effets en cascade
-        try:
-            self.users_table.itemChanged.disconnect(self.on_cell_edited)
-        except:
-            # Journaliser l'erreur si le signal n'était pas connecté
-            logging.debug(f"Impossible de déconnecter le signal itemChanged: {str(e)}")
-            pass
-
-        # Mémoriser la position de défilement
-        scrollbar_pos = self.users_table.verticalScrollBar().value()
-
-        # Charger les utilisateurs avec l'option d'affichage des désactivés
-        self.load_users(include_disabled=checked)
-
-        # Reconnecter le signal après le chargement
-        self.users_table.itemChanged.connect(self.on_cell_edited)
-
-        # Restaurer la position de défilement
-        self.users_table.verticalScrollBar().setValue(scrollbar_pos)
+        self.users_proxy.set_show_disabled(checked)
 
     def bulk_edit_selected(self):
         """Modifier en masse les utilisateurs sélectionnés"""
-        # Récupérer les lignes sélectionnées
-        selected_items = self.users_table.selectedItems()
+        selected_ids = self.selected_user_ids()
 
-        if not selected_items:
+        if not selected_ids:
             QMessageBox.warning(self, "Attention", "Aucun utilisateur sélectionné")
             return
 
-        # Récupérer les lignes et identifiants uniques des utilisateurs sélectionnés
-        selected_users = {}  # {user_id: (row, username)}
-        for item in selected_items:
-            row = item.row()
-            user_id = self.users_table.item(row, 0).data(Qt.UserRole)
-            username = self.users_table.item(row, 0).text()
-            if user_id not in selected_users:
-                selected_users[user_id] = (row, username)
-
-        if not selected_users:
-            QMessageBox.warning(
-                self,
-                "Attention",
-                "Impossible de récupérer les identifiants des utilisateurs",
-            )
-            return
-
         # Créer une boîte de dialogue pour l'édition en masse
         dialog = QDialog(self)
         dialog.setWindowTitle("Édition en masse")
@@ -452,9 +353,7 @@ class UserManagementDialog(QDialog):
         layout.addLayout(form_layout)
 
         # Informations sur la sélection
-        user_count_label = QLabel(
-            f"{len(selected_users)} utilisateur(s) sélectionné(s)"
-        )
+        user_count_label = QLabel(f"{len(selected_ids)} utilisateur(s) sélectionné(s)")
         layout.addWidget(user_count_label)
 
         # Boutons
@@ -472,192 +371,140 @@ class UserManagementDialog(QDialog):
         apply_btn.clicked.connect(dialog.accept)
 
         # Afficher la boîte de dialogue
-        if dialog.exec_() == QDialog.Accepted:
-            # Appliquer les modifications
-            modified_count = 0
+        if dialog.exec_() != QDialog.Accepted:
+            return
 
-            # Désactiver le signal de changement pour éviter les mises à jour multiples
-            try:
-                self.users_table.itemChanged.disconnect(self.on_cell_edited)
-            except Exception as e:
-                logging.debug(
-                    f"Impossible de déconnecter le signal itemChanged: {str(e)}"
-                )
+        modified_count = 0
 
-            # Mémoriser la position de défilement
-            scrollbar_pos = self.users_table.verticalScrollBar().value()
-
-            for user_id, (row, username) in selected_users.items():
-                changes_made = False
-
-                # Modifier max_streams si demandé
-                if max_streams_check.isChecked():
-                    max_streams = max_streams_spin.value()
-                    if self.db.add_or_update_user(
-                        user_id, username, max_streams=max_streams
-                    ):
-                        # Mettre à jour la cellule correspondante si elle est visible
-                        try:
-                            # Trouver l'élément dans le tableau (peut avoir changé après tri)
-                            for i in range(self.users_table.rowCount()):
-                                item_id = self.users_table.item(i, 0).data(Qt.UserRole)
-                                if item_id == user_id:
-                                    self.users_table.item(i, 2).setData(
-                                        Qt.DisplayRole, max_streams
-                                    )
-                                    break
-                        except Exception as e:
-                            logging.debug(
-                                f"Erreur lors de la mise à jour de la cellule : {str(e)}"
-                            )
-                            pass
-                        changes_made = True
-
-                # Modifier whitelist si demandé
-                if whitelist_check.isChecked():
-                    is_whitelisted = whitelist_options.currentText() == "Oui"
-                    if self.db.set_user_whitelist_status(user_id, is_whitelisted):
-                        try:
-                            # Trouver l'élément dans le tableau (peut avoir changé après tri)
-                            for i in range(self.users_table.rowCount()):
-                                item_id = self.users_table.item(i, 0).data(Qt.UserRole)
-                                if item_id == user_id:
-                                    self.users_table.item(i, 3).setText(
-                                        "Oui" if is_whitelisted else "Non"
-                                    )
-                                    break
-                        except:
-                            pass
-                        changes_made = True
-
-                # Modifier disabled si demandé
-                if disabled_check.isChecked():
-                    is_disabled = disabled_options.currentText() == "Oui"
-                    if self.db.set_user_disabled_status(user_id, is_disabled):
-                        try:
-                            # Trouver l'élément dans le tableau (peut avoir changé après tri)
-                            for i in range(self.users_table.rowCount()):
-                                item_id = self.users_table.item(i, 0).data(Qt.UserRole)
-                                if item_id == user_id:
-                                    self.users_table.item(i, 4).setText(
-                                        "Oui" if is_disabled else "Non"
-                                    )
-                                    break
-                        except:
-                            pass
-                        changes_made = True
-
-                if changes_made:
-                    modified_count += 1
-
-            # Recharger complètement la liste pour s'assurer que tout est cohérent
-            include_disabled = self.show_disabled_check.isChecked()
-            self.load_users(include_disabled=include_disabled)
-
-            # Restaurer la position de défilement
-            self.users_table.verticalScrollBar().setValue(scrollbar_pos)
-
-            if modified_count > 0:
-                QMessageBox.information(
-                    self, "Succès", f"{modified_count} utilisateur(s) modifié(s)"
-                )
-            else:
-                QMessageBox.warning(
-                    self, "Information", "Aucun utilisateur n'a été modifié"
-                )
+        for user_id in selected_ids:
+            user = self.users_model.get_user(user_id)
+            if user is None:
+                continue
 
-    def save_user(self):
-        """Enregistrer les modifications de l'utilisateur"""
-        selected_rows = self.users_table.selectedItems()
-        if selected_rows:
-            row = selected_rows[0].row()
-            user_id = self.users_table.item(row, 0).data(Qt.UserRole)
-            username = (
-                self.username_edit.text()
-            )  # Récupérer le nouveau nom d'utilisateur
-
-            if user_id:
-                max_streams = self.max_streams_spin.value()
-                is_whitelisted = self.whitelist_check.isChecked()
-                is_disabled = self.disabled_check.isChecked()
-                email = self.email_edit.text()
-
-                # S'assurer que le numéro de téléphone est correctement formaté avant de sauvegarder
-                self.phone_edit.format_phone_number()
-                phone = self.phone_edit.text()
-
-                notes = self.notes_edit.text()
-
-                # Mettre à jour l'utilisateur avec les informations de base
-                success = self.db.add_or_update_user(
+            changes = {}
+
+            # Modifier max_streams si demandé
+            if max_streams_check.isChecked():
+                max_streams = max_streams_spin.value()
+                if self.db.add_or_update_user(
                     user_id,
-                    username,
-                    email=email,
-                    phone=phone,
-                    notes=notes,
+                    user.get("username", ""),
+                    email=user.get("email"),
+                    phone=user.get("phone"),
+                    notes=user.get("notes"),
                     max_streams=max_streams,
-                )
-
-                # Mettre à jour spécifiquement les statuts whitelist et disabled
-                if success:
-                    whitelist_success = self.db.set_user_whitelist_status(
-                        user_id, is_whitelisted
-                    )
-                    disabled_success = self.db.set_user_disabled_status(
-                        user_id, is_disabled
-                    )
+                ):
+                    changes["max_streams"] = max_streams
+
+            # Modifier whitelist si demandé
+            if whitelist_check.isChecked():
+                is_whitelisted = 1 if whitelist_options.currentText() == "Oui" else 0
+                if self.db.set_user_whitelist_status(user_id, is_whitelisted):
+                    changes["is_whitelisted"] = is_whitelisted
+
+            # Modifier disabled si demandé
+            if disabled_check.isChecked():
+                is_disabled = 1 if disabled_options.currentText() == "Oui" else 0
+                if self.db.set_user_disabled_status(user_id, is_disabled):
+                    changes["is_disabled"] = is_disabled
+
+            # Mise à jour sur place via l'index id -> ligne
+            if changes:
+                self.users_model.update_user(user_id, **changes)
+                modified_count += 1
+
+        if modified_count > 0:
+            QMessageBox.information(
+                self, "Succès", f"{modified_count} utilisateur(s) modifié(s)"
+            )
+        else:
+            QMessageBox.warning(self, "Information", "Aucun utilisateur n'a été modifié")
 
-                    if whitelist_success and disabled_success:
-                        # Mémoriser la position de défilement
-                        scrollbar_pos = self.users_table.verticalScrollBar().value()
+    def save_user(self):
+        """Enregistrer les modifications de l'utilisateur"""
+        selected_ids = self.selected_user_ids()
+        if not selected_ids:
+            return
 
-                        # Recharger la liste avec le paramètre d'affichage actuel
-                        include_disabled = self.show_disabled_check.isChecked()
-                        self.load_users(include_disabled=include_disabled)
+        user_id = selected_ids[0]
+        username = self.username_edit.text()  # Récupérer le nouveau nom d'utilisateur
 
-                        # Restaurer la position de défilement
-                        self.users_table.verticalScrollBar().setValue(scrollbar_pos)
+        max_streams = self.max_streams_spin.value()
+        is_whitelisted = self.whitelist_check.isChecked()
+        is_disabled = self.disabled_check.isChecked()
+        email = self.email_edit.text()
 
-                        QMessageBox.information(
-                            self, UIMessages.TITLE_SUCCESS, UIMessages.USER_UPDATED
-                        )
-                    else:
-                        QMessageBox.warning(
-                            self, "Erreur", UIMessages.ERROR_UPDATE_USER
-                        )
-                else:
-                    QMessageBox.warning(self, "Erreur", UIMessages.ERROR_UPDATE_USER)
+        # S'assurer que le numéro de téléphone est correctement formaté avant de sauvegarder
+        self.phone_edit.format_phone_number()
+        phone = self.phone_edit.text()
 
-    def update_table_row(
-        self, row, user_id, username, phone, max_streams, is_whitelisted, is_disabled
-    ):
-        """Met à jour uniquement la ligne concernée dans le tableau sans recharger tout le tableau"""
-        # Désactiver temporairement le signal itemChanged pour éviter les effets en cascade
-        try:
-            self.users_table.itemChanged.disconnect(self.on_cell_edited)
-        except:
-            pass
+        notes = self.notes_edit.text()
 
-        # Mettre à jour les cellules individuellement
-        self.users_table.item(row, 0).setText(username)
-        self.users_table.item(row, 1).setText(phone)
+        # Mettre à jour l'utilisateur avec les informations de base
+        success = self.db.add_or_update_user(
+            user_id,
+            username,
+            email=email,
+            phone=phone,
+            notes=notes,
+            max_streams=max_streams,
+        )
 
-        max_streams_item = self.users_table.item(row, 2)
-        max_streams_item.setData(Qt.DisplayRole, max_streams)
+        # Mettre à jour spécifiquement les statuts whitelist et disabled
+        if success:
+            whitelist_success = self.db.set_user_whitelist_status(
+                user_id, is_whitelisted
+            )
+            disabled_success = self.db.set_user_disabled_status(user_id, is_disabled)
 
-        self.users_table.item(row, 3).setText("Oui" if is_whitelisted else "Non")
-        self.users_table.item(row, 4).setText("Oui" if is_disabled else "Non")
+            if whitelist_success and disabled_success:
+                self.update_table_row(
+                    user_id,
+                    username,
+                    phone,
+                    max_streams,
+                    is_whitelisted,
+                    is_disabled,
+                    email=email,
+                    notes=notes,
+                )
 
-        # Réactiver le signal itemChanged
-        self.users_table.itemChanged.connect(self.on_cell_edited)
+                QMessageBox.information(
+                    self, UIMessages.TITLE_SUCCESS, UIMessages.USER_UPDATED
+                )
+            else:
+                QMessageBox.warning(self, "Erreur", UIMessages.ERROR_UPDATE_USER)
+        else:
+            QMessageBox.warning(self, "Erreur", UIMessages.ERROR_UPDATE_USER)
 
-        # S'assurer que la ligne reste sélectionnée
-        self.users_table.selectRow(row)
+    def update_table_row(
+        self,
+        user_id,
+        username,
+        phone,
+        max_streams,
+        is_whitelisted,
+        is_disabled,
+        **extra_fields,
+    ):
+        """Met à jour uniquement la ligne concernée dans le tableau sans recharger tout le tableau"""
+        return self.users_model.update_user(
+            user_id,
+            username=username,
+            phone=phone,
+            max_streams=max_streams,
+            is_whitelisted=1 if is_whitelisted else 0,
+            is_disabled=1 if is_disabled else 0,
+            **extra_fields,
+        )
 
-    def delete_user(self):
+    def delete_user(self, proxy_index):
         """Supprimer un utilisateur de la base de données et de la configuration"""
-        sender = self.sender()
-        username = sender.property("username")
+        source_index = self.users_proxy.mapToSource(proxy_index)
+        user = self.users_model.user_at(source_index.row())
+        if user is None:
+            return
+        username = user.get("username", "")
 
         reply = QMessageBox.question(
             self,
@@ -681,8 +528,8 @@ class UserManagementDialog(QDialog):
                     with open(stats_path, "w", encoding="utf-8") as f:
                         json.dump(self.parent().stats, f)
 
-                # Recharger le tableau des utilisateurs
-                self.load_users()
+                # Retirer uniquement la ligne concernée
+                self.users_model.remove_user(user.get("id"))
 
                 QMessageBox.information(
                     self,
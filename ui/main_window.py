@@ -10,6 +10,8 @@ from PyQt5.QtWidgets import (
     QLabel,
     QTableWidget,
     QTableWidgetItem,
+    QTableView,
+    QAbstractItemView,
     QHeaderView,
     QTabWidget,
     QStatusBar,
@@ -22,13 +24,16 @@ from PyQt5.QtWidgets import (
     QDialog,
     QSizePolicy,
 )
-from PyQt5.QtCore import Qt, QTimer, QSize
-from PyQt5.QtGui import QIcon, QTextCursor
+from PyQt5.QtCore import Qt, QTimer, QSize, QSortFilterProxyModel
+from PyQt5.QtGui import QIcon
 
 # Importer les modules personnalisés
 from core import StreamMonitor
 from data.database import PlexPatrolDB
-from ui.dialogs import ConfigDialog, StatisticsDialog, MessageDialog
+from core.usage import format_bandwidth
+from ui.models import SessionsTableModel
+from ui.widgets.button_delegate import ButtonDelegate
+from ui.workers import AccountsLoader, StatsLoader
 from config.config_manager import config
 from utils import get_app_path
 from utils.constants import (
@@ -80,29 +85,34 @@ class PlexPatrolApp(QMainWindow):
 
         self.db = PlexPatrolDB()
 
+        # Remplis en arrière-plan par les threads de chargement
+        self.plex_users = {}
+        self.stats = {}
+        self.accounts_loader = None
+        self.stats_loader = None
+
         # Créer l'interface utilisateur
         self.setup_ui()
 
-        # Charger les utilisateurs Plex
-        self.load_plex_users()
-
         # Créer et démarrer le thread de surveillance
         self.stream_monitor = StreamMonitor(db_instance=self.db)
 
-        # Charger les statistiques
-        self.stats = self.load_stats()
-
-        # Charger les utilisateurs Plex
-        self.plex_users = {}
-
         # Connecter les signaux
         self.stream_monitor.new_log.connect(self.add_log)
         self.stream_monitor.sessions_updated.connect(self.update_sessions_table)
         self.stream_monitor.connection_status.connect(self.update_connection_status)
+        self.stream_monitor.usage_updated.connect(self.update_usage_summary)
 
-        # Démarrer la surveillance
+        # Onglet 5: Diagnostics, alimenté par les mesures du moteur de surveillance
+        self.tabs.addTab(self.create_diagnostics_tab(), UIMessages.TAB_DIAGNOSTICS)
+
+        # Démarrer la surveillance sans attendre les chargements ci-dessous
         self.stream_monitor.start()
 
+        # Charger les utilisateurs Plex et les statistiques en arrière-plan
+        self.load_plex_users()
+        self.refresh_stats(log=False)
+
         # Démarrer le timer maintenant que stream_monitor est initialisé
         self.refresh_timer.start(1000)  # Mise à jour chaque seconde
 
@@ -113,23 +123,30 @@ class PlexPatrolApp(QMainWindow):
         self.setup_tray_minimize_button()
 
     def load_plex_users(self):
-        """Charge la liste des utilisateurs Plex depuis le serveur"""
-        try:
-            from core.plex_api import get_plex_users
+        """Charge la liste des utilisateurs Plex depuis le serveur, en arrière-plan"""
+        if self.accounts_loader is not None and self.accounts_loader.isRunning():
+            return
+
+        self.accounts_loader = AccountsLoader(self)
+        self.accounts_loader.accounts_loaded.connect(self.on_plex_users_loaded)
+        self.accounts_loader.load_failed.connect(
+            lambda error: self.add_log(
+                f"Erreur lors du chargement des utilisateurs Plex: {error}", "ERROR"
+            )
+        )
+        self.accounts_loader.start()
 
-            self.plex_users = get_plex_users()
-            if self.plex_users:
-                self.add_log(
-                    f"Chargement de {len(self.plex_users)} utilisateurs Plex réussi",
-                    "SUCCESS",
-                )
-            else:
-                self.add_log(
-                    "Aucun utilisateur Plex trouvé ou erreur de connexion", "WARNING"
-                )
-        except Exception as e:
+    def on_plex_users_loaded(self, plex_users):
+        """Appelé lorsque les utilisateurs Plex ont été chargés"""
+        self.plex_users = plex_users
+        if self.plex_users:
             self.add_log(
-                f"Erreur lors du chargement des utilisateurs Plex: {str(e)}", "ERROR"
+                f"Chargement de {len(self.plex_users)} utilisateurs Plex réussi",
+                "SUCCESS",
+            )
+        else:
+            self.add_log(
+                "Aucun utilisateur Plex trouvé ou erreur de connexion", "WARNING"
             )
 
     def setup_ui(self):
@@ -154,10 +171,14 @@ class PlexPatrolApp(QMainWindow):
         # Onglet 3: Statistiques
         stats_tab = self.create_stats_tab()
 
+        # Onglet 4: Règles de limitation des flux
+        rules_tab = self.create_rules_tab()
+
         # Ajouter les onglets au widget principal
         self.tabs.addTab(sessions_tab, "Sessions actives")
         self.tabs.addTab(logs_tab, "Journal des événements")
         self.tabs.addTab(stats_tab, "Statistiques")
+        self.tabs.addTab(rules_tab, UIMessages.TAB_RULES)
 
         # Connecter le signal de changement d'onglet
         self.tabs.currentChanged.connect(self.on_tab_changed)
@@ -222,8 +243,10 @@ class PlexPatrolApp(QMainWindow):
         tab = QWidget()
         layout = QVBoxLayout(tab)
 
-        # Ajouter le compteur de rafraîchissement en haut
+        # Débit et transcodages en cours à gauche, compteur de rafraîchissement à droite
         refresh_layout = QHBoxLayout()
+        self.usage_label = QLabel()
+        refresh_layout.addWidget(self.usage_label)
         refresh_layout.addStretch()  # Pour pousser le label à droite
         refresh_layout.addWidget(self.refresh_counter_label)
         layout.addLayout(refresh_layout)
@@ -232,30 +255,38 @@ class PlexPatrolApp(QMainWindow):
         sessions_group = QGroupBox(UIMessages.GROUP_ACTIVE_SESSIONS)
         group_layout = QVBoxLayout(sessions_group)
 
-        self.sessions_table = QTableWidget()
-        self.sessions_table.setColumnCount(8)
+        # Modèle des sessions, trié via un proxy pour conserver sélection et défilement
+        self.sessions_model = SessionsTableModel(self)
+        self.sessions_proxy = QSortFilterProxyModel(self)
+        self.sessions_proxy.setSourceModel(self.sessions_model)
+        self.sessions_proxy.setDynamicSortFilter(True)
+        self.sessions_proxy.setSortRole(SessionsTableModel.SORT_ROLE)
+        self.update_server_names()
+
+        self.sessions_table = QTableView()
+        self.sessions_table.setModel(self.sessions_proxy)
 
         # Définir les noms des colonnes (pour référence interne)
-        self.column_names = [
-            "Utilisateur",
-            "Titre",
-            "Section",
-            "État",
-            "Appareil",
-            "Plateforme",
-            "IP",
-            "Actions",
-        ]
-        self.sessions_table.setHorizontalHeaderLabels(TableColumns.SESSIONS)
+        self.column_names = list(TableColumns.SESSIONS)
 
         # Configuration par défaut de la visibilité des colonnes (toutes visibles)
         self.column_visibility = [True] * len(self.column_names)
 
         self.sessions_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
-        self.sessions_table.setSelectionBehavior(QTableWidget.SelectRows)
+        self.sessions_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.sessions_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.sessions_table.verticalHeader().setVisible(False)
+
+        # Bouton d'arrêt dessiné par un délégué plutôt qu'un widget par ligne
+        self.stop_delegate = ButtonDelegate(UIMessages.BTN_STOP, self.sessions_table)
+        self.stop_delegate.clicked.connect(self.stop_session)
+        self.sessions_table.setItemDelegateForColumn(
+            SessionsTableModel.ACTIONS_COLUMN, self.stop_delegate
+        )
 
-        # Activer le tri
+        # Activer le tri (par défaut sur l'utilisateur)
         self.sessions_table.setSortingEnabled(True)
+        self.sessions_table.sortByColumn(0, Qt.AscendingOrder)
 
         # Ajouter le menu contextuel pour l'en-tête
         self.sessions_table.horizontalHeader().setContextMenuPolicy(
@@ -336,13 +367,27 @@ class PlexPatrolApp(QMainWindow):
         layout = QVBoxLayout(tab)
         logs_group = QGroupBox(UIMessages.GROUP_LOGS)
         logs_layout = QVBoxLayout(logs_group)
-        logs_widget = LogsWidget()
-        logs_layout.addWidget(logs_widget)
+        self.logs_widget = LogsWidget()
+        logs_layout.addWidget(self.logs_widget)
         layout.addWidget(logs_group)
-        self.log_text = logs_widget.log_text  # Pour maintenir la compatibilité
+        self.log_text = self.logs_widget.log_text  # Pour maintenir la compatibilité
 
         return tab
 
+    def create_rules_tab(self):
+        """Créer l'onglet des règles de limitation des flux"""
+        from ui.widgets.rules_widget import RulesWidget
+
+        self.rules_widget = RulesWidget(self.db)
+        return self.rules_widget
+
+    def create_diagnostics_tab(self):
+        """Créer l'onglet des durées de chaque étape du sondage"""
+        from ui.widgets.diagnostics_widget import DiagnosticsWidget
+
+        self.diagnostics_widget = DiagnosticsWidget(self.stream_monitor.timings)
+        return self.diagnostics_widget
+
     def create_stats_tab(self):
         """Créer l'onglet des statistiques"""
         tab = QWidget()
@@ -376,13 +421,17 @@ class PlexPatrolApp(QMainWindow):
         buttons_layout = QHBoxLayout()
 
         refresh_stats_btn = QPushButton("Rafraîchir")
-        refresh_stats_btn.clicked.connect(self.refresh_stats)
+        refresh_stats_btn.clicked.connect(lambda: self.refresh_stats())
         buttons_layout.addWidget(refresh_stats_btn)
 
         export_stats_btn = QPushButton("Exporter (CSV)")
         export_stats_btn.clicked.connect(self.export_stats)
         buttons_layout.addWidget(export_stats_btn)
 
+        export_history_btn = QPushButton(UIMessages.BTN_EXPORT_HISTORY)
+        export_history_btn.clicked.connect(self.export_history)
+        buttons_layout.addWidget(export_history_btn)
+
         reset_stats_btn = QPushButton("Réinitialiser")
         reset_stats_btn.clicked.connect(self.reset_stats)
         buttons_layout.addWidget(reset_stats_btn)
@@ -448,83 +497,45 @@ class PlexPatrolApp(QMainWindow):
 
     def add_log(self, message, level="INFO"):
         """Ajouter un message au journal des événements"""
-        current_time = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
-        log_message = f"[{current_time}] [{level}] {message}"
-
-        # Définir la couleur en fonction du niveau
-        color = "white"
-        if level == "ERROR":
-            color = "red"
-        elif level == "WARNING":
-            color = "orange"
-        elif level == "SUCCESS":
-            color = "lightgreen"
-
-        # Ajouter le message formaté
-        self.log_text.append(f'<span style="color:{color};">{log_message}</span>')
-
-        # Faire défiler vers le bas
-        self.log_text.moveCursor(QTextCursor.End)
+        # Le widget met les messages en tampon et les affiche par lots
+        self.logs_widget.add_log(message, level)
 
     def update_sessions_table(self, user_streams):
         """Mettre à jour le tableau des sessions actives"""
-        # Désactiver le tri pendant le remplissage
-        self.sessions_table.setSortingEnabled(False)
-        self.sessions_table.setRowCount(0)
-
-        row = 0
-        for user_id, streams in user_streams.items():
-            for stream in streams:
-                self.sessions_table.insertRow(row)
-
-                # Extraire les informations du stream
-                (
-                    session_id,
-                    ip_address,
-                    player_id,
-                    library_section,
-                    media_title,
-                    platform,
-                    product,
-                    device,
-                    username,
-                    state,
-                ) = stream
-
-                # Ajouter les informations dans le tableau
-                self.sessions_table.setItem(row, 0, QTableWidgetItem(username))
-                self.sessions_table.setItem(row, 1, QTableWidgetItem(media_title))
-                self.sessions_table.setItem(row, 2, QTableWidgetItem(library_section))
-                self.sessions_table.setItem(row, 3, QTableWidgetItem(state))
-                self.sessions_table.setItem(row, 4, QTableWidgetItem(device))
-                self.sessions_table.setItem(row, 5, QTableWidgetItem(platform))
-                self.sessions_table.setItem(row, 6, QTableWidgetItem(ip_address))
-
-                # Ajouter un bouton pour arrêter le stream
-                stop_button = QPushButton(UIMessages.BTN_STOP)
-                stop_button.setProperty("session_id", session_id)
-                stop_button.setProperty("username", username)
-                stop_button.setProperty("state", state)
-                stop_button.clicked.connect(self.stop_session)
-
-                self.sessions_table.setCellWidget(row, 7, stop_button)
-
-                row += 1
-
-        # Réactiver le tri après le remplissage
-        self.sessions_table.setSortingEnabled(True)
-
-        # Appliquer les paramètres de visibilité des colonnes
-        for i, is_visible in enumerate(self.column_visibility):
-            self.sessions_table.setColumnHidden(i, not is_visible)
+        # Le modèle n'applique que les différences, le proxy se charge du tri
+        self.sessions_model.update_sessions(user_streams)
 
         # Mettre à jour le titre de l'onglet pour indiquer le nombre de sessions
-        self.tabs.setTabText(0, f"Sessions actives ({row})")
-        self.sessions_table.sortItems(0, Qt.AscendingOrder)
+        self.tabs.setTabText(0, f"Sessions actives ({self.sessions_model.rowCount()})")
 
         # Réinitialiser le compteur de rafraîchissement
         self.reset_refresh_counter()
 
+    def update_usage_summary(self, usage):
+        """Afficher le débit et les transcodages en cours (moyennes et pics glissants)"""
+        total = usage.total
+        self.usage_label.setText(
+            UIMessages.USAGE_SUMMARY.format(
+                bandwidth=format_bandwidth(total.bandwidth),
+                average=format_bandwidth(total.average_bandwidth),
+                peak=format_bandwidth(total.peak_bandwidth),
+                transcodes=total.transcodes,
+                peak_transcodes=total.peak_transcodes,
+            )
+        )
+
+        # Détail par utilisateur au survol, plus gros débits en tête
+        lines = [
+            f"{entry.label}: {format_bandwidth(entry.bandwidth)} "
+            f"(pic {format_bandwidth(entry.peak_bandwidth)}), "
+            f"{entry.transcodes} transcodage(s)"
+            for entry in sorted(
+                usage.users.values(), key=lambda entry: entry.bandwidth, reverse=True
+            )
+            if entry.streams
+        ]
+        self.usage_label.setToolTip("\n".join(lines))
+
     def update_connection_status(self, is_connected):
         """Mettre à jour l'indicateur de connexion"""
         if is_connected:
@@ -551,12 +562,16 @@ class PlexPatrolApp(QMainWindow):
             # Redémarrer le compteur
             self.reset_refresh_counter()
 
-    def stop_session(self):
+    def stop_session(self, proxy_index):
         """Arrêter une session spécifique avec un message personnalisé"""
-        sender = self.sender()
-        session_id = sender.property("session_id")
-        username = sender.property("username")
-        state = sender.property("state")  # Récupérer l'état du flux
+        source_index = self.sessions_proxy.mapToSource(proxy_index)
+        user_id, stream = self.sessions_model.stream_at(source_index.row())
+        if stream is None:
+            return
+
+        session_id = stream[0]
+        username = stream[8]
+        state = stream[9]  # Récupérer l'état du flux
 
         # Demander confirmation
         reply = QMessageBox.question(
@@ -569,6 +584,8 @@ class PlexPatrolApp(QMainWindow):
 
         if reply == QMessageBox.Yes:
             # Ouvrir le dialogue pour saisir le message
+            from ui.dialogs.message_dialog import MessageDialog
+
             dialog = MessageDialog(self)
 
             if dialog.exec_() == QDialog.Accepted:
@@ -582,7 +599,7 @@ class PlexPatrolApp(QMainWindow):
                     elif state == "playing":
                         custom_message = UIMessages.TERMINATION_MESSAGE_PLAYING
                     else:
-                        custom_message = self.config.termination_message
+                        custom_message = config.termination_message
 
                 # Arrêter le flux avec le message personnalisé
                 success = self.stream_monitor.stop_stream_with_message(
@@ -605,8 +622,13 @@ class PlexPatrolApp(QMainWindow):
     def refresh_sessions(self):
         """Forcer la mise à jour des sessions actives"""
         try:
-            xml_data = self.stream_monitor.get_active_sessions()
-            user_streams = self.stream_monitor.parse_sessions(xml_data)
+            user_streams = self.stream_monitor.poll_sessions()
+            if user_streams is None:
+                self.add_log(
+                    "Aucun serveur Plex n'a répondu au rafraîchissement des sessions",
+                    "ERROR",
+                )
+                return
             self.update_sessions_table(user_streams)
             self.add_log(UIMessages.SESSIONS_REFRESHED, LogLevels.INFO)
         except Exception as e:
@@ -616,8 +638,7 @@ class PlexPatrolApp(QMainWindow):
 
     def clear_logs(self):
         """Effacer les logs affichés"""
-        self.log_text.clear()
-        self.add_log("Journal effacé", "INFO")
+        self.logs_widget.clear_logs()
 
     def save_logs(self):
         """Enregistrer les logs dans un fichier"""
@@ -631,7 +652,7 @@ class PlexPatrolApp(QMainWindow):
 
         try:
             with open(filepath, "w", encoding="utf-8") as f:
-                f.write(self.log_text.toPlainText())
+                f.write(self.logs_widget.to_plain_text())
 
             self.add_log(f"Logs enregistrés dans {filepath}", "SUCCESS")
         except Exception as e:
@@ -639,30 +660,49 @@ class PlexPatrolApp(QMainWindow):
 
     def show_config_dialog(self):
         """Afficher la boîte de dialogue de configuration"""
+        from ui.dialogs.config_dialog import ConfigDialog  # Importation à la demande
+
         dialog = ConfigDialog(self)
         if dialog.exec_():
+            self.update_server_names()
             self.add_log("Configuration mise à jour", "SUCCESS")
 
+    def update_server_names(self):
+        """Mettre à jour les noms de serveurs affichés dans le tableau des sessions"""
+        self.sessions_model.set_server_names(
+            {server["id"]: server["name"] for server in config.plex_servers}
+        )
+
     def show_stats_dialog(self):
         """Afficher la boîte de dialogue des statistiques"""
+        # QtChart et QtWebEngine ne sont chargés qu'à l'ouverture des statistiques
+        from ui.dialogs.stats_dialog import StatisticsDialog
+
         dialog = StatisticsDialog(self.stats, self.stream_monitor.db, self)
         dialog.exec_()
 
-    def refresh_stats(self):
-        """Rafraîchir l'affichage des statistiques"""
-        self.stats = self.load_stats()
-        self.update_stats_table()
-        self.add_log("Statistiques rafraîchies", "INFO")
+    def refresh_stats(self, log=True):
+        """Rafraîchir les statistiques en arrière-plan puis mettre à jour le tableau"""
+        if self.stats_loader is not None and self.stats_loader.isRunning():
+            return
 
-    def load_stats(self):
-        """Charger les statistiques depuis la base de données"""
-        try:
-            return self.db.get_user_stats()
-        except Exception as e:
-            self.add_log(
-                f"Erreur lors du chargement des statistiques: {str(e)}", "ERROR"
+        self.stats_loader = StatsLoader(self.db, self)
+        self.stats_loader.stats_loaded.connect(
+            lambda stats: self.on_stats_loaded(stats, log)
+        )
+        self.stats_loader.load_failed.connect(
+            lambda error: self.add_log(
+                f"Erreur lors du chargement des statistiques: {error}", "ERROR"
             )
-            return {}
+        )
+        self.stats_loader.start()
+
+    def on_stats_loaded(self, stats, log=True):
+        """Appelé lorsque les statistiques ont été calculées"""
+        self.stats = stats
+        self.update_stats_table()
+        if log:
+            self.add_log("Statistiques rafraîchies", "INFO")
 
     def update_stats_table(self):
         """Mettre à jour le tableau des statistiques"""
@@ -778,6 +818,13 @@ class PlexPatrolApp(QMainWindow):
                 LogLevels.ERROR,
             )
 
+    def export_history(self):
+        """Exporter l'historique brut des sessions sur une période"""
+        from ui.dialogs.export_dialog import ExportDialog  # Importation à la demande
+
+        dialog = ExportDialog(self.db, self)
+        dialog.exec_()
+
     def reset_stats(self):
         """Réinitialiser les statistiques"""
         reply = QMessageBox.question(
@@ -829,6 +876,12 @@ class PlexPatrolApp(QMainWindow):
                 self.stream_monitor.terminate()
                 self.stream_monitor.wait()
 
+            # Même traitement pour les chargements encore en cours
+            for loader in (self.accounts_loader, self.stats_loader):
+                if loader is not None and not loader.wait(1000):
+                    loader.terminate()
+                    loader.wait()
+
             # Fermer proprement la connexion à la base de données
             if hasattr(self.stream_monitor, "db"):
                 # S'assurer que toutes les connexions à la base de données sont fermées
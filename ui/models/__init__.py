@@ -0,0 +1,4 @@
+from ui.models.sessions_model import SessionsTableModel
+from ui.models.users_model import UsersTableModel, UsersFilterProxyModel
+
+__all__ = ["SessionsTableModel", "UsersTableModel", "UsersFilterProxyModel"]
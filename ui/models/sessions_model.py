@@ -0,0 +1,150 @@
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex
+from core.usage import format_bandwidth
+from utils.constants import TableColumns, UIMessages
+
+
+class SessionsTableModel(QAbstractTableModel):
+    """Modèle des sessions actives, indexé par session_id et mis à jour par deltas"""
+
+    # Position des champs du tuple de stream affichés dans chaque colonne
+    STREAM_FIELDS = [8, 4, 3, 9, 7, 5, 1, 13, 12, 10]
+    QUALITY_COLUMN = len(TableColumns.SESSIONS) - 4
+    BANDWIDTH_COLUMN = len(TableColumns.SESSIONS) - 3
+    SERVER_COLUMN = len(TableColumns.SESSIONS) - 2
+    ACTIONS_COLUMN = len(TableColumns.SESSIONS) - 1
+
+    # Valeur de tri: le débit est trié numériquement, pas sur son texte
+    SORT_ROLE = Qt.UserRole + 1
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._rows = []  # Liste de tuples (user_id, stream)
+        self._index = {}  # {session_id: row}
+        self._server_names = {}  # {server_id: nom affiché}
+
+    def set_server_names(self, server_names):
+        """Définir les noms affichés dans la colonne Serveur"""
+        self._server_names = dict(server_names)
+        if self._rows:
+            self.dataChanged.emit(
+                self.index(0, self.SERVER_COLUMN),
+                self.index(len(self._rows) - 1, self.SERVER_COLUMN),
+            )
+
+    # =====================================================
+    # API QAbstractTableModel
+    # =====================================================
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(TableColumns.SESSIONS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return TableColumns.SESSIONS[section]
+        return super().headerData(section, orientation, role)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self._rows):
+            return None
+
+        user_id, stream = self._rows[index.row()]
+        column = index.column()
+
+        if role == Qt.DisplayRole:
+            if column == self.ACTIONS_COLUMN:
+                return UIMessages.BTN_STOP
+            if column == self.SERVER_COLUMN:
+                server_id = stream.server_id
+                return self._server_names.get(server_id, server_id)
+            if column == self.QUALITY_COLUMN:
+                if stream.transcode:
+                    return f"{stream.quality or '?'} (transcodé)"
+                return stream.quality
+            if column == self.BANDWIDTH_COLUMN:
+                return format_bandwidth(stream.bandwidth) if stream.bandwidth else ""
+            return stream[self.STREAM_FIELDS[column]]
+        elif role == Qt.UserRole:
+            return stream[0]  # session_id
+        elif role == self.SORT_ROLE:
+            if column == self.BANDWIDTH_COLUMN:
+                return stream.bandwidth
+            return self.data(index, Qt.DisplayRole)
+
+        return None
+
+    # =====================================================
+    # MISE À JOUR PAR DELTAS
+    # =====================================================
+
+    def update_sessions(self, user_streams):
+        """
+        Appliquer les sessions reçues sous forme de deltas (suppressions,
+        modifications, insertions) plutôt que de reconstruire le tableau
+
+        Args:
+            user_streams (dict): {user_id: [stream, ...]} tel qu'émis par le moniteur
+        """
+        incoming = {}
+        for user_id, streams in user_streams.items():
+            for stream in streams:
+                incoming[stream[0]] = (user_id, stream)
+
+        # 1. Suppressions, par blocs contigus en partant de la fin
+        removed_rows = [
+            row
+            for session_id, row in self._index.items()
+            if session_id not in incoming
+        ]
+        if removed_rows:
+            removed_rows.sort(reverse=True)
+            block_end = block_start = removed_rows[0]
+            for row in removed_rows[1:] + [None]:
+                if row is not None and row == block_start - 1:
+                    block_start = row
+                    continue
+                self.beginRemoveRows(QModelIndex(), block_start, block_end)
+                del self._rows[block_start : block_end + 1]
+                self.endRemoveRows()
+                if row is not None:
+                    block_end = block_start = row
+            self._rebuild_index()
+
+        # 2. Modifications des lignes existantes
+        last_column = self.columnCount() - 1
+        for session_id, row in self._index.items():
+            entry = incoming.pop(session_id)
+            if self._rows[row] != entry:
+                self._rows[row] = entry
+                self.dataChanged.emit(
+                    self.index(row, 0), self.index(row, last_column)
+                )
+
+        # 3. Insertions des nouvelles sessions en fin de modèle
+        if incoming:
+            first = len(self._rows)
+            self.beginInsertRows(QModelIndex(), first, first + len(incoming) - 1)
+            for session_id, entry in incoming.items():
+                self._index[session_id] = len(self._rows)
+                self._rows.append(entry)
+            self.endInsertRows()
+
+    def _rebuild_index(self):
+        """Reconstruire l'index session_id -> ligne"""
+        self._index = {stream[0]: row for row, (_, stream) in enumerate(self._rows)}
+
+    def stream_at(self, row):
+        """Retourner (user_id, stream) pour une ligne du modèle source"""
+        if 0 <= row < len(self._rows):
+            return self._rows[row]
+        return None, None
+
+    def row_for_session(self, session_id):
+        """Retourner la ligne d'une session, ou None si elle n'est pas affichée"""
+        return self._index.get(session_id)
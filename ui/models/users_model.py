@@ -0,0 +1,198 @@
+from PyQt5.QtCore import (
+    Qt,
+    QAbstractTableModel,
+    QSortFilterProxyModel,
+    QModelIndex,
+    pyqtSignal,
+)
+from PyQt5.QtGui import QBrush, QColor
+from utils.constants import TableColumns, UIMessages
+
+
+class UsersTableModel(QAbstractTableModel):
+    """Modèle des utilisateurs avec index id -> ligne pour les mises à jour sur place"""
+
+    # Rôle utilisé par le proxy pour trier sur les valeurs brutes
+    SORT_ROLE = Qt.UserRole + 1
+
+    # Clé du dictionnaire utilisateur affichée dans chaque colonne
+    FIELDS = [
+        "username",
+        "phone",
+        "max_streams",
+        "is_whitelisted",
+        "is_disabled",
+        "total_sessions",
+        "terminated_sessions",
+        "last_seen",
+        None,  # Actions
+    ]
+    EDITABLE_COLUMNS = (0, 1, 2, 3, 4)
+    BOOLEAN_COLUMNS = (3, 4)
+    ACTIONS_COLUMN = len(FIELDS) - 1
+
+    # Émis lorsqu'une cellule est éditée: user_id, colonne, nouvelle valeur
+    edit_requested = pyqtSignal(str, int, object)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._users = []  # Liste de dictionnaires utilisateur
+        self._index = {}  # {user_id: row}
+
+    # =====================================================
+    # API QAbstractTableModel
+    # =====================================================
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._users)
+
+    def columnCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(TableColumns.USERS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return TableColumns.USERS[section]
+        return super().headerData(section, orientation, role)
+
+    def flags(self, index):
+        flags = super().flags(index)
+        if index.isValid() and index.column() in self.EDITABLE_COLUMNS:
+            flags |= Qt.ItemIsEditable
+        return flags
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self._users):
+            return None
+
+        user = self._users[index.row()]
+        column = index.column()
+        field = self.FIELDS[column]
+
+        if role in (Qt.DisplayRole, Qt.EditRole):
+            if column == self.ACTIONS_COLUMN:
+                return UIMessages.BTN_DELETE
+            value = user.get(field)
+            if column in self.BOOLEAN_COLUMNS:
+                return "Oui" if value else "Non"
+            if column == 7:
+                return value or "Jamais"
+            if value is None:
+                return 0 if column in (2, 5, 6) else ""
+            return value
+        elif role == self.SORT_ROLE:
+            if field is None:
+                return None
+            value = user.get(field)
+            if isinstance(value, str):
+                return value.lower()
+            return value if value is not None else 0
+        elif role == Qt.UserRole:
+            return user.get("id", "")
+        elif role == Qt.ForegroundRole:
+            if user.get("is_disabled") and column != self.ACTIONS_COLUMN:
+                return QBrush(QColor(128, 128, 128))  # Texte grisé
+
+        return None
+
+    def setData(self, index, value, role=Qt.EditRole):
+        """Transmettre l'édition au dialogue qui valide et enregistre en base"""
+        if role != Qt.EditRole or not index.isValid():
+            return False
+        if index.column() not in self.EDITABLE_COLUMNS:
+            return False
+
+        user_id = self._users[index.row()].get("id", "")
+        self.edit_requested.emit(user_id, index.column(), value)
+        return True
+
+    # =====================================================
+    # GESTION DES DONNÉES
+    # =====================================================
+
+    def load_users(self, users):
+        """Remplacer l'ensemble des utilisateurs (chargement initial ou synchronisation)"""
+        self.beginResetModel()
+        self._users = list(users)
+        self._rebuild_index()
+        self.endResetModel()
+
+    def _rebuild_index(self):
+        """Reconstruire l'index user_id -> ligne"""
+        self._index = {user.get("id"): row for row, user in enumerate(self._users)}
+
+    def user_at(self, row):
+        """Retourner le dictionnaire d'un utilisateur à partir de sa ligne source"""
+        if 0 <= row < len(self._users):
+            return self._users[row]
+        return None
+
+    def get_user(self, user_id):
+        """Retourner le dictionnaire d'un utilisateur à partir de son ID"""
+        row = self._index.get(user_id)
+        return self._users[row] if row is not None else None
+
+    def update_user(self, user_id, **fields):
+        """Mettre à jour un utilisateur sur place et notifier uniquement sa ligne"""
+        row = self._index.get(user_id)
+        if row is None:
+            return False
+
+        self._users[row].update(fields)
+        self.dataChanged.emit(
+            self.index(row, 0), self.index(row, self.columnCount() - 1)
+        )
+        return True
+
+    def remove_user(self, user_id):
+        """Retirer un utilisateur du modèle"""
+        row = self._index.get(user_id)
+        if row is None:
+            return False
+
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self._users[row]
+        self._rebuild_index()
+        self.endRemoveRows()
+        return True
+
+
+class UsersFilterProxyModel(QSortFilterProxyModel):
+    """Proxy de tri, de filtrage des comptes désactivés et de recherche"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.show_disabled = False
+        self.search_text = ""
+        self.setSortRole(UsersTableModel.SORT_ROLE)
+        self.setDynamicSortFilter(True)
+
+    def set_show_disabled(self, show_disabled):
+        """Afficher ou masquer les utilisateurs désactivés"""
+        self.show_disabled = bool(show_disabled)
+        self.invalidateFilter()
+
+    def set_search_text(self, text):
+        """Filtrer sur le nom d'utilisateur, le téléphone ou l'e-mail"""
+        self.search_text = (text or "").strip().lower()
+        self.invalidateFilter()
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        user = self.sourceModel().user_at(source_row)
+        if user is None:
+            return False
+
+        if not self.show_disabled and user.get("is_disabled"):
+            return False
+
+        if self.search_text:
+            haystack = " ".join(
+                str(user.get(key) or "") for key in ("username", "phone", "email")
+            ).lower()
+            if self.search_text not in haystack:
+                return False
+
+        return True
@@ -1,4 +1,13 @@
 from ui.widgets.phone_field import PhoneNumberEdit
 from ui.widgets.logs_widget import LogsWidget
+from ui.widgets.button_delegate import ButtonDelegate
+from ui.widgets.diagnostics_widget import DiagnosticsWidget
+from ui.widgets.rules_widget import RulesWidget
 
-__all__ = ["PhoneNumberEdit", "LogsWidget"]
+__all__ = [
+    "PhoneNumberEdit",
+    "LogsWidget",
+    "ButtonDelegate",
+    "DiagnosticsWidget",
+    "RulesWidget",
+]
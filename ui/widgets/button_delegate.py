@@ -0,0 +1,49 @@
+from PyQt5.QtWidgets import QStyledItemDelegate, QStyleOptionButton, QStyle, QApplication
+from PyQt5.QtCore import Qt, QEvent, QModelIndex, pyqtSignal
+
+
+class ButtonDelegate(QStyledItemDelegate):
+    """Délégué qui dessine un bouton dans une cellule sans créer de widget par ligne"""
+
+    clicked = pyqtSignal(QModelIndex)
+
+    def __init__(self, text, parent=None):
+        super().__init__(parent)
+        self.text = text
+        self._pressed_index = None
+
+    def _button_rect(self, option):
+        """Zone du bouton, légèrement en retrait par rapport à la cellule"""
+        return option.rect.adjusted(4, 2, -4, -2)
+
+    def paint(self, painter, option, index):
+        """Dessiner le bouton dans la cellule"""
+        button = QStyleOptionButton()
+        button.rect = self._button_rect(option)
+        button.text = index.data(Qt.DisplayRole) or self.text
+        button.state = QStyle.State_Enabled
+
+        if self._pressed_index is not None and self._pressed_index == index:
+            button.state |= QStyle.State_Sunken
+        else:
+            button.state |= QStyle.State_Raised
+
+        widget = option.widget
+        style = widget.style() if widget else QApplication.style()
+        style.drawControl(QStyle.CE_PushButton, button, painter, widget)
+
+    def editorEvent(self, event, model, option, index):
+        """Détecter les clics sur le bouton dessiné"""
+        if event.type() == QEvent.MouseButtonPress:
+            if self._button_rect(option).contains(event.pos()):
+                self._pressed_index = QModelIndex(index)
+                return True
+        elif event.type() == QEvent.MouseButtonRelease:
+            was_pressed = (
+                self._pressed_index is not None and self._pressed_index == index
+            )
+            self._pressed_index = None
+            if was_pressed and self._button_rect(option).contains(event.pos()):
+                self.clicked.emit(index)
+                return True
+        return super().editorEvent(event, model, option, index)
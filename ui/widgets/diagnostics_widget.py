@@ -0,0 +1,133 @@
+from datetime import datetime
+from PyQt5.QtWidgets import (
+    QWidget,
+    QVBoxLayout,
+    QHBoxLayout,
+    QGroupBox,
+    QLabel,
+    QPushButton,
+    QTableWidget,
+    QTableWidgetItem,
+    QHeaderView,
+    QAbstractItemView,
+)
+from PyQt5.QtCore import Qt, QTimer
+from core.diagnostics import STAGES, STAGE_LABELS
+from utils.constants import UIMessages, Defaults
+
+
+def _format_ms(seconds):
+    return f"{seconds * 1000:.1f}"
+
+
+class DiagnosticsWidget(QWidget):
+    """Durées par étape des cycles de sondage: percentiles, derniers cycles, plus lents"""
+
+    PERCENTILE_HEADERS = ["Étape", "p50", "p95", "p99"]
+
+    def __init__(self, timings, parent=None):
+        super().__init__(parent)
+        self.timings = timings
+
+        self.setup_ui()
+
+        # Rafraîchissement périodique, uniquement lorsque l'onglet est affiché
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setInterval(Defaults.DIAGNOSTICS_REFRESH_MS)
+        self.refresh_timer.timeout.connect(self.refresh)
+        self.refresh_timer.start()
+
+    def setup_ui(self):
+        """Configurer l'interface utilisateur"""
+        layout = QVBoxLayout(self)
+
+        header_layout = QHBoxLayout()
+        self.summary_label = QLabel()
+        header_layout.addWidget(self.summary_label)
+        header_layout.addStretch()
+        clear_btn = QPushButton("Réinitialiser")
+        clear_btn.clicked.connect(self.clear)
+        header_layout.addWidget(clear_btn)
+        layout.addLayout(header_layout)
+
+        cycle_headers = ["Heure", "Total"] + [STAGE_LABELS[stage] for stage in STAGES]
+
+        self.percentiles_table = self._create_table(self.PERCENTILE_HEADERS)
+        self.recent_table = self._create_table(cycle_headers)
+        self.slowest_table = self._create_table(cycle_headers)
+
+        for title, table in (
+            (UIMessages.GROUP_PERCENTILES, self.percentiles_table),
+            (UIMessages.GROUP_RECENT_CYCLES, self.recent_table),
+            (UIMessages.GROUP_SLOWEST_CYCLES, self.slowest_table),
+        ):
+            group = QGroupBox(title)
+            group_layout = QVBoxLayout(group)
+            group_layout.addWidget(table)
+            layout.addWidget(group)
+
+        self.refresh()
+
+    def _create_table(self, headers):
+        table = QTableWidget(0, len(headers))
+        table.setHorizontalHeaderLabels(headers)
+        table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        table.verticalHeader().setVisible(False)
+        table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        return table
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.refresh()
+
+    def clear(self):
+        """Oublier les cycles mesurés"""
+        self.timings.clear()
+        self.refresh()
+
+    def refresh(self):
+        """Recalculer les tableaux à partir du tampon des cycles"""
+        if not self.isVisible():
+            return
+
+        self.summary_label.setText(
+            UIMessages.DIAGNOSTICS_SUMMARY.format(count=len(self.timings))
+        )
+
+        percentiles = self.timings.percentiles()
+        rows = [(STAGE_LABELS[stage], percentiles[stage]) for stage in STAGES]
+        rows.append(("Total", percentiles["total"]))
+        self._fill_table(
+            self.percentiles_table,
+            [[label] + [_format_ms(value) for value in values] for label, values in rows],
+        )
+
+        self._fill_cycles(
+            self.recent_table, self.timings.recent(Defaults.DIAGNOSTICS_ROWS)
+        )
+        self._fill_cycles(
+            self.slowest_table, self.timings.slowest(Defaults.DIAGNOSTICS_ROWS)
+        )
+
+    def _fill_cycles(self, table, cycles):
+        self._fill_table(
+            table,
+            [
+                [
+                    datetime.fromtimestamp(cycle.started_at).strftime("%H:%M:%S"),
+                    _format_ms(cycle.total),
+                ]
+                + [_format_ms(cycle.stages[stage]) for stage in STAGES]
+                for cycle in cycles
+            ],
+        )
+
+    def _fill_table(self, table, rows):
+        table.setRowCount(len(rows))
+        for row, values in enumerate(rows):
+            for column, value in enumerate(values):
+                item = QTableWidgetItem(value)
+                if column > 0:
+                    item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                table.setItem(row, column, item)
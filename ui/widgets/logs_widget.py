@@ -1,30 +1,86 @@
 import os
+import html
+import time
+from collections import deque
 from datetime import datetime
 from utils import get_app_path
-from utils.constants import UIMessages, LogLevels, Paths
-from PyQt5.QtWidgets import QWidget, QVBoxLayout, QTextEdit, QPushButton, QHBoxLayout
-from PyQt5.QtCore import Qt, QTime
+from utils.constants import UIMessages, LogLevels, Defaults
+from PyQt5.QtWidgets import (
+    QWidget,
+    QVBoxLayout,
+    QPlainTextEdit,
+    QPushButton,
+    QHBoxLayout,
+    QComboBox,
+    QLineEdit,
+)
+from PyQt5.QtCore import QTimer
 from PyQt5.QtGui import QTextCursor
 
 
 class LogsWidget(QWidget):
     """Widget pour afficher les logs de l'application"""
 
-    def __init__(self, parent=None):
+    # Couleur associée à chaque niveau de log
+    LEVEL_COLORS = {
+        LogLevels.ERROR: "red",
+        LogLevels.WARNING: "orange",
+        LogLevels.SUCCESS: "lightgreen",
+    }
+    ALL_LEVELS = "Tous les niveaux"
+
+    def __init__(self, parent=None, max_lines=Defaults.LOG_MAX_LINES):
         super().__init__(parent)
+        self.max_lines = max_lines
+
+        # Tampon circulaire: source de vérité pour le filtrage et la recherche
+        self.buffer = deque(maxlen=max_lines)
+        # Messages reçus depuis le dernier affichage
+        self._pending = []
+
+        # Regroupement des messages sur un court délai
+        self.flush_timer = QTimer(self)
+        self.flush_timer.setSingleShot(True)
+        self.flush_timer.setInterval(Defaults.LOG_FLUSH_INTERVAL_MS)
+        self.flush_timer.timeout.connect(self.flush_pending)
+
         self.setup_ui()
 
     def setup_ui(self):
         """Configurer l'interface utilisateur"""
         layout = QVBoxLayout(self)
 
-        # Zone de texte pour les logs
-        self.log_text = QTextEdit()
+        # Filtres par niveau et recherche
+        filter_layout = QHBoxLayout()
+
+        self.level_combo = QComboBox()
+        self.level_combo.addItem(self.ALL_LEVELS)
+        for level in (
+            LogLevels.INFO,
+            LogLevels.SUCCESS,
+            LogLevels.WARNING,
+            LogLevels.ERROR,
+        ):
+            self.level_combo.addItem(level)
+        self.level_combo.currentIndexChanged.connect(self.render_buffer)
+        filter_layout.addWidget(self.level_combo)
+
+        self.search_edit = QLineEdit()
+        self.search_edit.setPlaceholderText("Rechercher dans le journal...")
+        self.search_edit.setClearButtonEnabled(True)
+        self.search_edit.textChanged.connect(self.render_buffer)
+        filter_layout.addWidget(self.search_edit)
+
+        layout.addLayout(filter_layout)
+
+        # Zone de texte pour les logs, limitée au nombre de lignes du tampon
+        self.log_text = QPlainTextEdit()
         self.log_text.setReadOnly(True)
-        self.log_text.setLineWrapMode(QTextEdit.NoWrap)
+        self.log_text.setLineWrapMode(QPlainTextEdit.NoWrap)
+        self.log_text.setMaximumBlockCount(self.max_lines)
         self.log_text.setStyleSheet(
             """
-            QTextEdit {
+            QPlainTextEdit {
                 background-color: #1e1e1e;
                 color: white;
                 font-family: Consolas, Monaco, monospace;
@@ -49,30 +105,91 @@ class LogsWidget(QWidget):
         layout.addLayout(buttons_layout)
 
     def add_log(self, message, level=LogLevels.INFO):
-        """Ajouter un message au journal des logs"""
-        current_time = QTime.currentTime().toString("hh:mm:ss")
-        log_message = f"[{current_time}] [{level}] {message}"
-
-        # Définir la couleur en fonction du niveau
-        color = "white"
-        if level == LogLevels.ERROR:
-            color = "red"
-        elif level == LogLevels.WARNING:
-            color = "orange"
-        elif level == LogLevels.SUCCESS:
-            color = "lightgreen"
-
-        # Ajouter le message formaté
-        self.log_text.append(f'<span style="color:{color};">{log_message}</span>')
+        """Ajouter un message au journal des logs (affiché au prochain lot)"""
+        current_time = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
+        entry = (current_time, level, str(message))
+
+        self.buffer.append(entry)
+        self._pending.append(entry)
+
+        if not self.flush_timer.isActive():
+            self.flush_timer.start()
+
+    def flush_pending(self):
+        """Afficher en une seule fois les messages reçus depuis le dernier lot"""
+        # Le tampon circulaire a pu évincer une partie des messages en attente
+        pending = self._pending[-self.max_lines :]
+        self._pending = []
+
+        visible = [entry for entry in pending if self._matches_filters(entry)]
+        if visible:
+            self._append_entries(visible)
+
+    def render_buffer(self, *args):
+        """Réafficher le tampon en appliquant le filtre de niveau et la recherche"""
+        self._pending = []
+        self.flush_timer.stop()
+        self.log_text.clear()
 
-        # Faire défiler vers le bas
-        self.log_text.moveCursor(QTextCursor.End)
+        visible = [entry for entry in self.buffer if self._matches_filters(entry)]
+        if visible:
+            self._append_entries(visible)
+
+    def _matches_filters(self, entry):
+        """Vérifier si une entrée correspond au niveau et à la recherche courants"""
+        _, level, message = entry
+
+        selected_level = self.level_combo.currentText()
+        if selected_level != self.ALL_LEVELS and level != selected_level:
+            return False
+
+        search = self.search_edit.text().strip().lower()
+        if search and search not in message.lower():
+            return False
+
+        return True
+
+    def _format_entry(self, entry):
+        """Formater une entrée en HTML coloré"""
+        timestamp, level, message = entry
+        color = self.LEVEL_COLORS.get(level, "white")
+        text = html.escape(f"[{timestamp}] [{level}] {message}")
+        return f'<span style="color:{color};">{text}</span>'
+
+    def _append_entries(self, entries):
+        """Ajouter un lot d'entrées au widget en une seule opération"""
+        scrollbar = self.log_text.verticalScrollBar()
+        at_bottom = scrollbar.value() >= scrollbar.maximum() - 4
+
+        # Un bloc par ligne pour que la limite de blocs s'applique, dans une seule
+        # transaction d'édition pour ne relancer la mise en page qu'une fois
+        cursor = QTextCursor(self.log_text.document())
+        cursor.movePosition(QTextCursor.End)
+        cursor.beginEditBlock()
+        for entry in entries:
+            if not self.log_text.document().isEmpty():
+                cursor.insertBlock()
+            cursor.insertHtml(self._format_entry(entry))
+        cursor.endEditBlock()
+
+        # Ne faire défiler que si l'utilisateur suivait déjà la fin du journal
+        if at_bottom:
+            scrollbar.setValue(scrollbar.maximum())
 
     def clear_logs(self):
         """Effacer les logs affichés"""
+        self.buffer.clear()
+        self._pending = []
         self.log_text.clear()
         self.add_log(UIMessages.LOGS_CLEARED, LogLevels.INFO)
 
+    def to_plain_text(self):
+        """Retourner le contenu du tampon au format texte"""
+        return "\n".join(
+            f"[{timestamp}] [{level}] {message}"
+            for timestamp, level, message in self.buffer
+        )
+
     def save_logs(self):
         """Enregistrer les logs dans un fichier"""
 
@@ -85,7 +202,7 @@ class LogsWidget(QWidget):
 
         try:
             with open(filepath, "w", encoding="utf-8") as f:
-                f.write(self.log_text.toPlainText())
+                f.write(self.to_plain_text())
 
             self.add_log(
                 UIMessages.LOGS_SAVED.format(filepath=filepath), LogLevels.SUCCESS
@@ -94,4 +211,3 @@ class LogsWidget(QWidget):
             self.add_log(
                 f"Erreur lors de l'enregistrement des logs: {str(e)}", LogLevels.ERROR
             )
-        pass
@@ -0,0 +1,145 @@
+from PyQt5.QtWidgets import (
+    QWidget,
+    QVBoxLayout,
+    QHBoxLayout,
+    QLabel,
+    QPushButton,
+    QTableWidget,
+    QTableWidgetItem,
+    QHeaderView,
+    QAbstractItemView,
+    QMessageBox,
+)
+from PyQt5.QtCore import Qt
+from utils.constants import UIMessages
+
+
+def _format_minute(minute):
+    return f"{minute // 60:02d}:{minute % 60:02d}"
+
+
+class RulesWidget(QWidget):
+    """Liste des règles de limitation des flux, avec ajout, modification et suppression"""
+
+    HEADERS = [
+        "Nom",
+        "Utilisateur",
+        "Bibliothèque",
+        "Plateforme",
+        "Transcodage",
+        "Plage horaire",
+        "Flux max",
+        "Active",
+    ]
+
+    def __init__(self, db, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self.rules = []
+
+        self.setup_ui()
+
+    def setup_ui(self):
+        """Configurer l'interface utilisateur"""
+        layout = QVBoxLayout(self)
+
+        help_label = QLabel(UIMessages.RULES_HELP)
+        help_label.setWordWrap(True)
+        layout.addWidget(help_label)
+
+        self.table = QTableWidget(0, len(self.HEADERS))
+        self.table.setHorizontalHeaderLabels(self.HEADERS)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.table.verticalHeader().setVisible(False)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.table.doubleClicked.connect(self.edit_rule)
+        layout.addWidget(self.table)
+
+        button_layout = QHBoxLayout()
+        button_layout.addStretch()
+        for label, slot in (
+            ("Ajouter", self.add_rule),
+            ("Modifier", self.edit_rule),
+            ("Supprimer", self.delete_rule),
+        ):
+            button = QPushButton(label)
+            button.clicked.connect(slot)
+            button_layout.addWidget(button)
+        layout.addLayout(button_layout)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.refresh()
+
+    def refresh(self):
+        """Recharger les règles depuis la base"""
+        self.rules = self.db.get_policy_rules()
+        usernames = {
+            user.get("id"): user.get("username", "")
+            for user in self.db.get_all_users(include_disabled=True)
+        }
+
+        self.table.setRowCount(len(self.rules))
+        for row, rule in enumerate(self.rules):
+            if rule.get("start_minute") is not None and rule.get("end_minute") is not None:
+                window = (
+                    f"{_format_minute(rule['start_minute'])} - "
+                    f"{_format_minute(rule['end_minute'])}"
+                )
+            else:
+                window = "Toute la journée"
+
+            values = [
+                rule.get("name", ""),
+                usernames.get(rule.get("user_id"), rule.get("user_id")) or "Tous",
+                rule.get("library") or "Toutes",
+                rule.get("platform") or "Toutes",
+                "Oui" if rule.get("transcode_only") else "",
+                window,
+                str(rule.get("max_streams", "")),
+                "Oui" if rule.get("enabled") else "Non",
+            ]
+            for column, value in enumerate(values):
+                item = QTableWidgetItem(value)
+                if column == 6:
+                    item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                self.table.setItem(row, column, item)
+
+    def selected_rule(self):
+        row = self.table.currentRow()
+        if 0 <= row < len(self.rules):
+            return self.rules[row]
+        return None
+
+    def add_rule(self):
+        from ui.dialogs.rule_dialog import RuleDialog
+
+        if RuleDialog(self.db, parent=self).exec_():
+            self.refresh()
+
+    def edit_rule(self):
+        from ui.dialogs.rule_dialog import RuleDialog
+
+        rule = self.selected_rule()
+        if rule is None:
+            return
+        if RuleDialog(self.db, rule, parent=self).exec_():
+            self.refresh()
+
+    def delete_rule(self):
+        rule = self.selected_rule()
+        if rule is None:
+            return
+
+        reply = QMessageBox.question(
+            self,
+            UIMessages.TITLE_CONFIRMATION,
+            UIMessages.RULE_DELETE_CONFIRM.format(name=rule.get("name", "")),
+            QMessageBox.Yes | QMessageBox.No,
+            QMessageBox.No,
+        )
+        if reply == QMessageBox.Yes:
+            self.db.delete_policy_rule(rule["id"])
+            self.refresh()
@@ -0,0 +1,91 @@
+import os
+import logging
+from PyQt5.QtCore import QThread, pyqtSignal
+from data.export import SessionExporter
+
+
+class ExportWorker(QThread):
+    """Thread d'export de l'historique des sessions, pour ne pas bloquer l'interface"""
+
+    progress = pyqtSignal(int, int)  # lignes écrites, total
+    export_finished = pyqtSignal(str, int)  # chemin du fichier, nombre de lignes
+    export_failed = pyqtSignal(str)  # message d'erreur
+    export_cancelled = pyqtSignal()
+
+    def __init__(self, db, filepath, fmt, compress=False, filters=None, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self.filepath = filepath
+        self.fmt = fmt
+        self.compress = compress
+        self.filters = filters or {}
+        self._cancel_requested = False
+
+    def cancel(self):
+        """Demander l'interruption de l'export en cours"""
+        self._cancel_requested = True
+
+    def run(self):
+        exporter = SessionExporter(self.db)
+        try:
+            written = exporter.export(
+                self.filepath,
+                fmt=self.fmt,
+                compress=self.compress,
+                progress_callback=self.progress.emit,
+                should_cancel=lambda: self._cancel_requested,
+                **self.filters,
+            )
+        except Exception as e:
+            logging.error(f"Erreur lors de l'export de l'historique: {str(e)}")
+            self._remove_partial_file()
+            self.export_failed.emit(str(e))
+            return
+
+        if written is None:
+            self._remove_partial_file()
+            self.export_cancelled.emit()
+        else:
+            self.export_finished.emit(self.filepath, written)
+
+    def _remove_partial_file(self):
+        """Supprimer un fichier d'export incomplet"""
+        try:
+            if os.path.exists(self.filepath):
+                os.remove(self.filepath)
+        except OSError:
+            pass
+
+
+class AccountsLoader(QThread):
+    """Thread de chargement des comptes Plex (/accounts), hors du thread graphique"""
+
+    accounts_loaded = pyqtSignal(dict)  # {user_id: username}
+    load_failed = pyqtSignal(str)  # message d'erreur
+
+    def run(self):
+        try:
+            from core.plex_api import get_plex_users
+
+            self.accounts_loaded.emit(get_plex_users() or {})
+        except Exception as e:
+            logging.error(f"Erreur lors du chargement des utilisateurs Plex: {str(e)}")
+            self.load_failed.emit(str(e))
+
+
+class StatsLoader(QThread):
+    """Thread de calcul des statistiques utilisateurs, hors du thread graphique"""
+
+    stats_loaded = pyqtSignal(dict)  # {username: statistiques}
+    load_failed = pyqtSignal(str)  # message d'erreur
+
+    def __init__(self, db, parent=None):
+        super().__init__(parent)
+        self.db = db
+
+    def run(self):
+        try:
+            self.stats_loaded.emit(self.db.get_user_stats() or {})
+        except Exception as e:
+            logging.error(f"Erreur lors du chargement des statistiques: {str(e)}")
+            self.load_failed.emit(str(e))
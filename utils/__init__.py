@@ -1,6 +1,6 @@
 from utils.helpers import get_app_path, apply_dark_theme
 from utils.logger import setup_logging
-from utils.notification import send_telegram_notification
+from utils.notification import send_telegram_notification, queue_telegram_notification
 from utils.constants import (
     ConfigKeys,
     UIMessages,
@@ -15,6 +15,7 @@ __all__ = [
     "apply_dark_theme",
     "setup_logging",
     "send_telegram_notification",
+    "queue_telegram_notification",
     "ConfigKeys",
     "UIMessages",
     "LogMessages",
@@ -11,24 +11,136 @@ class ConfigKeys:
     PLEX_SERVER_URL = "plex_server.url"
     PLEX_TOKEN = "plex_server.token"
     CHECK_INTERVAL = "plex_server.check_interval"
+    # Serveurs Plex supplémentaires: liste de {"id", "name", "url", "token"}
+    PLEX_ADDITIONAL_SERVERS = "plex_server.additional_servers"
 
     # Règles
     TERMINATION_MESSAGE = "rules.termination_message"
+    # Comptage des flux par foyer (préfixe réseau) plutôt que par appareil + IP
+    HOUSEHOLD_GROUPING = "rules.household_grouping"
+    HOUSEHOLD_IPV4_PREFIX = "rules.household_ipv4_prefix"
+    HOUSEHOLD_IPV6_PREFIX = "rules.household_ipv6_prefix"
+    # Réseaux CIDR formant chacun un foyer
+    HOUSEHOLD_NETWORKS = "rules.household_networks"
+    # Délai de grâce avant l'arrêt: secondes ou sondages consécutifs en dépassement
+    ENFORCEMENT_GRACE_PERIOD = "rules.grace_period"
+    ENFORCEMENT_GRACE_POLLS = "rules.grace_polls"
+    # Simulation: les décisions d'arrêt sont journalisées, jamais appliquées
+    SHADOW_MODE = "rules.shadow_mode"
+    # Capacité de chaque serveur: transcodages simultanés et débit total (Mb/s)
+    MAX_TRANSCODES = "rules.max_transcodes"
+    MAX_BANDWIDTH = "rules.max_bandwidth"
+
+    # Détection du partage de compte (lieux et réseaux des sessions)
+    SHARING_ENABLED = "sharing.enabled"
+    SHARING_WINDOW_HOURS = "sharing.window_hours"
+    SHARING_MAX_SPEED = "sharing.max_speed"
+    SHARING_MAX_LOCATIONS = "sharing.max_locations"
+    SHARING_MAX_NETWORKS = "sharing.max_networks"
 
     # Notifications
     TELEGRAM_ENABLED = "telegram.enabled"
     TELEGRAM_BOT_TOKEN = "telegram.bot_token"
     TELEGRAM_GROUP_ID = "telegram.group_id"
+    TELEGRAM_SUPPRESSION_WINDOW = "telegram.suppression_window"
+    TELEGRAM_DIGEST_INTERVAL = "telegram.digest_interval"
+
+    # Enregistrement des réponses brutes de /status/sessions
+    RECORDER_ENABLED = "recorder.enabled"
+    RECORDER_CHANGES_ONLY = "recorder.changes_only"
+    RECORDER_MAX_SIZE_MB = "recorder.max_size_mb"
+
+    # Métriques
+    METRICS_ENABLED = "metrics.enabled"
+    METRICS_PORT = "metrics.port"
 
 
 # Valeurs par défaut
 class Defaults:
     PLEX_SERVER_URL = "http://localhost:32400"
+    # Identifiant et nom du serveur principal (plex_server.url / plex_server.token)
+    SERVER_ID = "default"
+    SERVER_NAME = "Principal"
     CHECK_INTERVAL = 30
     TERMINATION_MESSAGE = (
         "Votre abonnement ne vous permet pas la lecture sur plusieurs écrans."
     )
 
+    # Journal d'activité
+    LOG_MAX_LINES = 5000
+    LOG_FLUSH_INTERVAL_MS = 200
+
+    # Fichiers de logs
+    LOG_MAX_BYTES = 5 * 1024 * 1024
+    LOG_BACKUP_COUNT = 14
+
+    # Export de l'historique des sessions
+    EXPORT_CHUNK_SIZE = 1000
+
+    # Onglet Diagnostics: cycles de sondage conservés et rafraîchissement
+    DIAGNOSTICS_MAX_CYCLES = 500
+    DIAGNOSTICS_REFRESH_MS = 2000
+    DIAGNOSTICS_ROWS = 20
+
+    # Notifications: taille de la file, intervalle minimal entre deux messages
+    # (Telegram limite un groupe à 20 messages par minute), nouvelles tentatives
+    NOTIFICATION_QUEUE_SIZE = 500
+    TELEGRAM_MIN_INTERVAL = 3.0
+    NOTIFICATION_MAX_ATTEMPTS = 5
+    NOTIFICATION_MAX_BACKOFF = 60
+    # Reprise périodique des messages stockés non livrés (secondes)
+    NOTIFICATION_RESCAN_INTERVAL = 300
+
+    # Regroupement des notifications: une même alerte (événement, utilisateur,
+    # session) n'est renvoyée qu'après la fenêtre de suppression; les
+    # occurrences supprimées sont résumées à chaque intervalle
+    NOTIFICATION_SUPPRESSION_WINDOW = 900
+    NOTIFICATION_DIGEST_INTERVAL = 300
+    NOTIFICATION_BURST = 5
+
+    # Point de terminaison local des métriques (format Prometheus)
+    METRICS_HOST = "127.0.0.1"
+    METRICS_PORT = 9464
+
+    # Foyers: préfixes de regroupement, apprentissage des réseaux domestiques
+    # (part des observations d'un utilisateur, historique relu au démarrage)
+    HOUSEHOLD_IPV4_PREFIX = 24
+    HOUSEHOLD_IPV6_PREFIX = 64
+    HOUSEHOLD_LEARN_MIN_OBSERVATIONS = 20
+    HOUSEHOLD_LEARN_MIN_SHARE = 0.5
+    HOUSEHOLD_HISTORY_DAYS = 30
+    HOUSEHOLD_CACHE_SIZE = 10000
+
+    # Délai de grâce: un dépassement n'est sanctionné qu'après ce délai ou ce
+    # nombre de sondages consécutifs, et n'est oublié qu'après plusieurs
+    # sondages conformes; une session arrêtée est ignorée un moment si Plex
+    # la signale encore
+    ENFORCEMENT_GRACE_PERIOD = 60
+    ENFORCEMENT_GRACE_POLLS = 3
+    ENFORCEMENT_CLEAR_POLLS = 2
+    ENFORCEMENT_TERMINATED_TTL = 300
+
+    # Enregistrement des sondages: taille totale et d'un segment, compression
+    RECORDER_MAX_MB = 200
+    RECORDER_SEGMENT_BYTES = 4 * 1024 * 1024
+    RECORDER_COMPRESSION_LEVEL = 6
+
+    # Débit et transcodages: fenêtre glissante des moyennes et pics (secondes)
+    USAGE_WINDOW = 300
+
+    # Partage de compte: fenêtre glissante (heures), vitesse plausible (km/h),
+    # distance minimale comparée (précision GeoIP, km), lieux et réseaux
+    # distincts tolérés, adresses mises en cache
+    SHARING_WINDOW_HOURS = 24
+    SHARING_MAX_SPEED = 800
+    SHARING_MIN_DISTANCE = 100
+    SHARING_MAX_LOCATIONS = 3
+    SHARING_MAX_NETWORKS = 4
+    SHARING_CACHE_SIZE = 10000
+
+    # Rapport des décisions d'arrêt (--shadow-report): période par défaut
+    ENFORCEMENT_REPORT_DAYS = 7
+
 
 # Messages pour l'interface utilisateur
 class UIMessages:
@@ -65,6 +177,10 @@ class UIMessages:
     GROUP_USERS = "Utilisateurs"
     GROUP_USER_DETAILS = "Détails de l'utilisateur"
     GROUP_ACTIVE_SESSIONS = "Sessions actives"
+    USAGE_SUMMARY = (
+        "Débit: {bandwidth} (moy. {average}, pic {peak}) — "
+        "Transcodages: {transcodes} (pic {peak_transcodes})"
+    )
     GROUP_STATS = "Statistiques"
     GROUP_LOGS = "Journal d'activité"
 
@@ -91,6 +207,7 @@ class UIMessages:
     BTN_RESUME = "Reprendre"
     BTN_DELETE = "Supprimer"
     BTN_EXPORT = "Exporter (CSV)"
+    BTN_EXPORT_HISTORY = "Exporter l'historique"
     BTN_RESET = "Réinitialiser"
     BTN_SYNC = "Synchroniser avec Plex"
     BTN_MIGRATE = "Migrer les données existantes"
@@ -107,6 +224,8 @@ class UIMessages:
     LOGS_CLEARED = "Journal effacé"
     LOGS_SAVED = "Logs enregistrés dans {filepath}"
     STATS_EXPORTED = "Statistiques exportées dans {filepath}"
+    HISTORY_EXPORTED = "{count} sessions exportées dans {filepath}"
+    HISTORY_EXPORT_CANCELLED = "Export de l'historique annulé"
     STATS_RESET = "Statistiques réinitialisées"
     SESSIONS_REFRESHED = "Sessions rafraîchies manuellement"
     USER_UPDATED = "Utilisateur mis à jour avec succès!"
@@ -163,6 +282,20 @@ class UIMessages:
     CONFIG_TELEGRAM_GROUP_LABEL = "ID du groupe/canal Telegram:"
     CONFIG_CONNECTION_SUCCESS = "Connexion au serveur Plex réussie!"
     CONFIG_CONNECTION_ERROR = "Erreur de connexion: {error}"
+    CONFIG_SAVE_ERROR = "Impossible d'enregistrer la configuration"
+    CONFIG_HOUSEHOLD_INVALID = "Réseau invalide: {network}"
+    CONFIG_HOUSEHOLD_HELP = (
+        "Les adresses d'un même préfixe comptent pour un seul flux, ainsi que "
+        "celles d'un réseau listé. Le réseau d'où chaque utilisateur ouvre la "
+        "majorité de ses sessions est appris comme son foyer."
+    )
+    CONFIG_SHARING_HELP = (
+        "Chaque nouvelle session est localisée (base GeoLite2-City dans le "
+        "dossier data) et rattachée à son réseau. Une alerte est levée pour "
+        "deux sessions trop éloignées pour le temps qui les sépare, ou pour "
+        "trop de lieux ou de réseaux distincts sur la fenêtre. Les adresses "
+        "du réseau local sont ignorées."
+    )
 
     # Messages de migration
     CONFIRM_MIGRATION = "Voulez-vous migrer les données existantes vers la base de données?\nCette opération peut prendre du temps en fonction du volume de données."
@@ -173,12 +306,39 @@ class UIMessages:
     TAB_DATA = "Données"
     TAB_CHARTS = "Graphiques"
     TAB_PLATFORMS = "Plateformes"
+    TAB_DIAGNOSTICS = "Diagnostics"
+    TAB_RULES = "Règles"
+    GROUP_PERCENTILES = "Durée par étape (ms)"
+    GROUP_RECENT_CYCLES = "Derniers cycles de sondage"
+    GROUP_SLOWEST_CYCLES = "Cycles les plus lents"
+    DIAGNOSTICS_SUMMARY = "{count} cycles mesurés"
     CHART_SESSIONS_TITLE = "Répartition des arrêts de flux par utilisateur"
     CHART_PLATFORMS_TITLE = "Arrêts de flux par plateforme"
 
+    # Règles de limitation des flux
+    RULES_HELP = (
+        "Chaque règle limite, pour chaque utilisateur concerné, le nombre de flux "
+        "correspondant à ses critères. Elle s'ajoute à la limite personnelle "
+        "définie dans la gestion des utilisateurs."
+    )
+    RULE_DIALOG_NEW = "Nouvelle règle"
+    RULE_DIALOG_EDIT = "Modifier la règle"
+    RULE_NAME_REQUIRED = "Donnez un nom à la règle."
+    RULE_EMPTY_WINDOW = "Le début et la fin de la plage horaire doivent différer."
+    RULE_SAVE_ERROR = "Impossible d'enregistrer la règle"
+    RULE_DELETE_CONFIRM = "Supprimer la règle « {name} » ?"
+
     # Messages de désactivation de compte
     ACCOUNT_DISABLED_MESSAGE = "Votre compte a été suspendu pour impayé. Veuillez me contacter sur WhatsApp pour régulariser votre situation."
     LABEL_ACCOUNT_DISABLED = "Compte désactivé:"
+    NOTIFICATION_DIGEST_TITLE = "📋 <b>Notifications regroupées</b>"
+    NOTIFICATION_DIGEST_LINE = "• {label}: {event} ×{count}"
+    NOTIFICATION_EVENTS = {
+        "disabled_attempt": "tentative sur compte désactivé",
+        "streams_stopped": "flux arrêtés",
+        "sharing_alert": "alertes de partage de compte",
+    }
+    SHARING_ALERT = "🌍 Partage de compte suspecté:\n\nUtilisateur: {username}\nAlerte: {kind}\nDétails: {details}\nIP: {ip}"
     DISABLED_USER_ATTEMPT = "❌ Tentative de lecture sur compte désactivé:\n\nUtilisateur: {username}\nTitre: {title}\nPlateforme: {platform}\nIP: {ip}"
 
 
@@ -187,6 +347,12 @@ class LogMessages:
     # Démarrage et arrêt
     MONITOR_START = "Démarrage de la surveillance des flux Plex"
     MONITOR_STOP = "Arrêt de la surveillance des flux Plex"
+    HEADLESS_START = "Mode sans interface: surveillance démarrée (Ctrl+C pour arrêter)"
+    HEADLESS_SIGNAL = "Signal {signal} reçu, arrêt de la surveillance"
+    HEADLESS_NOT_CONFIGURED = (
+        "Configuration Plex incomplète: renseignez l'URL et le token du serveur "
+        "avant de lancer le mode sans interface"
+    )
 
     # Erreurs
     DB_ERROR = "Erreur lors de l'initialisation de la base de données: {error}"
@@ -195,14 +361,48 @@ class LogMessages:
     XML_PARSE_ERROR = "Erreur lors du parsing des données de session: {error}"
     PLEX_USERS_ERROR = "Erreur lors du chargement des utilisateurs Plex: {error}"
     STATS_EXPORT_ERROR = "Erreur lors de l'exportation des statistiques: {error}"
+    HISTORY_EXPORT_ERROR = "Erreur lors de l'exportation de l'historique: {error}"
     STREAM_STOP_FAILED = "Échec de l'arrêt du flux pour {username} sur {platform}"
+    METRICS_ERROR = "Impossible d'exposer les métriques sur le port {port}: {error}"
+    HOUSEHOLD_NETWORK_ERROR = "Réseau de foyer invalide ignoré: {error}"
+    RECORDER_ERROR = "Impossible d'ouvrir l'enregistrement des sondages: {error}"
 
     # Succès
     DB_INITIALIZED = "Base de données initialisée avec succès"
     PLEX_USERS_LOADED = "Chargement de {count} utilisateurs Plex réussi"
+    METRICS_STARTED = "Métriques disponibles sur http://{host}:{port}/metrics"
+    RULES_COMPILED = "{count} règle(s) de limitation compilée(s)"
+    RECORDER_ENABLED = "Enregistrement des sondages dans {path} (max {size} Mo)"
+    HOUSEHOLDS_ENABLED = "Comptage par foyer activé ({networks} réseau(x) configuré(s))"
 
     # Avertissements
     USER_STREAM_LIMIT = "Utilisateur {username} dépasse la limite: {count} flux actifs"
+    DISABLED_ACCOUNT_REASON = "Compte désactivé"
+    STREAMS_SELECTED = (
+        "Arrêt de {count} flux sur {total} pour {username} "
+        "(en pause, transcodés, gros débits et plus récents d'abord)"
+    )
+    RULE_VIOLATION = (
+        "Utilisateur {username} enfreint la règle « {rule} »: {count} flux (max: {max})"
+    )
+    SHADOW_DECISION = (
+        "[Simulation] {count} flux de {username} auraient été arrêtés: {reason}"
+    )
+    SHADOW_MODE_ENABLED = (
+        "Mode simulation actif: les décisions d'arrêt sont journalisées sans être appliquées"
+    )
+    SHARING_ALERT = "Partage de compte suspecté pour {username} ({kind}): {details}"
+    SHARING_ENABLED = "Détection du partage de compte activée (fenêtre de {hours} h)"
+    CAPACITY_TRANSCODES = (
+        "Serveur {server}: {count} transcodages en cours (max: {max})"
+    )
+    CAPACITY_BANDWIDTH = (
+        "Serveur {server}: débit total de {total:.1f} Mb/s (max: {max} Mb/s)"
+    )
+    ENFORCEMENT_GRACE = (
+        "Dépassement toléré pour {username}: arrêt différé "
+        "({elapsed:.0f}s sur {period}s de grâce)"
+    )
 
     # Actions
     STREAM_STOPPED = "Stream arrêté pour {username} sur {platform}"
@@ -212,6 +412,12 @@ class LogMessages:
     TELEGRAM_CONFIG_INCOMPLETE = "Configuration Telegram incomplète"
     TELEGRAM_ERROR = "Erreur lors de l'envoi du message Telegram: {code}"
     TELEGRAM_EXCEPTION = "Exception lors de l'envoi du message Telegram: {error}"
+    NOTIFICATION_QUEUE_FULL = (
+        "File des notifications pleine: message conservé pour un envoi ultérieur"
+    )
+    NOTIFICATION_GIVEN_UP = (
+        "Notification non livrée après {attempts} tentatives, nouvel essai au prochain démarrage"
+    )
 
     # Messages spécifiques à l'état des streams
     STREAM_STOPPED_PLAYING = (
@@ -244,6 +450,9 @@ class TableColumns:
         "Appareil",
         "Plateforme",
         "IP",
+        "Qualité",
+        "Débit",
+        "Serveur",
         "Actions",
     ]
 
@@ -278,4 +487,5 @@ class Paths:
     EXPORTS = "exports"
     ICON = "plexpatrol_icon.png"
     DATABASE = "plexpatrol.db"
+    RECORDINGS = "recordings"
     STATS_FILE = "stats.json"
@@ -1,7 +1,3 @@
-from PyQt5.QtCore import Qt
-from PyQt5.QtGui import QColor, QPalette
-
-
 def get_app_path():
     """Obtenir le chemin de base de l'application, même si empaqueté avec PyInstaller"""
     import sys
@@ -22,6 +18,10 @@ def apply_dark_theme(app):
 
 def apply_dark_palette(app):
     """Appliquer un thème sombre à l'application"""
+    # Import local: get_app_path doit rester utilisable sans Qt (mode sans interface)
+    from PyQt5.QtCore import Qt
+    from PyQt5.QtGui import QColor, QPalette
+
     dark_palette = QPalette()
     dark_palette.setColor(QPalette.Window, QColor(53, 53, 53))
     dark_palette.setColor(QPalette.WindowText, Qt.white)
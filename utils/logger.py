@@ -1,25 +1,188 @@
 import os
+import gzip
+import queue
+import shutil
+import atexit
 import logging
-from datetime import datetime
+import logging.handlers
+import threading
 from utils import get_app_path
+from utils.constants import Defaults, Paths
 import sys
 
+LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
 
-def setup_logging():
-    """Configurer le système de journalisation"""
-    logs_dir = os.path.join(get_app_path(), "logs")
-    if not os.path.exists(logs_dir):
-        os.makedirs(logs_dir)
+# État du pipeline de journalisation (une seule configuration par processus)
+_listener = None
+_queue_handler = None
+_setup_lock = threading.Lock()
 
-    log_file = os.path.join(
-        logs_dir, f"PlexPatrol_{datetime.now().strftime('%Y%m%d')}.log"
-    )
 
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-        handlers=[
-            logging.FileHandler(log_file, encoding="utf-8"),
-            logging.StreamHandler(sys.stdout),
-        ],
+class CompressedRotatingFileHandler(logging.handlers.TimedRotatingFileHandler):
+    """
+    Handler de fichier avec rotation quotidienne ET sur taille,
+    les anciens fichiers étant compressés en gzip
+    """
+
+    def __init__(self, filename, max_bytes=0, backup_count=0, **kwargs):
+        super().__init__(
+            filename,
+            when="midnight",
+            backupCount=backup_count,
+            encoding="utf-8",
+            delay=True,
+            **kwargs,
+        )
+        self.max_bytes = max_bytes
+        self.namer = self._gzip_namer
+        self.rotator = self._gzip_rotator
+
+    def shouldRollover(self, record):
+        """Rotation à minuit ou lorsque le fichier dépasse la taille maximale"""
+        if super().shouldRollover(record):
+            return True
+
+        if self.max_bytes > 0:
+            if self.stream is None:
+                self.stream = self._open()
+            # Position courante = taille du fichier (ouvert en ajout)
+            self.stream.seek(0, 2)
+            return self.stream.tell() >= self.max_bytes
+
+        return False
+
+    def rotation_filename(self, default_name):
+        """Éviter d'écraser une archive du jour lors des rotations sur taille"""
+        name = super().rotation_filename(default_name)
+        if not os.path.exists(name):
+            return name
+
+        index = 1
+        base, ext = os.path.splitext(name)
+        while os.path.exists(f"{base}.{index}{ext}"):
+            index += 1
+        return f"{base}.{index}{ext}"
+
+    def getFilesToDelete(self):
+        """Inclure les archives compressées dans la purge des anciens fichiers"""
+        dir_name, base_name = os.path.split(self.baseFilename)
+        prefix = base_name + "."
+        # Tri par date de modification: les suffixes .1, .2 ne sont pas chronologiques
+        candidates = sorted(
+            (
+                os.path.join(dir_name, name)
+                for name in os.listdir(dir_name)
+                if name.startswith(prefix) and name != base_name
+            ),
+            key=os.path.getmtime,
+        )
+        if len(candidates) <= self.backupCount:
+            return []
+        return candidates[: len(candidates) - self.backupCount]
+
+    @staticmethod
+    def _gzip_namer(default_name):
+        return default_name + ".gz"
+
+    @staticmethod
+    def _gzip_rotator(source, dest):
+        """Compresser le fichier sortant puis le supprimer"""
+        with open(source, "rb") as f_in, gzip.open(dest, "wb") as f_out:
+            shutil.copyfileobj(f_in, f_out)
+        os.remove(source)
+
+
+def _build_file_handler(logs_dir, filename, formatter, logger_name=None):
+    """Créer un handler de fichier rotatif, éventuellement limité à un logger"""
+    handler = CompressedRotatingFileHandler(
+        os.path.join(logs_dir, filename),
+        max_bytes=Defaults.LOG_MAX_BYTES,
+        backup_count=Defaults.LOG_BACKUP_COUNT,
     )
+    handler.setFormatter(formatter)
+    if logger_name:
+        handler.addFilter(logging.Filter(logger_name))
+    return handler
+
+
+def setup_logging(level=logging.INFO, console=True):
+    """
+    Configurer le système de journalisation
+
+    Les loggers écrivent dans une file en mémoire; un thread d'écoute se
+    charge des écritures disque (avec rotation et compression). L'appel est
+    idempotent: les appels suivants ne font que retourner le listener existant.
+
+    Args:
+        level (int): Niveau de journalisation du logger racine
+        console (bool): Si True, recopier les logs sur la sortie standard
+
+    Returns:
+        QueueListener: Le listener actif
+    """
+    global _listener, _queue_handler
+
+    with _setup_lock:
+        if _listener is not None:
+            return _listener
+
+        logs_dir = os.path.join(get_app_path(), Paths.LOGS)
+        if not os.path.exists(logs_dir):
+            os.makedirs(logs_dir)
+
+        formatter = logging.Formatter(LOG_FORMAT)
+
+        handlers = [
+            # Journal principal de l'application
+            _build_file_handler(logs_dir, "PlexPatrol.log", formatter),
+            # Journal dédié au moniteur de flux
+            _build_file_handler(
+                logs_dir,
+                "stream_monitor.log",
+                logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"),
+                logger_name="stream_monitor",
+            ),
+        ]
+
+        if console:
+            console_handler = logging.StreamHandler(sys.stdout)
+            console_handler.setFormatter(formatter)
+            handlers.append(console_handler)
+
+        log_queue = queue.Queue(-1)
+        _queue_handler = logging.handlers.QueueHandler(log_queue)
+
+        root_logger = logging.getLogger()
+        root_logger.setLevel(level)
+        root_logger.addHandler(_queue_handler)
+
+        _listener = logging.handlers.QueueListener(
+            log_queue, *handlers, respect_handler_level=True
+        )
+        _listener.start()
+
+        # Profondeur de la file des logs, exposée avec les métriques internes
+        from utils.metrics import QUEUE_DEPTH, register_collector
+
+        register_collector(lambda: QUEUE_DEPTH.set(log_queue.qsize(), queue="logging"))
+
+        atexit.register(shutdown_logging)
+
+        return _listener
+
+
+def shutdown_logging():
+    """Vider la file et arrêter le thread d'écriture des logs"""
+    global _listener, _queue_handler
+
+    with _setup_lock:
+        if _listener is None:
+            return
+
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+
+        logging.getLogger().removeHandler(_queue_handler)
+        _listener = None
+        _queue_handler = None
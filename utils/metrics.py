@@ -0,0 +1,402 @@
+"""
+Métriques internes de PlexPatrol, exposées au format texte Prometheus
+
+Les compteurs sont alimentés par le moteur de surveillance, la base de
+données et l'envoi des notifications. Un petit serveur HTTP local, optionnel
+(clés metrics.enabled et metrics.port), les publie sur /metrics.
+"""
+
+import time
+import bisect
+import logging
+import threading
+from functools import wraps
+
+from utils.constants import Defaults, LogMessages
+
+# Bornes par défaut des histogrammes de durée (en secondes)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    """Échapper une valeur d'étiquette selon le format d'exposition"""
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Timer:
+    """Mesurer une durée dans un histogramme, en contexte ou en décorateur"""
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self._start, **self.labels)
+        return False
+
+    def __call__(self, func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with _Timer(self.histogram, self.labels):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+
+class _Metric:
+    """Base commune: une valeur par combinaison d'étiquettes"""
+
+    TYPE = None
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.label_names):
+            raise ValueError(
+                f"Étiquettes attendues pour {self.name}: {', '.join(self.label_names)}"
+            )
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def clear(self):
+        """Oublier toutes les séries de la métrique"""
+        with self._lock:
+            self._values.clear()
+
+    def samples(self):
+        """Retourner les lignes (nom, étiquettes, valeur) à exposer"""
+        with self._lock:
+            return [
+                (self.name, _format_labels(self.label_names, key), value)
+                for key, value in sorted(self._values.items())
+            ]
+
+    def render(self):
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.TYPE}",
+        ]
+        for name, labels, value in self.samples():
+            lines.append(f"{name}{labels} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    """Valeur qui ne fait qu'augmenter (événements comptés)"""
+
+    TYPE = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    """Valeur instantanée"""
+
+    TYPE = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def replace(self, values):
+        """Remplacer toutes les séries d'une jauge à une étiquette par {étiquette: valeur}"""
+        with self._lock:
+            self._values = {(str(label),): value for label, value in values.items()}
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class Histogram(_Metric):
+    """Distribution de durées, répartie dans des intervalles cumulés"""
+
+    TYPE = "histogram"
+
+    def __init__(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                # Compteurs par intervalle (+Inf en dernier), somme, nombre
+                series = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][bisect.bisect_left(self.buckets, value)] += 1
+            series[1] += value
+            series[2] += 1
+
+    def time(self, **labels):
+        """Chronométrer un bloc ou une fonction"""
+        return _Timer(self, labels)
+
+    def count(self, **labels):
+        with self._lock:
+            series = self._values.get(self._key(labels))
+            return series[2] if series else 0
+
+    def samples(self):
+        with self._lock:
+            items = sorted(
+                (key, [list(series[0]), series[1], series[2]])
+                for key, series in self._values.items()
+            )
+
+        samples = []
+        for key, (counts, total, count) in items:
+            cumulated = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulated += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                samples.append(
+                    (
+                        f"{self.name}_bucket",
+                        _format_labels(self.label_names, key, le),
+                        cumulated,
+                    )
+                )
+            labels = _format_labels(self.label_names, key)
+            samples.append((f"{self.name}_sum", labels, total))
+            samples.append((f"{self.name}_count", labels, count))
+        return samples
+
+
+class MetricsRegistry:
+    """Ensemble des métriques exposées"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name, documentation, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Métrique {name} déjà déclarée avec un autre type")
+            return metric
+
+    def counter(self, name, documentation, labels=()):
+        return self._register(Counter, name, documentation, labels=labels)
+
+    def gauge(self, name, documentation, labels=()):
+        return self._register(Gauge, name, documentation, labels=labels)
+
+    def histogram(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        return self._register(
+            Histogram, name, documentation, labels=labels, buckets=buckets
+        )
+
+    def render(self):
+        """Produire le texte d'exposition de toutes les métriques"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# Registre global du processus
+REGISTRY = MetricsRegistry()
+
+# Surveillance
+POLL_DURATION = REGISTRY.histogram(
+    "plexpatrol_poll_duration_seconds",
+    "Durée d'une requête /status/sessions par serveur",
+    labels=("server",),
+)
+POLL_FAILURES = REGISTRY.counter(
+    "plexpatrol_poll_failures_total",
+    "Sondages en échec par serveur",
+    labels=("server",),
+)
+PARSE_DURATION = REGISTRY.histogram(
+    "plexpatrol_parse_duration_seconds",
+    "Durée du parsing et de l'enregistrement des sessions d'un serveur",
+)
+LAST_POLL = REGISTRY.gauge(
+    "plexpatrol_last_poll_timestamp_seconds",
+    "Horodatage du dernier sondage réussi",
+)
+CONSECUTIVE_ERRORS = REGISTRY.gauge(
+    "plexpatrol_consecutive_errors",
+    "Nombre d'erreurs de sondage consécutives",
+)
+ACTIVE_STREAMS = REGISTRY.gauge(
+    "plexpatrol_active_streams",
+    "Flux actifs par utilisateur",
+    labels=("user",),
+)
+USER_BANDWIDTH = REGISTRY.gauge(
+    "plexpatrol_user_bandwidth_kbps",
+    "Débit courant par utilisateur (kb/s)",
+    labels=("user",),
+)
+SERVER_BANDWIDTH = REGISTRY.gauge(
+    "plexpatrol_server_bandwidth_kbps",
+    "Débit courant par serveur (kb/s)",
+    labels=("server",),
+)
+SERVER_TRANSCODES = REGISTRY.gauge(
+    "plexpatrol_server_transcodes",
+    "Transcodages en cours par serveur",
+    labels=("server",),
+)
+
+# Application des règles
+TERMINATIONS = REGISTRY.counter(
+    "plexpatrol_terminations_total",
+    "Arrêts de flux demandés, par résultat",
+    labels=("result",),
+)
+TERMINATION_DURATION = REGISTRY.histogram(
+    "plexpatrol_termination_duration_seconds",
+    "Durée d'un arrêt de flux, nouvelles tentatives comprises",
+)
+
+# Base de données
+DB_WRITE_DURATION = REGISTRY.histogram(
+    "plexpatrol_db_write_duration_seconds",
+    "Durée des écritures en base",
+    labels=("operation",),
+)
+
+# Notifications
+TELEGRAM_DURATION = REGISTRY.histogram(
+    "plexpatrol_telegram_send_duration_seconds",
+    "Durée d'envoi d'un message Telegram",
+)
+TELEGRAM_MESSAGES = REGISTRY.counter(
+    "plexpatrol_telegram_messages_total",
+    "Messages Telegram, par résultat",
+    labels=("result",),
+)
+
+# Files d'attente internes
+QUEUE_DEPTH = REGISTRY.gauge(
+    "plexpatrol_queue_depth",
+    "Éléments en attente dans les files internes",
+    labels=("queue",),
+)
+
+
+# Fonctions appelées à chaque exposition (profondeur des files, etc.)
+_collectors = []
+
+
+def register_collector(collector):
+    """Enregistrer une fonction appelée juste avant chaque exposition"""
+    if collector not in _collectors:
+        _collectors.append(collector)
+
+
+def render_metrics():
+    """Texte d'exposition Prometheus de toutes les métriques du processus"""
+    for collector in list(_collectors):
+        try:
+            collector()
+        except Exception as e:
+            logging.debug(f"Collecteur de métriques en erreur: {str(e)}")
+    return REGISTRY.render()
+
+
+# Serveur d'exposition (un seul par processus)
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port=Defaults.METRICS_PORT, host=Defaults.METRICS_HOST):
+    """
+    Démarrer le serveur HTTP local des métriques, s'il ne tourne pas déjà
+
+    Returns:
+        bool: True si le serveur est disponible
+    """
+    global _server
+
+    # http.server n'est chargé que si l'exposition est activée
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class _MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/", "/metrics"):
+                self.send_error(404)
+                return
+
+            body = render_metrics().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    with _server_lock:
+        if _server is not None:
+            return True
+        try:
+            _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+        except OSError as e:
+            logging.error(LogMessages.METRICS_ERROR.format(port=port, error=str(e)))
+            return False
+
+        _server.daemon_threads = True
+        threading.Thread(
+            target=_server.serve_forever, name="metrics-server", daemon=True
+        ).start()
+        logging.info(LogMessages.METRICS_STARTED.format(host=host, port=port))
+        return True
+
+
+def stop_metrics_server():
+    """Arrêter le serveur des métriques"""
+    global _server
+
+    with _server_lock:
+        if _server is None:
+            return
+        _server.shutdown()
+        _server.server_close()
+        _server = None
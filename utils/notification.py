@@ -1,47 +1,444 @@
-import requests
+import time
+import queue
 import logging
+import threading
 
-from utils.constants import LogMessages
+from utils.constants import LogMessages, UIMessages, Defaults
+from utils.metrics import (
+    TELEGRAM_DURATION,
+    TELEGRAM_MESSAGES,
+    QUEUE_DEPTH,
+    register_collector,
+)
 
 
-def send_telegram_notification(message):
+def _telegram_settings():
     """
-    Envoyer une notification Telegram
-
-    Args:
-        config (dict): Configuration avec les paramètres Telegram
-        message (str): Message à envoyer
+    Lire la configuration Telegram
 
     Returns:
-        bool: True si le message a été envoyé avec succès, False sinon
+        tuple: (bot_token, group_id), ou None si les notifications sont
+        désactivées ou incomplètes
     """
     from config.config_manager import config
 
     if not config.telegram_enabled:
         logging.warning("Notifications Telegram désactivées, message non envoyé")
-        return False
+        return None
 
     bot_token = config.telegram_bot_token
     group_id = config.telegram_group_id
 
     if not bot_token or not group_id:
         logging.warning("Configuration Telegram incomplète, notification non envoyée")
-        return False
+        return None
+
+    return bot_token, group_id
+
+
+def _post_telegram(bot_token, group_id, message):
+    """
+    Envoyer un message via l'API Telegram
+
+    Returns:
+        tuple: (livré, délai imposé par Telegram en secondes ou None,
+        erreur définitive ne justifiant pas de nouvelle tentative)
+    """
+    # Import local: requests n'est nécessaire qu'à l'envoi effectif d'un message
+    import requests
 
     url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
     payload = {"chat_id": group_id, "text": message, "parse_mode": "HTML"}
 
     try:
-        response = requests.post(url, data=payload, timeout=10)
-        if response.status_code == 200:
-            return True
-        else:
-            logging.error(LogMessages.TELEGRAM_ERROR.format(code=response.status_code))
-            return False
+        with TELEGRAM_DURATION.time():
+            response = requests.post(url, data=payload, timeout=10)
     except Exception as e:
         logging.error(LogMessages.TELEGRAM_EXCEPTION.format(error=str(e)))
+        return False, None, False
+
+    if response.status_code == 200:
+        return True, None, False
+
+    logging.error(LogMessages.TELEGRAM_ERROR.format(code=response.status_code))
+
+    if response.status_code == 429:
+        # Limite de débit dépassée: Telegram indique le délai à respecter
+        try:
+            retry_after = response.json()["parameters"]["retry_after"]
+        except Exception:
+            retry_after = None
+        return False, retry_after, False
+
+    # Les autres erreurs 4xx (token invalide, chat inconnu...) sont définitives
+    return False, None, 400 <= response.status_code < 500
+
+
+def send_telegram_notification(message):
+    """
+    Envoyer immédiatement une notification Telegram (appel bloquant)
+
+    Pour la surveillance, préférer queue_telegram_notification() qui ne bloque
+    jamais l'application des règles.
+
+    Args:
+        message (str): Message à envoyer
+
+    Returns:
+        bool: True si le message a été envoyé avec succès, False sinon
+    """
+    settings = _telegram_settings()
+    if settings is None:
         return False
 
+    delivered, _, _ = _post_telegram(*settings, message)
+    TELEGRAM_MESSAGES.inc(result="sent" if delivered else "failed")
+    return delivered
+
+
+class NotificationDispatcher:
+    """
+    Envoi des notifications Telegram en arrière-plan
+
+    Les messages sont placés dans une file bornée et envoyés par un thread
+    dédié, qui respecte un intervalle minimal entre deux envois (limite de
+    débit de Telegram par discussion) et réessaie avec un délai croissant en
+    cas d'échec. Avec un stockage (PlexPatrolDB), chaque message est conservé
+    jusqu'à sa livraison: les messages non envoyés sont repris au démarrage
+    et, tant que le thread tourne, à intervalle régulier. Un message déjà en
+    file n'y est jamais ajouté une seconde fois.
+    """
+
+    def __init__(
+        self,
+        store=None,
+        max_queue=Defaults.NOTIFICATION_QUEUE_SIZE,
+        min_interval=Defaults.TELEGRAM_MIN_INTERVAL,
+        max_attempts=Defaults.NOTIFICATION_MAX_ATTEMPTS,
+        rescan_interval=Defaults.NOTIFICATION_RESCAN_INTERVAL,
+    ):
+        self.store = store
+        self.min_interval = min_interval
+        self.max_attempts = max_attempts
+        self.rescan_interval = rescan_interval
+        self._queue = queue.Queue(maxsize=max_queue)
+        # Identifiants stockés en file ou en cours d'envoi
+        self._queued = set()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._last_sent = 0.0
+        self._last_scan = 0.0
+
+        register_collector(
+            lambda: QUEUE_DEPTH.set(self._queue.qsize(), queue="notifications")
+        )
+
+    @property
+    def is_running(self):
+        return (
+            self._thread is not None
+            and self._thread.is_alive()
+            and not self._stop_event.is_set()
+        )
+
+    def start(self):
+        """Démarrer le thread d'envoi et reprendre les messages non livrés"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                # Thread en cours d'arrêt (envoi en cours au moment de stop()):
+                # il reprend plutôt que d'être doublé par un second
+                self._stop_event.clear()
+                return
+            self._stop_event.clear()
+            self._thread = threading.Thread(
+                target=self._run, name="notification-dispatcher", daemon=True
+            )
+
+        self._reload_pending()
+        self._thread.start()
+
+    def stop(self, timeout=2):
+        """Arrêter le thread d'envoi; les messages en attente restent stockés"""
+        self._stop_event.set()
+        thread = self._thread
+        if thread is not None:
+            # Le thread s'efface lui-même en sortant: s'il est encore dans un
+            # envoi au-delà du délai, start() le reprendra
+            thread.join(timeout)
+
+    def submit(self, message):
+        """
+        Confier un message au thread d'envoi, sans jamais bloquer
+
+        Returns:
+            bool: True si le message a été mis en file
+        """
+        notification_id = None
+        if self.store is not None:
+            notification_id = self.store.add_pending_notification(message)
+        return self._enqueue(notification_id, message)
+
+    def _enqueue(self, notification_id, message):
+        with self._lock:
+            if notification_id is not None:
+                if notification_id in self._queued:
+                    return True
+                self._queued.add(notification_id)
+            try:
+                self._queue.put_nowait((notification_id, message))
+                return True
+            except queue.Full:
+                self._queued.discard(notification_id)
+        # Le message reste stocké et sera repris à la prochaine relecture
+        logging.warning(LogMessages.NOTIFICATION_QUEUE_FULL)
+        TELEGRAM_MESSAGES.inc(result="deferred")
+        return False
+
+    def _reload_pending(self):
+        """Mettre en file les messages stockés qui n'y sont pas déjà"""
+        self._last_scan = time.monotonic()
+        if self.store is None:
+            return
+        for notification_id, message in self.store.get_pending_notifications():
+            if not self._enqueue(notification_id, message):
+                break
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if self._stop_event.is_set():
+                    if self._thread is threading.current_thread():
+                        self._thread = None
+                    return
+            try:
+                notification_id, message = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                # Messages abandonnés ou refusés par une file pleine: un
+                # processus qui tourne longtemps doit finir par les livrer
+                if time.monotonic() - self._last_scan >= self.rescan_interval:
+                    self._reload_pending()
+                continue
+            try:
+                self._deliver(notification_id, message)
+            except Exception as e:
+                logging.error(f"Erreur dans l'envoi des notifications: {str(e)}")
+            finally:
+                with self._lock:
+                    self._queued.discard(notification_id)
+
+    def _forget(self, notification_id):
+        if self.store is not None and notification_id is not None:
+            self.store.delete_pending_notification(notification_id)
+
+    def _deliver(self, notification_id, message):
+        """Envoyer un message en respectant le débit et en réessayant si besoin"""
+        for attempt in range(1, self.max_attempts + 1):
+            # Intervalle minimal entre deux messages
+            wait = self.min_interval - (time.monotonic() - self._last_sent)
+            if wait > 0 and self._stop_event.wait(wait):
+                return
+
+            settings = _telegram_settings()
+            if settings is None:
+                self._forget(notification_id)
+                return
+
+            delivered, retry_after, permanent = _post_telegram(*settings, message)
+            self._last_sent = time.monotonic()
+
+            if delivered:
+                TELEGRAM_MESSAGES.inc(result="sent")
+                self._forget(notification_id)
+                return
+
+            if permanent:
+                TELEGRAM_MESSAGES.inc(result="failed")
+                self._forget(notification_id)
+                return
+
+            if attempt < self.max_attempts:
+                TELEGRAM_MESSAGES.inc(result="retried")
+                delay = retry_after or min(
+                    Defaults.NOTIFICATION_MAX_BACKOFF, 2 ** (attempt - 1)
+                )
+                if self._stop_event.wait(delay):
+                    return
+
+        # Toujours en échec: le message reste stocké pour la prochaine relecture
+        TELEGRAM_MESSAGES.inc(result="failed")
+        logging.error(
+            LogMessages.NOTIFICATION_GIVEN_UP.format(attempts=self.max_attempts)
+        )
+
+
+# Dispatcher partagé par le processus
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+
+def start_notification_dispatcher(store=None):
+    """Démarrer le dispatcher partagé, avec un stockage des messages en attente"""
+    global _dispatcher
+
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            _dispatcher = NotificationDispatcher(store)
+        elif store is not None and _dispatcher.store is None:
+            _dispatcher.store = store
+        _dispatcher.start()
+        return _dispatcher
+
+
+def stop_notification_dispatcher():
+    """Arrêter le dispatcher partagé"""
+    with _dispatcher_lock:
+        if _dispatcher is not None:
+            _dispatcher.stop()
+
+
+def queue_telegram_notification(message):
+    """
+    Envoyer une notification Telegram en arrière-plan, sans bloquer l'appelant
+
+    Returns:
+        bool: True si le message a été pris en charge
+    """
+    from config.config_manager import config
+
+    if not config.telegram_enabled:
+        logging.warning("Notifications Telegram désactivées, message non envoyé")
+        return False
+
+    dispatcher = _dispatcher
+    if dispatcher is None or not dispatcher.is_running:
+        dispatcher = start_notification_dispatcher()
+    return dispatcher.submit(message)
+
+
+class NotificationDigester:
+    """
+    Déduplication et regroupement des notifications
+
+    Chaque notification est identifiée par son type d'événement, l'utilisateur
+    et éventuellement la session. La première occurrence est envoyée
+    immédiatement; les suivantes, pendant la fenêtre de suppression, sont
+    seulement comptées. Au-delà d'un nombre d'envois immédiats par intervalle
+    de résumé (incident touchant de nombreux utilisateurs), les nouvelles
+    notifications sont elles aussi regroupées. Les occurrences comptées sont
+    envoyées sous forme d'un résumé à chaque intervalle.
+
+    Args:
+        sink (callable): Fonction d'envoi d'un message
+        suppression_window (float): Durée, en secondes, pendant laquelle une
+            même notification n'est pas renvoyée
+        digest_interval (float): Intervalle minimal entre deux résumés, en secondes
+        burst (int): Envois immédiats autorisés par intervalle de résumé
+    """
+
+    def __init__(
+        self,
+        sink,
+        suppression_window=Defaults.NOTIFICATION_SUPPRESSION_WINDOW,
+        digest_interval=Defaults.NOTIFICATION_DIGEST_INTERVAL,
+        burst=Defaults.NOTIFICATION_BURST,
+        clock=time.monotonic,
+    ):
+        self.sink = sink
+        self.suppression_window = suppression_window
+        self.digest_interval = digest_interval
+        self.burst = burst
+        self.clock = clock
+
+        self._last_sent = {}  # {(événement, user_id, session_id): horodatage}
+        self._suppressed = {}  # {(événement, libellé): nombre d'occurrences}
+        self._window_start = clock()
+        self._sent_in_window = 0
+        self._lock = threading.Lock()
+
+    def notify(self, event, message, user_id, session_id=None, label=None):
+        """
+        Envoyer une notification, ou la compter pour le prochain résumé
+
+        Args:
+            event (str): Type d'événement (voir UIMessages.NOTIFICATION_EVENTS)
+            message (str): Message complet, envoyé si la notification n'est pas supprimée
+            user_id (str): Utilisateur concerné
+            session_id (str, optional): Session concernée
+            label (str, optional): Libellé de l'utilisateur dans le résumé
+
+        Returns:
+            bool: True si le message a été envoyé immédiatement
+        """
+        key = (event, user_id, session_id)
+        now = self.clock()
+
+        with self._lock:
+            last_sent = self._last_sent.get(key)
+            duplicate = (
+                last_sent is not None and now - last_sent < self.suppression_window
+            )
+            if duplicate or self._sent_in_window >= self.burst:
+                digest_key = (event, label or user_id)
+                self._suppressed[digest_key] = self._suppressed.get(digest_key, 0) + 1
+                TELEGRAM_MESSAGES.inc(result="suppressed")
+                return False
+
+            self._last_sent[key] = now
+            self._sent_in_window += 1
+
+        self.sink(message)
+        return True
+
+    def flush(self, force=False):
+        """
+        Envoyer le résumé des notifications regroupées si l'intervalle est écoulé
+
+        Args:
+            force (bool): Envoyer le résumé sans attendre la fin de l'intervalle
+
+        Returns:
+            bool: True si un résumé a été envoyé
+        """
+        now = self.clock()
+
+        with self._lock:
+            if not force and now - self._window_start < self.digest_interval:
+                return False
+
+            suppressed = self._suppressed
+            self._suppressed = {}
+            self._window_start = now
+            self._sent_in_window = 0
+
+            # Oublier les notifications dont la fenêtre de suppression est passée
+            self._last_sent = {
+                key: sent_at
+                for key, sent_at in self._last_sent.items()
+                if now - sent_at < self.suppression_window
+            }
+
+        if not suppressed:
+            return False
+
+        self.sink(self.format_digest(suppressed))
+        return True
+
+    @staticmethod
+    def format_digest(suppressed):
+        """Construire le message de résumé à partir des occurrences comptées"""
+        lines = [UIMessages.NOTIFICATION_DIGEST_TITLE]
+        for (event, label), count in sorted(
+            suppressed.items(), key=lambda item: item[1], reverse=True
+        ):
+            event_label = UIMessages.NOTIFICATION_EVENTS.get(event, event)
+            lines.append(
+                UIMessages.NOTIFICATION_DIGEST_LINE.format(
+                    label=label, event=event_label, count=count
+                )
+            )
+        return "\n".join(lines)
+
 
 def format_stream_info(stream):
     """
@@ -64,7 +461,7 @@ def format_stream_info(stream):
         device,
         username,
         state,
-    ) = stream
+    ) = stream[:10]
 
     return (
         f"<b>Utilisateur:</b> {username}\n"